@@ -1,14 +1,22 @@
 from __future__ import annotations
+import hashlib
 import json
+import os
+import threading
+import time
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 # NOTE: Python 3.9.6 compatible
 # v18 intent:
 #  - Normalize reject reasons across risk/safety/execution layers
 #  - Provide stable taxonomy + policy mapping (REJECT/RETRY/COOLDOWN/KILL)
 #  - Must be deterministic + auditable (inputs -> decision)
+# Hot path (reject storms): load_policy_cached() -> CompiledRejectPolicyV1, compiled once per policy file
+# (by_code table, ordered prefix rules, per-domain fallbacks) with a per-code memo; the file is re-checked
+# at most every TMF_REJECT_POLICY_CHECK_SEC (stat mtime/size, recompiled only when the sha256 changes).
+# decide_action / decision_from_verdict accept either the plain policy dict or the compiled policy.
 
 @dataclass(frozen=True)
 class RejectDecision:
@@ -55,11 +63,13 @@ def load_policy(path: str) -> Dict[str, Any]:
         raise ValueError("reject_policy root must be object")
     return obj
 
-def decide_action(code: str, *, policy: Dict[str, Any]) -> Tuple[str, str]:
+def decide_action(code: str, *, policy: Union[Dict[str, Any], "CompiledRejectPolicyV1"]) -> Tuple[str, str]:
     """
     Returns (action, severity)
     action ∈ {REJECT, RETRY, COOLDOWN, KILL}
     """
+    if isinstance(policy, CompiledRejectPolicyV1):
+        return policy.decide(code)
     c = (code or "").upper()
     domain = _domain_from_code(c)
 
@@ -84,6 +94,113 @@ def decide_action(code: str, *, policy: Dict[str, Any]) -> Tuple[str, str]:
 
     return ("REJECT", _severity_default(domain, c))
 
+def _row(row: Any, domain: str, code: str) -> Tuple[str, str]:
+    row = row or {}
+    return (str(row.get("action", "REJECT")).upper(), str(row.get("severity", _severity_default(domain, code))).upper())
+
+class CompiledRejectPolicyV1:
+    """Policy dict compiled for per-reject lookups; decide(code) == decide_action(code, policy=<dict>)."""
+
+    MEMO_MAX = 4096
+
+    def __init__(self, policy: Dict[str, Any], *, sha256: str = "", path: str = ""):
+        self.policy = policy
+        self.sha256 = sha256
+        self.path = path
+        by_code = policy.get("by_code") or {}
+        by_prefix = policy.get("by_prefix") or {}
+        by_domain = policy.get("by_domain") or {}
+        self._exact: Dict[str, Tuple[str, str]] = {}
+        if isinstance(by_code, dict):
+            for c, row in by_code.items():
+                cs = str(c)
+                self._exact[cs] = _row(row, _domain_from_code(cs), cs.upper())
+        # prefix rules keep policy order (first match wins, as in decide_action)
+        self._prefixes: List[Tuple[str, Dict[str, Any]]] = []
+        if isinstance(by_prefix, dict):
+            self._prefixes = [(str(p).upper(), (r or {})) for p, r in by_prefix.items()]
+        self._domains: Dict[str, Dict[str, Any]] = dict(by_domain) if isinstance(by_domain, dict) else {}
+        self._memo: Dict[str, Tuple[str, str]] = {}
+
+    def decide(self, code: str) -> Tuple[str, str]:
+        c = (code or "").upper()
+        hit = self._exact.get(c) or self._memo.get(c)
+        if hit is not None:
+            return hit
+        domain = _domain_from_code(c)
+        for pref, row in self._prefixes:
+            if c.startswith(pref):
+                hit = _row(row, domain, c)
+                break
+        else:
+            hit = _row(self._domains[domain], domain, c) if domain in self._domains else ("REJECT", _severity_default(domain, c))
+        if len(self._memo) < self.MEMO_MAX:
+            self._memo[c] = hit
+        return hit
+
+    def get(self, key: str, default: Any = None) -> Any:
+        # dict-style read access for callers that inspect the raw policy
+        return self.policy.get(key, default)
+
+class _PolicyCacheEntry:
+    __slots__ = ("compiled", "mtime_ns", "size", "next_check")
+
+    def __init__(self, compiled: CompiledRejectPolicyV1, mtime_ns: int, size: int, next_check: float):
+        self.compiled = compiled
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.next_check = next_check
+
+_POLICY_CACHE: Dict[str, _PolicyCacheEntry] = {}
+_POLICY_LOCK = threading.Lock()
+
+def _policy_check_sec() -> float:
+    try:
+        return float((os.environ.get("TMF_REJECT_POLICY_CHECK_SEC", "1.0") or "1.0").strip())
+    except Exception:
+        return 1.0
+
+def load_policy_cached(path: str) -> CompiledRejectPolicyV1:
+    """
+    Process-wide compiled policy for path. Re-stat at most every TMF_REJECT_POLICY_CHECK_SEC; re-read only
+    when mtime/size moved, recompile only when the content sha256 changed. A broken edit keeps the last good
+    policy (raises only when there was none).
+    """
+    ent = _POLICY_CACHE.get(path)
+    now = time.monotonic()
+    if ent is not None and now < ent.next_check:
+        return ent.compiled
+    with _POLICY_LOCK:
+        ent = _POLICY_CACHE.get(path)
+        next_check = now + _policy_check_sec()
+        try:
+            st = os.stat(path)
+        except OSError:
+            if ent is not None:
+                ent.next_check = next_check
+                return ent.compiled
+            raise
+        if ent is not None and (st.st_mtime_ns, st.st_size) == (ent.mtime_ns, ent.size):
+            ent.next_check = next_check
+            return ent.compiled
+        try:
+            raw = Path(path).read_bytes()
+            sha = hashlib.sha256(raw).hexdigest()
+            if ent is not None and sha == ent.compiled.sha256:
+                compiled = ent.compiled
+            else:
+                obj = json.loads(raw.decode("utf-8"))
+                if not isinstance(obj, dict):
+                    raise ValueError("reject_policy root must be object")
+                compiled = CompiledRejectPolicyV1(obj, sha256=sha, path=os.path.abspath(path))
+        except Exception:
+            if ent is not None:
+                ent.next_check = next_check
+                return ent.compiled
+            raise
+        _POLICY_CACHE[path] = _PolicyCacheEntry(compiled, st.st_mtime_ns, st.st_size, next_check)
+        return compiled
+
 def _unwrap_verdict_v1(verdict):
     v = verdict
     # unwrap common wrapper shapes deterministically
@@ -98,7 +215,7 @@ def _unwrap_verdict_v1(verdict):
 def decision_from_verdict(
     verdict: Any,
     *,
-    policy: Dict[str, Any],
+    policy: Union[Dict[str, Any], CompiledRejectPolicyV1],
     reason_fallback: str = "",
     details_fallback: Optional[Dict[str, Any]] = None,
 ) -> RejectDecision:
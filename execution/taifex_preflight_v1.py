@@ -4,6 +4,8 @@ from dataclasses import dataclass
 from datetime import datetime, time
 from typing import Any, Dict, List, Optional
 
+from src.ops.clock_v1 import clock_now
+
 # TAIFEX official rule anchor (English site):
 # - Market order max qty: 10 (regular), 5 (after-hours) since 2019-05-27
 # - Limit/MWP max qty: futures 100 (most), options 200, single-stock futures/options 499 (see TAIFEX pages)
@@ -121,7 +123,7 @@ def check_taifex_preflight(
     if bool(meta.get("allow_preflight_bypass")):
         return PreflightVerdict(True, "OK_PREFLIGHT_BYPASS", "preflight bypassed by meta", {"meta_keys": list(meta.keys())})
 
-    now = now or datetime.now()
+    now = now or clock_now()
     # Prefer explicit session hint if supplied, else infer from time.
     raw_hint = meta.get("session_hint")
     if raw_hint is None:
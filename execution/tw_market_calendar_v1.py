@@ -7,6 +7,8 @@ from pathlib import Path
 from typing import Any, Dict, Optional
 import json
 
+from src.ops.clock_v1 import clock_now
+
 # v18: minimal TW market calendar gate (bootstrap)
 # - Primary goal: never attempt to trade when TWSE/TAIFEX are closed (holidays/weekends)
 # - Allow override for backtests/sims via meta flags.
@@ -36,7 +38,7 @@ def market_open_verdict(*, now: Optional[datetime] = None, meta: Optional[Dict[s
     if bool(meta.get("allow_market_closed")) or bool(meta.get("sim_mode")) or bool(meta.get("paper_mode")):
         return MarketOpenVerdict(True, "OK_MARKET_OVERRIDE", "market closed gate bypassed by meta override", {"meta_keys": list(meta.keys())})
 
-    now = now or datetime.now()
+    now = now or clock_now()
     d = now.date().isoformat()
 
     # [REGTEST OVERRIDE] allow smoke/regression to bypass holiday/weekend/time gates
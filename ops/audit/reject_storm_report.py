@@ -1,30 +1,101 @@
 from __future__ import annotations
 
 """
-V18 scaffold: ops/audit/reject_storm_report.py
+ops/audit/reject_storm_report.py (v18 Reject OS): reject reason distribution + DPB/size-limit tracking
++ storm verdict.
 
-This is a placeholder created to align repo structure with TMF_AutoTrader_BIBLE_OFFICIAL_LOCKED_v18.
-Implement according to v18 requirements before production use.
+Sources:
+  - orders (status=REJECTED) through the incremental RejectStatsStreamV1 (orders.id watermark checkpoint,
+    rolling 5m / 1h / 1d windows)
+  - live in-process detectors (src.safety.reject_storm_v1) when called from a running process
+The storm verdict uses the same thresholds as the live detector (TMF_REJECT_STORM_*) on the window of
+the same length, and is handed to auto_remediation.decide_actions; --apply executes the actions through
+SystemSafetyEngineV1 (for out-of-process use; in-process rejects are handled by the live detector already).
 """
 
-from dataclasses import dataclass
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
 from typing import Any, Dict, Optional
 
+_REPO_ROOT = Path(__file__).resolve().parents[2]
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
 
-@dataclass(frozen=True)
-class _ScaffoldInfo:
-    module: str = "ops/audit/reject_storm_report.py"
-    status: str = "SCAFFOLDED"
-    note: str = "TODO: implement per v18"
+from ops.auto_remediation.auto_remediation_engine import apply_actions, decide_actions  # noqa: E402
+from ops.rejects.reject_stats_stream_v1 import DEFAULT_CHECKPOINT, RejectStatsStreamV1  # noqa: E402
+from src.safety.reject_storm_v1 import IGNORE_CODES, RejectStormConfigV1, storm_snapshots  # noqa: E402
 
+DEFAULT_OUT = "runtime/state/reject_storm_report_latest.json"
 
-def get_scaffold_info() -> Dict[str, Any]:
-    return {"module": "ops/audit/reject_storm_report.py", "status": "SCAFFOLDED", "todo": True}
 
+def _storm_window(st: RejectStatsStreamV1, cfg: RejectStormConfigV1) -> Dict[str, Any]:
+    w = st.rolling.window(int(cfg.window_sec))
+    # minute buckets are keyed by code only; the domain follows the code prefix (execution.reject_taxonomy)
+    # rejects caused by an active cooldown / kill are consequences, not storm input (as in the live detector)
+    by_code = {k: n for k, n in w["by_key"].items() if k not in IGNORE_CODES}
+    by_domain: Dict[str, int] = {}
+    for code, n in by_code.items():
+        d = code.split("_", 1)[0].upper()
+        d = d if d in ("RISK", "SAFETY", "EXEC", "BROKER") else "UNKNOWN"
+        by_domain[d] = by_domain.get(d, 0) + n
+    return {"window_sec": cfg.window_sec, "total": sum(by_code.values()), "by_code": by_code, "by_domain": by_domain}
 
-def _not_implemented(*args: Any, **kwargs: Any) -> None:
-    raise NotImplementedError("V18 scaffold placeholder: implement per v18")
 
+def build_reject_storm_report(db_path: str, *, checkpoint: str = DEFAULT_CHECKPOINT,
+                              cfg: Optional[RejectStormConfigV1] = None, topn: int = 10) -> Dict[str, Any]:
+    cfg = cfg or RejectStormConfigV1.from_env()
+    st = RejectStatsStreamV1(db_path, checkpoint=checkpoint)
+    st.update()
+    rep = st.report(topn=topn)
+    c = st.counts["by_exec_code"]
+    storm = _storm_window(st, cfg)
+    out = {
+        "generated_utc": rep["generated_utc"],
+        "db": db_path,
+        "total_rejects": rep["total_rows"],
+        "by_exec_code_top": rep["counts"]["by_exec_code_top"],
+        "by_reason_top": rep["counts"]["by_reason_top"],
+        "dpb": {"rejects": st.dpbm_like, "codes": {k: v for k, v in c.items() if "DPB" in k.upper()}},
+        "size_limit": {"codes": {k: v for k, v in c.items() if "QTY_LIMIT" in k.upper() or "SIZE" in k.upper()}},
+        "windows": rep["windows"],
+        "storm_window": storm,
+        "live": storm_snapshots(),
+        "thresholds": {"window_sec": cfg.window_sec, "code_n": cfg.code_n, "domain_n": cfg.domain_n,
+                       "kill_n": cfg.kill_n, "cooldown_sec": cfg.cooldown_sec},
+        "incremental": rep["incremental"],
+    }
+    out["auto_remediation"] = decide_actions(metrics={"reject_storm": storm}, cfg=cfg)
+    return out
 
-# public surface (safe default)
-__all__ = ["get_scaffold_info", "_not_implemented"]
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", default="runtime/data/tmf_autotrader_v1.sqlite3")
+    ap.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT)
+    ap.add_argument("--out", default=DEFAULT_OUT)
+    ap.add_argument("--apply", action="store_true", help="execute COOLDOWN/KILL via SystemSafetyEngineV1 on --db")
+    args = ap.parse_args()
+    if not Path(args.db).exists():
+        raise SystemExit(f"[FATAL] missing db: {args.db}")
+
+    rep = build_reject_storm_report(args.db, checkpoint=args.checkpoint)
+    if args.apply and rep["auto_remediation"]["actions"]:
+        from src.safety.system_safety_v1 import SystemSafetyEngineV1
+        rep["auto_remediation"]["applied"] = apply_actions(rep["auto_remediation"]["actions"], safety=SystemSafetyEngineV1(db_path=args.db))
+
+    p = Path(args.out)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    tmp = p.with_name(p.name + f".{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(rep, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    os.replace(tmp, p)
+    acts = [a["action"] for a in rep["auto_remediation"]["actions"]]
+    print(f"[OK] reject storm report: total={rep['total_rejects']} window={rep['storm_window']['total']} actions={acts}")
+    print("[OK] wrote:", p)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
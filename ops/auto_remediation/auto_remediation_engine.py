@@ -1,10 +1,17 @@
 """
 Auto-Remediation OS (v18): monitoring -> automatic actions (not just alerts).
 Outputs AUTO_REMEDIATION_REPORT.
+
+decide_actions(metrics=...) understands:
+  - reject_storm: {"total", "by_code", "by_domain", "window_sec"} (live detector snapshot or the
+    reject_storm_report window) -> COOLDOWN / KILL with the src.safety.reject_storm_v1 thresholds
+apply_actions() executes them through SystemSafetyEngineV1.request_cooldown / request_kill.
 """
 from __future__ import annotations
-from dataclasses import dataclass
-from typing import Dict, Any
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional
+
+from src.safety.reject_storm_v1 import STORM_COOLDOWN_CODE, STORM_KILL_CODE, RejectStormConfigV1, storm_action
 
 @dataclass(frozen=True)
 class RemediationAction:
@@ -12,6 +19,35 @@ class RemediationAction:
     reason: str
     details: Dict[str, Any]
 
-def decide_actions(*, metrics: Dict[str, Any]) -> Dict[str, Any]:
-    # Scaffold: no action
-    return {"actions": [], "metrics": metrics}
+def decide_actions(*, metrics: Dict[str, Any], cfg: Optional[RejectStormConfigV1] = None) -> Dict[str, Any]:
+    actions: List[RemediationAction] = []
+    rs = metrics.get("reject_storm") if isinstance(metrics, dict) else None
+    if isinstance(rs, dict):
+        cfg = cfg or RejectStormConfigV1.from_env()
+        hit = storm_action(cfg, total=int(rs.get("total") or 0), by_code=dict(rs.get("by_code") or {}),
+                           by_domain=dict(rs.get("by_domain") or {}))
+        if hit is not None:
+            actions.append(RemediationAction(
+                action=hit["action"],
+                reason=f"reject storm: {hit['key']} n={hit['n']} >= {hit['limit']} in {int(cfg.window_sec)}s",
+                details={**hit, "window_sec": cfg.window_sec, "cooldown_sec": cfg.cooldown_sec},
+            ))
+    return {"actions": [asdict(a) for a in actions], "metrics": metrics}
+
+def apply_actions(actions: List[Dict[str, Any]], *, safety: Any) -> List[Dict[str, Any]]:
+    out = []
+    for a in actions:
+        act = str(a.get("action") or "")
+        det = a.get("details") or {}
+        try:
+            if act == "KILL":
+                safety.request_kill(code=STORM_KILL_CODE, reason=str(a.get("reason")), details=det)
+            elif act == "COOLDOWN":
+                safety.request_cooldown(seconds=int(det.get("cooldown_sec") or 60), code=STORM_COOLDOWN_CODE,
+                                        reason=str(a.get("reason")), details=det)
+            else:
+                continue
+            out.append({"action": act, "ok": True})
+        except Exception as e:
+            out.append({"action": act, "ok": False, "err": f"{type(e).__name__}: {e}"})
+    return out
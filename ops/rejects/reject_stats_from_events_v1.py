@@ -1,9 +1,24 @@
 from __future__ import annotations
 
+import hashlib
 import json
+import os
+import sys
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, Iterable
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+_REPO_ROOT = Path(__file__).resolve().parents[2]
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+from ops.rejects.reject_stats_stream_v1 import RollingCountsV1, ts_epoch  # noqa: E402
+
+# Incremental mode (main): per-file byte offset + counters in runtime/state/reject_stats_events_checkpoint.json;
+# each run reads only lines appended since the last run. A file whose head changed (rotated / rewritten) or
+# shrank is re-read from 0 and its old contribution dropped. A trailing partial line waits for the next run.
+CHECKPOINT = Path("runtime/state/reject_stats_events_checkpoint.json")
+HEAD_BYTES = 256
 
 def _now_iso() -> str:
     return datetime.now().isoformat(timespec="seconds")
@@ -21,6 +36,33 @@ def _iter_jsonl(paths: Iterable[Path]) -> Iterable[Dict[str, Any]]:
             except Exception:
                 continue
 
+def classify_event(e: Dict[str, Any]) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """(exec_code, sample) for a reject callback event, else None."""
+    payload = (e.get("payload") or {})
+    stat = str(payload.get("stat") or "")
+    msg  = payload.get("msg")
+
+    try:
+        blob = json.dumps(msg, ensure_ascii=False)
+    except Exception:
+        blob = repr(msg)
+
+    is_reject = any(k in stat for k in ("REJECT","Rejected","reject","失敗","拒","Error","FAIL")) or \
+                any(k in blob for k in ("REJECT","Rejected","reject","失敗","拒","Error","FAIL"))
+
+    if not is_reject:
+        return None
+
+    exec_code = None
+    if isinstance(payload, dict):
+        exec_code = payload.get("exec_code")
+    if not exec_code:
+        if any(k in blob for k in ("DPBM","Dynamic Price Banding","動態價格","穩定措施")):
+            exec_code = "EXEC_TAIFEX_DPBM_REJECT"
+        else:
+            exec_code = "EXEC_TAIFEX_REJECT_GENERIC"
+    return str(exec_code), {"stat": stat, "msg": msg}
+
 def build_reject_stats(*, events: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
     total = 0
     rejects = 0
@@ -29,35 +71,97 @@ def build_reject_stats(*, events: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
 
     for e in events:
         total += 1
-        payload = (e.get("payload") or {})
-        stat = str(payload.get("stat") or "")
-        msg  = payload.get("msg")
-
-        try:
-            blob = json.dumps(msg, ensure_ascii=False)
-        except Exception:
-            blob = repr(msg)
-
-        is_reject = any(k in stat for k in ("REJECT","Rejected","reject","失敗","拒","Error","FAIL")) or \
-                    any(k in blob for k in ("REJECT","Rejected","reject","失敗","拒","Error","FAIL"))
-
-        if not is_reject:
+        c = classify_event(e)
+        if c is None:
             continue
 
         rejects += 1
-
-        exec_code = None
-        if isinstance(payload, dict):
-            exec_code = payload.get("exec_code")
-        if not exec_code:
-            if any(k in blob for k in ("DPBM","Dynamic Price Banding","動態價格","穩定措施")):
-                exec_code = "EXEC_TAIFEX_DPBM_REJECT"
-            else:
-                exec_code = "EXEC_TAIFEX_REJECT_GENERIC"
-
+        exec_code, sample = c
         by_exec_code[exec_code] = by_exec_code.get(exec_code, 0) + 1
         if exec_code not in samples:
-            samples[exec_code] = {"stat": stat, "msg": msg}
+            samples[exec_code] = sample
+
+    return {
+        "generated_at": _now_iso(),
+        "total_events": total,
+        "reject_events": rejects,
+        "reject_rate": (rejects / total) if total else 0.0,
+        "by_exec_code": by_exec_code,
+        "samples": samples,
+    }
+
+def _head_digest(p: Path, n: int) -> str:
+    with p.open("rb") as f:
+        return hashlib.sha256(f.read(n)).hexdigest()
+
+def update_file_stats(p: Path, st: Dict[str, Any]) -> Dict[str, Any]:
+    """Fold lines appended to p since st["offset"] into st (per-file counters)."""
+    size = p.stat().st_size
+    off = int(st.get("offset") or 0)
+    if (not st) or size < off or _head_digest(p, min(HEAD_BYTES, off)) != st.get("head"):
+        st = {"offset": 0, "total": 0, "rejects": 0, "by_exec_code": {}, "samples": {}, "rolling": {}}
+        off = 0
+    rolling = RollingCountsV1.from_dict(st.get("rolling"))
+    with p.open("rb") as f:
+        f.seek(off)
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                break
+            off += len(raw)
+            line = raw.decode("utf-8", errors="replace").strip()
+            if not line:
+                continue
+            try:
+                e = json.loads(line)
+            except Exception:
+                continue
+            st["total"] += 1
+            c = classify_event(e)
+            if c is None:
+                continue
+            exec_code, sample = c
+            st["rejects"] += 1
+            st["by_exec_code"][exec_code] = st["by_exec_code"].get(exec_code, 0) + 1
+            st["samples"].setdefault(exec_code, sample)
+            rolling.add(ts_epoch(e.get("ts")), exec_code)
+    rolling.prune()
+    st["offset"] = off
+    st["head"] = _head_digest(p, min(HEAD_BYTES, off))
+    st["rolling"] = rolling.to_dict()
+    return st
+
+def build_reject_stats_incremental(paths: Iterable[Path], checkpoint: Optional[Path] = CHECKPOINT) -> Dict[str, Any]:
+    ck: Dict[str, Any] = {}
+    if checkpoint is not None:
+        try:
+            ck = json.loads(checkpoint.read_text(encoding="utf-8")).get("files") or {}
+        except Exception:
+            ck = {}
+    files: Dict[str, Any] = {}
+    for p in paths:
+        if p.exists():
+            files[str(p)] = update_file_stats(p, dict(ck.get(str(p)) or {}))
+
+    total = sum(int(f["total"]) for f in files.values())
+    rejects = sum(int(f["rejects"]) for f in files.values())
+    by_exec_code: Dict[str, int] = {}
+    samples: Dict[str, Any] = {}
+    rolling = RollingCountsV1()
+    for f in files.values():
+        for k, n in f["by_exec_code"].items():
+            by_exec_code[k] = by_exec_code.get(k, 0) + int(n)
+        for k, v in f["samples"].items():
+            samples.setdefault(k, v)
+        for m, b in RollingCountsV1.from_dict(f.get("rolling")).buckets.items():
+            dst = rolling.buckets.setdefault(m, {})
+            for k, n in b.items():
+                dst[k] = dst.get(k, 0) + n
+
+    if checkpoint is not None:
+        checkpoint.parent.mkdir(parents=True, exist_ok=True)
+        tmp = checkpoint.with_name(checkpoint.name + f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps({"files": files}, ensure_ascii=False) + "\n", encoding="utf-8")
+        os.replace(tmp, checkpoint)
 
     return {
         "generated_at": _now_iso(),
@@ -66,6 +170,8 @@ def build_reject_stats(*, events: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
         "reject_rate": (rejects / total) if total else 0.0,
         "by_exec_code": by_exec_code,
         "samples": samples,
+        "windows": rolling.windows(),
+        "files": {k: v["offset"] for k, v in files.items()},
     }
 
 def main() -> int:
@@ -76,7 +182,8 @@ def main() -> int:
     paths = paths_real if paths_real else paths_all
     paths = sorted(paths, key=lambda x: x.stat().st_mtime)
 
-    rep = build_reject_stats(events=_iter_jsonl(paths))
+    full = "--full" in sys.argv[1:]
+    rep = build_reject_stats_incremental(paths, checkpoint=(None if full else CHECKPOINT))
 
     out_json = Path("runtime/handoff/state/reject_stats_report_latest.json")
     out_json.write_text(json.dumps(rep, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
@@ -0,0 +1,298 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# Incremental reject analytics over orders (status=REJECTED), replacing the full re-scan in
+# scripts/build_rejection_stats_v1.py:
+# - persisted checkpoint (runtime/state/reject_stats_checkpoint.json): orders.id watermark + counters
+#   by verdict/decision(domain)/action/exec_code/reason, recent samples, per-minute buckets
+# - each update() streams only rows with id > watermark, in chunks of TMF_REJECT_STATS_CHUNK, and pulls
+#   reject_decision / preflight_verdict code+reason out of meta_json with json_extract (no Python-side
+#   decode of the full meta; fallback to json.loads when SQLite lacks JSON1)
+# - RollingCountsV1: per-minute buckets (kept 24h) -> last 5m / 1h / 1d counts for reject-storm detection
+# - watermark above MAX(orders.id) (DB replaced / rebuilt) -> checkpoint reset, full rebuild
+# NOTE: Python 3.9.6 compatible
+
+DEFAULT_CHECKPOINT = "runtime/state/reject_stats_checkpoint.json"
+WINDOWS: Tuple[Tuple[str, int], ...] = (("5m", 300), ("1h", 3600), ("1d", 86400))
+SAMPLES_KEEP = 80
+CHECKPOINT_VERSION = 1
+
+_COLS = "id, ts, symbol, side, qty, order_type, status, verdict, decision, action"
+_SQL_JSON1 = (
+    f"SELECT {_COLS}, "
+    "json_extract(meta_json, '$.reject_decision.code'), json_extract(meta_json, '$.reject_decision.reason'), "
+    "json_extract(meta_json, '$.preflight_verdict.code'), json_extract(meta_json, '$.preflight_verdict.reason') "
+    "FROM orders WHERE id > ? AND status = ? ORDER BY id ASC LIMIT ?"
+)
+_SQL_PLAIN = f"SELECT {_COLS}, meta_json FROM orders WHERE id > ? AND status = ? ORDER BY id ASC LIMIT ?"
+
+
+def _env(name: str, default: str) -> str:
+    return (os.environ.get(name, default) or default).strip()
+
+
+def utc_now_z() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z")
+
+
+def ts_epoch(ts: Any) -> Optional[float]:
+    try:
+        return datetime.fromisoformat(str(ts).replace("Z", "+00:00")).timestamp()
+    except Exception:
+        return None
+
+
+def _inc(m: Dict[str, int], k: Any, n: int = 1) -> None:
+    if k is None:
+        return
+    k = str(k).strip()
+    if not k:
+        return
+    m[k] = int(m.get(k, 0)) + n
+
+
+def top_items(d: Dict[str, int], n: int) -> List[Tuple[str, int]]:
+    return sorted(d.items(), key=lambda kv: (-kv[1], kv[0]))[:n]
+
+
+def exec_code_of(verdict: Any, rd_code: Any, rd_reason: Any, pv_code: Any, pv_reason: Any) -> Tuple[str, str]:
+    """(exec_code, reason): reject_decision first, then preflight_verdict, then a legacy RISK_* verdict."""
+    code = str(rd_code or "")
+    reason = str(rd_reason or "")
+    if not code:
+        code = str(pv_code or "")
+        if not reason:
+            reason = str(pv_reason or "")
+    if not code and isinstance(verdict, str) and verdict.startswith("RISK_"):
+        code = verdict
+    return code, reason
+
+
+class RollingCountsV1:
+    """Per-minute reject counts (total + per key) for the last keep_sec; window() sums the tail."""
+
+    def __init__(self, keep_sec: int = 86400):
+        self.keep_sec = int(keep_sec)
+        self.buckets: Dict[int, Dict[str, int]] = {}   # minute epoch -> {"_n": total, key: n}
+
+    def add(self, epoch: Optional[float], key: str = "") -> None:
+        if epoch is None:
+            return
+        b = self.buckets.setdefault(int(epoch // 60) * 60, {})
+        b["_n"] = b.get("_n", 0) + 1
+        if key:
+            b[key] = b.get(key, 0) + 1
+
+    def prune(self, now: Optional[float] = None) -> None:
+        cut = (time.time() if now is None else float(now)) - self.keep_sec - 60
+        for m in [m for m in self.buckets if m < cut]:
+            del self.buckets[m]
+
+    def window(self, sec: int, now: Optional[float] = None) -> Dict[str, Any]:
+        now = time.time() if now is None else float(now)
+        cut = now - float(sec)
+        total = 0
+        by_key: Dict[str, int] = {}
+        for m, b in self.buckets.items():
+            if m + 60 <= cut or m > now:
+                continue
+            for k, n in b.items():
+                if k == "_n":
+                    total += n
+                else:
+                    by_key[k] = by_key.get(k, 0) + n
+        return {"n": total, "per_min": round(total / (sec / 60.0), 3), "by_key": by_key}
+
+    def windows(self, now: Optional[float] = None) -> Dict[str, Any]:
+        return {name: self.window(sec, now) for name, sec in WINDOWS}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {str(m): b for m, b in self.buckets.items()}
+
+    @classmethod
+    def from_dict(cls, d: Any, keep_sec: int = 86400) -> "RollingCountsV1":
+        r = cls(keep_sec)
+        if isinstance(d, dict):
+            for m, b in d.items():
+                try:
+                    r.buckets[int(m)] = {str(k): int(v) for k, v in b.items()}
+                except Exception:
+                    continue
+        return r
+
+
+class RejectStatsStreamV1:
+    def __init__(self, db_path: str, *, checkpoint: str = DEFAULT_CHECKPOINT, status: str = "REJECTED",
+                 chunk: Optional[int] = None):
+        self.db_path = str(db_path)
+        self.checkpoint = str(checkpoint or "")
+        self.status = str(status)
+        self.chunk = max(1, int(chunk if chunk is not None else _env("TMF_REJECT_STATS_CHUNK", "5000")))
+        self.last_update: Dict[str, Any] = {}
+        self._reset()
+        self._load()
+
+    def _reset(self) -> None:
+        self.watermark = 0
+        self.total = 0
+        self.counts: Dict[str, Dict[str, int]] = {
+            "by_status": {}, "by_verdict": {}, "by_decision": {}, "by_action": {}, "by_exec_code": {}, "by_reason": {},
+        }
+        self.taifex_like = 0
+        self.dpbm_like = 0
+        self.samples: List[Dict[str, Any]] = []
+        self.rolling = RollingCountsV1()
+
+    def _load(self) -> None:
+        if not self.checkpoint:
+            return
+        try:
+            obj = json.loads(Path(self.checkpoint).read_text(encoding="utf-8"))
+        except Exception:
+            return
+        if not isinstance(obj, dict) or obj.get("version") != CHECKPOINT_VERSION:
+            return
+        if obj.get("db") != os.path.abspath(self.db_path) or obj.get("status") != self.status:
+            return
+        try:
+            self.watermark = int(obj["watermark_id"])
+            self.total = int(obj["total"])
+            for k in self.counts:
+                self.counts[k] = {str(a): int(b) for a, b in (obj["counts"].get(k) or {}).items()}
+            self.taifex_like = int(obj.get("taifex_like") or 0)
+            self.dpbm_like = int(obj.get("dpbm_like") or 0)
+            self.samples = list(obj.get("samples") or [])[-SAMPLES_KEEP:]
+            self.rolling = RollingCountsV1.from_dict(obj.get("rolling"))
+        except Exception:
+            self._reset()
+
+    def save(self) -> None:
+        if not self.checkpoint:
+            return
+        obj = {
+            "version": CHECKPOINT_VERSION,
+            "db": os.path.abspath(self.db_path),
+            "status": self.status,
+            "updated_utc": utc_now_z(),
+            "watermark_id": self.watermark,
+            "total": self.total,
+            "counts": self.counts,
+            "taifex_like": self.taifex_like,
+            "dpbm_like": self.dpbm_like,
+            "samples": self.samples,
+            "rolling": self.rolling.to_dict(),
+        }
+        p = Path(self.checkpoint)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        tmp = p.with_name(p.name + f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(obj, ensure_ascii=False, separators=(",", ":")) + "\n", encoding="utf-8")
+        os.replace(tmp, p)
+
+    def _add(self, r: Tuple[Any, ...], code: str, reason: str) -> None:
+        _id, ts, symbol, side, qty, order_type, status, verdict, decision, action = r[:10]
+        self.total += 1
+        c = self.counts
+        _inc(c["by_status"], status)
+        _inc(c["by_verdict"], verdict)
+        _inc(c["by_decision"], decision)
+        _inc(c["by_action"], action)
+        if code:
+            _inc(c["by_exec_code"], code)
+            u = code.upper()
+            if "TAIFEX" in u:
+                self.taifex_like += 1
+            if "DPB" in u:
+                self.dpbm_like += 1
+        if reason:
+            _inc(c["by_reason"], reason[:200])
+        self.rolling.add(ts_epoch(ts), code or str(verdict or ""))
+        self.samples.append({
+            "id": _id, "ts": ts, "symbol": symbol, "side": side, "qty": qty, "order_type": order_type,
+            "status": status, "verdict": verdict, "decision": decision, "action": action,
+            "exec_code": code, "reason": reason,
+        })
+
+    def update(self, con: Optional[sqlite3.Connection] = None) -> Dict[str, Any]:
+        """Stream orders rows past the watermark into the counters; persists the checkpoint. Returns update stats."""
+        t0 = time.perf_counter()
+        own = con is None
+        if own:
+            con = sqlite3.connect(self.db_path, timeout=5.0)
+        new = 0
+        reset = False
+        try:
+            row = con.execute("SELECT MAX(id) FROM orders").fetchone()
+            max_id = int((row[0] if row else 0) or 0)
+            if max_id < self.watermark:
+                self._reset()
+                reset = True
+            try:
+                con.execute("SELECT json_extract('{\"a\":1}', '$.a')").fetchone()
+                json1 = True
+            except sqlite3.OperationalError:
+                json1 = False
+            while True:
+                rows = con.execute(_SQL_JSON1 if json1 else _SQL_PLAIN, (self.watermark, self.status, self.chunk)).fetchall()
+                if not rows:
+                    break
+                for r in rows:
+                    if json1:
+                        code, reason = exec_code_of(r[7], r[10], r[11], r[12], r[13])
+                    else:
+                        try:
+                            meta = json.loads(r[10] or "{}")
+                        except Exception:
+                            meta = {}
+                        meta = meta if isinstance(meta, dict) else {}
+                        rd = meta.get("reject_decision") if isinstance(meta.get("reject_decision"), dict) else {}
+                        pv = meta.get("preflight_verdict") if isinstance(meta.get("preflight_verdict"), dict) else {}
+                        code, reason = exec_code_of(r[7], rd.get("code"), rd.get("reason"), pv.get("code"), pv.get("reason"))
+                    self._add(r, code, reason)
+                    self.watermark = int(r[0])
+                    new += 1
+                if len(rows) < self.chunk:
+                    break
+            # status filter skips rows; the watermark still covers everything scanned
+            self.watermark = max(self.watermark, max_id)
+        finally:
+            if own:
+                con.close()
+        self.samples = self.samples[-SAMPLES_KEEP:]
+        self.rolling.prune()
+        self.save()
+        self.last_update = {"new_rows": new, "reset": reset, "watermark_id": self.watermark,
+                            "ms": round((time.perf_counter() - t0) * 1000.0, 3)}
+        return self.last_update
+
+    def windows(self, now: Optional[float] = None) -> Dict[str, Any]:
+        """Rolling reject counts: {"5m": {"n", "per_min", "by_key": {exec_code|verdict: n}}, "1h": ..., "1d": ...}."""
+        return self.rolling.windows(now)
+
+    def report(self, topn: int = 30) -> Dict[str, Any]:
+        c = self.counts
+        return {
+            "generated_utc": utc_now_z(),
+            "db": self.db_path,
+            "filter": {"status": self.status},
+            "total_rows": self.total,
+            "counts": {
+                "by_status_top": top_items(c["by_status"], topn),
+                "by_decision_top": top_items(c["by_decision"], topn),
+                "by_verdict_top": top_items(c["by_verdict"], topn),
+                "by_action_top": top_items(c["by_action"], topn),
+                "by_exec_code_top": top_items(c["by_exec_code"], topn),
+                "by_reason_top": top_items(c["by_reason"], topn),
+            },
+            "taifex_like_rejects_sampled": self.taifex_like,
+            "dpbm_like_rejects_sampled": self.dpbm_like,
+            "windows": self.windows(),
+            "incremental": dict(self.last_update),
+            "sample_recent": list(reversed(self.samples)),
+        }
@@ -1,12 +1,24 @@
 from __future__ import annotations
 
 import hashlib
+import heapq
 import json
+import os
 import platform
+import shutil
+import tempfile
+from collections import deque
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+SortKey = Tuple[float, int, str, int]
+
+# external-sort mode (multi-GB logs): chunk size in events, auto threshold on the log size, merge fan-in
+DEFAULT_CHUNK_EVENTS = 200_000
+DEFAULT_EXTERNAL_MIN_MB = 256
+MAX_MERGE_FANIN = 64
 
 @dataclass
 class ReplayResult:
@@ -47,7 +59,7 @@ def _to_int(x: Any) -> Optional[int]:
     except Exception:
         return None
 
-def _event_sort_key(ev: Dict[str, Any], line_no: int) -> Tuple[float, int, str, int]:
+def _event_sort_key(ev: Dict[str, Any], line_no: int) -> SortKey:
     # OFFICIAL-LOCKED deterministic ordering (best-effort):
     # 1) timestamp-like field (epoch; missing -> 0)
     # 2) sequence-like field (seq/event_id/id/rowid/offset; missing -> line_no)
@@ -83,14 +95,6 @@ def _sha256_file(p: Path) -> str:
             h.update(chunk)
     return h.hexdigest()
 
-def _sha256_events(events: Iterable[Dict[str, Any]]) -> str:
-    h = hashlib.sha256()
-    for ev in events:
-        b = json.dumps(ev, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8")
-        h.update(b)
-        h.update(b"\n")
-    return h.hexdigest()
-
 def _write_report(report_json: Optional[Path], report_md: Optional[Path], payload: Dict[str, Any]) -> None:
     # OFFICIAL-LOCKED: avoid f-string dict-key NameError by never using payload.get(KEY) without quotes.
     if report_json:
@@ -114,6 +118,159 @@ def _write_report(report_json: Optional[Path], report_md: Optional[Path], payloa
         lines.append("tail10=" + ",".join(payload.get("kinds_tail10", [])))
         lines.append("```")
         report_md.write_text("\n".join(lines) + "\n", encoding="utf-8")
+class _ReplayDigest:
+    """
+    Everything the report needs, accumulated one event at a time in replay order
+    (events_sha256, kinds head/tail, drift diagnostics); O(1) memory in the log length.
+    """
+
+    def __init__(self, handler: Callable[[Dict[str, Any]], None]):
+        self.handler = handler
+        self.n = 0
+        self._sha = hashlib.sha256()
+        self.kinds_head10: List[str] = []
+        self.kinds_tail10: Deque[str] = deque(maxlen=10)
+        self.missing_ts = 0
+        self.missing_seq = 0
+        self.kind_counts: Dict[str, int] = {}
+        self.key_head5: List[Dict[str, Any]] = []
+        self.key_tail5: Deque[Dict[str, Any]] = deque(maxlen=5)
+
+    def feed(self, key: SortKey, line_no: int, ev: Dict[str, Any]) -> None:
+        self.handler(ev)
+        self.n += 1
+        # hashed after the handler ran, as the in-memory replay always did
+        self._sha.update(json.dumps(ev, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8"))
+        self._sha.update(b"\n")
+        k = ev.get("kind")
+        if isinstance(k, str):
+            if len(self.kinds_head10) < 10:
+                self.kinds_head10.append(k)
+            self.kinds_tail10.append(k)
+        te, si, ks, lno = key
+        if te == 0.0:
+            self.missing_ts += 1
+        if si == int(lno):
+            self.missing_seq += 1
+        self.kind_counts[ks] = self.kind_counts.get(ks, 0) + 1
+        row = {"k": [te, si, ks, lno], "line_no": line_no}
+        if len(self.key_head5) < 5:
+            self.key_head5.append(row)
+        self.key_tail5.append(row)
+
+    def events_sha256(self) -> str:
+        return self._sha.hexdigest()
+
+    def diagnostics(self, bad: int) -> Tuple[Dict[str, Any], List[str]]:
+        total = max(1, self.n)
+        missing_ts_ratio = self.missing_ts / total
+        missing_seq_ratio = self.missing_seq / total
+        drift_codes = []
+        if bad > 0:
+            drift_codes.append("DRIFT_PARSE_ERRORS")
+        if missing_ts_ratio >= 0.5:
+            drift_codes.append("DRIFT_MISSING_TS_HIGH")
+        elif missing_ts_ratio > 0:
+            drift_codes.append("DRIFT_MISSING_TS_SOME")
+        if missing_seq_ratio >= 0.5:
+            drift_codes.append("DRIFT_MISSING_SEQ_HIGH")
+        elif missing_seq_ratio > 0:
+            drift_codes.append("DRIFT_MISSING_SEQ_SOME")
+        diag = {
+            "missing_ts": int(self.missing_ts),
+            "missing_seq": int(self.missing_seq),
+            "missing_ts_ratio": float(missing_ts_ratio),
+            "missing_seq_ratio": float(missing_seq_ratio),
+            "kind_counts": self.kind_counts,
+            "sort_key_head5": self.key_head5,
+            "sort_key_tail5": list(self.key_tail5),
+        }
+        return diag, drift_codes
+
+
+def _iter_lines(p: Path, stats: Dict[str, int]) -> Iterator[Tuple[int, str, Dict[str, Any]]]:
+    line_no = 0
+    with p.open("r", encoding="utf-8") as f:
+        for raw in f:
+            line_no += 1
+            line = raw.strip()
+            if not line:
+                continue
+            try:
+                obj = json.loads(line)
+            except Exception:
+                stats["bad"] += 1
+                continue
+            if not isinstance(obj, dict):
+                stats["bad"] += 1
+                continue
+            yield line_no, line, obj
+
+
+# --- external sort: sorted runs of <= chunk_events lines in temp files, then a k-way merge ---
+# run file line: <sort key JSON>\t<original JSON line>  (json.dumps escapes tabs inside strings, so the first tab splits)
+
+def _write_run(tmp: Path, idx: int, chunk: List[Tuple[SortKey, str]]) -> Path:
+    chunk.sort(key=lambda t: t[0])
+    rp = tmp / f"run_{idx:06d}.txt"
+    with rp.open("w", encoding="utf-8") as f:
+        for k, line in chunk:
+            f.write(json.dumps(k, ensure_ascii=False, separators=(",", ":")) + "\t" + line + "\n")
+    return rp
+
+
+def _read_run(rp: Path) -> Iterator[Tuple[SortKey, str]]:
+    with rp.open("r", encoding="utf-8") as f:
+        for raw in f:
+            ks, line = raw.rstrip("\n").split("\t", 1)
+            te, si, kind, lno = json.loads(ks)
+            yield (float(te), int(si), str(kind), int(lno)), line
+
+
+def _merge_runs(tmp: Path, runs: List[Path], fanin: int) -> Iterator[Tuple[SortKey, str]]:
+    # cascade while there are more runs than open files we want to hold
+    runs = list(runs)
+    idx = len(runs)
+    while len(runs) > fanin:
+        group, runs = runs[:fanin], runs[fanin:]
+        rp = tmp / f"run_{idx:06d}.txt"
+        idx += 1
+        with rp.open("w", encoding="utf-8") as f:
+            for k, line in heapq.merge(*[_read_run(r) for r in group], key=lambda t: t[0]):
+                f.write(json.dumps(k, ensure_ascii=False, separators=(",", ":")) + "\t" + line + "\n")
+        for r in group:
+            r.unlink()
+        runs.append(rp)
+    return heapq.merge(*[_read_run(r) for r in runs], key=lambda t: t[0])
+
+
+def _replay_external(p: Path, digest: _ReplayDigest, stats: Dict[str, int], *, chunk_events: int, tmp_dir: Optional[str]) -> None:
+    tmp = Path(tempfile.mkdtemp(prefix="tmf_replay_sort_", dir=tmp_dir))
+    try:
+        runs: List[Path] = []
+        chunk: List[Tuple[SortKey, str]] = []
+        for line_no, line, obj in _iter_lines(p, stats):
+            chunk.append((_event_sort_key(obj, line_no), line))
+            if len(chunk) >= chunk_events:
+                runs.append(_write_run(tmp, len(runs), chunk))
+                chunk = []
+        if chunk:
+            runs.append(_write_run(tmp, len(runs), chunk))
+        del chunk
+        stats["runs"] = len(runs)
+        for k, line in _merge_runs(tmp, runs, MAX_MERGE_FANIN):
+            digest.feed(k, k[3], json.loads(line))
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int((os.environ.get(name, "") or str(default)).strip())
+    except Exception:
+        return int(default)
+
+
 def replay_jsonl(
     log_path: str,
     handler: Callable[[Dict[str, Any]], None],
@@ -121,6 +278,9 @@ def replay_jsonl(
     deterministic: bool = True,
     report_json_path: Optional[str] = None,
     report_md_path: Optional[str] = None,
+    external_sort: Optional[bool] = None,
+    chunk_events: Optional[int] = None,
+    tmp_dir: Optional[str] = None,
 ) -> ReplayResult:
     """
     Replay JSONL audit log. Each line must be a JSON object.
@@ -128,6 +288,13 @@ def replay_jsonl(
     OFFICIAL-LOCKED enhancements:
     - Deterministic ordering (best-effort) to reduce replay drift risk.
     - Optional artifacted replay report (JSON/MD) for evidence-chain + drift investigation.
+
+    Memory bounded mode (external_sort=True): sorted runs of chunk_events lines go to temp files
+    under tmp_dir and are k-way merged; events_sha256 / kinds / diagnostics are accumulated while
+    replaying, so peak memory follows chunk_events, not the log length. Same order, hashes and report
+    as the in-memory sort. external_sort=None: on when the log is >= TMF_REPLAY_EXTERNAL_MIN_MB
+    (default 256); chunk_events defaults to TMF_REPLAY_CHUNK_EVENTS (200000).
+    deterministic=False streams in file order in either mode.
     """
     p = Path(log_path)
     if not p.exists():
@@ -136,40 +303,29 @@ def replay_jsonl(
     report_json = Path(report_json_path) if report_json_path else None
     report_md = Path(report_md_path) if report_md_path else None
 
-    parsed: List[Tuple[Tuple[float, int, str, int], int, Dict[str, Any]]] = []
-    bad = 0
-    line_no = 0
+    if external_sort is None:
+        external_sort = p.stat().st_size >= _env_int("TMF_REPLAY_EXTERNAL_MIN_MB", DEFAULT_EXTERNAL_MIN_MB) * 1024 * 1024
+    chunk_events = max(1, int(chunk_events or _env_int("TMF_REPLAY_CHUNK_EVENTS", DEFAULT_CHUNK_EVENTS)))
 
-    with p.open("r", encoding="utf-8") as f:
-        for raw in f:
-            line_no += 1
-            line = raw.strip()
-            if not line:
-                continue
-            try:
-                obj = json.loads(line)
-                if not isinstance(obj, dict):
-                    bad += 1
-                    continue
-                k = _event_sort_key(obj, line_no)
-                parsed.append((k, line_no, obj))
-            except Exception:
-                bad += 1
-
-    if deterministic:
+    stats = {"bad": 0, "runs": 0}
+    digest = _ReplayDigest(handler)
+    if not deterministic:
+        mode = "stream"
+        for line_no, _line, obj in _iter_lines(p, stats):
+            digest.feed(_event_sort_key(obj, line_no), line_no, obj)
+    elif external_sort:
+        mode = "external"
+        _replay_external(p, digest, stats, chunk_events=chunk_events, tmp_dir=tmp_dir)
+    else:
+        mode = "memory"
+        parsed = [(_event_sort_key(obj, line_no), line_no, obj) for line_no, _line, obj in _iter_lines(p, stats)]
         parsed.sort(key=lambda t: t[0])
+        for k, line_no, obj in parsed:
+            digest.feed(k, line_no, obj)
+        del parsed
 
-    events = [ev for _, __, ev in parsed]
-
-    n = 0
-    kinds: List[str] = []
-    for ev in events:
-        handler(ev)
-        n += 1
-        k = ev.get("kind")
-        if isinstance(k, str):
-            kinds.append(k)
-
+    n = digest.n
+    bad = stats["bad"]
     payload = {
         "generated_at": datetime.now(timezone.utc).isoformat(),
         "log_path": str(p),
@@ -177,16 +333,20 @@ def replay_jsonl(
         "deterministic": bool(deterministic),
         "replayed": int(n),
         "bad": int(bad),
-        "events_sha256": _sha256_events(events),
-        "kinds_head10": kinds[:10],
-        "kinds_tail10": kinds[-10:],
+        "events_sha256": digest.events_sha256(),
+        "kinds_head10": list(digest.kinds_head10),
+        "kinds_tail10": list(digest.kinds_tail10),
         "python": platform.python_version(),
         "platform": platform.platform(),
+        "sort": {"mode": mode, "chunk_events": int(chunk_events) if mode == "external" else None, "runs": int(stats["runs"])},
         "notes": {
             "ordering_key": "ts/event_ts/ingest_ts/recv_ts/time + seq/event_id/id/rowid/offset + kind + line_no",
         },
     }
-    # --- OFFICIAL-LOCKED: drift taxonomy + ordering diagnostics (best-effort, side-effect free) ---\n    missing_ts = 0\n    missing_seq = 0\n    kind_counts = {}\n    key_head5 = []\n    key_tail5 = []\n    for idx, (k, ln_no, ev) in enumerate(parsed):\n        te, si, ks, lno = k\n        if te == 0.0:\n            missing_ts += 1\n        if si == int(lno):\n            missing_seq += 1\n        kind_counts[ks] = kind_counts.get(ks, 0) + 1\n        if idx < 5:\n            key_head5.append({"k": [te, si, ks, lno], "line_no": ln_no})\n    for idx, (k, ln_no, ev) in enumerate(parsed[-5:]):\n        te, si, ks, lno = k\n        key_tail5.append({"k": [te, si, ks, lno], "line_no": ln_no})\n    total = max(1, len(parsed))\n    missing_ts_ratio = missing_ts / total\n    missing_seq_ratio = missing_seq / total\n    drift_codes = []\n    if bad > 0:\n        drift_codes.append("DRIFT_PARSE_ERRORS")\n    if missing_ts_ratio >= 0.5:\n        drift_codes.append("DRIFT_MISSING_TS_HIGH")\n    elif missing_ts_ratio > 0:\n        drift_codes.append("DRIFT_MISSING_TS_SOME")\n    if missing_seq_ratio >= 0.5:\n        drift_codes.append("DRIFT_MISSING_SEQ_HIGH")\n    elif missing_seq_ratio > 0:\n        drift_codes.append("DRIFT_MISSING_SEQ_SOME")\n    payload["diagnostics"] = {\n        "missing_ts": int(missing_ts),\n        "missing_seq": int(missing_seq),\n        "missing_ts_ratio": float(missing_ts_ratio),\n        "missing_seq_ratio": float(missing_seq_ratio),\n        "kind_counts": kind_counts,\n        "sort_key_head5": key_head5,\n        "sort_key_tail5": key_tail5,\n    }\n    payload["drift_codes"] = drift_codes\n    # --- end diagnostics ---\n    _write_report(report_json, report_md, payload)
+    # --- OFFICIAL-LOCKED: drift taxonomy + ordering diagnostics (best-effort, side-effect free) ---
+    payload["diagnostics"], payload["drift_codes"] = digest.diagnostics(bad)
+    # --- end diagnostics ---
+    _write_report(report_json, report_md, payload)
 
     if bad > 0:
         return ReplayResult(
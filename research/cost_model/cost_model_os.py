@@ -1,10 +1,20 @@
 """
 Cost Model OS (v18): scenario-based trading cost model (explicit + implicit + opportunity).
 All research/backtests must include cost; costless metrics are invalid.
+
+estimate_cost: one side (entry or exit) of `qty` contracts, in NTD.
+- fees: exchange + clearing + commission per contract (src/cost/cost_model_v1), plus tax when price is given
+- spread / impact / slippage: calibrated points per contract (src/cost/implicit_cost_v1 table for
+  symbol, session, vol regime, qty) x multiplier x qty; consecutive legs from the mid (mid -> touch ->
+  book VWAP -> realized fill), so their sum is the cost vs mid; LIMIT orders rest -> no spread / impact
+- no calibrated cell with enough samples -> implicit parts are 0.0 and details["implicit"] == "uncalibrated"
 """
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+
+from src.cost.cost_model_v1 import DEFAULT_FEE_BY_SYMBOL, DEFAULT_MULTIPLIER_BY_SYMBOL, TAX_RATE_EQUITY_FUTURES
+from src.cost.implicit_cost_v1 import base_symbol, get_implicit_cost_model
 
 @dataclass(frozen=True)
 class CostEstimate:
@@ -15,6 +25,25 @@ class CostEstimate:
     total: float
     details: Dict[str, Any]
 
-def estimate_cost(*, symbol: str, qty: float, order_type: str, regime: str, session: str) -> CostEstimate:
-    # Scaffold: return zeros; implement calibrated model next.
-    return CostEstimate(0.0, 0.0, 0.0, 0.0, 0.0, {"symbol": symbol, "qty": qty, "order_type": order_type, "regime": regime, "session": session})
+def estimate_cost(*, symbol: str, qty: float, order_type: str, regime: str, session: str,
+                  price: Optional[float] = None, table_path: str = "") -> CostEstimate:
+    sym = base_symbol(symbol)
+    q = float(qty)
+    mult = float(DEFAULT_MULTIPLIER_BY_SYMBOL.get(sym, 0.0))
+    fee = DEFAULT_FEE_BY_SYMBOL.get(sym)
+    fees = (fee.per_side_total * q if fee is not None else 0.0)
+    if price is not None and float(price) > 0:
+        fees += float(price) * mult * q * TAX_RATE_EQUITY_FUTURES
+    details: Dict[str, Any] = {"symbol": symbol, "qty": qty, "order_type": order_type, "regime": regime, "session": session,
+                               "multiplier": mult}
+    c = get_implicit_cost_model(table_path).lookup(sym, qty=q, session=session, regime=regime) if q > 0 else None
+    if c is None:
+        details["implicit"] = "uncalibrated"
+        return CostEstimate(float(fees), 0.0, 0.0, 0.0, float(fees), details)
+    passive = str(order_type).upper() == "LIMIT"
+    spread = 0.0 if passive else c.half_spread * mult * q
+    impact = 0.0 if passive else c.impact * mult * q
+    slippage = c.slippage * mult * q
+    details.update(implicit="calibrated", cell=c.key, samples=c.n,
+                   points={"half_spread": c.half_spread, "impact": c.impact, "slippage": c.slippage})
+    return CostEstimate(float(fees), float(slippage), float(spread), float(impact), float(fees + slippage + spread + impact), details)
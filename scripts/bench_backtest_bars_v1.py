@@ -0,0 +1,69 @@
+from __future__ import annotations
+import argparse, json, random, sqlite3, sys, tempfile, time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+from src.data.store_sqlite_v1 import init_db  # noqa: E402
+from src.sim.backtest_bars_v1 import BacktestConfigV1, BacktestEngineV1, load_bars_1m  # noqa: E402
+from src.strat.mean_reversion_v1 import MeanReversionStrategyV1  # noqa: E402
+from src.strat.trend_v1 import TrendStrategyV1  # noqa: E402
+
+# Benchmark: one year of synthetic 1m TMF bars (day + night session ~ 1140 bars/day x 252 days)
+# through BacktestEngineV1 with indicator kernels vs plain on_bar.
+
+
+def gen_bars(db: Path, n: int, seed: int = 7) -> None:
+    rnd = random.Random(seed)
+    px = 20000.0
+    rows = []
+    t0 = datetime(2025, 1, 2)
+    for i in range(n):
+        o = px
+        px += rnd.gauss(0.0, 6.0)
+        h = max(o, px) + abs(rnd.gauss(0.0, 2.0))
+        l = min(o, px) - abs(rnd.gauss(0.0, 2.0))
+        rows.append(((t0 + timedelta(minutes=i)).strftime("%Y-%m-%dT%H:%M"), "FOP", "TMFB6",
+                     o, h, l, px, float(rnd.randint(1, 50)), 1, "bench"))
+    con = sqlite3.connect(str(db))
+    try:
+        con.executemany("INSERT INTO bars_1m(ts_min, asset_class, symbol, o, h, l, c, v, n_trades, source) VALUES(?,?,?,?,?,?,?,?,?,?)", rows)
+        con.commit()
+    finally:
+        con.close()
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="bench offline backtest over bars_1m (kernels vs on_bar)")
+    ap.add_argument("--bars", type=int, default=1140 * 252)
+    ap.add_argument("--skip-on-bar", action="store_true")
+    args = ap.parse_args()
+
+    out = {"bars": int(args.bars)}
+    with tempfile.TemporaryDirectory(prefix="tmf_backtest_bench_") as td:
+        db = Path(td) / "bench.sqlite3"
+        init_db(db)
+        gen_bars(db, int(args.bars))
+        t0 = time.perf_counter()
+        bars = load_bars_1m(str(db), "TMFB6")
+        out["secs_load"] = round(time.perf_counter() - t0, 3)
+        modes = [("kernels", True)] + ([] if args.skip_on_bar else [("on_bar", False)])
+        res = {}
+        for name, uk in modes:
+            eng = BacktestEngineV1([TrendStrategyV1(qty=2.0), MeanReversionStrategyV1()], BacktestConfigV1(use_kernels=uk))
+            r = eng.run(bars)
+            res[name] = r
+            out[name] = {k: r.summary[k] for k in ("secs_total", "secs_signals", "n_fills", "n_trades_closed", "net_pnl_ntd", "impl", "numpy")}
+        if "on_bar" in res and (res["on_bar"].fills != res["kernels"].fills):
+            print("[FAIL] kernels and on_bar fills differ")
+            return 2
+    print(json.dumps(out, ensure_ascii=False, indent=2))
+    print("[PASS] bench_backtest_bars_v1")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,103 @@
+from __future__ import annotations
+import argparse, json, random, sqlite3, sys, tempfile, threading, time
+from pathlib import Path
+
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+from src.data.bar_events_v1 import DbChangeEventSourceV1, UdpEventSourceV1  # noqa: E402
+from src.data.store_sqlite_v1 import init_db  # noqa: E402
+from src.data.stream_bars_v1 import UdpBarSinkV1  # noqa: E402
+from src.ops.latency.latency_histogram import LatencyHistogramV1  # noqa: E402
+
+# Benchmark: bar commit -> runner wake-up lag and bars_1m reads, for
+#   poll   : fresh connection + ORDER BY ts_min DESC LIMIT 1 every --poll-sec (run_strategies_paper_loop_v1 default)
+#   db     : DbChangeEventSourceV1 (PRAGMA data_version, bars_1m read only on change)
+#   udp    : UdpEventSourceV1 (recorder datagram per closed bar)
+# A writer thread commits --bars bars at random gaps (uniform 0..--max-gap-sec).
+
+SQL_LAST = "SELECT ts_min, o, h, l, c, v, n_trades, source FROM bars_1m WHERE symbol=? ORDER BY ts_min DESC LIMIT 1"
+
+
+def _writer(db: Path, n: int, max_gap: float, sent: dict, sink=None) -> None:
+    rnd = random.Random(3)
+    con = sqlite3.connect(str(db))
+    for i in range(n):
+        time.sleep(rnd.uniform(0.0, max_gap))
+        ts = f"2026-02-06T{9 + i // 60:02d}:{i % 60:02d}"
+        con.execute("INSERT INTO bars_1m(ts_min, asset_class, symbol, o, h, l, c, v, n_trades, source) VALUES(?,?,?,?,?,?,?,?,?,?)",
+                    (ts, "FOP", "TMFB6", 1.0, 1.0, 1.0, 1.0, 1.0, 1, "bench"))
+        sent[ts] = time.time()
+        con.commit()
+        if sink is not None:
+            sink({"kind": "bar_v1", "interval_sec": 60, "symbol": "TMFB6", "ts_start": ts, "closed": True,
+                  "o": 1.0, "h": 1.0, "l": 1.0, "c": 1.0, "v": 1.0, "n_trades": 1, "revision": 0})
+    con.close()
+
+
+def run_mode(mode: str, td: Path, n: int, max_gap: float, poll_sec: float) -> dict:
+    db = td / f"{mode}.sqlite3"
+    init_db(db)
+    sent: dict = {}
+    hist = LatencyHistogramV1()
+    reads = 0
+    src = sink = None
+    if mode == "db":
+        src = DbChangeEventSourceV1(str(db), symbol="TMFB6")
+    elif mode == "udp":
+        src = UdpEventSourceV1("127.0.0.1", 0, symbol="TMFB6")
+        sink = UdpBarSinkV1(*src.address)
+    w = threading.Thread(target=_writer, args=(db, n, max_gap, sent, sink), daemon=True)
+    t0 = time.time()
+    w.start()
+    seen = 0
+    last = None
+    while seen < n:
+        if src is None:
+            con = sqlite3.connect(str(db))
+            row = con.execute(SQL_LAST, ("TMFB6",)).fetchone()
+            con.close()
+            reads += 1
+            ts = None if row is None else row[0]
+            if ts is not None and ts != last:
+                last = ts
+                seen = len(sent)  # poll only ever sees the latest bar; skipped bars count as seen
+                hist.observe((time.time() - sent[ts]) * 1000.0)
+            time.sleep(poll_sec)
+        else:
+            ev = src.wait_bar(1.0)
+            if ev is None:
+                continue
+            hist.observe((time.time() - sent[ev.bar["ts_min"]]) * 1000.0)
+            seen += 1
+    w.join()
+    secs = time.time() - t0
+    if src is not None:
+        reads = int(src.stats.get("changes", 0))  # udp: bars never read back from the DB
+        src.close()
+    if sink is not None:
+        sink.close()
+    d = hist.to_dict()
+    return {"mode": mode, "bars": n, "observed": d["n"], "secs": round(secs, 2), "bars_1m_reads": reads,
+            "lag_ms": {k: (None if d[k] is None else round(d[k], 2)) for k in ("p50_ms", "p95_ms", "p99_ms", "max_ms")}}
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="bench bar-close wake-up: polling vs event sources")
+    ap.add_argument("--bars", type=int, default=40)
+    ap.add_argument("--max-gap-sec", type=float, default=0.3)
+    ap.add_argument("--poll-sec", type=float, default=0.5)
+    args = ap.parse_args()
+    out = {"runs": []}
+    with tempfile.TemporaryDirectory(prefix="tmf_bar_events_bench_") as td:
+        for mode in ("poll", "db", "udp"):
+            r = run_mode(mode, Path(td), int(args.bars), float(args.max_gap_sec), float(args.poll_sec))
+            out["runs"].append(r)
+            print(json.dumps(r, ensure_ascii=False), flush=True)
+    print("[PASS] bench_bar_events_v1")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,102 @@
+from __future__ import annotations
+import argparse, json, os, sys, tempfile, time
+from dataclasses import replace
+from datetime import datetime, timedelta
+from pathlib import Path
+
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+from src.data.store_sqlite_v1 import init_db  # noqa: E402
+from src.oms.paper_oms_v1 import PaperOMS  # noqa: E402
+from src.sim.depth_fill_v1 import DepthFillConfigV1, DepthFillEngineV1  # noqa: E402
+
+# Benchmark: depth-walking paper fills (src/sim/depth_fill_v1.py).
+# 1) on_quote cost with no working order (the per-quote price every replay pays when TMF_PAPER_DEPTH_FILL=1)
+# 2) match latency: flat PaperOMS.match vs DepthFillEngineV1.match (5-level walk, one fill)
+# 3) replay events/sec over a synthetic recorder log, depth fills off vs on
+
+
+def book(i: int) -> dict:
+    b = 20000.0 + (i % 50)
+    return {"code": "TMFB6", "bid_price": [b - k for k in range(5)], "bid_volume": [3 + k for k in range(5)],
+            "ask_price": [b + 1 + k for k in range(5)], "ask_volume": [2 + k for k in range(5)]}
+
+
+def bench_quotes(n: int) -> float:
+    eng = DepthFillEngineV1("TMFB6", cfg=DepthFillConfigV1())
+    books = [book(i) for i in range(64)]
+    t0 = time.perf_counter()
+    for i in range(n):
+        eng.on_quote(None, books[i & 63])
+    return (time.perf_counter() - t0) / n * 1e6
+
+
+def bench_match(db: Path, n: int) -> dict:
+    oms = PaperOMS(db)
+    eng = DepthFillEngineV1("TMFB6", cfg=DepthFillConfigV1())
+    out = {}
+    for mode in ("flat", "depth"):
+        orders = [oms.place_order(symbol="TMFB6", side=("BUY" if i % 2 == 0 else "SELL"), qty=8.0, order_type="MARKET",
+                                  meta={"bench": i}) for i in range(n)]
+        lat = []
+        for i, o in enumerate(orders):
+            eng.on_quote(oms, book(i))
+            t = time.perf_counter()
+            if mode == "flat":
+                oms.match(o, market_price=20001.0, liquidity_qty=10.0, reason="bench")
+            else:
+                eng.match(oms, o, reason="bench")
+            lat.append(time.perf_counter() - t)
+        lat.sort()
+        out[mode] = {"match_p50_us": round(lat[len(lat) // 2] * 1e6, 1), "match_p99_us": round(lat[int(len(lat) * 0.99)] * 1e6, 1)}
+    out["depth_stats"] = dict(eng.stats)
+    return out
+
+
+def bench_replay(td: Path, n: int) -> dict:
+    os.environ.update(TMF_IGNORE_MARKET_CALENDAR="1", TMF_STRATEGIES="trend", TMF_TREND_FORCE_FIRST_SIGNAL="1",
+                      TMF_TREND_FORCE_STOP_PTS="30")
+    from src.sim.replay_engine_v1 import ReplayConfigV1, ReplayEngineV1
+    t0 = datetime(2025, 3, 5, 2, 0)
+    log = td / "replay.jsonl"
+    with log.open("w", encoding="utf-8") as f:
+        for i in range(n):
+            ts = (t0 + timedelta(seconds=i * 0.5)).isoformat(timespec="milliseconds") + "Z"
+            q = dict(book(i), synthetic=False, recv_ts=ts, ingest_ts=ts, source_file="bench")
+            f.write(json.dumps({"ts": ts, "kind": "bidask_fop_v1", "payload": q}) + "\n")
+            f.write(json.dumps({"ts": ts, "kind": "tick_fop_v1", "payload": {"code": "TMFB6", "datetime": ts,
+                                "close": q["bid_price"][0] + 0.5, "volume": 1}}) + "\n")
+    out = {}
+    for mode, flag in (("off", 0), ("on", 1)):
+        cfg = replace(ReplayConfigV1(fop_code="TMFB6", max_bidask_age_seconds=15), depth_fill=flag)
+        rep = ReplayEngineV1(db_path=str(td / f"replay_{mode}.sqlite3"), cfg=cfg).run([str(log)])
+        out[mode] = {"events_per_sec": rep["events_per_sec"], "fills": rep["counters"]["fills"], "errors": rep["last_errors"]}
+    return out
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="bench depth-walking paper fills vs flat single-price fills")
+    ap.add_argument("--quotes", type=int, default=200000)
+    ap.add_argument("--orders", type=int, default=2000)
+    ap.add_argument("--replay-quotes", type=int, default=20000)
+    args = ap.parse_args()
+
+    os.environ["TMF_OMS_WRITE_BEHIND"] = "0"
+    out = {"on_quote_us": round(bench_quotes(int(args.quotes)), 2)}
+    with tempfile.TemporaryDirectory(prefix="tmf_depth_fill_bench_") as td:
+        db = Path(td) / "match.sqlite3"
+        init_db(db)
+        out["match"] = bench_match(db, int(args.orders))
+        out["replay"] = bench_replay(Path(td), int(args.replay_quotes))
+    print(json.dumps(out, ensure_ascii=False, indent=2))
+    if out["replay"]["on"]["errors"] or out["replay"]["off"]["errors"]:
+        print("[FAIL] replay errors")
+        return 2
+    print("[PASS] bench_depth_fill_v1")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,76 @@
+from __future__ import annotations
+import argparse, json, os, sys, tempfile, time
+from pathlib import Path
+
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+from src.data.store_sqlite_v1 import init_db  # noqa: E402
+from src.ops.latency.gate_timing import GateLatencyRecorderV1, GateTimerV1, get_gate_recorder  # noqa: E402
+from src.ops.latency.latency_histogram import percentile  # noqa: E402
+from src.oms.paper_oms_v1 import PaperOMS  # noqa: E402
+from src.oms.paper_oms_risk_safety_wrapper_v1 import PaperOMSRiskSafetyWrapperV1  # noqa: E402
+from src.risk.risk_engine_v1 import RiskEngineV1  # noqa: E402
+from src.safety.system_safety_v1 import SafetyConfigV1, SystemSafetyEngineV1  # noqa: E402
+
+# Benchmark: cost of the gate-chain instrumentation.
+#   micro : GateTimerV1 (6 laps) + GateLatencyRecorderV1.record, per attempt
+#   wrap  : PaperOMSRiskSafetyWrapperV1.place_order with TMF_GATE_TIMING=0 vs 1 (fresh DB each,
+#           so the sqlite trace callback is installed only in the timed run)
+# Also prints the stage breakdown the instrumentation produced for the timed run.
+
+
+def bench_micro(n: int) -> dict:
+    rec = GateLatencyRecorderV1(ring=2048, path="", every_sec=1.0)
+    t0 = time.perf_counter()
+    for _ in range(n):
+        t = GateTimerV1()
+        for s in ("safety", "calendar", "preflight", "risk", "oms", "audit"):
+            t.lap(s)
+        rec.record(t, "ACCEPTED")
+    return {"n": n, "us_per_attempt": round((time.perf_counter() - t0) / n * 1e6, 3)}
+
+
+def bench_wrap(td: Path, n: int, timing: str) -> dict:
+    os.environ["TMF_GATE_TIMING"] = timing
+    db = td / f"wrap_{timing}.sqlite3"
+    init_db(db)
+    safety = SystemSafetyEngineV1(db_path=str(db), cfg=SafetyConfigV1(require_recent_bidask=0))
+    w = PaperOMSRiskSafetyWrapperV1(paper_oms=PaperOMS(db), risk=RiskEngineV1(db_path=str(db)), safety=safety, db_path=str(db))
+    meta = {"ref_price": 20000.0, "stop_price": 19990.0, "session_hint": "DAY"}
+    lat = []
+    for i in range(n):
+        t = time.perf_counter()
+        w.place_order(symbol="TMF", side=("BUY" if i % 2 == 0 else "SELL"), qty=1, order_type="MARKET", meta=dict(meta))
+        lat.append((time.perf_counter() - t) * 1000.0)
+    lat.sort()
+    return {"n": n, "p50_ms": round(percentile(lat, 50), 3), "p95_ms": round(percentile(lat, 95), 3), "mean_ms": round(sum(lat) / n, 3)}
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=300, help="place_order attempts per mode")
+    ap.add_argument("--micro-n", type=int, default=100000)
+    args = ap.parse_args()
+    os.environ.setdefault("TMF_IGNORE_MARKET_CALENDAR", "1")
+    os.environ["TMF_GATE_LATENCY_PATH"] = ""
+    td = Path(tempfile.mkdtemp(prefix="tmf_bench_gate_timing_"))
+    out = {"micro": bench_micro(args.micro_n)}
+    out["wrap_off"] = bench_wrap(td, args.n, "0")
+    out["wrap_on"] = bench_wrap(td, args.n, "1")
+    out["overhead_p50_ms"] = round(out["wrap_on"]["p50_ms"] - out["wrap_off"]["p50_ms"], 3)
+    rec = get_gate_recorder(str(td / "wrap_1.sqlite3"))
+    rec.export()
+    s = rec.latest()
+    out["stages_p95_ms"] = {k: round(v["p95_ms"], 3) for k, v in s["stages"].items()}
+    out["stages_db_queries_mean"] = {k: v["db_queries_mean"] for k, v in s["stages"].items()}
+    out["broker_rtt_ms"] = s["broker_rtt_ms"]
+    out["gate_latency_ms"] = s["gate_latency_ms"]
+    print(json.dumps(out, indent=2))
+    print("[PASS] bench_gate_timing_v1")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
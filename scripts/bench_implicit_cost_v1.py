@@ -0,0 +1,80 @@
+from __future__ import annotations
+import argparse, json, os, sqlite3, sys, tempfile, time
+from dataclasses import replace
+from datetime import datetime, timedelta
+from pathlib import Path
+
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+from src.cost.implicit_cost_v1 import ImplicitCostCalibratorV1, ImplicitCostConfigV1, ImplicitCostModelV1  # noqa: E402
+from src.data.store_sqlite_v1 import init_db  # noqa: E402
+
+# Benchmark: implicit cost calibration + serving (src/cost/implicit_cost_v1.py).
+# 1) full calibration over N synthetic events (bidask L5 + ticks across both sessions)
+# 2) incremental recalibration after appending 1% more events (only the new rows are read)
+# 3) lookup latency (table cached in memory; mtime probe every reload_sec)
+
+
+def fill_db(db: Path, n: int, start: int = 0) -> None:
+    t0 = datetime(2025, 3, 5, 0, 0)
+    rows = []
+    for i in range(start, start + n):
+        ts = (t0 + timedelta(seconds=i * 2)).isoformat(timespec="milliseconds") + "Z"
+        b = 20000.0 + (i % 37)
+        if i % 3 == 0:
+            rows.append((ts, "tick_fop_v1", json.dumps({"code": "TMFB6", "close": b + (i % 11), "volume": 1})))
+        else:
+            sp = 1.0 + (i % 4)
+            rows.append((ts, "bidask_fop_v1", json.dumps({
+                "code": "TMFB6", "bid_price": [b - k for k in range(5)], "ask_price": [b + sp + k for k in range(5)],
+                "bid_volume": [2 + (i + k) % 6 for k in range(5)], "ask_volume": [2 + (i * 3 + k) % 6 for k in range(5)]})))
+    con = sqlite3.connect(str(db))
+    con.executemany("INSERT INTO events(ts, kind, payload_json, source_file, ingest_ts) VALUES (?,?,?,?,?)",
+                    [(ts, k, p, "bench", ts) for ts, k, p in rows])
+    con.commit()
+    con.close()
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="bench implicit cost calibration / incremental recalibration / lookups")
+    ap.add_argument("--events", type=int, default=100000)
+    ap.add_argument("--lookups", type=int, default=200000)
+    args = ap.parse_args()
+    n = int(args.events)
+
+    out = {"events": n}
+    with tempfile.TemporaryDirectory(prefix="tmf_implicit_cost_bench_") as td:
+        db = Path(td) / "bench.sqlite3"
+        init_db(db)
+        fill_db(db, n)
+        cfg = replace(ImplicitCostConfigV1.from_env(), table_path=str(Path(td) / "table.json"),
+                      checkpoint=str(Path(td) / "calib.json"), min_samples=1)
+        t = time.perf_counter()
+        st = ImplicitCostCalibratorV1(str(db), cfg=cfg).update()
+        dt = time.perf_counter() - t
+        out["full"] = {"secs": round(dt, 3), "events_per_sec": round(n / dt if dt > 0 else 0.0), "cells": st["cells"]}
+        fill_db(db, max(1, n // 100), start=n)
+        t = time.perf_counter()
+        st = ImplicitCostCalibratorV1(str(db), cfg=cfg).update()
+        out["incremental"] = {"new_events": st["new_events"], "secs": round(time.perf_counter() - t, 3)}
+
+        m = ImplicitCostModelV1(cfg.table_path, cfg=cfg)
+        k = int(args.lookups)
+        t = time.perf_counter()
+        for i in range(k):
+            m.lookup("TMF", qty=1.0 + (i % 60), session=("DAY" if i & 1 else "NIGHT"), regime=("LOW", "MID", "HIGH")[i % 3])
+        out["lookup_us"] = round((time.perf_counter() - t) / k * 1e6, 3)
+        out["lookup_stats"] = dict(m.stats)
+        out["table_bytes"] = os.path.getsize(cfg.table_path)
+    print(json.dumps(out, ensure_ascii=False, indent=2))
+    if out["incremental"]["new_events"] != max(1, n // 100):
+        print("[FAIL] incremental recalibration re-read old events")
+        return 2
+    print("[PASS] bench_implicit_cost_v1")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
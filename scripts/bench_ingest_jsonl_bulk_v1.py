@@ -0,0 +1,98 @@
+from __future__ import annotations
+import argparse, json, random, sys, tempfile, time
+from pathlib import Path
+
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+from src.data.store_sqlite_v1 import ingest_jsonl, ingest_jsonl_bulk, connect  # noqa: E402
+
+# Benchmark: legacy per-line ingest_jsonl (syncs quotes_l5 inline) vs batched ingest_jsonl_bulk on a synthetic
+# recorder day, reported ingest-only and with the quotes_l5 sync (--sync-quotes).
+# Lines mimic shioaji_recorder._write_event output (bidask_fop_v1 L5 + tick_fop_v1).
+
+def gen_jsonl(p: Path, n: int, seed: int = 7) -> None:
+    rnd = random.Random(seed)
+    px = 20000.0
+    with p.open("w", encoding="utf-8") as f:
+        for i in range(n):
+            px += rnd.choice((-1.0, 0.0, 1.0))
+            ss = i % 86400
+            ts = f"2026-02-06T{(ss // 3600) % 24:02d}:{(ss // 60) % 60:02d}:{ss % 60:02d}.{i % 1000:03d}"
+            if i % 4 == 0:
+                kind = "tick_fop_v1"
+                payload = {"code": "TMFB6", "raw_code": "TMFB6", "datetime": ts, "close": px,
+                           "volume": rnd.randint(1, 5), "synthetic": False}
+            else:
+                kind = "bidask_fop_v1"
+                payload = {"code": "TMFB6", "raw_code": "TMFB6", "datetime": ts,
+                           "bid_price": [px - k for k in range(1, 6)],
+                           "ask_price": [px + k for k in range(1, 6)],
+                           "bid_volume": [rnd.randint(1, 30) for _ in range(5)],
+                           "ask_volume": [rnd.randint(1, 30) for _ in range(5)],
+                           "synthetic": False}
+            f.write(json.dumps({"ts": ts, "kind": kind, "payload": payload}) + "\n")
+        # a couple of malformed lines: both paths must count them as bad
+        f.write("{not json\n")
+        f.write('{"ts": "x", "kind": "y", "payload": {"a": 1,}}\n')
+
+
+def count_events(db: Path) -> int:
+    con = connect(db)
+    try:
+        return int(con.execute("SELECT COUNT(1) FROM events").fetchone()[0])
+    finally:
+        con.close()
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="bench raw_events JSONL ingest (legacy vs bulk)")
+    ap.add_argument("--lines", type=int, default=1_000_000)
+    ap.add_argument("--chunk-size", type=int, default=20000)
+    ap.add_argument("--rebuild-indexes", default="always", choices=["auto", "always", "never"])
+    ap.add_argument("--skip-legacy", action="store_true")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="tmf_ingest_bench_") as td:
+        tdp = Path(td)
+        jl = tdp / "raw_events_bench.jsonl"
+        t0 = time.time()
+        gen_jsonl(jl, int(args.lines))
+        print(f"[INFO] generated lines={args.lines} bytes={jl.stat().st_size} secs={time.time() - t0:.2f}")
+
+        out = {"lines": int(args.lines)}
+        if not args.skip_legacy:
+            db_a = tdp / "legacy.sqlite3"
+            t0 = time.time()
+            ingest_jsonl(db_a, jl)
+            dt = time.time() - t0
+            n_a = count_events(db_a)
+            out["legacy"] = {"rows": n_a, "secs": round(dt, 3), "rows_per_sec": round(n_a / dt if dt > 0 else 0.0)}
+
+        # ingest only (default), then ingest + quotes_l5 sync (--sync-quotes) on a fresh DB
+        for name, sync in (("bulk", False), ("bulk_sync", True)):
+            db_b = tdp / f"{name}.sqlite3"
+            t0 = time.time()
+            rep = ingest_jsonl_bulk(db_b, [jl], chunk_size=int(args.chunk_size), rebuild_indexes=str(args.rebuild_indexes),
+                                    sync_quotes=sync)
+            dt = time.time() - t0
+            n_b = count_events(db_b)
+            out[name] = {"rows": n_b, "secs": round(dt, 3), "rows_per_sec": round(n_b / dt if dt > 0 else 0.0)}
+            if sync:
+                out[name].update(quotes_l5_rows=rep["quotes_l5_rows"], sync_secs=round(rep["sync_secs"], 3))
+
+        if "legacy" in out:
+            if out["legacy"]["rows"] != n_b:
+                print(f"[FAIL] row count mismatch legacy={out['legacy']['rows']} bulk={n_b}")
+                return 2
+            for name in ("bulk", "bulk_sync"):
+                out[name]["speedup"] = round(out["legacy"]["secs"] / out[name]["secs"], 2) if out[name]["secs"] > 0 else None
+
+    print(json.dumps(out, ensure_ascii=False, indent=2))
+    print("[PASS] bench_ingest_jsonl_bulk_v1")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,60 @@
+from __future__ import annotations
+import argparse, json, os, sys, tempfile, time
+from pathlib import Path
+
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+from src.data.store_sqlite_v1 import init_db, connect  # noqa: E402
+from src.oms.paper_oms_v1 import PaperOMS  # noqa: E402
+
+# Benchmark: orders/sec through PaperOMS.place_order + match,
+# per-call connections (TMF_SQLITE_SHARED_CONN=0) vs shared long-lived connection + one tx per fill.
+# Orders alternate BUY/SELL so every pair opens and closes a trade (all OMS write paths exercised).
+
+
+def run_orders(db: Path, n: int) -> float:
+    oms = PaperOMS(db)
+    t0 = time.perf_counter()
+    for i in range(n):
+        o = oms.place_order(symbol="TMFB6", side=("BUY" if i % 2 == 0 else "SELL"), qty=1.0, order_type="MARKET",
+                            meta={"bench": i})
+        oms.match(o, market_price=20000.0 + (i % 7), reason="bench")
+    return time.perf_counter() - t0
+
+
+def table_counts(db: Path) -> dict:
+    con = connect(db)
+    try:
+        return {t: int(con.execute(f"SELECT COUNT(1) FROM {t}").fetchone()[0]) for t in ("orders", "fills", "trades")}
+    finally:
+        con.close()
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="bench PaperOMS place_order+match (per-call vs shared connections)")
+    ap.add_argument("--orders", type=int, default=2000)
+    args = ap.parse_args()
+
+    out = {"orders": int(args.orders)}
+    with tempfile.TemporaryDirectory(prefix="tmf_oms_bench_") as td:
+        for mode, flag in (("per_call", "0"), ("shared", "1")):
+            db = Path(td) / f"{mode}.sqlite3"
+            init_db(db)
+            os.environ["TMF_SQLITE_SHARED_CONN"] = flag
+            dt = run_orders(db, int(args.orders))
+            out[mode] = {"secs": round(dt, 3), "orders_per_sec": round(args.orders / dt if dt > 0 else 0.0), **table_counts(db)}
+
+    for t in ("orders", "fills", "trades"):
+        if out["per_call"][t] != out["shared"][t]:
+            print(f"[FAIL] {t} count mismatch per_call={out['per_call'][t]} shared={out['shared'][t]}")
+            return 2
+    out["speedup"] = round(out["per_call"]["secs"] / out["shared"]["secs"], 2) if out["shared"]["secs"] > 0 else None
+    print(json.dumps(out, ensure_ascii=False, indent=2))
+    print("[PASS] bench_paper_oms_orders_v1")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
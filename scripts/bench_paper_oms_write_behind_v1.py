@@ -0,0 +1,86 @@
+from __future__ import annotations
+import argparse, json, os, sys, tempfile, time
+from pathlib import Path
+
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+from src.data.store_sqlite_v1 import init_db, connect  # noqa: E402
+from src.oms.oms_journal_v1 import close_oms_journal  # noqa: E402
+from src.oms.paper_oms_v1 import PaperOMS  # noqa: E402
+
+# Benchmark: PaperOMS.match latency (fill + order status + position/trade book),
+# synchronous SQLite writes (one transaction per fill) vs write-behind journal (TMF_OMS_WRITE_BEHIND=1).
+# Orders are placed up front (not timed); each is filled in two halves, alternating BUY/SELL so trades
+# open and close. Tables must be identical after the journal is drained (drain time reported separately).
+
+
+def run_fills(db: Path, n: int) -> tuple:
+    oms = PaperOMS(db)
+    orders = [oms.place_order(symbol="TMFB6", side=("BUY" if i % 2 == 0 else "SELL"), qty=2.0, order_type="MARKET",
+                              meta={"bench": i, "stop_price": 19990.0}) for i in range(n)]
+    lat = []
+    t0 = time.perf_counter()
+    for i, o in enumerate(orders):
+        for _ in range(2):
+            t = time.perf_counter()
+            oms.match(o, market_price=20000.0 + (i % 7), liquidity_qty=1.0, reason="bench")
+            lat.append(time.perf_counter() - t)
+    dt = time.perf_counter() - t0
+    t = time.perf_counter()
+    oms.flush()
+    drain = time.perf_counter() - t
+    return dt, drain, sorted(lat), oms
+
+
+def tables(db: Path) -> dict:
+    con = connect(db)
+    try:
+        return {
+            "orders": con.execute("SELECT symbol, side, qty, status, meta_json FROM orders ORDER BY id").fetchall(),
+            "fills": con.execute("SELECT symbol, side, qty, price, fee, tax FROM fills ORDER BY id").fetchall(),
+            "trades": con.execute("SELECT symbol, side, qty, entry, exit, pnl, reason_close FROM trades ORDER BY id").fetchall(),
+        }
+    finally:
+        con.close()
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="bench PaperOMS fills: synchronous writes vs write-behind journal")
+    ap.add_argument("--orders", type=int, default=2000)
+    args = ap.parse_args()
+    n = int(args.orders)
+
+    out = {"orders": n, "fills": 2 * n}
+    rows = {}
+    with tempfile.TemporaryDirectory(prefix="tmf_oms_wb_bench_") as td:
+        for mode, flag in (("sync", "0"), ("write_behind", "1")):
+            db = Path(td) / f"{mode}.sqlite3"
+            init_db(db)
+            os.environ["TMF_OMS_WRITE_BEHIND"] = flag
+            dt, drain, lat, oms = run_fills(db, n)
+            out[mode] = {
+                "secs": round(dt, 3),
+                "fills_per_sec": round(2 * n / dt if dt > 0 else 0.0),
+                "match_p50_us": round(lat[len(lat) // 2] * 1e6, 1),
+                "match_p99_us": round(lat[int(len(lat) * 0.99)] * 1e6, 1),
+                "drain_secs": round(drain, 3),
+            }
+            if oms.journal is not None:
+                out[mode]["journal"] = {k: oms.journal.counters[k] for k in ("records", "applied", "batches", "pending_max", "lag_ms_max")}
+                close_oms_journal(db)
+            rows[mode] = tables(db)
+
+    for t in ("orders", "fills", "trades"):
+        if rows["sync"][t] != rows["write_behind"][t]:
+            print(f"[FAIL] {t} rows differ between sync and write_behind")
+            return 2
+    out["speedup_p50"] = round(out["sync"]["match_p50_us"] / out["write_behind"]["match_p50_us"], 1) if out["write_behind"]["match_p50_us"] > 0 else None
+    print(json.dumps(out, ensure_ascii=False, indent=2))
+    print("[PASS] bench_paper_oms_write_behind_v1")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,49 @@
+from __future__ import annotations
+import argparse, json, os, random, sys, tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+from src.research.param_sweep_v1 import SweepGridV1, run_sweep  # noqa: E402
+from src.sim.backtest_bars_v1 import BarArraysV1  # noqa: E402
+
+# Benchmark: configs/sec of the parameter sweep vs worker count (expect ~linear up to physical cores).
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="bench param sweep scaling (workers=1..N)")
+    ap.add_argument("--bars", type=int, default=60_000)
+    ap.add_argument("--workers", default="", help="csv; default 1,2,4,..,cpu_count")
+    args = ap.parse_args()
+
+    rnd = random.Random(7)
+    px = 20000.0
+    rows = []
+    t0 = datetime(2025, 1, 2)
+    for i in range(int(args.bars)):
+        o = px
+        px += rnd.gauss(0.0, 6.0)
+        rows.append(((t0 + timedelta(minutes=i)).strftime("%Y-%m-%dT%H:%M"), o, max(o, px) + 1.0, min(o, px) - 1.0, px, 1.0))
+    bars = BarArraysV1.from_rows("TMFB6", rows)
+    tasks = SweepGridV1().tasks()
+
+    ncpu = os.cpu_count() or 1
+    ws = [int(x) for x in args.workers.split(",") if x.strip()] if args.workers else sorted({1, *[w for w in (2, 4, 8, 16) if w <= ncpu], ncpu})
+    out = {"bars": len(bars), "configs": len(tasks), "cpu_count": ncpu, "runs": []}
+    base = None
+    with tempfile.TemporaryDirectory(prefix="tmf_sweep_bench_") as td:
+        for w in ws:
+            st = run_sweep(bars=bars, tasks=tasks, store_path=Path(td) / f"w{w}.sqlite3", workers=w, fresh=True)
+            base = base or st["secs"]
+            out["runs"].append({"workers": w, "secs": st["secs"], "configs_per_sec": round(len(tasks) / st["secs"], 2),
+                                "speedup": round(base / st["secs"], 2)})
+    print(json.dumps(out, ensure_ascii=False, indent=2))
+    print("[PASS] bench_param_sweep_v1")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,49 @@
+from __future__ import annotations
+import argparse, json, sys, time
+from pathlib import Path
+
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+from execution.reject_taxonomy import decision_from_verdict, load_policy, load_policy_cached  # noqa: E402
+
+# Benchmark: reject decisions/sec on the wrapper's hot path.
+#   file     : load_policy() + decision_from_verdict(dict policy) per reject (read + parse per reject)
+#   dict     : policy dict loaded once, decision_from_verdict string matching per call
+#   compiled : load_policy_cached() per reject (stat throttled) + compiled lookup table / memo
+# Codes cycle through exact, prefix and domain-fallback hits.
+
+POLICY = str(_REPO_ROOT / "execution" / "reject_policy.yaml")
+CODES = ("SAFETY_FEED_STALE", "RISK_PER_TRADE_MAX_LOSS", "SAFETY_COOLDOWN_ACTIVE", "EXEC_TAIFEX_DPBM_REJECT",
+         "BROKER_TIMEOUT", "RISK_QTY_LIMIT", "UNKNOWN_X", "EXEC_MARKET_CLOSED")
+
+
+def _run(n: int, get_policy) -> dict:
+    verdicts = [{"ok": False, "code": c, "reason": "bench", "details": {"i": 1}} for c in CODES]
+    t0 = time.perf_counter()
+    for i in range(n):
+        decision_from_verdict(verdicts[i % len(verdicts)], policy=get_policy())
+    dt = time.perf_counter() - t0
+    return {"n": n, "decisions_per_sec": int(n / dt), "us_per_decision": round(dt / n * 1e6, 3)}
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=200000)
+    args = ap.parse_args()
+    pol = load_policy(POLICY)
+    out = {
+        "file": _run(max(1, args.n // 20), lambda: load_policy(POLICY)),
+        "dict": _run(args.n, lambda: pol),
+        "compiled": _run(args.n, lambda: load_policy_cached(POLICY)),
+    }
+    out["speedup_vs_file"] = round(out["compiled"]["decisions_per_sec"] / max(1, out["file"]["decisions_per_sec"]), 1)
+    out["speedup_vs_dict"] = round(out["compiled"]["decisions_per_sec"] / max(1, out["dict"]["decisions_per_sec"]), 2)
+    print(json.dumps(out, indent=2))
+    print("[PASS] bench_reject_policy_v1")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,59 @@
+from __future__ import annotations
+import argparse, json, os, sys, tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+from src.sim.replay_engine_v1 import ReplayConfigV1, ReplayEngineV1  # noqa: E402
+
+# Benchmark: ReplayEngineV1 over --minutes of synthetic recorder output split into two files
+# (bidask file + tick file, --rate quotes and ticks per second each), forced trend entries.
+# Reports events/sec of the full stack (merge -> quote cache / bars -> strategies -> gates -> PaperOMS -> controls)
+# and checks the decision log hash of two runs.
+
+
+def write_logs(td: Path, minutes: int, rate: int) -> list:
+    t0 = datetime(2025, 3, 5, 1, 0)
+    qp, tp = td / "quotes.jsonl", td / "ticks.jsonl"
+    with qp.open("w", encoding="utf-8") as fq, tp.open("w", encoding="utf-8") as ft:
+        for i in range(minutes * 60 * rate):
+            t = (t0 + timedelta(seconds=i / rate)).isoformat(timespec="milliseconds") + "Z"
+            px = 20000.0 + (i % 400) - 200.0
+            fq.write(json.dumps({"ts": t, "kind": "bidask_fop_v1", "payload": {
+                "code": "TMFB6", "bid_price": [px] * 5, "ask_price": [px + 1] * 5, "bid_volume": [5] * 5, "ask_volume": [5] * 5,
+                "synthetic": False, "ingest_ts": t, "source_file": "bench"}}) + "\n")
+            ft.write(json.dumps({"ts": t, "kind": "tick_fop_v1", "payload": {"code": "TMFB6", "datetime": t, "close": px + 0.5,
+                                                                             "volume": 1}}) + "\n")
+    return [str(qp), str(tp)]
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--minutes", type=int, default=30)
+    ap.add_argument("--rate", type=int, default=5, help="quotes and ticks per second each")
+    args = ap.parse_args()
+    os.environ.setdefault("TMF_IGNORE_MARKET_CALENDAR", "1")
+    os.environ.setdefault("TMF_STRATEGIES", "trend")
+    os.environ.setdefault("TMF_TREND_FORCE_FIRST_SIGNAL", "1")
+    td = Path(tempfile.mkdtemp(prefix="tmf_bench_replay_"))
+    paths = write_logs(td, args.minutes, args.rate)
+    runs = []
+    for k in range(2):
+        rep = ReplayEngineV1(db_path=str(td / f"run{k}.sqlite3"), cfg=ReplayConfigV1()).run(paths)
+        runs.append(rep)
+    c = runs[0]["counters"]
+    out = {"minutes": args.minutes, "events": c["events"], "bars": c["bars"], "orders": c["orders_sent"], "fills": c["fills"],
+           "secs": [r["secs"] for r in runs], "events_per_sec": [r["events_per_sec"] for r in runs],
+           "replay_speedup_x": round(args.minutes * 60.0 / max(1e-9, runs[0]["secs"]), 1),
+           "deterministic": runs[0]["decision_log_sha256"] == runs[1]["decision_log_sha256"]}
+    print(json.dumps(out, indent=2))
+    assert out["deterministic"], runs
+    print("[PASS] bench_replay_engine_v1")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
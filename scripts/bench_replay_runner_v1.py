@@ -0,0 +1,75 @@
+from __future__ import annotations
+import argparse, json, os, random, resource, subprocess, sys, tempfile, time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+from ops.replay.replay_runner import replay_jsonl  # noqa: E402
+
+# Benchmark: peak RSS of ops.replay.replay_runner.replay_jsonl vs log size, in-memory sort vs external sort.
+# Logs are bidask-shaped recorder lines with locally shuffled ts (so the sort has work to do).
+# Every (size, mode) runs in a fresh child process (ru_maxrss is per process, never goes down).
+
+
+def write_log(p: Path, n: int) -> None:
+    rnd = random.Random(n)
+    t0 = datetime(2025, 3, 5, 1, 0, tzinfo=timezone.utc)
+    with p.open("w", encoding="utf-8") as f:
+        for i in range(n):
+            t = (t0 + timedelta(milliseconds=200 * i + rnd.randint(-5000, 5000))).isoformat(timespec="milliseconds")
+            px = 20000.0 + (i % 400)
+            f.write(json.dumps({"ts": t.replace("+00:00", "Z"), "kind": "bidask_fop_v1", "payload": {
+                "code": "TMFB6", "bid_price": [px - k for k in range(5)], "ask_price": [px + 1 + k for k in range(5)],
+                "bid_volume": [5] * 5, "ask_volume": [5] * 5, "synthetic": False, "source_file": "bench"}}) + "\n")
+
+
+def child(log: str, mode: str, chunk: int) -> int:
+    t = time.perf_counter()
+    res = replay_jsonl(log, handler=lambda ev: None, external_sort=(mode == "external"), chunk_events=chunk,
+                       tmp_dir=str(Path(log).parent))
+    secs = time.perf_counter() - t
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        rss_kb //= 1024
+    print(json.dumps({"ok": res.ok, "replayed": res.details["replayed"], "sha": res.details["events_sha256"],
+                      "secs": round(secs, 3), "peak_rss_mb": round(rss_kb / 1024.0, 1)}))
+    return 0
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="50000,200000,400000", help="log sizes in events")
+    ap.add_argument("--chunk", type=int, default=50000, help="external sort chunk (events)")
+    ap.add_argument("--child", nargs=2, metavar=("LOG", "MODE"), help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.child:
+        return child(args.child[0], args.child[1], args.chunk)
+
+    td = Path(tempfile.mkdtemp(prefix="tmf_bench_replay_runner_"))
+    rows = []
+    for n in [int(x) for x in args.sizes.split(",") if x.strip()]:
+        log = td / f"log_{n}.jsonl"
+        write_log(log, n)
+        row = {"events": n, "log_mb": round(log.stat().st_size / 1048576.0, 1)}
+        for mode in ("memory", "external"):
+            out = subprocess.run([sys.executable, __file__, "--chunk", str(args.chunk), "--child", str(log), mode],
+                                 check=True, capture_output=True, text=True).stdout
+            row[mode] = json.loads(out.strip().splitlines()[-1])
+        assert row["memory"]["sha"] == row["external"]["sha"], row
+        rows.append(row)
+        log.unlink()
+    for r in rows:
+        print(f"events={r['events']:>8} log={r['log_mb']:>7.1f}MB  memory: {r['memory']['peak_rss_mb']:>7.1f}MB "
+              f"{r['memory']['secs']:>6.2f}s  external(chunk={args.chunk}): {r['external']['peak_rss_mb']:>7.1f}MB "
+              f"{r['external']['secs']:>6.2f}s")
+    print(json.dumps({"chunk_events": args.chunk, "rows": rows}, indent=2))
+    os.rmdir(td)
+    print("[PASS] bench_replay_runner_v1")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,68 @@
+from __future__ import annotations
+import argparse, json, os, sqlite3, sys, tempfile, time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+from src.data.store_sqlite_v1 import init_db  # noqa: E402
+from src.ops.latency.latency_histogram import percentile  # noqa: E402
+from src.risk.risk_engine_v1 import RiskEngineV1  # noqa: E402
+
+# Benchmark: RiskEngineV1.check_pre_trade DB-based gates on a trades table of --trades rows
+# (a few days of history; today's closes mixed in).
+#   db    : TMF_RISK_STATE_CACHE=0 (SUM ... LIKE 'day%', 50-row streak scan, last-loss query per order)
+#   cache : incremental state (src.risk.risk_state_v1), first check = rebuild, then data_version probe only
+
+
+def seed(db: Path, n: int) -> None:
+    init_db(db)
+    con = sqlite3.connect(str(db))
+    t0 = datetime.now() - timedelta(days=5)
+    step = timedelta(days=5) / max(1, n)
+    rows = []
+    for i in range(n):
+        ts = (t0 + step * i).isoformat(timespec="milliseconds")
+        rows.append((ts, ts, "TMF", "LONG", 1.0, 20000.0, 20000.0, (-20.0 if i % 3 else 30.0)))
+    con.executemany("INSERT INTO trades(open_ts, close_ts, symbol, side, qty, entry, exit, pnl) VALUES (?,?,?,?,?,?,?,?)", rows)
+    con.commit()
+    con.close()
+
+
+def bench(db: Path, n: int, cache: str) -> dict:
+    os.environ["TMF_RISK_STATE_CACHE"] = cache
+    eng = RiskEngineV1(db_path=str(db))
+    meta = {"stop_price": 19990.0}
+    lat = []
+    v = None
+    for _ in range(n):
+        t = time.perf_counter()
+        v = eng.check_pre_trade(symbol="TMF", side="BUY", qty=1.0, entry_price=20000.0, meta=dict(meta))
+        lat.append((time.perf_counter() - t) * 1000.0)
+    first = lat[0]
+    lat.sort()
+    return {"n": n, "first_ms": round(first, 3), "p50_ms": round(percentile(lat, 50), 4),
+            "p95_ms": round(percentile(lat, 95), 4), "code": v.code if v else None}
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--trades", type=int, default=50000)
+    ap.add_argument("--n", type=int, default=2000, help="check_pre_trade calls per mode")
+    args = ap.parse_args()
+    os.environ["TMF_RISK_STATE_PATH"] = ""
+    td = Path(tempfile.mkdtemp(prefix="tmf_bench_risk_state_"))
+    db = td / "bench.sqlite3"
+    seed(db, args.trades)
+    out = {"trades": args.trades, "db": bench(db, args.n, "0"), "cache": bench(db, args.n, "1")}
+    out["speedup_p50"] = round(out["db"]["p50_ms"] / max(1e-9, out["cache"]["p50_ms"]), 1)
+    assert out["db"]["code"] == out["cache"]["code"], out
+    print(json.dumps(out, indent=2))
+    print("[PASS] bench_risk_state_v1")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
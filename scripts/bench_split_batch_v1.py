@@ -0,0 +1,73 @@
+from __future__ import annotations
+import argparse, json, os, sys, tempfile, time
+from pathlib import Path
+
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+os.environ.setdefault("TMF_IGNORE_MARKET_CALENDAR", "1")
+
+from src.data.store_sqlite_v1 import init_db, connect  # noqa: E402
+from src.oms.paper_oms_v1 import PaperOMS  # noqa: E402
+from src.oms.paper_oms_risk_safety_wrapper_v1 import PaperOMSRiskSafetyWrapperV1  # noqa: E402
+from src.risk.risk_engine_v1 import RiskEngineV1  # noqa: E402
+from src.safety.system_safety_v1 import SafetyConfigV1, SystemSafetyEngineV1  # noqa: E402
+
+# Benchmark: child orders/sec for a TAIFEX-split MARKET order (50 lots -> 25 children of max_qty_per_order=2),
+# children one by one through place_order (TMF_SPLIT_BATCH=0) vs batched (shared gates once, one transaction).
+# Each round uses a fresh correlation id; results and orders rows must match between the two modes.
+
+META = {"ref_price": 20000.0, "stop_price": 19990.0, "session_hint": "DAY"}
+
+
+def run_split(db: Path, lots: int, rounds: int) -> tuple:
+    w = PaperOMSRiskSafetyWrapperV1(paper_oms=PaperOMS(db), risk=RiskEngineV1(db_path=str(db)),
+                                    safety=SystemSafetyEngineV1(db_path=str(db), cfg=SafetyConfigV1(require_recent_bidask=0)),
+                                    db_path=str(db))
+    children = 0
+    t0 = time.perf_counter()
+    for i in range(rounds):
+        r = w.place_order(symbol="TMF", side="BUY", qty=float(lots), order_type="MARKET", meta=dict(META, correlation_id=f"bench{i}"))
+        assert isinstance(r, dict) and r.get("status") == "SPLIT_SUBMITTED", r
+        children += len(r["exec"]["details"]["children"])
+    return time.perf_counter() - t0, children
+
+
+def table_rows(db: Path) -> list:
+    con = connect(db)
+    try:
+        return [tuple(r) for r in con.execute("SELECT symbol, side, qty, order_type, status, verdict, decision, action FROM orders ORDER BY id")]
+    finally:
+        con.close()
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="bench TAIFEX split: per-child place_order vs batched submission")
+    ap.add_argument("--lots", type=int, default=50)
+    ap.add_argument("--rounds", type=int, default=20)
+    args = ap.parse_args()
+
+    out = {"lots": int(args.lots), "rounds": int(args.rounds)}
+    rows = {}
+    with tempfile.TemporaryDirectory(prefix="tmf_split_bench_") as td:
+        for mode, flag in (("per_child", "0"), ("batch", "1")):
+            db = Path(td) / f"{mode}.sqlite3"
+            init_db(db)
+            os.environ["TMF_SPLIT_BATCH"] = flag
+            dt, n = run_split(db, int(args.lots), int(args.rounds))
+            rows[mode] = table_rows(db)
+            out[mode] = {"secs": round(dt, 3), "children": n, "child_orders_per_sec": round(n / dt if dt > 0 else 0.0),
+                         "orders_rows": len(rows[mode])}
+
+    if rows["per_child"] != rows["batch"]:
+        print("[FAIL] orders rows differ between per_child and batch")
+        return 2
+    out["speedup"] = round(out["per_child"]["secs"] / out["batch"]["secs"], 2) if out["batch"]["secs"] > 0 else None
+    print(json.dumps(out, ensure_ascii=False, indent=2))
+    print("[PASS] bench_split_batch_v1")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,57 @@
+from __future__ import annotations
+import argparse, json, random, sys, time
+from pathlib import Path
+
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+from src.research import stat_gate_fast_v1 as F  # noqa: E402
+from src.research import stat_gate_v1 as R  # noqa: E402
+
+# Benchmark: stat gate (PBO-CSCV + RealityCheck) reference loops vs matrix engine, N strategies x T returns.
+# The reference is only timed up to --ref-max-n (its RealityCheck is O(n_boot * N * T) Python ops);
+# where both run, results must be identical.
+
+
+def _timed(fn, *a, **kw):
+    t0 = time.perf_counter()
+    v = fn(*a, **kw)
+    return v, time.perf_counter() - t0
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="bench stat gate reference vs matrix engine")
+    ap.add_argument("--n", default="10,100,1000", help="csv strategy counts")
+    ap.add_argument("--t", type=int, default=500, help="returns per strategy (e.g. trading days)")
+    ap.add_argument("--n-boot", type=int, default=1000)
+    ap.add_argument("--ref-max-n", type=int, default=100)
+    args = ap.parse_args()
+
+    out = {"t": int(args.t), "n_boot": int(args.n_boot), "engine": F.engine_info(), "runs": []}
+    for n in [int(x) for x in args.n.split(",") if x.strip()]:
+        rng = random.Random(n)
+        sr = {f"s{j:04d}": [rng.gauss(0.0003 if j == 0 else 0.0, 0.01) for _ in range(int(args.t))] for j in range(n)}
+        row = {"n": n}
+        fp, row["fast_pbo_secs"] = _timed(F.pbo_cscv_fast, sr)
+        fr, row["fast_rc_secs"] = _timed(F.reality_check_pvalue_fast, sr, n_boot=args.n_boot)
+        row.update(pbo=fp, rc_p=fr)
+        if n <= int(args.ref_max_n):
+            rp, row["ref_pbo_secs"] = _timed(R.pbo_cscv, sr)
+            rr, row["ref_rc_secs"] = _timed(R.reality_check_pvalue, sr, n_boot=args.n_boot)
+            if (rp, rr) != (fp, fr):
+                print(f"[FAIL] n={n} mismatch ref=({rp},{rr}) fast=({fp},{fr})")
+                return 2
+            row["speedup"] = round((row["ref_pbo_secs"] + row["ref_rc_secs"]) / max(1e-9, row["fast_pbo_secs"] + row["fast_rc_secs"]), 1)
+        for k in [k for k in row if k.endswith("_secs")]:
+            row[k] = round(row[k], 3)
+        out["runs"].append(row)
+        print(json.dumps(row, ensure_ascii=False), flush=True)
+
+    print(json.dumps(out, ensure_ascii=False, indent=2))
+    print("[PASS] bench_stat_gate_fast_v1")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,127 @@
+from __future__ import annotations
+import argparse, json, os, sys, tempfile, time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+from src.data import tick_archive_v1 as ta  # noqa: E402
+from src.data.build_bars_1m_v1 import _tick_from_event  # noqa: E402
+
+# Benchmark: recorder JSONL vs tick archive (.tav1) for one trading day of TMFB6.
+#   storage : bytes on disk (JSONL file vs tick + bidask archives)
+#   load    : every tick price + every L1 bid/ask into memory (json.loads per line vs mmap columns)
+#   bars    : 1m OHLCV from the ticks (_tick_from_event + dict aggregation vs TickArchiveV1.bars_1m_rows)
+#   slice   : one hour of quotes by time range (scan + filter vs bisect on ts_ns)
+
+
+def write_log(p: Path, n: int) -> None:
+    t0 = datetime(2025, 3, 5, 8, 45)
+    with p.open("w", encoding="utf-8") as f:
+        for i in range(n):
+            loc = t0 + timedelta(milliseconds=100 * i)
+            utc = (loc - timedelta(hours=8)).isoformat(timespec="milliseconds") + "Z"
+            dt = loc.isoformat(timespec="microseconds")
+            px = 20000.0 + (i % 400) - 200.0
+            f.write(json.dumps({"ts": utc, "kind": "bidask_fop_v1", "payload": {
+                "code": "TMFB6", "raw_code": "TXFR1", "datetime": dt, "bid_price": [px - k for k in range(5)],
+                "ask_price": [px + 1 + k for k in range(5)], "bid_volume": [5, 6, 7, 8, 9], "ask_volume": [9, 8, 7, 6, 5],
+                "diff_bid_vol": [0, 0, 0, 0, 0], "diff_ask_vol": [0, 0, 0, 0, 0], "first_derived_bid_price": 0.0,
+                "first_derived_ask_price": 0.0, "first_derived_bid_vol": 0, "first_derived_ask_vol": 0,
+                "underlying_price": px, "simtrade": False, "synthetic": False, "source_file": "shioaji_recorder",
+                "ingest_ts": utc}}) + "\n")
+            f.write(json.dumps({"ts": utc, "kind": "tick_fop_v1", "payload": {
+                "code": "TMFB6", "raw_code": "TXFR1", "datetime": dt, "open": 19950.0, "underlying_price": px, "bid_side_total_vol": 1000,
+                "ask_side_total_vol": 1000, "avg_price": px, "close": px + 0.5, "high": 20300.0, "low": 19700.0, "amount": px,
+                "total_amount": 1e9, "volume": 1 + i % 3, "total_volume": i, "tick_type": 1 + i % 2, "chg_type": 2,
+                "price_chg": 1.0, "pct_chg": 0.01, "simtrade": False, "synthetic": False, "source_file": "shioaji_recorder",
+                "ingest_ts": utc}}) + "\n")
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=100000, help="ticks (and quotes) in the day")
+    args = ap.parse_args()
+    td = Path(tempfile.mkdtemp(prefix="tmf_bench_tick_archive_"))
+    log = td / "rec.jsonl"
+    write_log(log, args.n)
+    t = time.perf_counter()
+    rep = ta.convert_jsonl([str(log)], str(td / "archive"))
+    t_conv = time.perf_counter() - t
+    tick_p = next(f["path"] for f in rep["files"] if "tick_fop_v1" in f["path"])
+    quote_p = next(f["path"] for f in rep["files"] if "bidask_fop_v1" in f["path"])
+    out = {"n": args.n, "numpy": ta.np is not None, "convert_s": round(t_conv, 2),
+           "storage": {"jsonl_bytes": log.stat().st_size, "archive_bytes": sum(f["bytes"] for f in rep["files"])}}
+    out["storage"]["ratio"] = round(out["storage"]["jsonl_bytes"] / out["storage"]["archive_bytes"], 1)
+
+    # load
+    t = time.perf_counter()
+    px, bid = [], []
+    with log.open("r", encoding="utf-8") as f:
+        for line in f:
+            r = json.loads(line)
+            if r["kind"] == "tick_fop_v1":
+                px.append(float(r["payload"]["close"]))
+            else:
+                bid.append(float(r["payload"]["bid_price"][0]))
+    t_json = time.perf_counter() - t
+    t = time.perf_counter()
+    with ta.TickArchiveV1(tick_p) as a, ta.TickArchiveV1(quote_p) as b:
+        px2 = a.prices(a.cols["price"])
+        bid2 = b.prices(b.cols["bid_price_1"])
+        assert len(px2) == len(px) and float(px2[-1]) == px[-1] and float(bid2[-1]) == bid[-1]
+    t_arch = time.perf_counter() - t
+    out["load"] = {"jsonl_s": round(t_json, 3), "archive_s": round(t_arch, 4), "speedup": round(t_json / max(1e-9, t_arch), 1)}
+
+    # bars
+    t = time.perf_counter()
+    agg = {}
+    with log.open("r", encoding="utf-8") as f:
+        for line in f:
+            r = json.loads(line)
+            if r["kind"] != "tick_fop_v1":
+                continue
+            tk = _tick_from_event(r["ts"], json.dumps(r["payload"]))
+            b = agg.get(tk[0])
+            if b is None:
+                agg[tk[0]] = [tk[2], tk[2], tk[2], tk[2], tk[3], 1]
+            else:
+                b[1] = max(b[1], tk[2]); b[2] = min(b[2], tk[2]); b[3] = tk[2]; b[4] += tk[3]; b[5] += 1
+    t_json = time.perf_counter() - t
+    t = time.perf_counter()
+    with ta.TickArchiveV1(tick_p) as a:
+        rows = a.bars_1m_rows()
+    t_arch = time.perf_counter() - t
+    assert len(rows) == len(agg) and rows[-1][4] == agg[rows[-1][0]][3], (rows[-1], agg[rows[-1][0]])
+    out["bars"] = {"bars": len(rows), "jsonl_s": round(t_json, 3), "archive_s": round(t_arch, 4), "speedup": round(t_json / max(1e-9, t_arch), 1)}
+
+    # slice: 10:00-11:00 quotes
+    t = time.perf_counter()
+    n_json = 0
+    with log.open("r", encoding="utf-8") as f:
+        for line in f:
+            r = json.loads(line)
+            if r["kind"] == "bidask_fop_v1" and "2025-03-05T10:00" <= r["payload"]["datetime"] < "2025-03-05T11:00":
+                n_json += 1
+    t_json = time.perf_counter() - t
+    t = time.perf_counter()
+    with ta.TickArchiveV1(quote_p) as b:
+        c = b.slice("2025-03-05T10:00:00", "2025-03-05T11:00:00")
+        n_arch = len(c["ts_ns"])
+        c = None
+    t_arch = time.perf_counter() - t
+    assert n_arch == n_json, (n_arch, n_json)
+    out["slice_1h"] = {"rows": n_arch, "jsonl_s": round(t_json, 3), "archive_s": round(t_arch, 5), "speedup": round(t_json / max(1e-9, t_arch), 1)}
+    for f in rep["files"]:
+        os.unlink(f["path"])
+        os.unlink(f["path"] + ".sha256.txt")
+    log.unlink()
+    print(json.dumps(out, indent=2))
+    print("[PASS] bench_tick_archive_v1")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,7 +1,12 @@
 from __future__ import annotations
-import argparse, json, sqlite3, hashlib
+import argparse, json, sys, hashlib
 from pathlib import Path
-from datetime import datetime, timezone
+
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+from ops.rejects.reject_stats_stream_v1 import DEFAULT_CHECKPOINT, RejectStatsStreamV1  # noqa: E402
 
 def sha256_file(p: Path) -> str:
     h = hashlib.sha256()
@@ -15,18 +20,14 @@ def write_sha256_sidecar(p: Path) -> None:
     side = p.with_name(p.name + ".sha256.txt")
     side.write_text(f"{dig}  {p.name}\n", encoding="utf-8")
 
-def utc_now_z() -> str:
-    return datetime.now(timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z")
-
-def top_items(d: dict[str,int], n: int) -> list[tuple[str,int]]:
-    return sorted(d.items(), key=lambda kv: (-kv[1], kv[0]))[:n]
-
 def main() -> None:
     ap = argparse.ArgumentParser()
     ap.add_argument("--db", default="runtime/data/tmf_autotrader_v1.sqlite3")
     ap.add_argument("--outdir", default="runtime/reports")
     ap.add_argument("--topn", type=int, default=30)
     ap.add_argument("--status", default="REJECTED")  # allow override for future
+    ap.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="incremental state ('' = rebuild in memory every run)")
+    ap.add_argument("--full", action="store_true", help="ignore the checkpoint and rebuild from orders.id=0")
     args = ap.parse_args()
 
     db = Path(args.db)
@@ -36,121 +37,15 @@ def main() -> None:
     outdir = Path(args.outdir)
     outdir.mkdir(parents=True, exist_ok=True)
 
-    con = sqlite3.connect(str(db))
-    con.row_factory = sqlite3.Row
-    try:
-        rows = con.execute(
-            """
-            SELECT ts, symbol, side, qty, price, order_type, status, verdict, decision, action, meta_json
-            FROM orders
-            WHERE status = ?
-            ORDER BY ts DESC
-            """,
-            (args.status,),
-        ).fetchall()
-    finally:
-        con.close()
-
-    total = len(rows)
-
-    def inc(m: dict, k: str) -> None:
-        if k is None:
-            return
-        k = str(k).strip()
-        if not k:
-            return
-        m[k] = int(m.get(k, 0)) + 1
-
-    by_status: dict[str,int] = {}
-    by_decision: dict[str,int] = {}
-    by_verdict: dict[str,int] = {}
-    by_action: dict[str,int] = {}
-    by_exec_code: dict[str,int] = {}
-    by_reason: dict[str,int] = {}
-
-    dpbm_like = 0
-    taifex_like = 0
-
-    samples: list[dict] = []
-    for r in rows[: min(300, total)]:
-        status  = r["status"]
-        verdict = r["verdict"]
-        decision = r["decision"]
-        action  = r["action"]
-
-        inc(by_status, status)
-        inc(by_verdict, verdict)
-        inc(by_decision, decision)
-        inc(by_action, action)
-
-        meta = {}
-        try:
-            meta = json.loads(r["meta_json"] or "{}") if isinstance(r["meta_json"], str) else {}
-        except Exception:
-            meta = {}
-
-        exec_code = ""
-        reason = ""
-
-        # prefer structured reject_decision / preflight_verdict if present
-        rd = meta.get("reject_decision") if isinstance(meta, dict) else None
-        if isinstance(rd, dict):
-            exec_code = str(rd.get("code") or "")
-            reason = str(rd.get("reason") or "")
-
-        if not exec_code:
-            pv = meta.get("preflight_verdict") if isinstance(meta, dict) else None
-            if isinstance(pv, dict):
-                exec_code = str(pv.get("code") or "")
-                if not reason:
-                    reason = str(pv.get("reason") or "")
-
-        # fallback: sometimes legacy rows only have verdict string
-        if not exec_code and isinstance(verdict, str) and verdict.startswith("RISK_"):
-            exec_code = verdict
-
-        if exec_code:
-            inc(by_exec_code, exec_code)
-            u = exec_code.upper()
-            if "TAIFEX" in u or u.startswith("EXEC_TAIFEX"):
-                taifex_like += 1
-            if "DPB" in u or "DPBM" in u:
-                dpbm_like += 1
-
-        if reason:
-            inc(by_reason, reason[:200])
-
-        samples.append({
-            "ts": r["ts"],
-            "symbol": r["symbol"],
-            "side": r["side"],
-            "qty": r["qty"],
-            "order_type": r["order_type"],
-            "status": status,
-            "verdict": verdict,
-            "decision": decision,
-            "action": action,
-            "exec_code": exec_code,
-            "reason": reason,
-        })
-
-    report = {
-        "generated_utc": utc_now_z(),
-        "db": str(db),
-        "filter": {"status": args.status},
-        "total_rows": total,
-        "counts": {
-            "by_status_top": top_items(by_status, args.topn),
-            "by_decision_top": top_items(by_decision, args.topn),
-            "by_verdict_top": top_items(by_verdict, args.topn),
-            "by_action_top": top_items(by_action, args.topn),
-            "by_exec_code_top": top_items(by_exec_code, args.topn),
-            "by_reason_top": top_items(by_reason, args.topn),
-        },
-        "taifex_like_rejects_sampled": taifex_like,
-        "dpbm_like_rejects_sampled": dpbm_like,
-        "sample_recent": samples[:80],
-    }
+    if args.full and args.checkpoint:
+        Path(args.checkpoint).unlink(missing_ok=True)
+    # only orders past the checkpoint watermark are read (see ops/rejects/reject_stats_stream_v1.py)
+    st = RejectStatsStreamV1(str(db), checkpoint=args.checkpoint, status=args.status)
+    st.update()
+    report = st.report(topn=args.topn)
+    total = report["total_rows"]
+    taifex_like = report["taifex_like_rejects_sampled"]
+    dpbm_like = report["dpbm_like_rejects_sampled"]
 
     out_json = outdir / "rejection_stats_latest.json"
     out_md   = outdir / "rejection_stats_latest.md"
@@ -166,6 +61,10 @@ def main() -> None:
     md.append(f"- TAIFEX-like sampled: **{taifex_like}**\n")
     md.append(f"- DPBM-like sampled: **{dpbm_like}**\n")
 
+    md.append("\n## Rolling windows\n")
+    for k, w in report["windows"].items():
+        md.append(f"- last {k}: {w['n']} ({w['per_min']}/min)\n")
+
     md.append("\n## Top by verdict\n")
     for k,v in report['counts']["by_verdict_top"]:
         md.append(f"- {k}: {v}\n")
@@ -0,0 +1,41 @@
+from __future__ import annotations
+import argparse, json, sys
+from dataclasses import replace
+from pathlib import Path
+
+_REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(_REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(_REPO_ROOT))
+
+from src.cost.implicit_cost_v1 import ImplicitCostCalibratorV1, ImplicitCostConfigV1  # noqa: E402
+
+# Recalibrate the implicit cost table (spread / depth impact / fill slippage per symbol, session,
+# vol regime, qty anchor) from events + fills. Incremental: only rows past the checkpoint watermarks
+# are read (see src/cost/implicit_cost_v1.py); --full drops the checkpoint first.
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", default="runtime/data/tmf_autotrader_v1.sqlite3")
+    ap.add_argument("--table", default="", help="table file (default TMF_COST_TABLE_PATH / runtime/state/implicit_cost_table_v1.json)")
+    ap.add_argument("--checkpoint", default=None, help="incremental state ('' = rebuild in memory every run)")
+    ap.add_argument("--full", action="store_true", help="ignore the checkpoint and recalibrate from id=0")
+    args = ap.parse_args()
+
+    db = Path(args.db)
+    if not db.exists():
+        raise SystemExit(f"[FATAL] missing db: {db}")
+    cfg = ImplicitCostConfigV1.from_env()
+    if args.table:
+        cfg = replace(cfg, table_path=args.table)
+    if args.checkpoint is not None:
+        cfg = replace(cfg, checkpoint=args.checkpoint)
+    if args.full and cfg.checkpoint:
+        Path(cfg.checkpoint).unlink(missing_ok=True)
+
+    cal = ImplicitCostCalibratorV1(str(db), cfg=cfg)
+    st = cal.update()
+    print(json.dumps(st, ensure_ascii=False))
+    print("[OK] wrote:", cfg.table_path)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/bin/bash
+set -euo pipefail
+cd "$(dirname "$0")/.."
+
+echo "=== [m3 regression async supervisor v1] start $(date -Iseconds) ==="
+
+TMF_IGNORE_MARKET_CALENDAR=1 TMF_STRATEGIES=trend TMF_TREND_FORCE_FIRST_SIGNAL=1 TMF_TREND_FORCE_STOP_PTS=30 \
+python3 - <<'PY'
+import asyncio, json, sqlite3, tempfile, threading, time
+from dataclasses import replace
+from datetime import datetime, timedelta
+from pathlib import Path
+from src.sim.run_async_supervisor_v1 import AsyncSupervisorV1, SupervisorConfigV1, jsonl_source
+
+td = Path(tempfile.mkdtemp(prefix="tmf_async_sup_reg_"))
+base_cfg = SupervisorConfigV1(fop_code="TMFB6", raw_events_dir=str(td / "raw"), metrics_path="", recover_sec=3600.0)
+
+def quote(t, px, code="TMFB6"):
+    return {"code": code, "bid_price": [px] * 5, "ask_price": [px + 1] * 5, "bid_volume": [5] * 5, "ask_volume": [5] * 5,
+            "synthetic": False, "recv_ts": t, "source_file": "regtest"}
+
+def tick(t, px, code="TMFB6"):
+    return {"code": code, "datetime": t, "close": px, "volume": 1, "source_file": "regtest"}
+
+def write_events(path, n_sec, t0):
+    with path.open("w", encoding="utf-8") as f:
+        for i in range(n_sec):
+            t = (t0 + timedelta(seconds=i)).isoformat(timespec="milliseconds")
+            f.write(json.dumps({"ts": t, "kind": "bidask_fop_v1", "payload": quote(t, 20000.0 + i)}) + "\n")
+            f.write(json.dumps({"ts": t, "kind": "tick_fop_v1", "payload": tick(t, 20000.5 + i)}) + "\n")
+            f.write(json.dumps({"ts": t, "kind": "tick_fop_v1", "payload": tick(t, 100.0, code="MXFB6")}) + "\n")
+
+t0 = datetime.now().replace(second=0, microsecond=0) - timedelta(minutes=10)
+
+# CASE A: JSONL replay -> bars persisted, one order per bar, persistence off the hot path, metrics artifact
+ev = td / "a.jsonl"
+write_events(ev, 300, t0)
+db = td / "a.sqlite3"
+cfg = replace(base_cfg, metrics_path=str(td / "metrics.json"))
+sup = AsyncSupervisorV1(db_path=str(db), cfg=cfg)
+out = asyncio.run(sup.run(jsonl_source(str(ev), restamp=True)))
+c = out["counters"]
+assert c["events"] == 900 and c["ticks"] == 600 and c["quotes"] == 300, c
+assert c["bars"] == 5 and c["bars_persisted"] == 10 and c["persist_errors"] == 0, c    # strategies see TMFB6 only
+assert c["signals"] == 1 and c["orders_sent"] == 1 and c["orders_accepted"] == 1 and c["fills"] == 1, (c, out["last_errors"])
+assert c["oms_errors"] == 0 and c["strategy_errors"] == 0 and not out["degraded"], c
+con = sqlite3.connect(str(db))
+bars = con.execute("SELECT ts_min, o, c, n_trades FROM bars_1m WHERE symbol='TMFB6' ORDER BY ts_min").fetchall()
+assert len(bars) == 5 and bars[0] == (t0.strftime("%Y-%m-%dT%H:%M"), 20000.5, 20059.5, 60), bars
+assert con.execute("SELECT COUNT(*) FROM events WHERE source_file='regtest'").fetchone()[0] == 900
+assert con.execute("SELECT COUNT(*) FROM orders").fetchone()[0] >= 1
+m = json.loads((td / "metrics.json").read_text(encoding="utf-8"))
+assert set(m["stages"]) == {"ingest", "bars", "strategy", "oms"}, m["stages"].keys()
+assert m["stages"]["ingest"]["processed"] == 900 and m["stages"]["strategy"]["processed"] == 5, m["stages"]
+assert m["latency"]["bar_close_to_decision_ms"]["n"] == 1 and m["latency"]["bar_close_to_order_ms"]["n"] == 1, m["latency"]
+assert m["writer"]["db_errors"] == 0 and m["writer"]["db_rows"] == 900, m["writer"]
+print("[OK] CASE A replay", {k: c[k] for k in ("bars", "orders_sent", "fills")},
+      "decision p50 ms", m["latency"]["bar_close_to_decision_ms"]["p50_ms"])
+
+# CASE B: degraded no_entry sheds new entries (stays degraded: recover_sec=3600)
+sup = AsyncSupervisorV1(db_path=str(td / "b.sqlite3"), cfg=replace(base_cfg, degraded_mode="no_entry", persist_events=0))
+sup.degraded = True
+out = asyncio.run(sup.run(jsonl_source(str(ev), restamp=True)))
+c = out["counters"]
+assert c["signals"] == 1 and c["signals_shed"] == 1 and c["orders_sent"] == 0, c
+print("[OK] CASE B no_entry", {k: c[k] for k in ("signals", "signals_shed", "orders_sent")})
+
+# CASE C: lag budget exceeded -> degraded detected; off-mode only measures
+evc = td / "c.jsonl"
+write_events(evc, 3000, t0 - timedelta(minutes=60))
+sup = AsyncSupervisorV1(db_path=str(td / "c.sqlite3"), cfg=replace(base_cfg, degraded_mode="off", lag_budget_ms=0.0, persist_events=0),
+                        strategies=[])
+out = asyncio.run(sup.run(jsonl_source(str(evc))))
+c = out["counters"]
+assert out["degraded"] and out["degraded_transitions"] == 1 and out["degraded_stages"], out["degraded_stages"]
+assert c["bars"] == 50 and c["bars_persisted"] == 100 and c["signals_shed"] == 0, c
+print("[OK] CASE C lag detection", out["degraded_stages"], "ingest wait p99 ms", out["stages"]["ingest"]["queue_wait_ms"]["p99_ms"])
+
+# CASE D: in-process feed (submit_threadsafe) + in-trade stop on the live mid
+sup = AsyncSupervisorV1(db_path=str(td / "d.sqlite3"), cfg=replace(base_cfg, persist_events=0, controls_every_sec=0.05))
+
+def feeder():
+    while sup._loop is None:
+        time.sleep(0.01)
+    for i in range(130):
+        t = (t0 + timedelta(seconds=i)).isoformat(timespec="milliseconds")
+        now = datetime.now().isoformat(timespec="milliseconds")
+        sup.submit_threadsafe(now, "bidask_fop_v1", quote(now, 20000.0 + i))
+        sup.submit_threadsafe(t, "tick_fop_v1", tick(t, 20000.5 + i))
+    time.sleep(0.5)                                   # bars close on flush_due (quiet minute); forced BUY, stop = c - 30
+    now = datetime.now().isoformat(timespec="milliseconds")
+    sup.submit_threadsafe(now, "bidask_fop_v1", quote(now, 19000.0))
+    time.sleep(0.5)
+    sup.stop_threadsafe()
+
+th = threading.Thread(target=feeder, daemon=True)
+th.start()
+out = asyncio.run(sup.run(None, max_seconds=30.0))
+th.join()
+c = out["counters"]
+assert c["orders_accepted"] == 1 and c["fills"] == 1, c
+assert c["controls_closes"] == 1 and out["latency"]["quote_to_controls_ms"]["n"] >= 1, c
+assert not sup.oms.pos.get("TMF") or float(sup.oms.pos["TMF"].qty) == 0.0
+print("[OK] CASE D threadsafe feed + in-trade stop", {k: c[k] for k in ("controls_runs", "controls_closes")},
+      "quote->controls p50 ms", out["latency"]["quote_to_controls_ms"]["p50_ms"])
+PY
+
+echo "=== [m3 regression async supervisor v1] PASS $(date -Iseconds) ==="
@@ -0,0 +1,69 @@
+#!/bin/bash
+set -euo pipefail
+cd "$(dirname "$0")/.."
+
+echo "=== [m3 regression backtest bars v1] start $(date -Iseconds) ==="
+
+python3 - <<'PY'
+import random, sqlite3, tempfile
+from pathlib import Path
+from src.data.store_sqlite_v1 import init_db
+from src.oms.paper_oms_v1 import PaperOMS
+from src.sim.backtest_bars_v1 import BacktestConfigV1, BacktestEngineV1, load_bars_1m
+from src.sim.slippage_model_v1 import SlippageSpec
+from src.strat.mean_reversion_v1 import MeanReversionConfigV1, MeanReversionStrategyV1
+from src.strat.trend_v1 import TrendStrategyV1
+
+td = Path(tempfile.mkdtemp(prefix="tmf_backtest_reg_"))
+db = td / "t.sqlite3"
+init_db(db)
+rnd = random.Random(11)
+px = 20000.0
+rows = []
+for i in range(1500):
+    o = px
+    px += rnd.gauss(0, 6)
+    h = max(o, px) + abs(rnd.gauss(0, 2)); l = min(o, px) - abs(rnd.gauss(0, 2))
+    rows.append((f"2026-02-{2 + i // 600:02d}T{(i // 60) % 10 + 8:02d}:{i % 60:02d}", "FOP", "TMFB6", o, h, l, px, 1.0, 1, "fixture"))
+con = sqlite3.connect(str(db))
+con.executemany("INSERT INTO bars_1m(ts_min, asset_class, symbol, o, h, l, c, v, n_trades, source) VALUES(?,?,?,?,?,?,?,?,?,?)", rows)
+con.commit(); con.close()
+
+bars = load_bars_1m(str(db), "TMFB6")
+assert len(bars) == 1500
+
+def strats():
+    return [TrendStrategyV1(qty=2.0, lookback=20, atr_n=14), MeanReversionStrategyV1(MeanReversionConfigV1(lookback_n=30, entry_z=1.8, qty=1.0))]
+
+# 1) indicator kernels == strategy.on_bar, bar for bar
+a = BacktestEngineV1(strats(), BacktestConfigV1(use_kernels=True)).run(bars)
+b = BacktestEngineV1(strats(), BacktestConfigV1(use_kernels=False)).run(bars)
+assert a.summary["impl"] == ["trend_kernel_v1", "mean_reversion_kernel_v1"] and b.summary["impl"] == ["on_bar", "on_bar"]
+assert a.fills == b.fills and a.trades == b.trades and list(a.equity) == list(b.equity)
+assert a.summary["n_fills"] > 20 and a.summary["n_trades_closed"] > 0, a.summary
+
+# 2) parity with PaperOMS: same orders through place_order+match -> same trades/fees/taxes
+cfg = BacktestConfigV1(slippage=SlippageSpec(fixed_points=0.0, bps=0.0, max_points=0.0))
+r = BacktestEngineV1(strats(), cfg).run(bars)
+oms_db = td / "oms.sqlite3"
+init_db(oms_db)
+oms = PaperOMS(oms_db)
+for f in r.fills:
+    o = oms.place_order(symbol="TMFB6", side=f["side"], qty=f["qty"], order_type="MARKET", meta={})
+    oms.match(o, market_price=f["price"], reason=f["reason"])
+con = sqlite3.connect(str(oms_db))
+ofills = con.execute("SELECT price, fee, tax FROM fills ORDER BY id").fetchall()
+otrades = con.execute("SELECT side, qty, entry, exit, pnl, reason_open, reason_close FROM trades ORDER BY id").fetchall()
+assert len(ofills) == len(r.fills)
+for (p, fee, tax), f in zip(ofills, r.fills):
+    assert abs(p - f["price"]) < 1e-9 and abs(fee - f["fee"]) < 1e-9 and abs(tax - f["tax"]) < 1e-6, (p, fee, tax, f)
+assert len(otrades) == len(r.trades), (len(otrades), len(r.trades))
+for ot, t in zip(otrades, r.trades):
+    assert (ot[0], ot[1], ot[5], ot[6]) == (t["side"], t["qty"], t["reason_open"], t["reason_close"]), (ot, t)
+    assert abs(ot[2] - t["entry"]) < 1e-6
+    assert (ot[3] is None) == (t["exit"] is None) and (ot[3] is None or abs(ot[3] - t["exit"]) < 1e-6)
+    assert (ot[4] is None) == (t["pnl"] is None) and (ot[4] is None or abs(ot[4] - t["pnl"]) < 1e-4), (ot, t)
+print(f"[OK] backtest: kernels == on_bar ({a.summary['n_fills']} fills), PaperOMS parity ({len(otrades)} trades)")
+PY
+
+echo "=== [m3 regression backtest bars v1] PASS $(date -Iseconds) ==="
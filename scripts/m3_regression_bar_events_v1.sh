@@ -0,0 +1,113 @@
+#!/bin/bash
+set -euo pipefail
+cd "$(dirname "$0")/.."
+
+echo "=== [m3 regression bar events v1] start $(date -Iseconds) ==="
+
+python3 - <<'PY'
+import json, os, sqlite3, subprocess, sys, tempfile, time
+from datetime import datetime, timedelta
+from pathlib import Path
+from src.data.bar_events_v1 import DbChangeEventSourceV1, UdpEventSourceV1
+from src.data.quotes_l5_v1 import sync_quotes_l5
+from src.data.store_sqlite_v1 import init_db
+from src.data.stream_bars_v1 import StreamBarAggregatorV1, UdpBarSinkV1
+from src.market.quote_cache_v1 import LatestQuoteCacheV1
+from src.ops.latency.latency_histogram import LatencyHistogramV1
+
+td = Path(tempfile.mkdtemp(prefix="tmf_bar_events_reg_"))
+db = td / "t.sqlite3"
+init_db(db)
+
+def ins_bar(con, ts, c, sym="TMFB6"):
+    con.execute("INSERT INTO bars_1m(ts_min, asset_class, symbol, o, h, l, c, v, n_trades, source) VALUES(?,?,?,?,?,?,?,?,?,?)",
+                (ts, "FOP", sym, c, c + 2, c - 2, c, 1.0, 1, "regtest"))
+    con.commit()
+
+def ins_quote(con, ts, px):
+    pl = {"code": "TMFB6", "bid_price": [px], "ask_price": [px + 1], "bid_volume": [5], "ask_volume": [5], "synthetic": False}
+    con.execute("INSERT INTO events(ts, kind, payload_json, source_file, ingest_ts) VALUES(?,?,?,?,?)",
+                (ts, "bidask_fop_v1", json.dumps(pl), "recorder", ts))
+    con.commit()
+    sync_quotes_l5(con)  # the recorder's writer step
+
+# CASE A: histogram
+h = LatencyHistogramV1(keep=100)
+for x in range(1, 201):
+    h.observe(float(x))
+d = h.to_dict()
+assert d["n"] == 200 and d["window"] == 100 and d["min_ms"] == 1.0 and d["max_ms"] == 200.0, d
+assert (d["p50_ms"], d["p95_ms"], d["p99_ms"]) == (150.0, 195.0, 199.0), d
+assert sum(d["buckets"].values()) == 200 and d["buckets"]["le_1"] == 1 and d["buckets"]["le_200"] == 100, d["buckets"]
+print("[OK] CASE A histogram", {k: d[k] for k in ("p50_ms", "p95_ms", "p99_ms")})
+
+# CASE B: SQLite change detection starts at the end of bars_1m, wakes on commit, skips back-fills
+con = sqlite3.connect(str(db))
+ins_bar(con, "2026-02-06T09:00", 20000.0)
+qc = LatestQuoteCacheV1(str(db))
+src = DbChangeEventSourceV1(str(db), symbol="TMFB6", quote_cache=qc, poll_ms=5)
+assert src.wait_bar(0.05) is None
+checks0, changes0 = src.stats["checks"], src.stats["changes"]
+assert changes0 == 0 and checks0 >= 2
+ins_bar(con, "2026-02-06T09:01", 20010.0)
+ins_bar(con, "2026-02-06T09:01", 1.0, sym="MXFB6")      # other symbol: change seen, no event
+ins_quote(con, "2026-02-06T09:01:30", 20011.0)
+ins_bar(con, "2026-02-06T09:02", 20020.0)
+ins_bar(con, "2026-02-06T08:59", 19990.0)               # back-fill of an older minute
+e1 = src.wait_bar(1.0); e2 = src.wait_bar(1.0); e3 = src.wait_bar(0.05)
+assert e1 is not None and e1.via == "db" and e1.bar["ts_min"] == "2026-02-06T09:01" and e1.bar["c"] == 20010.0, e1
+assert e2 is not None and e2.bar["ts_min"] == "2026-02-06T09:02" and e3 is None, (e2, e3)
+assert set(e1.bar) == {"ts_min", "o", "h", "l", "c", "v", "n_trades", "source"}
+snap = qc.get("TMFB6", refresh=False)
+assert snap is not None and snap.bid == 20011.0, snap                 # quote cache pre-warmed on change
+src.close()
+print("[OK] CASE B db change source", src.stats)
+
+# CASE C: UDP bar-close + quote datagrams (recorder UdpBarSinkV1)
+qc2 = LatestQuoteCacheV1(str(td / "empty.sqlite3"))
+usrc = UdpEventSourceV1("127.0.0.1", 0, symbol="TMFB6", quote_cache=qc2)
+sink = UdpBarSinkV1(*usrc.address)
+agg = StreamBarAggregatorV1(intervals_sec=[5, 60])
+agg.add_sink(sink)
+t0 = datetime(2026, 2, 6, 9, 0, 0)
+for i in range(130):
+    agg.on_tick("TMFB6", t0 + timedelta(seconds=i), 20000.0 + i, 1.0)
+sink.send_event("bidask_fop_v1", {"code": "TMFB6", "bid_price": [20129.0], "ask_price": [20130.0], "synthetic": False},
+                ts="2026-02-06T09:02:10")
+got = [usrc.wait_bar(0.5) for _ in range(2)]
+assert [g.bar["ts_min"] for g in got] == ["2026-02-06T09:00", "2026-02-06T09:01"], got
+assert got[0].bar["o"] == 20000.0 and got[0].bar["c"] == 20059.0 and got[0].bar["n_trades"] == 60, got[0]
+assert all(g.via == "udp" and g.detect_wall >= g.close_wall - 0.001 for g in got)
+assert usrc.wait_bar(0.1) is None
+assert usrc.stats["ignored"] >= 24 and usrc.stats["quotes"] == 1, usrc.stats     # 5s bars ignored
+assert qc2.get("TMFB6", refresh=False).ask == 20130.0
+usrc.close(); sink.close()
+print("[OK] CASE C udp source", usrc.stats)
+
+# CASE D: runner in event mode wakes per committed bar and writes the latency artifact
+db2 = td / "loop.sqlite3"
+init_db(db2)
+con2 = sqlite3.connect(str(db2))
+base = datetime.now().replace(second=0, microsecond=0) - timedelta(minutes=30)
+ins_bar(con2, base.strftime("%Y-%m-%dT%H:%M"), 20000.0)
+lat = td / "lat.json"
+env = dict(os.environ, TMF_PAPER_LOOP_MODE="event", TMF_MAX_SECONDS="5", TMF_FOP_CODE="TMFB6", TMF_STRATEGIES="trend",
+           TMF_PAPER_LOOP_LATENCY_PATH=str(lat), TMF_BAR_EVENTS_UDP="", PYTHONPATH=os.getcwd())
+p = subprocess.Popen([sys.executable, "-m", "src.sim.run_strategies_paper_loop_v1", "--db", str(db2)],
+                     env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+time.sleep(2.0)
+for k in range(1, 4):
+    t = base + timedelta(minutes=k)
+    ins_quote(con2, (t - timedelta(seconds=1)).isoformat(timespec="seconds"), 20000.0 + k)
+    ins_bar(con2, t.strftime("%Y-%m-%dT%H:%M"), 20000.0 + 5 * k)
+    time.sleep(0.2)
+out, _ = p.communicate(timeout=60)
+assert p.returncode == 0, out
+assert out.count("[BAR]") == 3 and "mode=event" in out, out
+s = json.loads(lat.read_text(encoding="utf-8"))
+assert s["mode"] == "event" and s["via"] == "DbChangeEventSourceV1" and s["bars_seen"] == 3, s
+assert s["close_to_decision_ms"]["n"] == 3 and s["close_to_decision_ms"]["p99_ms"] < 1000.0, s
+print("[OK] CASE D event-mode runner", s["close_to_decision_ms"]["p50_ms"], "ms p50")
+PY
+
+echo "=== [m3 regression bar events v1] PASS $(date -Iseconds) ==="
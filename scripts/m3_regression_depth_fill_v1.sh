@@ -0,0 +1,113 @@
+#!/bin/bash
+set -euo pipefail
+cd "$(dirname "$0")/.."
+
+echo "=== [m3 regression depth fill v1] start $(date -Iseconds) ==="
+
+TD="$(mktemp -d /tmp/tmf_depth_fill_reg_XXXXXX)"
+TMF_OMS_WRITE_BEHIND=0 TMF_PAPER_MATCH_LIQ_QTY=10 TMF_TD="$TD" \
+python3 - <<'PY'
+import json, os, sqlite3
+from dataclasses import replace
+from datetime import datetime, timedelta
+from pathlib import Path
+from src.data.store_sqlite_v1 import init_db
+from src.oms.paper_oms_v1 import PaperOMS
+from src.sim.depth_fill_v1 import DepthFillConfigV1, DepthFillEngineV1
+
+td = Path(os.environ["TMF_TD"])
+
+def book(bids, asks, code="TMFB6"):
+    return {"code": code, "bid_price": [p for p, _ in bids], "bid_volume": [q for _, q in bids],
+            "ask_price": [p for p, _ in asks], "ask_volume": [q for _, q in asks]}
+
+def fresh(name, **kw):
+    db = td / f"{name}.sqlite3"
+    init_db(db)
+    return db, PaperOMS(db), DepthFillEngineV1("TMFB6", cfg=DepthFillConfigV1(**kw))
+
+BIDS = [(20000.0, 5), (19999.0, 4), (19998.0, 3), (19997.0, 2), (19996.0, 1)]
+ASKS = [(20001.0, 2), (20002.0, 3), (20003.0, 4), (20004.0, 1), (20005.0, 1)]
+
+# CASE A: MARKET walks the asks (one fill at the VWAP), consumption persists within the snapshot,
+# size beyond L5 keeps working and fills on the next quote
+db, oms, eng = fresh("a")
+assert eng.on_quote(oms, book(BIDS, ASKS)) == [] and eng.on_quote(oms, book(BIDS, ASKS, code="MXFB6")) == []
+o = oms.place_order(symbol="TMFB6", side="BUY", qty=6, order_type="MARKET", meta={})
+fs = eng.match(oms, o)
+assert len(fs) == 1 and fs[0].qty == 6.0 and o.status == "FILLED", fs
+assert abs(fs[0].price - (2 * 20001 + 3 * 20002 + 1 * 20003) / 6.0) < 1e-9, fs[0].price
+assert fs[0].meta["depth"]["levels"] == [[20001.0, 2.0], [20002.0, 3.0], [20003.0, 1.0]], fs[0].meta
+o2 = oms.place_order(symbol="TMFB6", side="BUY", qty=8, order_type="MARKET", meta={})
+fs = eng.match(oms, o2)
+assert fs[0].qty == 5.0 and fs[0].meta["depth"]["levels"] == [[20003.0, 3.0], [20004.0, 1.0], [20005.0, 1.0]], fs[0].meta
+assert o2.status == "PARTIALLY_FILLED" and eng.working() == 1 and eng.depth(1)[-1] == (20005.0, 0.0)
+fs = eng.on_quote(oms, book(BIDS, [(20006.0, 10)]), ts="t1")
+assert [(f.qty, f.price) for f in fs] == [(3.0, 20006.0)] and o2.status == "FILLED" and eng.working() == 0, fs
+assert fs[0].meta["depth"]["book_ts"] == "t1" and fs[0].meta["reason"] == "depth_fill"
+assert oms.pos["TMFB6"].qty == 14.0
+print("[OK] CASE A depth walk", eng.stats)
+
+# CASE B: resting LIMIT: queue ahead at its price shrinks with trades / quotes; trade-through and crossing fill at the limit
+db, oms, eng = fresh("b")
+eng.on_quote(oms, book(BIDS, ASKS))
+b = oms.place_order(symbol="TMFB6", side="BUY", qty=2, order_type="LIMIT", price=20000.0, meta={})
+assert eng.match(oms, b) == [] and eng._working[b.order_id][1] == 5.0             # behind 5 lots at 20000
+assert eng.on_trade(oms, {"code": "TMFB6", "close": 20000.0, "volume": 3}) == []  # ahead 5 -> 2
+eng.on_quote(oms, book([(20000.0, 1)] + BIDS[1:], ASKS))                          # cancels: ahead 2 -> 1
+assert eng._working[b.order_id][1] == 1.0
+fs = eng.on_trade(oms, {"code": "TMFB6", "close": 20000.0, "volume": 2})
+assert [(f.qty, f.price) for f in fs] == [(1.0, 20000.0)] and fs[0].meta["depth"]["mode"] == "trade", fs
+fs = eng.on_trade(oms, {"code": "TMFB6", "close": 19999.0, "volume": 5})
+assert [(f.qty, f.price) for f in fs] == [(1.0, 20000.0)] and b.status == "FILLED" and eng.working() == 0
+s = oms.place_order(symbol="TMFB6", side="SELL", qty=3, order_type="LIMIT", price=20010.0, meta={})
+assert eng.match(oms, s) == [] and eng._working[s.order_id][1] == float("inf")    # beyond the displayed asks
+eng.on_quote(oms, book(BIDS, [(20012.0, 1)]))                                      # asks pulled: now the touch
+assert eng._working[s.order_id][1] == 0.0
+fs = eng.on_quote(oms, book([(20011.0, 1), (20010.0, 1), (20009.0, 9)], [(20012.0, 1)]))
+assert [(f.qty, f.price) for f in fs] == [(2.0, 20010.0)] and fs[0].meta["depth"]["mode"] == "cross", fs
+x = oms.place_order(symbol="TMFB6", side="BUY", qty=1, order_type="LIMIT", price=None, meta={})
+assert eng.match(oms, x) == [] and x.status == "REJECTED" and eng.working() == 1
+print("[OK] CASE B queue position", eng.stats)
+
+# CASE C: slippage overlay on taker fills (capped at the limit); quotes without volumes -> TMF_PAPER_MATCH_LIQ_QTY
+db, oms, eng = fresh("c", slippage_overlay=1, unknown_level_qty=4.0)
+eng.on_quote(oms, {"code": "TMFB6", "bid": 20000.0, "ask": 20001.0})
+assert eng.depth(0) == [(20000.0, 4.0)] and eng.depth(1) == [(20001.0, 4.0)]
+o = oms.place_order(symbol="TMFB6", side="SELL", qty=3, order_type="MARKET", meta={})
+fs = eng.match(oms, o)
+assert [(f.qty, f.price) for f in fs] == [(3.0, 19999.0)] and fs[0].meta["depth"]["slippage_points"] == 1.0, fs
+o = oms.place_order(symbol="TMFB6", side="BUY", qty=2, order_type="LIMIT", price=20001.5, meta={})
+fs = eng.match(oms, o)
+assert [(f.qty, f.price) for f in fs] == [(2.0, 20001.5)], fs
+con = sqlite3.connect(str(db))
+meta = [json.loads(r[0]) for r in con.execute("SELECT meta_json FROM fills ORDER BY id")]
+con.close()
+assert meta[0]["depth"]["levels"] == [[20000.0, 3.0]] and meta[1]["depth"]["vwap"] == 20001.0, meta
+print("[OK] CASE C slippage overlay + fill meta persisted")
+
+# CASE D: replay with TMF_PAPER_DEPTH_FILL=1 stays deterministic; the order fills across levels
+os.environ.update(TMF_IGNORE_MARKET_CALENDAR="1", TMF_STRATEGIES="trend", TMF_TREND_FORCE_FIRST_SIGNAL="1",
+                  TMF_TREND_FORCE_STOP_PTS="30")
+from src.sim.replay_engine_v1 import ReplayConfigV1, ReplayEngineV1
+T0 = datetime(2025, 3, 5, 2, 0)
+iso = lambda i: (T0 + timedelta(seconds=i)).isoformat(timespec="milliseconds") + "Z"
+rows = []
+for i in range(300):
+    q = book([(20000.0 + i - k, 5) for k in range(5)], [(20001.0 + i + k, 1) for k in range(5)])
+    q.update(synthetic=False, recv_ts=iso(i), ingest_ts=iso(i), source_file="regtest")
+    rows.append({"ts": iso(i), "kind": "bidask_fop_v1", "payload": q})
+    rows.append({"ts": iso(i), "kind": "tick_fop_v1", "payload": {"code": "TMFB6", "datetime": iso(i), "close": 20000.5 + i, "volume": 1}})
+log = td / "d.jsonl"
+log.write_text("".join(json.dumps(r) + "\n" for r in rows), encoding="utf-8")
+cfg = replace(ReplayConfigV1(fop_code="TMFB6", max_bidask_age_seconds=15), depth_fill=1)
+reps = [ReplayEngineV1(db_path=str(td / f"d{k}.sqlite3"), cfg=cfg).run([str(log)]) for k in range(2)]
+r = reps[0]
+assert not r["last_errors"] and r["decision_log_sha256"] == reps[1]["decision_log_sha256"], r
+assert r["counters"]["orders_accepted"] == 1 and r["counters"]["fills"] >= 1 and r["depth_fill"]["taker_fills"] >= 1, r
+off = ReplayEngineV1(db_path=str(td / "off.sqlite3"), cfg=replace(cfg, depth_fill=0)).run([str(log)])
+assert off["depth_fill"] is None and off["decision_log_sha256"] != r["decision_log_sha256"]
+print("[OK] CASE D deterministic replay with depth fills", r["counters"]["fills"], r["depth_fill"])
+PY
+
+echo "=== [m3 regression depth fill v1] PASS $(date -Iseconds) ==="
@@ -0,0 +1,124 @@
+#!/bin/bash
+set -euo pipefail
+cd "$(dirname "$0")/.."
+
+echo "=== [m3 regression gate timing v1] start $(date -Iseconds) ==="
+
+TD="$(mktemp -d /tmp/tmf_gate_timing_reg_XXXXXX)"
+TMF_IGNORE_MARKET_CALENDAR=1 TMF_GATE_LATENCY_PATH="$TD/gate_latency.json" TMF_GATE_LATENCY_EVERY_SEC=0 TMF_TD="$TD" \
+python3 - <<'PY'
+import json, os, sqlite3, time
+from pathlib import Path
+from src.data.store_sqlite_v1 import init_db
+from src.ops.latency import gate_timing as gt
+from src.ops.latency.latency_budget import LatencyBudgetV1
+from src.oms.paper_oms_v1 import PaperOMS
+from src.oms.paper_oms_risk_safety_wrapper_v1 import PaperOMSRiskSafetyWrapperV1
+from src.risk.risk_engine_v1 import RiskEngineV1
+from src.safety.system_safety_v1 import SafetyConfigV1, SystemSafetyEngineV1
+
+td = Path(os.environ["TMF_TD"])
+art = Path(os.environ["TMF_GATE_LATENCY_PATH"])
+
+def make_wrap(db):
+    init_db(db)
+    safety = SystemSafetyEngineV1(db_path=str(db), cfg=SafetyConfigV1(require_recent_bidask=0))
+    return PaperOMSRiskSafetyWrapperV1(paper_oms=PaperOMS(db), risk=RiskEngineV1(db_path=str(db)), safety=safety, db_path=str(db))
+
+META = {"ref_price": 20000.0, "stop_price": 19990.0, "session_hint": "DAY"}
+
+# CASE A: timer laps + per-thread SQL statement counts
+con = gt.trace_queries(sqlite3.connect(":memory:"))
+t = gt.GateTimerV1()
+con.execute("CREATE TABLE x(a)"); con.execute("INSERT INTO x VALUES(1)"); con.execute("SELECT * FROM x").fetchall()
+t.lap("one")
+t.lap("two")
+c = t.compact()
+assert list(c["ms"]) == ["one", "two"] and c["q"]["one"] >= 3 and c["q"]["two"] == 0 and c["db_queries"] == c["q"]["one"], c
+assert abs(sum(c["ms"].values()) - c["total_ms"]) < 0.01, c
+print("[OK] CASE A timer", c)
+
+# CASE B: a measured slow gate chain (artifact from another process) trips LatencyBudgetV1 via the safety gate
+assert LatencyBudgetV1().check({"gate_latency_ms": 1001})["code"] == "LAT_GATE_CHAIN_TOO_SLOW"
+assert LatencyBudgetV1().check({"gate_latency_ms": 1000})["ok"]
+art.write_text(json.dumps({"epoch": time.time(), "broker_rtt_ms": 10, "gate_latency_ms": 5000}), encoding="utf-8")
+dbb = td / "b.sqlite3"
+init_db(dbb)
+sb = SystemSafetyEngineV1(db_path=str(dbb), cfg=SafetyConfigV1(require_recent_bidask=0))
+v = sb.check_pre_trade(meta={"gate_latency_ms": 0})             # explicit meta wins over the measurement
+assert v.ok, v.to_dict()
+v = sb.check_pre_trade(meta={})
+assert (not v.ok) and v.code == "SAFETY_COOLDOWN_ACTIVE", v.to_dict()
+assert v.details["metrics"]["gate_latency_ms"] == 5000 and v.details["latency"]["code"] == "LAT_GATE_CHAIN_TOO_SLOW", v.details
+art.write_text(json.dumps({"epoch": time.time() - 60, "gate_latency_ms": 5000}), encoding="utf-8")
+assert gt.load_gate_latency() == {}                               # stale artifact is ignored
+print("[OK] CASE B latency budget consumes gate_latency_ms", v.details["metrics"])
+
+# CASE C: accepted + rejected attempts -> meta breakdown, ring buffer, exported percentiles
+db = td / "c.sqlite3"
+w = make_wrap(db)
+for i in range(5):
+    r = w.place_order(symbol="TMF", side="BUY", qty=1, order_type="MARKET", meta=dict(META))
+    assert not isinstance(r, dict), r
+    gtm = r.meta["gate_timing"]
+    assert list(gtm["ms"]) == ["safety", "calendar", "preflight", "risk", "oms", "audit"], gtm
+    # kill/cooldown come from the shared mirror: safety_state is read on first use, then only after another connection commits
+    assert (gtm["q"]["safety"] > 0 if i == 0 else gtm["q"]["safety"] <= 1) and gtm["q"]["oms"] > 0 and gtm["db_queries"] == sum(gtm["q"].values()), gtm
+r = w.place_order(symbol="TMF", side="BUY", qty=1, order_type="MARKET", meta={"ref_price": 20000.0, "session_hint": "DAY"})
+assert isinstance(r, dict) and r["status"] == "REJECTED" and r["risk"]["code"] == "RISK_STOP_REQUIRED", r
+con = sqlite3.connect(str(db))
+rows = con.execute("SELECT status, meta_json FROM orders ORDER BY id").fetchall()
+persisted = [json.loads(mj).get("gate_timing") for _st, mj in rows]
+assert all(p is not None for p in persisted), rows
+assert list(persisted[-1]["ms"]) == ["safety", "calendar", "preflight", "risk"] and rows[-1][0] == "REJECTED", persisted[-1]
+assert "oms" not in persisted[0]["ms"]                            # persisted before the OMS insert
+s = json.loads(art.read_text(encoding="utf-8"))
+assert s["attempts"] == 6 and s["outcomes"] == {"ACCEPTED": 5, "REJECTED": 1}, s["outcomes"]
+assert set(s["stages"]) == {"safety", "calendar", "preflight", "risk", "oms", "audit", "persist"}, s["stages"].keys()
+assert s["stages"]["safety"]["n"] == 6 and s["stages"]["oms"]["n"] == 5 and s["stages"]["persist"]["n"] == 1, s["stages"]
+for k in ("p50_ms", "p95_ms", "p99_ms"):
+    assert s["stages"]["risk"][k] is not None and s["total"][k] >= s["gates"][k], s
+assert isinstance(s["broker_rtt_ms"], int) and isinstance(s["gate_latency_ms"], int), s
+assert gt.load_gate_latency(db_path=str(db))["attempts"] == 6    # in-process recorder of this DB, no file read
+print("[OK] CASE C wrapper timing", {k: s["stages"][k]["p95_ms"] for k in s["stages"]}, "rtt", s["broker_rtt_ms"])
+
+# CASE D: ring buffer is bounded; TMF_GATE_TIMING=0 -> no breakdown
+rec = gt.GateLatencyRecorderV1(ring=3, path="", every_sec=0)
+for _ in range(5):
+    tt = gt.GateTimerV1(); tt.lap("safety"); rec.record(tt, "ACCEPTED")
+assert rec.n == 5 and rec.latest()["window"] == 3, rec.latest()
+os.environ["TMF_GATE_TIMING"] = "0"
+r = w.place_order(symbol="TMF", side="BUY", qty=1, order_type="MARKET", meta=dict(META))
+assert "gate_timing" not in r.meta and gt.get_gate_recorder(str(db)).n == 6
+print("[OK] CASE D ring bound + off switch")
+
+# CASE E: budget inputs = p95 of ALL attempts of the time window (a slow accepted spike cannot pin a
+# backpressure cooldown); default export is per DB, never the cwd-relative runtime/state file
+os.environ["TMF_GATE_TIMING"] = "1"
+rec = gt.GateLatencyRecorderV1(ring=2048, path="", every_sec=0, window_sec=60.0)
+slow = gt.GateTimerV1(); slow.t0 -= 5.0; slow.lap("oms"); rec.record(slow, "ACCEPTED")   # one 5 s accepted attempt
+assert rec.latest()["broker_rtt_ms"] >= 5000
+for _ in range(40):
+    tt = gt.GateTimerV1(); tt.lap("safety"); rec.record(tt, "REJECTED")                  # cooldown rejects: fast
+assert rec.latest()["broker_rtt_ms"] < 5, rec.latest()
+rec2 = gt.GateLatencyRecorderV1(ring=2048, path="", every_sec=0, window_sec=60.0)
+rec2.record(slow, "ACCEPTED")
+rec2._ring[0] = (time.time() - 61.0,) + rec2._ring[0][1:]                                # spike older than the window
+rec2.export()
+assert rec2.latest()["broker_rtt_ms"] == 0 and rec2.latest()["budget_window_n"] == 0, rec2.latest()
+del os.environ["TMF_GATE_LATENCY_PATH"]
+dbe = td / "e.sqlite3"
+we = make_wrap(dbe)
+we.place_order(symbol="TMF", side="BUY", qty=1, order_type="MARKET", meta=dict(META))
+own = Path(str(dbe) + ".gate_latency.json")
+assert gt.gate_latency_path(str(dbe)) == str(own) and json.loads(own.read_text())["attempts"] == 1
+assert gt.load_gate_latency(db_path=str(dbe))["attempts"] == 1 and gt.load_gate_latency(db_path=str(td / "other.sqlite3")) == {}
+os.environ["TMF_GATE_TIMING"] = "0"
+c2 = gt.trace_queries(sqlite3.connect(":memory:"))
+q0 = gt.queries_in_thread(); c2.execute("SELECT 1").fetchall()
+assert gt.queries_in_thread() == q0                                                      # no trace callback when off
+print("[OK] CASE E windowed all-attempt budget inputs + per-DB export", own.name)
+PY
+rm -rf "$TD"
+
+echo "=== [m3 regression gate timing v1] PASS $(date -Iseconds) ==="
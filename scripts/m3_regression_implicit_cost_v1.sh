@@ -0,0 +1,150 @@
+#!/bin/bash
+set -euo pipefail
+cd "$(dirname "$0")/.."
+
+echo "=== [m3 regression implicit cost v1] start $(date -Iseconds) ==="
+
+TD="$(mktemp -d /tmp/tmf_implicit_cost_reg_XXXXXX)"
+TMF_COST_TABLE_PATH="$TD/table.json" TMF_COST_CALIB_CHECKPOINT="$TD/calib.json" TMF_COST_MIN_SAMPLES=3 \
+TMF_COST_TABLE_RELOAD_SEC=0 TMF_COST_CALIB_CHUNK=7 TMF_TD="$TD" \
+python3 - <<'PY'
+import json, os, sqlite3, time
+from dataclasses import replace
+from datetime import datetime, timedelta
+from pathlib import Path
+from src.cost.implicit_cost_v1 import (ImplicitCostCalibratorV1, ImplicitCostConfigV1, get_implicit_cost_model,
+                                       session_of, vol_regime)
+from src.data.store_sqlite_v1 import init_db
+from src.sim.slippage_model_v1 import SlippageSpec, calc_slippage_points
+from src.sim.backtest_bars_v1 import BacktestConfigV1, BacktestEngineV1, BarArraysV1
+from research.cost_model.cost_model_os import estimate_cost
+
+td = Path(os.environ["TMF_TD"])
+db = td / "cost.sqlite3"
+init_db(db)
+DAY0 = datetime(2025, 3, 5, 1, 0)       # 09:00 Taipei
+NIGHT0 = datetime(2025, 3, 5, 10, 0)    # 18:00 Taipei
+
+def iso(t0, sec):
+    return (t0 + timedelta(seconds=sec)).isoformat(timespec="milliseconds") + "Z"
+
+def quote(spread, code="TMFB6"):
+    # 5 lots per level, 1 point per level: impact(1..5)=0, impact(10)=0.5, impact(20)=1.5, 50 lots not displayed
+    return {"code": code, "bid_price": [20000.0 - k for k in range(5)], "ask_price": [20000.0 + spread + k for k in range(5)],
+            "bid_volume": [5] * 5, "ask_volume": [5] * 5, "synthetic": False}
+
+def add_events(rows):
+    con = sqlite3.connect(str(db))
+    con.executemany("INSERT INTO events(ts, kind, payload_json, source_file, ingest_ts) VALUES (?,?,?,?,?)",
+                    [(ts, k, json.dumps(p), "regtest", ts) for ts, k, p in rows])
+    con.commit()
+    con.close()
+
+def add_fill(ts, side, qty, price, bid, ask):
+    meta = {"reason": "regtest", "order_meta": {"market_metrics": {"bid": bid, "ask": ask}}}
+    con = sqlite3.connect(str(db))
+    con.execute("INSERT INTO fills(ts, broker_order_id, symbol, side, qty, price, fee, tax, meta_json) VALUES (?,?,?,?,?,?,?,?,?)",
+                (ts, "x", "TMF", side, qty, price, 0.0, 0.0, json.dumps(meta)))
+    con.commit()
+    con.close()
+
+def tick(t0, sec, px):
+    return (iso(t0, sec), "tick_fop_v1", {"code": "TMFB6", "close": px, "volume": 1})
+
+# DAY minute 0: range 2 (LOW) -> quotes of minute 1 (spread 2); minute 1: range 20 (HIGH) -> quotes of minute 2 (spread 6)
+rows = [tick(DAY0, 1, 20000.0), tick(DAY0, 30, 20002.0)]
+rows += [(iso(DAY0, 60 + i), "bidask_fop_v1", quote(2.0)) for i in range(4)] + [tick(DAY0, 70, 20000.0), tick(DAY0, 80, 20020.0)]
+rows += [(iso(DAY0, 120 + i), "bidask_fop_v1", quote(6.0)) for i in range(4)] + [tick(DAY0, 130, 20000.0)]
+rows += [(iso(NIGHT0, i), "bidask_fop_v1", quote(4.0)) for i in range(3)]            # no completed minute -> regime NA
+rows += [(iso(NIGHT0, 5), "bidask_fop_v1", quote(1.0, code="MXFB6"))]                 # 1 sample < min_samples
+add_events(rows)
+add_fill("2025-03-05T09:01:10.000", "BUY", 1.0, 20003.0, 20000.0, 20002.0)      # minute 0 -> LOW, +1 vs touch
+add_fill("2025-03-05T09:01:20.000", "SELL", 10.0, 19997.0, 20000.0, 20002.0)    # LOW, +3 vs touch (book walk 0.5)
+
+# CASE A: calibration: half spread / depth impact curve / realized slippage beyond the book per (symbol, session, regime, qty)
+assert session_of(iso(DAY0, 0)) == "DAY" and session_of(iso(NIGHT0, 0)) == "NIGHT" and session_of("2025-03-05T13:45:00") == "NIGHT"
+assert vol_regime(2.0, (4.0, 12.0)) == "LOW" and vol_regime(20.0, (4.0, 12.0)) == "HIGH"
+cal = ImplicitCostCalibratorV1(str(db))
+st = cal.update()
+assert st["new_events"] == len(rows) and st["new_fills"] == 2 and not st["reset"], st
+cells = json.loads(Path(os.environ["TMF_COST_TABLE_PATH"]).read_text())["cells"]
+n, hs, imp, slp = cells["TMF|DAY|LOW"]
+assert (n, hs) == (4, 1.0) and imp == [0.0, 0.0, 0.0, 0.5, 1.5, 4.5], cells["TMF|DAY|LOW"]   # 50 lots: last-slope extrapolation
+assert slp == [1.0, 1.1667, 1.6667, 2.5, 2.5, 2.5], slp                                    # vs touch - impact; flat past 10 lots
+assert cells["TMF|DAY|HIGH"][:2] == [4, 3.0] and cells["TMF|DAY|*"][:2] == [8, 2.0]
+assert "TMF|NIGHT|NA" not in cells and cells["TMF|NIGHT|*"][:2] == [3, 2.0] and cells["TMF|*|*"][0] == 11
+print("[OK] CASE A calibrated cells", sorted(cells))
+
+# CASE B: O(1) lookups with qty interpolation and (session, *) / (*, *) fallbacks; estimate_cost in NTD
+m = get_implicit_cost_model()
+c = m.lookup("TMFB6", qty=15.0, session="DAY", regime="LOW")
+assert c.key == "TMF|DAY|LOW" and c.impact == 1.0 and abs(c.slippage - 2.5) < 1e-9, c
+assert (c.points_from("mid"), c.points_from("touch"), c.points_from("vwap")) == (4.5, 3.5, 2.5)
+assert m.lookup("TMF", qty=1.0, session="NIGHT", regime="LOW").key == "TMF|NIGHT|*"
+assert m.lookup("TMF", qty=1.0, session="", regime="").key == "TMF|*|*"
+assert m.lookup("MXF", qty=1.0, session="NIGHT") is None and m.lookup("TXF", qty=1.0) is None
+e = estimate_cost(symbol="TMF", qty=2, order_type="MARKET", regime="HIGH", session="DAY", price=20000.0)
+assert (e.spread, e.impact, e.fees) == (3.0 * 10 * 2, 0.0, 8.0 * 2 + 20000.0 * 10 * 2 * 0.00002), e
+assert e.details["implicit"] == "calibrated" and abs(e.total - (e.fees + e.spread + e.impact + e.slippage)) < 1e-9
+lim = estimate_cost(symbol="TMF", qty=2, order_type="LIMIT", regime="HIGH", session="DAY")
+assert lim.spread == lim.impact == 0.0 and lim.fees == 16.0
+z = estimate_cost(symbol="TXF", qty=1, order_type="MARKET", regime="LOW", session="DAY")
+assert z.total == 0.0 and z.details["implicit"] == "uncalibrated", z
+t0 = time.perf_counter()
+for i in range(20000):
+    m.lookup("TMF", qty=1.0 + (i % 40), session="DAY", regime="LOW")
+us = (time.perf_counter() - t0) / 20000 * 1e6
+print("[OK] CASE B lookups", round(us, 2), "us/lookup", m.stats)
+
+# CASE C: recalibration reads only new rows; equals a full rebuild
+more = [tick(DAY0, 190, 20000.0)] + [(iso(DAY0, 200 + i), "bidask_fop_v1", quote(2.0)) for i in range(5)]  # minute 2 range 0 -> LOW
+more += [tick(NIGHT0, 3540, 20000.0), tick(NIGHT0, 3570, 20030.0)]                  # 18:59 range 30 -> HIGH
+add_events(more)
+add_fill("2025-03-05T19:00:00.000", "BUY", 2.0, 20005.0, 20000.0, 20004.0)          # NIGHT, HIGH, +1
+st = ImplicitCostCalibratorV1(str(db)).update()                                      # fresh object: resumes from the checkpoint
+assert st["new_events"] == len(more) and st["new_fills"] == 0 and st["deferred_fills"] == 1, st   # events end at 18:59:30
+more2 = [tick(NIGHT0, 3605, 20010.0)]
+add_events(more2)
+st = ImplicitCostCalibratorV1(str(db)).update()
+assert st["new_events"] == 1 and st["new_fills"] == 1 and st["deferred_fills"] == 0, st
+more += more2
+inc = json.loads(Path(os.environ["TMF_COST_TABLE_PATH"]).read_text())["cells"]
+full = ImplicitCostCalibratorV1(str(db), cfg=replace(ImplicitCostConfigV1.from_env(), checkpoint="", table_path=""))
+full.update()
+assert full.build_table()["cells"] == inc and inc["TMF|DAY|LOW"][0] == 9 and inc["TMF|NIGHT|HIGH"][3][1] == 1.0, inc
+assert ImplicitCostCalibratorV1(str(db)).update()["new_events"] == 0
+print("[OK] CASE C incremental == full", st)
+
+# CASE D: slippage_model_v1 regime / qty aware behind TMF_SLIPPAGE_CALIBRATED=1 (capped); fixed 1 point otherwise
+assert calc_slippage_points(price=20000.0, symbol="TMF", side="BUY", qty=20) == 1.0
+assert calc_slippage_points(price=20000.0, symbol="TMF", side="BUY", qty=20, session="DAY", regime="LOW", calibrated=True) == 5.0
+os.environ["TMF_SLIPPAGE_CALIBRATED"] = "1"
+low = calc_slippage_points(price=20000.0, symbol="TMF", side="BUY", qty=1, session="DAY", regime="LOW")
+big = calc_slippage_points(price=20000.0, symbol="TMF", side="BUY", qty=20, session="DAY", regime="LOW")
+high = calc_slippage_points(price=20000.0, symbol="TMF", side="BUY", qty=1, session="DAY", regime="HIGH")
+huge = calc_slippage_points(price=20000.0, symbol="TMF", side="BUY", qty=200, session="DAY", regime="LOW")
+assert (low, big, high) == (1.0 + 0.0 + 1.0, 1.0 + 1.5 + 2.5, 3.0 + 0.0 + 0.0), (low, big, high)   # spread + impact + slippage
+assert huge == 10.0, huge                                                          # 1 + 19.5 + 2.5 -> max_points cap
+vw = calc_slippage_points(price=20000.0, symbol="TMF", side="BUY", qty=20, session="DAY", regime="LOW", reference="vwap")
+assert vw == 2.5, vw                                                               # depth fills: spread + impact are in the VWAP
+assert calc_slippage_points(price=20000.0, symbol="TMF", side="BUY", qty=200, session="DAY", regime="LOW",
+                            spec_override=SlippageSpec(max_points=4.0)) == 4.0     # spec_override: fallback + cap only
+assert calc_slippage_points(price=20000.0, symbol="TXF", side="SELL", qty=1, session="DAY") == 1.0   # uncalibrated symbol
+print("[OK] CASE D calibrated slippage", {"low": low, "high": high, "big": big, "huge": huge, "vwap": vw})
+
+# CASE E: the backtest opts in per config; close = mid, session from the bar, regime from the decision bar's h - l
+class _Once:
+    name = "once"
+    qty = 20.0
+    def on_bar(self, ctx, bar):
+        from src.strat.strategy_base_v1 import StrategySignalV1
+        return StrategySignalV1(side="BUY", qty=20.0, reason="t") if bar["ts_min"].endswith("09:02:00") else None
+bars = BarArraysV1.from_rows("TMFB6", [("2025-03-05T09:01:00", 20000, 20001, 19999, 20000, 1),
+                                       ("2025-03-05T09:02:00", 20000, 20002, 20000, 20000, 1)])   # range 2 -> LOW
+fx = BacktestEngineV1([_Once()], BacktestConfigV1(use_kernels=False)).run(bars).fills
+cal = BacktestEngineV1([_Once()], BacktestConfigV1(use_kernels=False, calibrated_slippage=True)).run(bars).fills
+assert fx[0]["slippage_points"] == 1.0 and cal[0]["slippage_points"] == 5.0, (fx, cal)
+print("[OK] CASE E backtest opt-in", fx[0]["price"], cal[0]["price"])
+PY
+
+echo "=== [m3 regression implicit cost v1] PASS $(date -Iseconds) ==="
@@ -0,0 +1,89 @@
+#!/bin/bash
+set -euo pipefail
+cd "$(dirname "$0")/.."
+
+echo "=== [m3 regression ingest bulk v1] start $(date -Iseconds) ==="
+
+TD="$(mktemp -d /tmp/tmf_ingest_bulk_reg_XXXXXX)"
+TMF_TD="$TD" python3 - <<'PY'
+import json, os, random, sqlite3
+from pathlib import Path
+from src.data.store_sqlite_v1 import ingest_jsonl, ingest_jsonl_bulk, sync_quotes_best_effort
+
+td = Path(os.environ["TMF_TD"])
+rnd = random.Random(11)
+
+def gen(p, n, day):
+    lines = []
+    for i in range(n):
+        ts = f"{day}T09:{(i // 60) % 60:02d}:{i % 60:02d}.{i % 1000:03d}"
+        px = 20000.0 + rnd.randint(-30, 30)
+        if i % 3 == 0:
+            rec = {"ts": ts, "kind": "tick_fop_v1", "payload": {"code": "TMFB6", "close": px, "volume": 1 + i % 4, "note": "成交"}}
+        else:
+            rec = {"ts": ts, "kind": "bidask_fop_v1", "payload": {"code": "TMFB6", "bid_price": [px - k for k in range(1, 6)],
+                   "ask_price": [px + k for k in range(5)], "bid_volume": [1 + (i + k) % 7 for k in range(5)],
+                   "ask_volume": [1 + (i * 3 + k) % 7 for k in range(5)], "synthetic": i % 17 == 0}}
+        lines.append(json.dumps(rec, ensure_ascii=(i % 2 == 0)))
+        if i % 97 == 5:   # shapes the fast path cannot slice: fallback decode / json_valid chunk replay
+            lines.append(json.dumps({"payload": {"code": "TMFB6", "i": i}, "ts": ts, "kind": "tick_fop_v1"}))
+            lines.append('{"ts": "%s", "kind": "tick_fop_v1", "payload": {"code": "TMFB6"}, "extra": {"i": %d}}' % (ts, i))
+            lines.append('{"ts": "%s", "kind": "session_info", "payload": [1, 2]}' % ts)
+        if i % 131 == 7:  # bad lines: counted, never stored
+            lines += ["{not json", "[1, 2]", '"str"', '{"ts": "x", "kind": "y", "payload": {"a": 1,}}', ""]
+    p.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+files = [td / "a.jsonl", td / "b.jsonl"]
+gen(files[0], 1500, "2026-02-05")
+gen(files[1], 900, "2026-02-06")
+
+def dump(db):
+    con = sqlite3.connect(str(db))
+    try:
+        ev = [(ts, kind, json.loads(pj), Path(sf).name) for ts, kind, pj, sf in
+              con.execute("SELECT ts, kind, payload_json, source_file FROM events ORDER BY id")]
+        runs = [(Path(sf).name, sh, a, b, c) for sf, sh, a, b, c in
+                con.execute("SELECT source_file, sha256, lines_total, lines_ok, lines_bad FROM ingest_runs ORDER BY id")]
+        try:
+            q = con.execute("SELECT COUNT(1) FROM quotes_l5").fetchone()[0]
+        except sqlite3.OperationalError:
+            q = 0   # never synced: no quotes_l5 table yet
+        idx = {r[0] for r in con.execute("SELECT name FROM sqlite_master WHERE type='index' AND tbl_name='events'")}
+        return ev, runs, q, idx
+    finally:
+        con.close()
+
+# CASE A: row-at-a-time reference vs batched executemany (small chunks: many chunk boundaries + replays)
+db_row, db_bulk = td / "row.sqlite3", td / "bulk.sqlite3"
+for p in files:
+    ingest_jsonl(db_row, p)
+rep = ingest_jsonl_bulk(db_bulk, files, chunk_size=64, rebuild_indexes="always", sync_quotes=True)
+a, b = dump(db_row), dump(db_bulk)
+assert len(a[0]) == len(b[0]) and a[0] == b[0], (len(a[0]), len(b[0]), next((x, y) for x, y in zip(a[0], b[0]) if x != y))
+assert a[1] == b[1] and all(r[4] > 0 for r in b[1]), (a[1], b[1])
+assert a[2] == b[2] > 0, (a[2], b[2])
+assert {"idx_events_ts", "idx_events_kind", "idx_events_source"} <= b[3], b[3]
+assert rep["rows_ok"] == sum(r[3] for r in b[1]) and rep["indexes_rebuilt"] and rep["quotes_l5_rows"] == b[2], rep
+print("[OK] CASE A bulk == row-at-a-time", len(b[0]), "events", [r[2:] for r in b[1]])
+
+# CASE B: chunk size does not change the result; re-ingest is skipped
+for cs, mode in ((1, "never"), (10 ** 6, "auto")):
+    db = td / f"bulk_{cs}.sqlite3"
+    ingest_jsonl_bulk(db, files, chunk_size=cs, rebuild_indexes=mode, sync_quotes=True)
+    assert dump(db)[:3] == b[:3], cs
+rep2 = ingest_jsonl_bulk(db_bulk, files, chunk_size=64)
+assert all(f["skipped"] for f in rep2["files"]) and dump(db_bulk)[:3] == b[:3], rep2
+print("[OK] CASE B chunk-size invariant, idempotent re-run")
+
+# CASE C: the quotes_l5 sync is opt-in; a later writer step catches up to the same rows
+db = td / "nosync.sqlite3"
+rep3 = ingest_jsonl_bulk(db, files, chunk_size=64)
+assert dump(db)[2] == 0 and rep3["quotes_l5_rows"] == 0 and rep3["sync_secs"] == 0.0, rep3
+con = sqlite3.connect(str(db))
+sync_quotes_best_effort(con)
+con.close()
+assert dump(db)[:3] == b[:3]
+print("[OK] CASE C deferred quotes_l5 sync")
+PY
+
+echo "=== [m3 regression ingest bulk v1] PASS $(date -Iseconds) ==="
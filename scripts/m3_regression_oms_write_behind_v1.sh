@@ -0,0 +1,139 @@
+#!/bin/bash
+set -euo pipefail
+cd "$(dirname "$0")/.."
+
+echo "=== [m3 regression oms write-behind v1] start $(date -Iseconds) ==="
+
+TD="$(mktemp -d /tmp/tmf_oms_write_behind_reg_XXXXXX)"
+TMF_RISK_STATE_PATH="" TMF_TD="$TD" \
+python3 - <<'PY'
+import os, sqlite3, subprocess, sys
+from pathlib import Path
+from src.data.store_sqlite_v1 import init_db
+from src.oms import oms_journal_v1 as oj
+from src.oms.paper_oms_v1 import PaperOMS
+from src.risk.risk_engine_v1 import RiskEngineV1
+
+td = Path(os.environ["TMF_TD"])
+META = {"stop_price": 19990.0, "spread_points": 0.5, "atr_points": 10.0, "liquidity_score": 1e9, "note": "é"}
+# (side, qty, order_type, limit, market_price, liquidity): adds, partial closes, flip, LIMIT no-fill, LIMIT w/o price
+STEPS = [("BUY", 2, "MARKET", None, 20000.0, None), ("BUY", 1, "MARKET", None, 20010.0, None),
+         ("SELL", 1, "MARKET", None, 20020.0, None), ("SELL", 4, "MARKET", None, 20030.0, 1.0),
+         ("BUY", 2, "LIMIT", 19990.0, 20000.0, None), ("BUY", 1, "LIMIT", None, 20000.0, None),
+         ("BUY", 3, "MARKET", None, 19980.0, None)]
+
+RUN_SRC = """
+def run(db, steps=STEPS):
+    oms = PaperOMS(db)
+    for side, q, ot, p, px, liq in steps:
+        o = oms.place_order(symbol="TMFB6", side=side, qty=q, order_type=ot, price=p, meta=dict(META))
+        for _ in range(5):
+            oms.match(o, market_price=px, liquidity_qty=liq, reason="regtest")
+    return oms
+"""
+exec(RUN_SRC)                                     # shared with the crashing child process (CASE C)
+
+def tables(db):
+    con = sqlite3.connect(str(db))
+    try:
+        return {t: con.execute(f"SELECT {c} FROM {t} ORDER BY id").fetchall() for t, c in (
+            ("orders", "symbol, side, qty, price, order_type, status, meta_json"),
+            ("fills", "broker_order_id IS NOT NULL, symbol, side, qty, price, fee, tax, meta_json"),
+            ("trades", "symbol, side, qty, entry, exit, pnl, pnl_pct, reason_open, reason_close, meta_json"))}
+    finally:
+        con.close()
+
+# CASE A: write-behind == synchronous writes (identical rows once drained); risk state never rebuilds on our lag
+os.environ["TMF_OMS_WRITE_BEHIND"] = "0"
+ref = td / "sync.sqlite3"; init_db(ref)
+run(ref)
+want = tables(ref)
+os.environ.update(TMF_OMS_WRITE_BEHIND="1", TMF_OMS_JOURNAL_FLUSH_SEC="3600", TMF_OMS_JOURNAL_BATCH_MAX="100000")
+db = td / "wb.sqlite3"; init_db(db)
+eng = RiskEngineV1(db_path=str(db))
+assert eng.state is not None and eng.state.day_pnl == 0.0
+oms = run(db)
+assert oms.journal is not None and oms.journal.pending() == 13, oms.journal.snapshot()
+assert sqlite3.connect(str(db)).execute("SELECT COUNT(1) FROM fills").fetchone()[0] == 0   # nothing written yet
+eng.check_pre_trade(symbol="TMF", side="BUY", qty=1.0, entry_price=20000.0, meta=dict(META))
+assert eng.state.stats["rebuilds"] == 1 and eng.state.day_pnl != 0.0, eng.state.stats   # in-process closes, no rebuild
+pnl = eng.state.day_pnl
+assert oms.flush() == 0 and tables(db) == want
+assert eng.verify_risk_state(repair=False)["ok"] and eng.state.day_pnl == pnl
+print("[OK] CASE A write-behind == sync", {k: len(v) for k, v in want.items()})
+
+# CASE B: fills are memory operations: no SQLite access on the fill path once the book is loaded
+oms2 = PaperOMS(db)
+o = oms2.place_order(symbol="TMFB6", side="SELL", qty=1, order_type="MARKET", meta=dict(META))
+assert oms2.get_order(o.order_id) is o and oms2.pos["TMFB6"].qty == 1.0          # book loaded once (open LONG 1)
+oms2._con = lambda: (_ for _ in ()).throw(AssertionError("SQLite on the fill path"))
+oms2.match(o, market_price=20050.0, liquidity_qty=0.5)
+oms2.match(o, market_price=20050.0)
+assert oms2.pos["TMFB6"].qty == 0.0 and oms2.get_order(o.order_id) is None and "TMFB6" not in oms2.open_trade
+del oms2._con
+oms2.flush()
+con = sqlite3.connect(str(db))
+assert con.execute("SELECT COUNT(1) FROM trades WHERE close_ts IS NULL").fetchone()[0] == 0
+assert con.execute("SELECT status FROM orders WHERE broker_order_id=?", (o.order_id,)).fetchone()[0] == "FILLED"
+con.close()
+print("[OK] CASE B fill path without SQLite")
+
+# CASE C: crash before the flush -> the next owner replays the journal (exactly once)
+db = td / "crash.sqlite3"; init_db(db)
+code = ("import os, sys; sys.path.insert(0, '.'); from pathlib import Path; from src.oms.paper_oms_v1 import PaperOMS; "
+        "exec(sys.stdin.read()); oms = run(Path(sys.argv[1])); assert oms.journal.pending() == 13; os._exit(3)")
+lib = "META = %r\nSTEPS = %r\n" % (META, STEPS) + RUN_SRC
+p = subprocess.run([sys.executable, "-c", code, str(db)], input=lib, text=True, capture_output=True)
+assert p.returncode == 3, p.stderr
+jp = oj.journal_path(str(db))
+raw = Path(jp).read_bytes()
+assert raw.count(b"\n") == 13 and tables(db)["fills"] == []
+Path(jp).write_bytes(raw + b'[14, [["fill", "torn')                              # torn tail of a dying writer
+j = oj.get_oms_journal(db)
+assert j.counters["recovered"] == 13 and j.counters["truncated_tail"] == 1 and os.path.getsize(jp) == 0, j.snapshot()
+assert tables(db) == want
+oj.close_oms_journal(db)
+Path(jp).write_bytes(raw)                                                       # crash after COMMIT, before truncate
+j = oj.get_oms_journal(db)
+assert j.counters["recovered"] == 0 and j._seq == 13 and tables(db) == want, j.snapshot()
+oj.close_oms_journal(db)
+assert not os.path.exists(jp)
+print("[OK] CASE C crash recovery", len(raw), "journal bytes")
+
+# CASE D: one owner per DB; the journal stays ordered across many flushes on a time/size budget
+os.environ.update(TMF_OMS_JOURNAL_FLUSH_SEC="0.01", TMF_OMS_JOURNAL_BATCH_MAX="8")
+db = td / "budget.sqlite3"; init_db(db)
+other = ("import sys; sys.path.insert(0, '.'); from src.oms.paper_oms_v1 import PaperOMS; "
+         "print(PaperOMS(sys.argv[1]).journal is None)")
+oms = run(db, STEPS * 6)
+out = subprocess.run([sys.executable, "-c", other, str(db)], capture_output=True, text=True, check=True).stdout
+assert out.strip() == "True", out                                              # not the owner -> synchronous writes
+oms.flush()
+c = oms.journal.counters
+assert c["batches"] >= 10 and c["applied"] == c["records"] == 13 * 6 and c["db_errors"] == 0, c
+con = sqlite3.connect(str(db))
+assert con.execute("SELECT COUNT(1) FROM trades WHERE close_ts IS NULL").fetchone()[0] == 1
+assert con.execute("SELECT SUM(qty) FROM fills").fetchone()[0] == 6 * sum(r[3] for r in want["fills"])
+con.close()
+print("[OK] CASE D size/time budget", c["batches"], "batches")
+
+# CASE E: two open trades for one symbol -> the book boots from the latest row (as the risk state and closes do)
+os.environ["TMF_OMS_WRITE_BEHIND"] = "0"
+db = td / "boot.sqlite3"; init_db(db)
+con = sqlite3.connect(str(db))
+con.executemany("INSERT INTO trades(open_ts, symbol, side, qty, entry, reason_open, meta_json) VALUES (?,?,?,?,?,?,?)",
+                [("2026-01-02T09:00:00", "TMFB6", "LONG", 1.0, 20000.0, "old", "{}"),
+                 ("2026-01-02T10:00:00", "TMFB6", "SHORT", 3.0, 21000.0, "new", "{}")])
+con.commit(); con.close()
+oms = PaperOMS(db)
+o = oms.place_order(symbol="TMFB6", side="BUY", qty=1, order_type="LIMIT", price=1.0, meta=dict(META))
+assert oms.get_order(o.order_id) is o                                           # loads the book
+p = oms.pos["TMFB6"]
+assert (p.side, p.qty, p.avg_price) == ("SHORT", 3.0, 21000.0) and oms.open_trade["TMFB6"].reason_open == "new", p
+st = RiskEngineV1(db_path=str(db)).state
+st.sync()
+assert st.positions == {"TMFB6": -3.0}, st.positions
+print("[OK] CASE E boot from the latest open trade")
+PY
+
+echo "=== [m3 regression oms write-behind v1] PASS $(date -Iseconds) ==="
@@ -0,0 +1,69 @@
+#!/bin/bash
+set -euo pipefail
+cd "$(dirname "$0")/.."
+
+echo "=== [m3 regression param sweep v1] start $(date -Iseconds) ==="
+
+python3 - <<'PY'
+import json, random, sqlite3, tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from src.data.store_sqlite_v1 import init_db
+from src.research.param_sweep_v1 import SweepGridV1, load_returns, main, run_sweep
+from src.sim.backtest_bars_v1 import load_bars_1m
+
+td = Path(tempfile.mkdtemp(prefix="tmf_sweep_reg_"))
+db = td / "t.sqlite3"
+init_db(db)
+rnd = random.Random(4)
+px = 20000.0
+rows = []
+for d in range(45):
+    t0 = datetime(2026, 1, 5) + timedelta(days=d)
+    for m in range(60):
+        o = px
+        px += rnd.gauss(0, 6)
+        rows.append(((t0 + timedelta(hours=9, minutes=m)).strftime("%Y-%m-%dT%H:%M"), "FOP", "TMFB6",
+                     o, max(o, px) + 1, min(o, px) - 1, px, 1.0, 1, "fixture"))
+con = sqlite3.connect(str(db))
+con.executemany("INSERT INTO bars_1m(ts_min, asset_class, symbol, o, h, l, c, v, n_trades, source) VALUES(?,?,?,?,?,?,?,?,?,?)", rows)
+con.commit(); con.close()
+
+bars = load_bars_1m(str(db), "TMFB6")
+grid = SweepGridV1(trend_lookback=(10, 20), trend_atr_n=(14,), trend_atr_mult=(2.0,),
+                   mr_lookback_n=(20,), mr_entry_z=(1.5, 2.0), mr_stop_pts=(30.0,))
+tasks = grid.tasks()
+assert len(tasks) == 4
+
+# interrupted run (2 of 4 configs) on a 2-worker pool, then resume
+st = td / "sweep.sqlite3"
+a = run_sweep(bars=bars, tasks=tasks, store_path=st, workers=2, max_tasks=2)
+assert a["n_run"] == 2 and a["n_pending"] == 2, a
+b = run_sweep(bars=bars, tasks=tasks, store_path=st, workers=2)
+assert b["n_skipped"] == 2 and b["n_run"] == 2 and b["n_pending"] == 0 and b["n_store"] == 4, b
+
+# same series as a single-process run
+st1 = td / "sweep1.sqlite3"
+run_sweep(bars=bars, tasks=tasks, store_path=st1, workers=1)
+r_pool = load_returns(sqlite3.connect(str(st)))
+r_one = load_returns(sqlite3.connect(str(st1)))
+assert r_pool == r_one and all(len(v) == 45 for v in r_one.values()), {k: len(v) for k, v in r_one.items()}
+
+# store is bound to its bars/options
+try:
+    run_sweep(bars=bars, tasks=tasks, store_path=st, workers=1, capital_ntd=123.0)
+    raise AssertionError("expected refusal")
+except RuntimeError:
+    pass
+
+# CLI: sweep -> stat gate with the real trial count
+out = td / "PARAM_SWEEP.json"
+rc = main(["--db", str(db), "--store", str(td / "cli.sqlite3"), "--workers", "1", "--out", str(out),
+           "--trend-lookback", "10,20", "--trend-atr-mult", "2.0", "--mr-lookback", "20", "--mr-entry-z", "1.5,2.0"])
+j = json.loads(out.read_text(encoding="utf-8"))
+assert rc == 0 and j["stat_gate"]["n_trials"] == 4 and j["stat_gate"]["n_series"] == 4, j["stat_gate"]
+assert (td / "PARAM_SWEEP.json.sha256.txt").exists()
+print(f"[OK] param sweep: resume, pool==single, bound store, stat gate n_trials=4 ({j['stat_gate']['code']})")
+PY
+
+echo "=== [m3 regression param sweep v1] PASS $(date -Iseconds) ==="
@@ -0,0 +1,131 @@
+#!/bin/bash
+set -euo pipefail
+cd "$(dirname "$0")/.."
+
+echo "=== [m3 regression quote cache v1] start $(date -Iseconds) ==="
+
+python3 - <<'PY'
+import json, os, random, sqlite3, tempfile, time
+from pathlib import Path
+from src.data.quotes_l5_v1 import sync_quotes_l5
+from src.data.store_sqlite_v1 import init_db
+from src.market.market_metrics_from_db_v1 import get_market_metrics_from_db
+from src.market.quote_cache_v1 import AsofNotServedError, LatestQuoteCacheV1, QuotesBehindError, get_quote_cache
+from src.safety.system_safety_v1 import SafetyConfigV1, SystemSafetyEngineV1
+
+td = Path(tempfile.mkdtemp(prefix="tmf_quote_cache_reg_"))
+db = td / "t.sqlite3"
+init_db(db)
+rnd = random.Random(5)
+
+def mk(i):
+    code = ("TMFB6", "TXFB6", "MXFB6")[i % 3]
+    px = 20000 + rnd.randint(-50, 50)
+    ts = f"2026-02-06T09:{(i // 60) % 60:02d}:{i % 60:02d}"
+    pl = {"code": code, "bid_price": [px - k for k in range(1, 6)], "ask_price": [px + k for k in range(0, 5)],
+          "bid_volume": [rnd.randint(1, 9) for _ in range(5)], "ask_volume": [rnd.randint(1, 9) for _ in range(5)],
+          "synthetic": (i % 11 == 0), "recv_ts": ts + "Z"}
+    sf = "ops_seed_bidask" if i % 13 == 0 else "recorder"
+    return (ts, "bidask_fop_v1", json.dumps(pl), sf, ts)
+
+con = sqlite3.connect(str(db))
+con.executemany("INSERT INTO events(ts, kind, payload_json, source_file, ingest_ts) VALUES(?,?,?,?,?)", [mk(i) for i in range(300)])
+con.commit()
+sync_quotes_l5(con)  # writer step (recorder / ingest); cache reads never write
+
+qc = LatestQuoteCacheV1(str(db))
+plain = SystemSafetyEngineV1(db_path=str(db), cfg=SafetyConfigV1())
+cached = SystemSafetyEngineV1(db_path=str(db), cfg=SafetyConfigV1(), quote_cache=qc)
+
+def check(tag):
+    for code in ("TMFB6", "TXFB6", "MXFB6", "NOPE"):
+        for rs in (True, False):
+            c = plain._con()
+            try:
+                a = plain._latest_event_by_code(c, kind="bidask_fop_v1", code=code, reject_synthetic=rs)
+                b = cached._latest_event_by_code(c, kind="bidask_fop_v1", code=code, reject_synthetic=rs)
+            finally:
+                c.close()
+            assert (a is None) == (b is None), (tag, code, rs)
+            if a:
+                assert a[:2] == b[:2], (tag, code, rs, a[:2], b[:2])
+                for k in ("bid_price", "ask_price", "bid_volume", "ask_volume", "recv_ts", "synthetic"):
+                    assert a[2].get(k) == b[2].get(k), (tag, k, a[2], b[2])
+        for asof in (None, "2026-02-06T09:01", "2026-02-06T09:03", "2026-02-06T09:04:30", "2026-02-06T09:59"):
+            m0 = get_market_metrics_from_db(db_path=str(db), fop_code=code, asof_ts=asof)
+            m1 = get_market_metrics_from_db(db_path=str(db), fop_code=code, asof_ts=asof, quote_cache=qc)
+            assert m0 == m1, (tag, code, asof, m0, m1)
+
+check("initial")
+# as-of reads older than the latest quote are answered from the ring, not the DB
+assert qc.stats["asof_hits"] > 0, qc.stats
+# new rows: not synced yet -> the cache refuses (caller falls back to the DB), then picks them up
+con.executemany("INSERT INTO events(ts, kind, payload_json, source_file, ingest_ts) VALUES(?,?,?,?,?)", [mk(i) for i in range(300, 450)])
+con.commit()
+try:
+    qc.get("TMFB6")
+    raise AssertionError("lagging quotes_l5 served from cache")
+except QuotesBehindError:
+    pass
+check("behind")
+assert qc.stats["db_rows"] == 300, qc.stats
+sync_quotes_l5(con)
+check("incremental")
+assert qc.stats["db_rows"] == 450, qc.stats
+
+# reads are write-free: served while another connection holds the write lock
+w = sqlite3.connect(str(db), timeout=0.1)
+w.execute("BEGIN IMMEDIATE")
+con.execute("PRAGMA busy_timeout=0")
+t0 = time.perf_counter()
+assert qc.get("TMFB6") is not None and qc.refresh(force=True) == 0
+assert time.perf_counter() - t0 < 1.0
+w.rollback()
+w.close()
+
+# a ring that evicted rows refuses as-of reads older than what it still holds
+os.environ["TMF_QUOTE_CACHE_RING"] = "4"
+small = LatestQuoteCacheV1(str(db))
+assert small.get("TMFB6", reject_synthetic=False).ts == "2026-02-06T09:07:27"
+assert small.get("TMFB6", reject_synthetic=False, asof_ts="2026-02-06T09:07:20").ts == "2026-02-06T09:07:18"
+try:
+    small.get("TMFB6", reject_synthetic=False, asof_ts="2026-02-06T09:01")
+    raise AssertionError("evicted as-of served")
+except AsofNotServedError:
+    pass
+del os.environ["TMF_QUOTE_CACHE_RING"]
+small.close()
+
+# direct feed wins over older DB rows; a later DB row wins over the fed snapshot
+snap = qc.feed_payload({"code": "TMFB6", "bid": 1.0, "ask": 2.0, "ingest_ts": "2026-02-06T23:59:59"}, ts="2026-02-06T23:59:59")
+assert qc.get("TMFB6", refresh=False).bid == 1.0 and snap.event_id is None
+con.execute("INSERT INTO events(ts, kind, payload_json, source_file, ingest_ts) VALUES(?,?,?,?,?)",
+            ("2026-02-07T00:00:00", "bidask_fop_v1", json.dumps({"code": "TMFB6", "bid": 3.0, "ask": 4.0, "ingest_ts": "2026-02-07T00:00:00"}), "recorder", "x"))
+con.commit()
+sync_quotes_l5(con)
+assert qc.get("TMFB6").bid == 3.0
+
+assert get_quote_cache(str(db)) is get_quote_cache(str(td / "." / "t.sqlite3"))
+
+# reads with no new commit are served from memory: PRAGMA data_version only, no quotes_l5 probe
+p0 = qc.stats["probes"]
+for _ in range(50):
+    qc.get("TMFB6")
+assert qc.stats["probes"] == p0, qc.stats
+
+# microbench: cached safety lookup vs DB lookup (same open connection; the cache must win)
+def bench(eng, n=2000):
+    c = eng._con()
+    try:
+        t0 = time.perf_counter()
+        for _ in range(n):
+            eng._latest_event_by_code(c, kind="bidask_fop_v1", code="TMFB6", reject_synthetic=True)
+        return (time.perf_counter() - t0) / n * 1e6
+    finally:
+        c.close()
+us_db, us_qc = min(bench(plain) for _ in range(3)), min(bench(cached) for _ in range(3))
+assert us_qc < us_db, (us_qc, us_db)
+print(f"[OK] quote cache parity (safety + market metrics, as-of ring, write-free reads); lookup_us db={us_db:.1f} cache={us_qc:.1f}")
+PY
+
+echo "=== [m3 regression quote cache v1] PASS $(date -Iseconds) ==="
@@ -0,0 +1,139 @@
+#!/bin/bash
+set -euo pipefail
+cd "$(dirname "$0")/.."
+
+echo "=== [m3 regression quotes_l5 v1] start $(date -Iseconds) ==="
+
+python3 - <<'PY'
+import json, os, random, sqlite3, tempfile
+from pathlib import Path
+from src.data.store_sqlite_v1 import init_db
+from src.data.quotes_l5_v1 import QuotesL5BehindError, latest_quote, recent_spreads, sync_quotes_l5
+from src.market.market_metrics_from_db_v1 import get_market_metrics_from_db
+from src.safety.system_safety_v1 import SafetyConfigV1, SystemSafetyEngineV1
+
+td = Path(tempfile.mkdtemp(prefix="tmf_quotes_l5_reg_"))
+db = td / "t.sqlite3"
+init_db(db)
+rnd = random.Random(3)
+rows = []
+for i in range(400):
+    code = "TMFB6" if i % 3 else "TXFB6"
+    px = 20000 + rnd.randint(-50, 50)
+    ts = f"2026-02-06T09:{i // 60:02d}:{i % 60:02d}"
+    if i % 7 == 0:
+        pl = {"code": code, "bid": px - 1, "ask": px + 1, "synthetic": False}            # scalar schema
+    else:
+        pl = {"code": code, "bid_price": [px - k for k in range(1, 6)], "ask_price": [px + k for k in range(0, 3)],
+              "bid_volume": [rnd.randint(1, 9) for _ in range(5)], "ask_volume": [rnd.randint(1, 9) for _ in range(3)],
+              "synthetic": (i % 11 == 0), "recv_ts": ts + "Z"}
+    sf = "ops_seed_bidask" if i % 13 == 0 else "recorder"
+    rows.append((ts, "bidask_fop_v1", json.dumps(pl), sf, ts))
+con = sqlite3.connect(str(db))
+con.executemany("INSERT INTO events(ts, kind, payload_json, source_file, ingest_ts) VALUES(?,?,?,?,?)", rows[:250])
+con.commit()
+sync_quotes_l5(con)  # writer step (ingest / recorder)
+
+def both(fn):
+    os.environ["TMF_QUOTES_L5"] = "0"; a = fn()
+    os.environ["TMF_QUOTES_L5"] = "1"; b = fn()
+    return a, b
+
+for code in ("TMFB6", "TXFB6", "NOPE"):
+    for asof in (None, "2026-02-06T09:02", "2026-02-06T09:03:30"):
+        a, b = both(lambda: get_market_metrics_from_db(db_path=str(db), fop_code=code, asof_ts=asof))
+        assert a == b, (code, asof, a, b)
+
+# rows written by a path that does not sync: reads refuse quotes_l5 (and write nothing) until a writer syncs
+con.executemany("INSERT INTO events(ts, kind, payload_json, source_file, ingest_ts) VALUES(?,?,?,?,?)", rows[250:])
+con.commit()
+eng = SystemSafetyEngineV1(db_path=str(db), cfg=SafetyConfigV1())
+
+def check_safety(synced=True):
+    for code in ("TMFB6", "TXFB6"):
+        for rs in (True, False):
+            def f():
+                c = eng._con()
+                try:
+                    return eng._latest_event_by_code(c, kind="bidask_fop_v1", code=code, reject_synthetic=rs)
+                finally:
+                    c.close()
+            a, b = both(f)
+            if not synced:
+                assert a == b, (code, rs, a[:2], b[:2])   # both from the events scan
+                continue
+            assert a[0] == b[0] and a[1] == b[1], (code, rs, a[:2], b[:2])
+            pa, pb = a[2], b[2]
+            # scalar bid/ask payloads are normalised into level-1 arrays
+            assert (pa.get("bid_price") or [pa.get("bid")]) == pb["bid_price"], (pa, pb)
+            assert (pa.get("ask_price") or [pa.get("ask")]) == pb["ask_price"], (pa, pb)
+            for k in ("bid_volume", "ask_volume", "recv_ts", "synthetic"):
+                assert (pa.get(k) or None) == (pb.get(k) or None), (k, pa, pb)
+
+c = sqlite3.connect(str(db))
+check_safety(synced=False)
+try:
+    latest_quote(c, code="TMFB6")
+    raise AssertionError("lagging quotes_l5 served")
+except QuotesL5BehindError:
+    pass
+assert c.execute("SELECT COUNT(1) FROM quotes_l5").fetchone()[0] == 250   # reads did not sync
+assert not c.in_transaction
+assert sync_quotes_l5(c) == 150
+check_safety()
+assert c.execute("SELECT COUNT(1) FROM quotes_l5").fetchone()[0] == 400
+assert sync_quotes_l5(c) == 0
+sp = recent_spreads(c, code="TMFB6", limit=50)
+assert len(sp) == 50 and all(s > 0 for s in sp), sp[:5]
+
+# a failed sync on the shared autocommit connection rolls back and releases the write lock
+from src.data.sqlite_conn_v1 import connect_shared
+con.execute("INSERT INTO events(ts, kind, payload_json, source_file, ingest_ts) VALUES(?,?,?,?,?)", rows[-1])
+con.commit()
+sh = connect_shared(db)
+sh.execute("CREATE TEMP TRIGGER boom BEFORE INSERT ON quotes_l5 BEGIN SELECT RAISE(ABORT, 'boom'); END")
+try:
+    sync_quotes_l5(sh)
+    raise AssertionError("expected failure")
+except sqlite3.DatabaseError:
+    pass
+sh.execute("DROP TRIGGER temp.boom")
+assert not sh.in_transaction
+w = sqlite3.connect(str(db), timeout=0.1)
+w.execute("BEGIN IMMEDIATE"); w.rollback(); w.close()
+assert sync_quotes_l5(sh) == 1
+
+# set-based sync (json_extract) == quote_row_from_payload, incl. payloads left to the Python path
+from src.data.quotes_l5_v1 import _ROW_COLS, quote_row_from_payload
+odd = [{"code": "A", "bid_price": [1, 2.5, None, 4], "ask_price": [3], "bid_volume": [1, True, False], "synthetic": True},
+       {"code": "A", "bid_price": [None, 2], "bid": 7, "ask_price": 9}, {"code": "A", "bid_price": {"a": 1}, "bid": 8},
+       {"code": "A", "synthetic": "yes"}, {"code": "A", "synthetic": 0.0}, {"code": "A", "synthetic": [1]},
+       {"code": "A", "bid_price": ["1", 2]}, {"code": "A", "bid": "3"}, {"code": "A", "bid_price": [[1]]},
+       {"code": 12, "bid": 1}, {"code": True}, {"code": ""}, {"code": None}, {"bid": 1}, [1, 2],
+       {"code": "A", "recv_ts": 5}, {"code": "é", "ask_volume": [1e300, -0.0, 123456789012345678, 1, 2, 3]}]
+raw = [json.dumps(x) for x in odd] + ['{"code": "A", "bid": 1, "ask": Infinity}', "not json", ""]
+db2 = td / "odd.sqlite3"
+init_db(db2)
+c2 = sqlite3.connect(str(db2))
+c2.executemany("INSERT INTO events(ts, kind, payload_json, source_file, ingest_ts) VALUES(?,?,?,?,?)",
+               [("2026-02-06T10:00:%02d" % i, "bidask_fop_v1", r, "sf", "its") for i, r in enumerate(raw)])
+c2.commit()
+want = []
+for eid, ts, pj, sf, its in c2.execute("SELECT id, ts, payload_json, source_file, ingest_ts FROM events ORDER BY id"):
+    try:
+        pl = json.loads(pj) if pj else {}
+    except ValueError:
+        pl = {}
+    r = quote_row_from_payload(event_id=eid, ts=ts, kind="bidask_fop_v1", payload=pl, source_file=sf, db_ingest_ts=its)
+    if r is not None:
+        want.append(r)
+n2 = sync_quotes_l5(c2)
+assert n2 == len(want), (n2, len(want))
+got = [tuple(r) for r in c2.execute("SELECT %s FROM quotes_l5 ORDER BY event_id" % ",".join(_ROW_COLS))]
+assert got == want and [tuple(map(type, r)) for r in got] == [tuple(map(type, r)) for r in want], \
+    [(a, b) for a, b in zip(got, want) if a != b]
+c2.close()
+print("[OK] quotes_l5 parity with events scan (market metrics + safety); failed sync rolls back; set-based sync")
+PY
+
+echo "=== [m3 regression quotes_l5 v1] PASS $(date -Iseconds) ==="
@@ -0,0 +1,56 @@
+#!/bin/bash
+set -euo pipefail
+cd "$(dirname "$0")/.."
+
+echo "=== [m3 regression reject policy cache v1] start $(date -Iseconds) ==="
+
+TD="$(mktemp -d /tmp/tmf_reject_policy_cache_reg_XXXXXX)"
+TMF_REJECT_POLICY_CHECK_SEC=0 TMF_TD="$TD" \
+python3 - <<'PY'
+import json, os, shutil
+from pathlib import Path
+from execution.reject_taxonomy import CompiledRejectPolicyV1, decide_action, decision_from_verdict, load_policy, load_policy_cached
+
+td = Path(os.environ["TMF_TD"])
+pol = load_policy("execution/reject_policy.yaml")
+comp = load_policy_cached("execution/reject_policy.yaml")
+
+# CASE A: compiled lookups == dict policy for every listed code, prefixes, domain fallback, odd input
+codes = list(pol["by_code"]) + ["SAFETY_X", "RISK_Y", "BROKER_TIMEOUT", "EXEC_Z", "FOO", "", None, "safety_feed_stale"]
+for c in codes:
+    assert comp.decide(c) == decide_action(c, policy=pol), c
+    assert comp.decide(c) == comp.decide(c)                     # memo hit
+for v in ({"ok": False, "code": "RISK_DAILY_MAX_LOSS", "reason": "x", "details": {"a": 1}},
+          {"risk": {"ok": False, "code": "SAFETY_FEED_STALE"}}, {"ok": True, "code": "OK"}):
+    assert decision_from_verdict(v, policy=comp) == decision_from_verdict(v, policy=pol), v
+print("[OK] CASE A compiled == dict policy", len(codes))
+
+# CASE B: cached object reused while the file is unchanged; edit -> recompiled; touch w/o change -> same object
+p = td / "policy.yaml"
+shutil.copy("execution/reject_policy.yaml", p)
+c1 = load_policy_cached(str(p))
+assert load_policy_cached(str(p)) is c1 and c1.decide("EXEC_TAIFEX_DPBM_REJECT") == ("COOLDOWN", "HIGH")
+obj = json.loads(p.read_text(encoding="utf-8"))
+obj["by_code"]["EXEC_TAIFEX_DPBM_REJECT"] = {"action": "KILL", "severity": "HIGH"}
+p.write_text(json.dumps(obj, indent=2) + "\n", encoding="utf-8")
+os.utime(p, ns=(1, 1))
+c2 = load_policy_cached(str(p))
+assert c2 is not c1 and c2.decide("EXEC_TAIFEX_DPBM_REJECT") == ("KILL", "HIGH"), c2.decide("EXEC_TAIFEX_DPBM_REJECT")
+os.utime(p, ns=(2, 2))
+assert load_policy_cached(str(p)) is c2                          # mtime moved, sha unchanged
+print("[OK] CASE B reload on change only")
+
+# CASE C: broken edit keeps the last good policy; a missing file without a prior load raises
+p.write_text("{not json", encoding="utf-8")
+os.utime(p, ns=(3, 3))
+assert load_policy_cached(str(p)) is c2
+try:
+    load_policy_cached(str(td / "missing.yaml"))
+    raise SystemExit("[FATAL] expected error for a missing policy")
+except OSError:
+    pass
+assert isinstance(comp, CompiledRejectPolicyV1) and comp.get("version") == pol.get("version")
+print("[OK] CASE C last good policy kept")
+PY
+
+echo "=== [m3 regression reject policy cache v1] PASS $(date -Iseconds) ==="
@@ -0,0 +1,88 @@
+#!/bin/bash
+set -euo pipefail
+cd "$(dirname "$0")/.."
+
+echo "=== [m3 regression reject stats stream v1] start $(date -Iseconds) ==="
+
+TD="$(mktemp -d /tmp/tmf_reject_stats_stream_reg_XXXXXX)"
+TMF_TD="$TD" TMF_REJECT_STATS_CHUNK=7 \
+python3 - <<'PY'
+import json, os, sqlite3
+from datetime import datetime, timedelta
+from pathlib import Path
+from src.data.store_sqlite_v1 import init_db
+from ops.rejects.reject_stats_from_events_v1 import build_reject_stats, build_reject_stats_incremental, _iter_jsonl
+from ops.rejects.reject_stats_stream_v1 import RejectStatsStreamV1
+
+td = Path(os.environ["TMF_TD"])
+db = td / "r.sqlite3"
+ck = td / "ck.json"
+init_db(db)
+
+def add(rows):
+    con = sqlite3.connect(str(db))
+    for ts, status, verdict, meta in rows:
+        con.execute("INSERT INTO orders(ts, symbol, side, qty, order_type, status, verdict, decision, action, meta_json) VALUES (?,?,?,?,?,?,?,?,?,?)",
+                    (ts, "TMF", "BUY", 1.0, "MARKET", status, verdict, "EXEC", "REJECT", json.dumps(meta)))
+    con.commit()
+    con.close()
+
+now = datetime.now()
+iso = lambda dt: dt.isoformat(timespec="milliseconds")
+rd = lambda code: {"reject_decision": {"code": code, "reason": "r_" + code}, "blob": "x" * 2000}
+add([(iso(now - timedelta(hours=3)), "REJECTED", "EXEC_TAIFEX_DPBM_REJECT", rd("EXEC_TAIFEX_DPBM_REJECT")) for _ in range(10)]
+    + [(iso(now - timedelta(minutes=30)), "FILLED", None, {})] * 3
+    + [(iso(now - timedelta(minutes=30)), "REJECTED", "RISK_QTY_LIMIT", {}) for _ in range(5)])
+
+# CASE A: first run streams everything in chunks; counters match a full decode
+st = RejectStatsStreamV1(str(db), checkpoint=str(ck))
+u = st.update()
+assert u["new_rows"] == 15 and st.total == 15 and u["watermark_id"] == 18, u
+c = st.counts
+assert c["by_exec_code"] == {"EXEC_TAIFEX_DPBM_REJECT": 10, "RISK_QTY_LIMIT": 5}, c
+assert c["by_reason"] == {"r_EXEC_TAIFEX_DPBM_REJECT": 10} and st.dpbm_like == 10 and st.taifex_like == 10, c
+w = st.windows()
+assert w["5m"]["n"] == 0 and w["1h"]["n"] == 5 and w["1d"]["n"] == 15 and w["1h"]["by_key"] == {"RISK_QTY_LIMIT": 5}, w
+print("[OK] CASE A full stream", u)
+
+# CASE B: checkpoint -> only new rows are read; storm shows in the 5m window
+add([(iso(now), "REJECTED", "X", {"preflight_verdict": {"code": "EXEC_PREFLIGHT_X", "reason": "px"}}) for _ in range(20)])
+st2 = RejectStatsStreamV1(str(db), checkpoint=str(ck))
+assert st2.total == 15 and st2.watermark == 18
+u = st2.update()
+assert u["new_rows"] == 20 and st2.total == 35 and not u["reset"], u
+w = st2.windows()
+assert w["5m"]["n"] == 20 and w["5m"]["per_min"] == 4.0 and w["5m"]["by_key"] == {"EXEC_PREFLIGHT_X": 20}, w
+r = st2.report(topn=2)
+assert r["total_rows"] == 35 and r["counts"]["by_exec_code_top"][0] == ("EXEC_PREFLIGHT_X", 20) and len(r["sample_recent"]) == 35, r["counts"]
+assert RejectStatsStreamV1(str(db), checkpoint=str(ck)).update()["new_rows"] == 0
+print("[OK] CASE B incremental", u)
+
+# CASE C: DB replaced (watermark past MAX(id)) -> reset + rebuild
+db.unlink()
+init_db(db)
+add([(iso(now), "REJECTED", "RISK_QTY_LIMIT", {})])
+st3 = RejectStatsStreamV1(str(db), checkpoint=str(ck))
+u = st3.update()
+assert u["reset"] and st3.total == 1, u
+print("[OK] CASE C reset")
+
+# CASE D: events JSONL: only appended lines are read; rewritten file is re-read, not double counted
+ev = td / "shioaji_order_events.x.jsonl"
+eck = td / "ev_ck.json"
+line = lambda stat, text: json.dumps({"ts": iso(now), "kind": "order_cb_v1", "payload": {"stat": stat, "msg": {"text": text}}}) + "\n"
+ev.write_text(line("Rejected", "DPBM banding") + line("OK", "accepted"), encoding="utf-8")
+r1 = build_reject_stats_incremental([ev], eck)
+with ev.open("a", encoding="utf-8") as f:
+    f.write(line("Rejected", "generic") + '{"ts": "partial')
+r2 = build_reject_stats_incremental([ev], eck)
+assert r1["total_events"] == 2 and r2["total_events"] == 3 and r2["reject_events"] == 2, (r1, r2)
+assert r2["by_exec_code"] == {"EXEC_TAIFEX_DPBM_REJECT": 1, "EXEC_TAIFEX_REJECT_GENERIC": 1} and r2["windows"]["5m"]["n"] == 2, r2
+ev.write_text(line("OK", "accepted"), encoding="utf-8")
+r3 = build_reject_stats_incremental([ev], eck)
+full = build_reject_stats(events=_iter_jsonl([ev]))
+assert r3["total_events"] == full["total_events"] == 1 and r3["reject_events"] == 0, r3
+print("[OK] CASE D events offsets", r2["files"])
+PY
+
+echo "=== [m3 regression reject stats stream v1] PASS $(date -Iseconds) ==="
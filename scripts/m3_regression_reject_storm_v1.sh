@@ -0,0 +1,89 @@
+#!/bin/bash
+set -euo pipefail
+cd "$(dirname "$0")/.."
+
+echo "=== [m3 regression reject storm v1] start $(date -Iseconds) ==="
+
+TD="$(mktemp -d /tmp/tmf_reject_storm_reg_XXXXXX)"
+TMF_IGNORE_MARKET_CALENDAR=1 TMF_GATE_LATENCY_PATH="" TMF_RISK_STATE_PATH="" TMF_TD="$TD" \
+TMF_REJECT_STORM_CODE_N=5 TMF_REJECT_STORM_DOMAIN_N=8 TMF_REJECT_STORM_KILL_N=12 TMF_REJECT_STORM_COOLDOWN_SEC=30 \
+python3 - <<'PY'
+import os, subprocess, sys, json
+from pathlib import Path
+from src.data.store_sqlite_v1 import init_db
+from src.oms.paper_oms_v1 import PaperOMS
+from src.oms.paper_oms_risk_safety_wrapper_v1 import PaperOMSRiskSafetyWrapperV1
+from src.risk.risk_engine_v1 import RiskEngineV1
+from src.safety import reject_storm_v1 as rs
+from src.safety.system_safety_v1 import SafetyConfigV1, SystemSafetyEngineV1
+from ops.audit.reject_storm_report import build_reject_storm_report
+from ops.auto_remediation.auto_remediation_engine import decide_actions
+
+td = Path(os.environ["TMF_TD"])
+
+# CASE A: sliding window ring (expiry, out-of-order within window, too-old drop)
+c = rs.SlidingWindowCounterV1(10, 1)
+for t in (100.0, 100.5, 101.2, 105.0):
+    c.add(t)
+c.add(99.0)                                   # late but inside the window
+c.add(80.0)                                   # older than the window -> dropped
+assert c.count(105.9) == 5 and c.count(110.5) == 2 and c.count(111.0) == 1 and c.count(200.0) == 0, c.total
+print("[OK] CASE A sliding window")
+
+# CASE B: wrapper rejects -> bus -> detector -> safety cooldown, within the same call
+db = td / "b.sqlite3"
+init_db(db)
+safety = SystemSafetyEngineV1(db_path=str(db), cfg=SafetyConfigV1(require_recent_bidask=0))
+w = PaperOMSRiskSafetyWrapperV1(paper_oms=PaperOMS(db), risk=RiskEngineV1(db_path=str(db)), safety=safety, db_path=str(db))
+assert w.storm is not None and w.storm.cfg.code_n == 5
+META = {"ref_price": 20000.0, "stop_price": 19990.0, "session_hint": "DAY"}
+codes = []
+for i in range(5):
+    r = w.place_order(symbol="TMF", side="BUY", qty=1, order_type="MARKET", meta=dict(META, stop_price=19000.0))
+    codes.append(r["risk"]["code"])
+assert codes == ["RISK_PER_TRADE_MAX_LOSS"] * 5, codes
+cd = safety._get_state("cooldown")
+assert cd["code"] == rs.STORM_COOLDOWN_CODE and "code:RISK_PER_TRADE_MAX_LOSS" in cd["reason"], cd
+snap = w.storm.snapshot()
+dec = snap["decisions"][-1]
+assert dec["action"] == "COOLDOWN" and dec["n"] == 5 and dec["decide_ms"] < 50, dec
+r = w.place_order(symbol="TMF", side="BUY", qty=1, order_type="MARKET", meta=dict(META))
+assert r["safety"]["code"] == "SAFETY_COOLDOWN_ACTIVE", r
+snap = w.storm.snapshot()
+assert snap["stats"]["ignored"] == 1 and snap["stats"]["cooldowns"] == 1 and snap["by_code"] == {"RISK_PER_TRADE_MAX_LOSS": 5}, snap
+print("[OK] CASE B cooldown via safety", dec)
+
+# CASE C: kill on total, latched; cooldown not re-issued while active
+class FakeSafety:
+    db_path = str(td / "c.sqlite3")
+    def __init__(self):
+        self.calls = []
+    def request_cooldown(self, **kw):
+        self.calls.append(("COOLDOWN", kw["code"]))
+    def request_kill(self, **kw):
+        self.calls.append(("KILL", kw["code"]))
+fs = FakeSafety()
+det = rs.RejectStormDetectorV1(cfg=rs.RejectStormConfigV1(code_n=5, domain_n=8, kill_n=12, cooldown_sec=30), safety=fs)
+out = [det.observe(f"EXEC_X{i % 4}", "EXEC", t=1000.0 + i * 0.1) for i in range(14)]
+assert fs.calls == [("COOLDOWN", rs.STORM_COOLDOWN_CODE), ("KILL", rs.STORM_KILL_CODE)], fs.calls
+assert out[7]["key"] == "domain:EXEC" and out[11]["action"] == "KILL" and out[13] is None and det.snapshot(t=1001.0)["killed"]
+assert det.snapshot(t=2000.0)["total"] == 0
+print("[OK] CASE C kill latch")
+
+# CASE D: offline report over orders (storm window) -> auto_remediation actions -> --apply
+rep = build_reject_storm_report(str(db), checkpoint=str(td / "ck.json"))
+assert rep["total_rejects"] == 6 and rep["storm_window"]["by_code"] == {"RISK_PER_TRADE_MAX_LOSS": 5}, rep["storm_window"]
+acts = rep["auto_remediation"]["actions"]
+assert [a["action"] for a in acts] == ["COOLDOWN"] and acts[0]["details"]["key"] == "code:RISK_PER_TRADE_MAX_LOSS", acts
+assert decide_actions(metrics={"reject_storm": {"total": 12, "by_code": {}, "by_domain": {}}})["actions"][0]["action"] == "KILL"
+assert decide_actions(metrics={})["actions"] == []
+safety.clear_cooldown()
+out = subprocess.run([sys.executable, "ops/audit/reject_storm_report.py", "--db", str(db), "--checkpoint", str(td / "ck2.json"),
+                      "--out", str(td / "storm.json"), "--apply"], capture_output=True, text=True, check=True).stdout
+art = json.loads((td / "storm.json").read_text(encoding="utf-8"))
+assert art["auto_remediation"]["applied"] == [{"action": "COOLDOWN", "ok": True}], art["auto_remediation"]
+assert safety._get_state("cooldown")["code"] == rs.STORM_COOLDOWN_CODE
+print("[OK] CASE D report + auto-remediation", out.strip().splitlines()[0])
+PY
+
+echo "=== [m3 regression reject storm v1] PASS $(date -Iseconds) ==="
@@ -0,0 +1,94 @@
+#!/bin/bash
+set -euo pipefail
+cd "$(dirname "$0")/.."
+
+echo "=== [m3 regression replay engine v1] start $(date -Iseconds) ==="
+
+TD="$(mktemp -d /tmp/tmf_replay_engine_reg_XXXXXX)"
+TMF_IGNORE_MARKET_CALENDAR=1 TMF_STRATEGIES=trend TMF_TREND_FORCE_FIRST_SIGNAL=1 TMF_TREND_FORCE_STOP_PTS=30 TMF_TD="$TD" \
+python3 - <<'PY'
+import json, os, time
+from dataclasses import replace
+from datetime import datetime, timedelta
+from pathlib import Path
+from src.ops.clock_v1 import clock_now, sim_clock
+from src.sim.replay_engine_v1 import ReplayConfigV1, ReplayEngineV1, merge_recorder_jsonl
+
+td = Path(os.environ["TMF_TD"])
+T0 = datetime(2025, 3, 5, 2, 0)   # recorded long ago: freshness / time stops must run on replay time
+CFG = ReplayConfigV1(fop_code="TMFB6", max_bidask_age_seconds=15)
+
+def iso(i):
+    return (T0 + timedelta(seconds=i)).isoformat(timespec="milliseconds") + "Z"
+
+def quote(t, px):
+    return {"ts": t, "kind": "bidask_fop_v1", "payload": {"code": "TMFB6", "bid_price": [px] * 5, "ask_price": [px + 1] * 5,
+            "bid_volume": [5] * 5, "ask_volume": [5] * 5, "synthetic": False, "recv_ts": t, "ingest_ts": t, "source_file": "regtest"}}
+
+def tick(t, px, code="TMFB6"):
+    return {"ts": t, "kind": "tick_fop_v1", "payload": {"code": code, "datetime": t, "close": px, "volume": 1, "source_file": "regtest"}}
+
+def write(p, rows):
+    with p.open("w", encoding="utf-8") as f:
+        for r in rows:
+            f.write((r if isinstance(r, str) else json.dumps(r)) + "\n")
+    return str(p)
+
+def run(name, paths, cfg=CFG):
+    eng = ReplayEngineV1(db_path=str(td / f"{name}.sqlite3"), cfg=cfg, decision_log=str(td / f"{name}.decisions.jsonl"))
+    rep = eng.run(paths)
+    assert not rep["last_errors"], rep["last_errors"]
+    return rep, [json.loads(x) for x in (td / f"{name}.decisions.jsonl").read_text(encoding="utf-8").splitlines()]
+
+# two recorder files (quotes / ticks), as written by separate recorder sessions
+QA = write(td / "quotes.jsonl", [quote(iso(i), 20000.0 + i) for i in range(300)])
+TA = write(td / "ticks.jsonl", [x for i in range(300) for x in (tick(iso(i), 20000.5 + i), tick(iso(i), 100.0, code="MXFB6"))])
+
+# CASE A: full stack on a 2025 log; byte-identical decision log across runs; clock restored afterwards
+wall0 = time.time()
+r1, d1 = run("a1", [QA, TA])
+r2, d2 = run("a2", [QA, TA])
+c = r1["counters"]
+assert c["events"] == 900 and c["quotes"] == 300 and c["ticks"] == 600, c
+assert c["bars"] == 5 and c["signals"] == 1 and c["orders_accepted"] == 1 and c["fills"] == 1, c
+assert d1[0]["kind"] == "order" and d1[0]["outcome"] == "ACCEPTED" and d1[0]["t"].startswith("2025-03-05"), d1
+assert (td / "a1.decisions.jsonl").read_bytes() == (td / "a2.decisions.jsonl").read_bytes()
+assert r1["decision_log_sha256"] == r2["decision_log_sha256"] and r1["events_per_sec"] > 0
+assert sim_clock() is None and abs(clock_now().timestamp() - wall0) < 600, clock_now()
+assert os.environ.get("TMF_GATE_TIMING") is None and os.environ.get("TMF_RISK_STATE_PATH") is None
+print("[OK] CASE A deterministic replay", {k: c[k] for k in ("events", "bars", "orders_accepted")},
+      "ev/s", r1["events_per_sec"], "sha", r1["decision_log_sha256"][:12])
+
+# CASE B: k-way merge on ts (ties -> file order, then line order); bad lines / missing ts counted
+b1 = write(td / "b1.jsonl", [tick(iso(0), 1.0), tick(iso(2), 2.0), "{not json", tick(iso(4), 3.0)])
+b2 = write(td / "b2.jsonl", [tick(iso(1), 4.0), tick(iso(2), 5.0), {"kind": "tick_fop_v1", "payload": {"close": 6.0}}, tick(iso(3), 7.0)])
+st = {"bad": 0, "ts_missing": 0, "out_of_order": 0}
+got = [(r[1], r[5]["close"]) for r in merge_recorder_jsonl([b1, b2], st)]
+assert got == [(0, 1.0), (1, 4.0), (0, 2.0), (1, 5.0), (1, 6.0), (1, 7.0), (0, 3.0)], got
+assert st == {"bad": 1, "ts_missing": 1, "out_of_order": 0}, st
+print("[OK] CASE B merge order", got)
+
+# CASE C: quotes stop after 60s of replay time -> the first signal (02:02) is rejected as stale feed
+QC = write(td / "quotes_c.jsonl", [quote(iso(i), 20000.0 + i) for i in range(60)])
+r, d = run("c", [QC, TA])
+assert r["counters"]["orders_rejected"] == 1 and d[0]["outcome"] == "REJECTED", (r["counters"], d)
+assert d[0]["code"] == "SAFETY_FEED_STALE", d
+print("[OK] CASE C stale feed on replay time", d[0]["code"], d[0]["t"])
+
+# CASE D: in-trade time stop fires after 60s of replay time (the whole replay takes well under a second of wall time)
+QD = write(td / "quotes_d.jsonl", [quote(iso(i), 20100.0) for i in range(300)])
+r, d = run("d", [QD, TA], cfg=replace(CFG, time_stop_seconds=60.0))
+kinds = [(x["kind"], x.get("action") or x.get("outcome")) for x in d]
+assert kinds[:2] == [("order", "ACCEPTED"), ("control", "CLOSE_TIME_STOP")], kinds
+t_open, t_close = (datetime.fromisoformat(x["t"]) for x in d[:2])
+assert 60.0 <= (t_close - t_open).total_seconds() < 61.0 and r["secs"] < 30, (d[:2], r["secs"])
+assert r["counters"]["controls_closes"] == 1, r["counters"]
+print("[OK] CASE D time stop on replay time", d[1]["t"], "wall secs", r["secs"])
+
+# CASE E: replay never imports the paper runner (its import runs the drift detector on the production DB)
+import sys
+assert "src.sim.run_strategies_paper_v1" not in sys.modules and "src.ops.learning.drift_detector_v1" not in sys.modules
+print("[OK] CASE E no runner import side effects")
+PY
+
+echo "=== [m3 regression replay engine v1] PASS $(date -Iseconds) ==="
@@ -0,0 +1,95 @@
+#!/bin/bash
+set -euo pipefail
+cd "$(dirname "$0")/.."
+
+echo "=== [m3 regression replay external sort v1] start $(date -Iseconds) ==="
+
+TD="$(mktemp -d /tmp/tmf_replay_extsort_reg_XXXXXX)"
+TMF_TD="$TD" python3 - <<'PY'
+import hashlib, json, os, random
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from ops.replay import replay_runner as rr
+from ops.replay.replay_runner import replay_jsonl
+
+td = Path(os.environ["TMF_TD"])
+rnd = random.Random(7)
+t0 = datetime(2025, 3, 5, 1, 0, tzinfo=timezone.utc)
+
+# shuffled recorder/audit-like log: ts jitter + ties, some rows without ts / seq, odd kinds, a few bad lines
+lines = []
+for i in range(2000):
+    ev = {"kind": rnd.choice(["bidask_fop_v1", "tick_fop_v1", "ORDER_SUBMIT", "k\ttab"]), "payload": {"i": i, "s": "é"}}
+    if i % 17:
+        ev["ts"] = (t0 + timedelta(seconds=rnd.randint(0, 300))).isoformat().replace("+00:00", "Z")
+    if i % 5:
+        ev["seq"] = rnd.randint(0, 50)
+    lines.append(json.dumps(ev, ensure_ascii=False))
+for j in (10, 500, 1500):
+    lines.insert(j, "{broken")
+lines.insert(42, "")
+lines.insert(43, "[1, 2]")
+log = td / "events.jsonl"
+log.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+def run(**kw):
+    seen = []
+    res = replay_jsonl(str(log), handler=lambda ev: seen.append(ev["payload"]["i"]), report_json_path=str(td / "rep.json"), **kw)
+    rep = json.loads((td / "rep.json").read_text(encoding="utf-8"))
+    return res, rep, seen
+
+def same(a, b):
+    for k in ("replayed", "bad", "events_sha256", "kinds_head10", "kinds_tail10", "diagnostics", "drift_codes"):
+        assert a[k] == b[k], (k, a[k], b[k])
+
+# reference: the whole log sorted in memory, hashed as one list
+ref = []
+for ln, raw in enumerate(lines, 1):
+    try:
+        obj = json.loads(raw)
+    except Exception:
+        continue
+    if isinstance(obj, dict):
+        ref.append((rr._event_sort_key(obj, ln), obj))
+ref.sort(key=lambda t: t[0])
+h = hashlib.sha256()
+for _, ev in ref:
+    h.update(json.dumps(ev, ensure_ascii=False, sort_keys=True, separators=(",", ":")).encode("utf-8") + b"\n")
+
+# CASE A: in-memory sort (default for small logs) == reference; diagnostics are real numbers now
+res_m, rep_m, seen_m = run()
+assert rep_m["sort"]["mode"] == "memory" and res_m.code == "REPLAY_PARSE_ERRORS" and rep_m["bad"] == 4, (res_m, rep_m["sort"])
+assert rep_m["events_sha256"] == h.hexdigest() and seen_m == [ev["payload"]["i"] for _, ev in ref]
+d = rep_m["diagnostics"]
+assert d["missing_ts"] == sum(1 for k, _ in ref if k[0] == 0.0) and d["missing_ts"] > 0, d
+assert sum(d["kind_counts"].values()) == 2000 and "DRIFT_PARSE_ERRORS" in rep_m["drift_codes"], rep_m["drift_codes"]
+print("[OK] CASE A memory sort", rep_m["events_sha256"][:12], rep_m["drift_codes"])
+
+# CASE B: external sort, tiny chunks -> same order, hashes and diagnostics
+res_e, rep_e, seen_e = run(external_sort=True, chunk_events=97, tmp_dir=str(td))
+assert rep_e["sort"] == {"mode": "external", "chunk_events": 97, "runs": 21}, rep_e["sort"]
+same(rep_m, rep_e)
+assert seen_e == seen_m and res_e == res_m
+print("[OK] CASE B external sort", rep_e["sort"])
+
+# CASE C: cascaded merge (more runs than the fan-in); temp runs cleaned up
+rr.MAX_MERGE_FANIN = 4
+_, rep_c, seen_c = run(external_sort=True, chunk_events=50, tmp_dir=str(td))
+rr.MAX_MERGE_FANIN = 64
+same(rep_m, rep_c)
+assert seen_c == seen_m and rep_c["sort"]["runs"] == 40, rep_c["sort"]
+assert not list(td.glob("tmf_replay_sort_*")), list(td.iterdir())
+print("[OK] CASE C cascade merge fan-in 4", rep_c["sort"])
+
+# CASE D: auto mode by log size + chunk size from env; deterministic=False streams in file order
+os.environ["TMF_REPLAY_EXTERNAL_MIN_MB"] = "0"
+os.environ["TMF_REPLAY_CHUNK_EVENTS"] = "500"
+_, rep_d, _ = run(tmp_dir=str(td))
+assert rep_d["sort"] == {"mode": "external", "chunk_events": 500, "runs": 4}, rep_d["sort"]
+same(rep_m, rep_d)
+_, rep_s, seen_s = run(deterministic=False)
+assert rep_s["sort"]["mode"] == "stream" and seen_s == [json.loads(x)["payload"]["i"] for x in lines if x.startswith("{\"")]
+print("[OK] CASE D auto/env + stream", rep_d["sort"], rep_s["sort"]["mode"])
+PY
+
+echo "=== [m3 regression replay external sort v1] PASS $(date -Iseconds) ==="
@@ -0,0 +1,140 @@
+#!/bin/bash
+set -euo pipefail
+cd "$(dirname "$0")/.."
+
+echo "=== [m3 regression risk state v1] start $(date -Iseconds) ==="
+
+TD="$(mktemp -d /tmp/tmf_risk_state_reg_XXXXXX)"
+TMF_RISK_STATE_PATH="$TD/risk_state.json" TMF_RISK_STATE_SAVE_SEC=60 TMF_TD="$TD" \
+python3 - <<'PY'
+import json, os, sqlite3
+from datetime import datetime, timedelta
+from pathlib import Path
+from src.data.store_sqlite_v1 import init_db
+from src.oms.paper_oms_v1 import PaperOMS
+from src.risk import risk_state_v1 as rs
+from src.risk.risk_engine_v1 import RiskEngineV1
+
+td = Path(os.environ["TMF_TD"])
+META = {"stop_price": 19990.0, "spread_points": 0.5, "atr_points": 10.0, "liquidity_score": 1e9}
+
+def iso(dt):
+    return dt.isoformat(timespec="milliseconds")
+
+def seed(db, rows, wipe=True):
+    # external writer (own connection), like the seed/smoke scripts
+    con = sqlite3.connect(str(db))
+    if wipe:
+        con.execute("DELETE FROM trades")
+    for close_ts, pnl in rows:
+        con.execute("INSERT INTO trades(open_ts, close_ts, symbol, side, qty, entry, exit, pnl) VALUES (?,?,?,?,?,?,?,?)",
+                    (close_ts, close_ts, "TMF", "LONG", 1.0, 20000.0, 20000.0, float(pnl)))
+    con.commit()
+    con.close()
+
+def check(eng):
+    return eng.check_pre_trade(symbol="TMF", side="BUY", qty=1.0, entry_price=20000.0, meta=dict(META))
+
+# CASE A: gates on cached state; external writes are picked up (data_version + fingerprint probe)
+db = td / "a.sqlite3"
+init_db(db)
+eng = RiskEngineV1(db_path=str(db))
+now = datetime.now()
+seed(db, [(iso(now), -6000.0)])
+v = check(eng)
+assert v.code == "RISK_DAILY_MAX_LOSS" and v.details["today_realized_pnl_ntd"] == -6000.0, v
+seed(db, [(iso(now - timedelta(minutes=5 + i)), -100.0) for i in range(3)])
+assert check(eng).code == "RISK_CONSEC_LOSS_COOLDOWN"
+seed(db, [(iso(now - timedelta(minutes=60 + i)), -100.0) for i in range(3)])
+v = check(eng)
+assert v.ok, v
+seed(db, [(iso(now - timedelta(days=1)), -9000.0)], wipe=False)     # yesterday: not in today's pnl, breaks nothing
+v = check(eng)
+assert v.ok, v
+os.environ["TMF_RISK_STATE_CACHE"] = "0"
+v0 = RiskEngineV1(db_path=str(db)).check_pre_trade(symbol="TMF", side="BUY", qty=1.0, entry_price=20000.0, meta=dict(META))
+os.environ.pop("TMF_RISK_STATE_CACHE")
+assert v0.ok and eng.state is not None and eng.verify_risk_state()["ok"], eng.state.to_dict()
+print("[OK] CASE A gates on cached state", eng.state.stats)
+
+# CASE B: PaperOMS updates the state in-process (no rebuild), consistent with trades
+db = td / "b.sqlite3"
+init_db(db)
+eng = RiskEngineV1(db_path=str(db))
+oms = PaperOMS(db)
+assert check(eng).ok
+rebuilds = eng.state.stats["rebuilds"]
+for px_in, px_out in ((20000.0, 19990.0), (20000.0, 19980.0), (20000.0, 20010.0), (20000.0, 19995.0)):
+    o = oms.submit_order(symbol="TMFB6", side="BUY", qty=1, order_type="MARKET")
+    oms.match(o, market_price=px_in)
+    assert eng.state.open_exposure("TMF") == {"TMF": 1.0}, eng.state.positions
+    check(eng)
+    o = oms.submit_order(symbol="TMFB6", side="SELL", qty=1, order_type="MARKET")
+    oms.match(o, market_price=px_out)
+    check(eng)
+st = eng.state
+assert st.stats["rebuilds"] == rebuilds and st.stats["closes"] == 4, st.stats
+assert st.loss_streak == 1 and abs(st.day_pnl - (-100.0 - 200.0 + 100.0 - 50.0)) < 1e-6 and st.positions == {}, st.to_dict()
+assert eng.verify_risk_state()["ok"]
+o = oms.submit_order(symbol="TMFB6", side="SELL", qty=2, order_type="MARKET")
+oms.match(o, market_price=20000.0)
+assert st.open_exposure() == {"TMF": -2.0} and eng.verify_risk_state()["ok"], st.to_dict()
+assert st.stats["saves"] == 2 and st._dirty, st.stats                  # rebuild + first fill; 17 fills later throttled
+st.close()                                                            # writes the pending snapshot
+print("[OK] CASE B in-process updates", st.to_dict(), st.stats)
+
+# CASE C: snapshot restores without a rebuild; stale snapshot (trades changed) -> rebuild
+snap = json.loads(Path(os.environ["TMF_RISK_STATE_PATH"]).read_text(encoding="utf-8"))
+assert snap["db"] == os.path.abspath(str(db)) and snap["loss_streak"] == 1, snap
+s2 = rs.RiskStateV1.from_env(str(db))
+s2.load()
+assert s2.stats == {"rebuilds": 0, "snapshot_loads": 1, "probes": 0, "closes": 0, "saves": 0} and s2.to_dict() == st.to_dict(), s2.stats
+seed(db, [(iso(datetime.now()), -10.0)], wipe=False)
+s3 = rs.RiskStateV1.from_env(str(db))
+s3.load()
+assert s3.stats["rebuilds"] == 1 and s3.loss_streak == 2, s3.stats
+for s in (s2, s3):
+    s.close()
+print("[OK] CASE C snapshot")
+
+# CASE D: probe off -> external change is invisible until verify (on demand) repairs it
+os.environ["TMF_RISK_STATE_PROBE"] = "0"
+db = td / "d.sqlite3"
+init_db(db)
+rs._STATES.pop(os.path.abspath(str(db)), None)
+eng = RiskEngineV1(db_path=str(db))
+assert check(eng).ok
+seed(db, [(iso(datetime.now()), -6000.0)])
+assert check(eng).ok                                                   # stale by design
+out = eng.verify_risk_state()
+assert (not out["ok"]) and out.get("repaired") and "day_pnl" in out["diffs"], out
+assert check(eng).code == "RISK_DAILY_MAX_LOSS"
+print("[OK] CASE D verify/repair", out["diffs"])
+os.environ.pop("TMF_RISK_STATE_PROBE")
+
+# CASE E: a rolled-back order event leaves the state alone; snapshot path defaults to <db>.risk_state.json
+os.environ.pop("TMF_RISK_STATE_PATH")
+db = td / "e.sqlite3"
+init_db(db)
+eng = RiskEngineV1(db_path=str(db))
+oms = PaperOMS(db)
+assert check(eng).ok and eng.state.path == os.path.abspath(str(db)) + ".risk_state.json" and os.path.exists(eng.state.path)
+orig = oms._apply_fill_to_position_and_trade
+def boom(f):
+    orig(f)
+    raise RuntimeError("after trade insert")
+oms._apply_fill_to_position_and_trade = boom
+o = oms.submit_order(symbol="TMFB6", side="BUY", qty=1, order_type="MARKET")
+try:
+    oms.match(o, market_price=20000.0)
+    raise AssertionError("no error")
+except RuntimeError:
+    pass
+con = sqlite3.connect(str(db))
+assert con.execute("SELECT COUNT(*) FROM trades").fetchone()[0] == 0 and con.execute("SELECT COUNT(*) FROM fills").fetchone()[0] == 0
+con.close()
+assert eng.state.positions == {} and eng.state.fp == (0, "") and eng.verify_risk_state(repair=False)["ok"], eng.state.to_dict()
+print("[OK] CASE E rollback does not move the state", eng.state.path)
+PY
+
+echo "=== [m3 regression risk state v1] PASS $(date -Iseconds) ==="
@@ -0,0 +1,127 @@
+#!/bin/bash
+set -euo pipefail
+cd "$(dirname "$0")/.."
+
+echo "=== [m3 regression safety state shm v1] start $(date -Iseconds) ==="
+
+TD="$(mktemp -d /tmp/tmf_safety_state_shm_reg_XXXXXX)"
+TMF_TD="$TD" \
+python3 - <<'PY'
+import json, os, sqlite3, subprocess, sys, time
+from datetime import datetime, timezone
+from pathlib import Path
+from src.data.store_sqlite_v1 import init_db
+from src.ops.chaos.chaos_drill_v1 import bench_safety_check
+from src.ops.clock_v1 import SimClockV1, use_clock
+from src.safety import safety_state_shm_v1 as shm
+from src.safety.system_safety_v1 import SafetyConfigV1, SystemSafetyEngineV1
+
+td = Path(os.environ["TMF_TD"])
+db = td / "t.sqlite3"
+init_db(db)
+now = datetime.now(timezone.utc)
+con = sqlite3.connect(str(db))
+
+def quote(ep):
+    iso = datetime.fromtimestamp(ep, timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+    con.execute("INSERT INTO events(ts, kind, payload_json, source_file, ingest_ts) VALUES(?,?,?,?,?)",
+                (iso, "bidask_fop_v1", json.dumps({"code": "TMFB6", "bid_price": [100.0], "ask_price": [101.0], "ingest_ts": iso}), "regtest", iso))
+    con.commit()
+
+quote(now.timestamp())
+cfg = SafetyConfigV1(max_bidask_age_seconds=3600)
+META = {"tmf_max_feed_age_ms": 10 ** 9}
+clk = SimClockV1(now.timestamp() + 0.25)
+
+# CASE A: engine writes go to safety_state first, then to the mirror (version bump per write)
+with use_clock(clk):
+    ss = SystemSafetyEngineV1(db_path=str(db), cfg=cfg)
+    assert ss.check_pre_trade(meta=META).code == "OK"
+    m = shm.get_safety_state_shm(str(db))
+    assert m is not None and m.path == str(db) + ".safety_state.mmap" and os.path.getsize(m.path) == shm.SIZE
+    v0 = m.read_hot()[0]
+    ss.request_kill(code="REG_KILL", reason="regtest", details={"n": 1})
+    ver, kill, until, _ = m.read_hot()
+    assert kill and ver == v0 + 1, (ver, v0)
+    v = ss.check_pre_trade(meta=META)
+    db_kill = json.loads(con.execute("SELECT value_json FROM safety_state WHERE key='kill'").fetchone()[0])
+    assert v.code == "SAFETY_KILL_SWITCH" and v.details["kill"] == db_kill, v
+    ss.clear_kill()
+    ss.request_cooldown(seconds=30, code="REG_CD", reason="regtest")
+    v = ss.check_pre_trade(meta=META)
+    assert v.code == "SAFETY_COOLDOWN_ACTIVE" and v.details["cooldown"]["code"] == "REG_CD", v
+    assert m.read_hot()[2] == v.details["cooldown"]["until_epoch"]
+    clk.advance(31)                                       # cooldown expiry is judged on the (sim) clock
+    quote(clk.epoch - 0.25)
+    assert ss.check_pre_trade(meta=META).code == "OK"
+    assert m.read_hot()[0] == v0 + 3
+    ss.request_kill(code="REG_BIG", reason="regtest", details={"blob": "x" * 10000})
+    assert ss.check_pre_trade(meta=META).details["kill"] == {"enabled": True, "code": "REG_BIG", "reason": "regtest", "details_truncated": True}
+    assert len(json.loads(con.execute("SELECT value_json FROM safety_state WHERE key='kill'").fetchone()[0])["details"]["blob"]) == 10000
+    ss.clear_kill()
+print("[OK] CASE A publish + version", m.read_hot()[0])
+
+# CASE B: writers that bypass the engine (direct SQL) are seen by the very next check (PRAGMA data_version moved),
+# no resync wait; checks without a foreign commit never touch safety_state; other processes see the mirror
+with use_clock(clk):
+    assert ss.check_pre_trade(meta=META).code == "OK"            # catches up with CASE A's own commits
+    m.stats["resyncs"] = 0
+    for _ in range(20):
+        assert ss.check_pre_trade(meta=META).code == "OK"
+    assert m.stats["resyncs"] == 0, m.stats
+    con.execute("UPDATE safety_state SET value_json=? WHERE key='kill'", (json.dumps({"enabled": True, "code": "SQL_KILL"}),))
+    con.commit()
+    v = ss.check_pre_trade(meta=META)
+    assert v.code == "SAFETY_KILL_SWITCH" and v.details["kill"]["code"] == "SQL_KILL", v
+    assert m.stats["resyncs"] == 1 and m.read_hot()[1], m.stats
+    con.execute("UPDATE safety_state SET value_json=? WHERE key='cooldown'",
+                (json.dumps({"until_epoch": clk.epoch + 60, "code": "SQL_CD"}),))
+    con.commit()
+    assert ss._get_state("cooldown")["code"] == "SQL_CD"
+    con.execute("UPDATE safety_state SET value_json=? WHERE key='cooldown'", (json.dumps({"until_epoch": 0}),))
+    con.commit()
+    code = "from src.safety.system_safety_v1 import SystemSafetyEngineV1 as E; import sys; E(db_path=sys.argv[1]).clear_kill()"
+    subprocess.run([sys.executable, "-c", code, str(db)], check=True)
+    assert ss.check_pre_trade(meta=META).code == "OK"          # no resync wait: the child published
+    code = ("from src.safety.system_safety_v1 import SystemSafetyEngineV1 as E; import sys; "
+            "print(E(db_path=sys.argv[1])._get_state('kill'))")
+    con.execute("UPDATE safety_state SET value_json=? WHERE key='kill'", (json.dumps({"enabled": True, "code": "SQL_KILL2"}),))
+    con.commit()
+    out = subprocess.run([sys.executable, "-c", code, str(db)], check=True, capture_output=True, text=True).stdout
+    assert "SQL_KILL2" in out, out                              # first use in a process always resyncs
+    ss.clear_kill()
+print("[OK] CASE B external SQL kill on the next check", m.stats["resyncs"], "resyncs")
+
+# CASE C: TMF_SAFETY_STATE_SHM=0 -> same verdicts from safety_state; a corrupt mirror is rebuilt from the DB
+os.environ["TMF_SAFETY_STATE_SHM"] = "0"
+with use_clock(clk):
+    off = SystemSafetyEngineV1(db_path=str(db), cfg=cfg)
+    assert off._shm() is False
+    off.request_cooldown(seconds=60, code="OFF_CD", reason="regtest")
+    assert off.check_pre_trade(meta=META).code == "SAFETY_COOLDOWN_ACTIVE"
+os.environ["TMF_SAFETY_STATE_SHM"] = "1"
+raw = bytearray(Path(m.path).read_bytes()); raw[:8] = b"garbage!"; Path(m.path).write_bytes(bytes(raw))
+code = ("from src.safety.system_safety_v1 import SystemSafetyEngineV1 as E; import sys; "
+        "print(E(db_path=sys.argv[1]).check_pre_trade(meta={'tmf_max_feed_age_ms': 10**9}).code)")
+out = subprocess.run([sys.executable, "-c", code, str(db)], check=True, capture_output=True, text=True).stdout
+assert out.strip() == "SAFETY_COOLDOWN_ACTIVE", out
+with use_clock(clk):
+    ss.clear_cooldown()
+print("[OK] CASE C shm off + mirror rebuild")
+
+# CASE D: one quote lookup per check (staleness + latency budget); cross-process toggles never tear
+with use_clock(clk):
+    calls = []
+    orig = ss._latest_event_by_code
+    ss._latest_event_by_code = lambda *a, **k: (calls.append(1), orig(*a, **k))[1]
+    clk.advance(2.0)
+    v = ss.check_pre_trade(meta={})
+    assert len(calls) == 1, calls
+    assert v.code == "SAFETY_COOLDOWN_ACTIVE" and v.details["metrics"]["feed_age_ms"] == 2250, v.details
+    ss.clear_cooldown()
+b = bench_safety_check(str(td / "bench.sqlite3"), SafetyConfigV1(), n=300, toggles=60)
+assert b["pass"] and b["propagation"]["torn_reads"] == 0 and b["propagation"]["version_delta"] >= 60, b
+print("[OK] CASE D single scan + chaos bench shm p50", b["shm"]["p50_us"], "us db p50", b["db"]["p50_us"], "us")
+PY
+
+echo "=== [m3 regression safety state shm v1] PASS $(date -Iseconds) ==="
@@ -0,0 +1,124 @@
+#!/bin/bash
+set -euo pipefail
+cd "$(dirname "$0")/.."
+
+echo "=== [m3 regression split batch v1] start $(date -Iseconds) ==="
+
+TD="$(mktemp -d /tmp/tmf_split_batch_reg_XXXXXX)"
+TMF_IGNORE_MARKET_CALENDAR=1 TMF_GATE_TIMING=1 TMF_TD="$TD" \
+python3 - <<'PY'
+import json, os, sqlite3
+from pathlib import Path
+from src.data.store_sqlite_v1 import init_db
+from src.oms.paper_oms_v1 import PaperOMS
+from src.oms.paper_oms_risk_safety_wrapper_v1 import PaperOMSRiskSafetyWrapperV1
+from src.risk.risk_engine_v1 import RiskEngineV1
+from src.safety.system_safety_v1 import SafetyConfigV1, SystemSafetyEngineV1
+
+td = Path(os.environ["TMF_TD"])
+META = {"ref_price": 20000.0, "stop_price": 19990.0, "session_hint": "DAY"}
+SKIP = ("gate_timing", "correlation_id", "split_parent_id", "order_id", "broker_order_id", "ts", "open_exposure")
+
+def norm(x):
+    if isinstance(x, dict):
+        return {k: norm(v) for k, v in x.items() if k not in SKIP}
+    if isinstance(x, list):
+        return [norm(v) for v in x]
+    if hasattr(x, "order_id"):
+        return norm({k: getattr(x, k) for k in ("symbol", "side", "qty", "order_type", "price", "status", "filled_qty", "meta")})
+    return x
+
+def wrapper(name):
+    db = td / f"{name}.sqlite3"
+    init_db(db)
+    return PaperOMSRiskSafetyWrapperV1(paper_oms=PaperOMS(db), risk=RiskEngineV1(db_path=str(db)),
+                                       safety=SystemSafetyEngineV1(db_path=str(db), cfg=SafetyConfigV1(require_recent_bidask=0)),
+                                       db_path=str(db)), db
+
+def rows(db):
+    con = sqlite3.connect(str(db))
+    try:
+        return [list(r[:9]) + [norm(json.loads(r[9]))] for r in
+                con.execute("SELECT symbol, side, qty, price, order_type, status, verdict, decision, action, meta_json FROM orders ORDER BY id")]
+    finally:
+        con.close()
+
+# CASE A: batched SPLIT == one-by-one SPLIT (results, children, orders rows incl. the parent audit row)
+out = {}
+for flag in ("0", "1"):
+    os.environ["TMF_SPLIT_BATCH"] = flag
+    for case, qty, meta in (("split50", 50, META), ("no_stop", 12, {"ref_price": 20000.0, "session_hint": "DAY"})):
+        w, db = wrapper(f"{case}_{flag}")
+        r = w.place_order(symbol="TMF", side="BUY", qty=qty, order_type="MARKET", meta=dict(meta, correlation_id="c1"))
+        out[(case, flag)] = (norm(r), rows(db))
+for case in ("split50", "no_stop"):
+    assert out[(case, "0")] == out[(case, "1")], case
+r, rr = out[("split50", "1")]
+assert r["status"] == "SPLIT_SUBMITTED" and len(r["exec"]["details"]["children"]) == 25 and len(rr) == 26, (r["status"], len(rr))
+assert rr[-1][5] == "SPLIT_SUBMITTED" and len(rr[-1][9]["split_children"]) == 25
+assert out[("no_stop", "1")][0]["status"] == "REJECTED" and len(out[("no_stop", "1")][1]) == 1
+print("[OK] CASE A batch == per-child", len(rr), "rows")
+
+# CASE B: shared gates once per batch, children + parent row in one INSERT/transaction
+os.environ["TMF_SPLIT_BATCH"] = "1"
+w, db = wrapper("once")
+calls = {"safety": 0, "ins": 0, "risk_state": 0}
+s0, i0, k0 = w.safety.check_pre_trade, w.paper_oms._ins_orders, w.risk._check_state
+w.safety.check_pre_trade = lambda **k: (calls.__setitem__("safety", calls["safety"] + 1), s0(**k))[1]
+w.paper_oms._ins_orders = lambda *a, **k: (calls.__setitem__("ins", calls["ins"] + 1), i0(*a, **k))[1]
+w.risk._check_state = lambda *a, **k: (calls.__setitem__("risk_state", calls["risk_state"] + 1), k0(*a, **k))[1]
+r = w.place_order(symbol="TMF", side="SELL", qty=50, order_type="MARKET", meta=dict(META, stop_price=20010.0))
+assert r["status"] == "SPLIT_SUBMITTED", r
+# one safety check for the parent (SPLIT decision) + one for the whole batch
+assert calls == {"safety": 2, "ins": 1, "risk_state": 1}, calls
+ch = r["exec"]["details"]["children"]
+gt = ch[0].meta["gate_timing"]
+assert gt["batch_size"] == 25 and "oms" in gt["ms"] and "audit" in gt["ms"] and all(c.meta["split_index"] == i for i, c in enumerate(ch)), gt
+print("[OK] CASE B one pass of shared gates, one insert", calls)
+
+# CASE C: place_orders_batch with a reject mid-batch (reject persisted like a single order)
+w, db = wrapper("mid")
+orders = [dict(symbol="TMF", side="BUY", qty=1.0, order_type="MARKET", meta=dict(META, n=i)) for i in range(4)]
+orders[2]["meta"] = {"ref_price": 20000.0, "session_hint": "DAY", "n": 2}             # no stop -> risk reject
+res = w.place_orders_batch(orders)
+assert len(res) == 3 and all(hasattr(x, "order_id") for x in res[:2]) and res[2]["status"] == "REJECTED", res
+st = [r[5] for r in rows(db)]
+assert st == ["NEW", "NEW", "REJECTED"], st
+res = w.place_orders_batch(orders, stop_on_reject=False)
+assert [hasattr(x, "order_id") for x in res] == [True, True, False, True], res
+assert [r[9]["n"] for r in rows(db)][3:] == [0, 1, 2, 3]
+print("[OK] CASE C mid-batch reject", st)
+
+# CASE D: a shared-gate reject (kill switch) rejects the batch through the normal reject path
+w, db = wrapper("kill")
+w.safety.request_kill(code="REG_KILL", reason="regtest")
+res = w.place_orders_batch(orders[:2])
+assert len(res) == 1 and res[0]["status"] == "REJECTED" and res[0]["safety"]["code"] == "SAFETY_KILL_SWITCH", res
+assert [r[5] for r in rows(db)] == ["REJECTED"]
+assert w.place_orders_batch([]) == []
+print("[OK] CASE D shared gate reject")
+
+# CASE E: a batch reject is persisted from the batch verdict (no second gate pass, even if a re-check would pass),
+# with the same row / policy action / result as a single-order reject
+from src.risk.risk_engine_v1 import RiskVerdict
+w, db = wrapper("verdict")
+calls = {"safety": 0, "risk": 0}
+s0, r0, b0 = w.safety.check_pre_trade, w.risk.check_pre_trade, w.risk.check_pre_trade_batch
+w.safety.check_pre_trade = lambda **k: (calls.__setitem__("safety", calls["safety"] + 1), s0(**k))[1]
+w.risk.check_pre_trade = lambda *a, **k: (calls.__setitem__("risk", calls["risk"] + 1), r0(*a, **k))[1]
+LOSS = RiskVerdict(False, "RISK_CONSEC_LOSS_COOLDOWN", "batch saw the loss streak", {"n": 1})
+w.risk.check_pre_trade_batch = lambda rq: [LOSS if i == 1 else v for i, v in enumerate(b0(rq))]
+res = w.place_orders_batch([orders[0], orders[1], orders[3]], stop_on_reject=False)
+assert calls == {"safety": 1, "risk": 0}, calls
+assert [hasattr(x, "order_id") for x in res] == [True, False, True] and res[1]["risk"]["code"] == "RISK_CONSEC_LOSS_COOLDOWN", res
+got = rows(db)
+assert [r[5] for r in got] == ["NEW", "REJECTED", "NEW"] and got[1][6:9] == ["RISK_CONSEC_LOSS_COOLDOWN", "RISK", "COOLDOWN"], got[1]
+assert s0(meta=dict(META)).code == "SAFETY_COOLDOWN_ACTIVE"                   # policy action applied once
+w2, db2 = wrapper("verdict_single")
+w2.risk.check_pre_trade = lambda *a, **k: LOSS
+single = w2.place_order(**orders[1])
+assert norm(res[1]) == norm(single) and rows(db2)[0] == got[1], (rows(db2)[0], got[1])
+print("[OK] CASE E reject from the batch verdict", [r[5] for r in got])
+PY
+
+echo "=== [m3 regression split batch v1] PASS $(date -Iseconds) ==="
@@ -0,0 +1,71 @@
+#!/bin/bash
+set -euo pipefail
+cd "$(dirname "$0")/.."
+
+echo "=== [m3 regression sqlite shared conn v1] start $(date -Iseconds) ==="
+
+python3 - <<'PY'
+import json, sqlite3, tempfile, threading
+from pathlib import Path
+from src.data.quotes_l5_v1 import sync_quotes_l5
+from src.data.store_sqlite_v1 import init_db
+from src.data.sqlite_conn_v1 import get_conn_manager
+from src.oms.paper_oms_v1 import PaperOMS
+from src.safety.system_safety_v1 import SafetyConfigV1, SystemSafetyEngineV1
+
+td = Path(tempfile.mkdtemp(prefix="tmf_sqlite_conn_reg_"))
+db = td / "t.sqlite3"
+init_db(db)
+mgr = get_conn_manager(db)
+other = sqlite3.connect(str(db))
+
+# pragmas applied on managed connections
+c = mgr.connection()
+assert c.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+assert int(c.execute("PRAGMA synchronous").fetchone()[0]) == 1
+
+# one order = one transaction: nothing visible to other connections until the outer block exits
+oms = PaperOMS(db)
+o = oms.place_order(symbol="TMFB6", side="BUY", qty=1.0, order_type="MARKET", meta={})
+with oms._tx():
+    oms.match(o, market_price=20000.0)
+    assert other.execute("SELECT COUNT(1) FROM fills").fetchone()[0] == 0
+assert other.execute("SELECT COUNT(1) FROM fills").fetchone()[0] == 1
+assert other.execute("SELECT status FROM orders WHERE broker_order_id=?", (o.order_id,)).fetchone()[0] == "FILLED"
+
+# an exception inside the order transaction rolls back every write of that order
+n0 = mgr.stats["tx_rollbacks"]
+o2 = oms.place_order(symbol="TMFB6", side="SELL", qty=1.0, order_type="MARKET", meta={})
+orig = oms._apply_fill_to_position_and_trade
+oms._apply_fill_to_position_and_trade = lambda f: (_ for _ in ()).throw(RuntimeError("boom"))
+try:
+    oms.match(o2, market_price=20001.0)
+    raise AssertionError("expected failure")
+except RuntimeError:
+    pass
+oms._apply_fill_to_position_and_trade = orig
+assert mgr.stats["tx_rollbacks"] == n0 + 1
+assert other.execute("SELECT COUNT(1) FROM fills").fetchone()[0] == 1
+assert other.execute("SELECT status FROM orders WHERE broker_order_id=?", (o2.order_id,)).fetchone()[0] == "NEW"
+
+# long-lived reader still sees rows committed by other connections (no stale snapshot)
+eng = SystemSafetyEngineV1(db_path=str(db), cfg=SafetyConfigV1())
+for i in range(3):
+    other.execute("INSERT INTO events(ts, kind, payload_json, source_file, ingest_ts) VALUES(?,?,?,?,?)",
+                  (f"2026-02-06T09:00:0{i}", "bidask_fop_v1", json.dumps({"code": "TMFB6", "bid": 1.0 + i, "ask": 2.0 + i}), "recorder", "x"))
+    other.commit()
+    sync_quotes_l5(other)  # writer step
+    con = eng._con()
+    ev = eng._latest_event_by_code(con, kind="bidask_fop_v1", code="TMFB6")
+    con.close()
+    assert ev and ev[2]["bid_price"] == [1.0 + i], ev
+
+# per-thread connections
+seen = []
+t = threading.Thread(target=lambda: seen.append(mgr.connection()))
+t.start(); t.join()
+assert seen[0] is not mgr.connection()
+print("[OK] shared conn: pragmas, one tx per order, rollback, fresh reads, per-thread")
+PY
+
+echo "=== [m3 regression sqlite shared conn v1] PASS $(date -Iseconds) ==="
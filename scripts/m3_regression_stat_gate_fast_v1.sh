@@ -0,0 +1,82 @@
+#!/bin/bash
+set -euo pipefail
+cd "$(dirname "$0")/.."
+
+echo "=== [m3 regression stat gate fast v1] start $(date -Iseconds) ==="
+
+python3 - <<'PY'
+import random
+from src.research import stat_gate_fast_v1 as F
+from src.research import stat_gate_v1 as R
+
+def fixture(n, T, seed, edge=0.0):
+    rng = random.Random(seed)
+    out = {}
+    for j in range(n):
+        mu = edge if j == 0 else 0.0
+        out[f"s{j:03d}"] = [rng.gauss(mu, 0.01) for _ in range(T - (j % 3))]  # ragged -> common length
+    return out
+
+# CASE A: PBO / RC / full gate equal the reference (same seed)
+for n, T, edge in ((2, 200, 0.0), (5, 400, 0.002), (12, 333, 0.0), (8, 256, 0.004)):
+    sr = fixture(n, T, seed=n * 31 + T, edge=edge)
+    for S in (4, 8):
+        a, b = R.pbo_cscv(sr, n_slices=S), F.pbo_cscv_fast(sr, n_slices=S)
+        assert a == b, ("pbo", n, T, S, a, b)
+    for block, seed in ((10, 7), (7, 3), (1, 11)):
+        a = R.reality_check_pvalue(sr, block=block, n_boot=200, seed=seed)
+        b = F.reality_check_pvalue_fast(sr, block=block, n_boot=200, seed=seed, chunk=37)
+        assert a == b, ("rc", n, T, block, seed, a, b)
+    ra = R.run_stat_gate_v1(sr, n_trials=n, ann_factor=252)
+    fa = F.run_stat_gate_fast_v1(sr, n_trials=n, ann_factor=252)
+    assert (ra.ok, ra.code, ra.details["best"]) == (fa.ok, fa.code, fa.details["best"]), (ra, fa)
+    assert ra.details["pbo"] == fa.details["pbo"] and ra.details["rc_p"] == fa.details["rc_p"], (ra, fa)
+    assert abs(ra.details["dsr"] - fa.details["dsr"]) < 1e-12
+print("[OK] CASE A parity with stat_gate_v1", F.engine_info())
+
+# CASE B: block starts follow the reference RNG order exactly
+rng = random.Random(5)
+exp = [[rng.randrange(0, 23) for _ in range(3)] for _ in range(4)]
+assert F.bootstrap_block_starts(23, block=10, n_boot=4, seed=5) == exp
+print("[OK] CASE B bootstrap index array matches reference draw order")
+
+# CASE C: guards identical
+assert F.pbo_cscv_fast({"a": [0.1] * 100}) == 1.0
+assert F.pbo_cscv_fast({"a": [0.1] * 30, "b": [0.2] * 30}) == 1.0
+assert F.reality_check_pvalue_fast({}) == 1.0 and F.reality_check_pvalue_fast({"a": [1.0] * 4}) == 1.0
+try:
+    F.pbo_cscv_fast({"a": [0.0] * 100, "b": [0.0] * 100}, n_slices=5)
+    raise AssertionError("odd n_slices accepted")
+except ValueError:
+    pass
+assert F.run_stat_gate_fast_v1({}).code == "STAT_EMPTY"
+print("[OK] CASE C guards")
+
+# CASE D: numpy path vs plain-Python path vs reference (only where numpy is importable)
+if F.np is None:
+    print("[SKIP] CASE D numpy not installed")
+else:
+    np_mod = F.np
+    for n, T, edge in ((2, 200, 0.0), (5, 400, 0.002), (12, 333, 0.0), (8, 256, 0.004), (40, 500, 0.001)):
+        sr = fixture(n, T, seed=n * 31 + T, edge=edge)
+        got = {}
+        for eng in ("numpy", "stdlib"):
+            F.np = np_mod if eng == "numpy" else None
+            try:
+                got[eng] = ({S: F.pbo_cscv_fast(sr, n_slices=S) for S in (4, 8)},
+                            F.reality_check_pvalue_fast(sr, block=10, n_boot=200, seed=7, chunk=37),
+                            F.run_stat_gate_fast_v1(sr, n_trials=n, ann_factor=252))
+            finally:
+                F.np = np_mod
+        ref_rc = R.reality_check_pvalue(sr, block=10, n_boot=200, seed=7)
+        for S in (4, 8):
+            n_splits = len(list(__import__("itertools").combinations(range(S), S // 2)))
+            assert got["stdlib"][0][S] == R.pbo_cscv(sr, n_slices=S), (n, T, S)
+            assert abs(got["numpy"][0][S] - got["stdlib"][0][S]) <= 1.0 / n_splits + 1e-12, (n, T, S, got)
+        assert got["stdlib"][1] == ref_rc and abs(got["numpy"][1] - ref_rc) <= 1.0 / 201 + 1e-12, (n, T, got, ref_rc)
+        a, b = got["numpy"][2], got["stdlib"][2]
+        assert (a.ok, a.code) == (b.ok, b.code) and abs(a.details["dsr"] - b.details["dsr"]) < 1e-9, (a, b)
+    print("[OK] CASE D numpy path within one count of the reference (PBO split / RC resample)")
+PY
+
+echo "=== [m3 regression stat gate fast v1] PASS $(date -Iseconds) ==="
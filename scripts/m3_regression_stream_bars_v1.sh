@@ -0,0 +1,97 @@
+#!/bin/bash
+set -euo pipefail
+cd "$(dirname "$0")/.."
+
+echo "=== [m3 regression stream bars v1] start $(date -Iseconds) ==="
+
+python3 - <<'PY'
+import json, random, socket, sqlite3, tempfile
+from pathlib import Path
+from src.data.build_bars_1m_v1 import _ensure_schema, build_bars_1m_from_events, build_bars_1m_incremental, STREAM_SOURCE
+from src.data.stream_bars_v1 import BarsDbSinkV1, QueueBarSinkV1, StreamBarAggregatorV1, UdpBarSinkV1, parse_intervals
+
+assert parse_intervals("5,15s,1m,5m") == [5, 15, 60, 300]
+
+rnd = random.Random(5)
+ticks = []
+for i in range(900):
+    sec = i * 2
+    ts = f"2026-02-06T09:{(sec // 60) % 60:02d}:{sec % 60:02d}.{i % 1000:03d}"
+    ticks.append({"code": "TMFB6", "datetime": ts, "close": 20000 + rnd.randint(-20, 20), "volume": rnd.randint(1, 3)})
+
+with tempfile.TemporaryDirectory() as td:
+    db_full = str(Path(td) / "full.sqlite3")
+    db_stream = str(Path(td) / "stream.sqlite3")
+    for db in (db_full, db_stream):
+        con = sqlite3.connect(db)
+        con.execute("CREATE TABLE events (id INTEGER PRIMARY KEY AUTOINCREMENT, ts TEXT NOT NULL, kind TEXT NOT NULL, payload_json TEXT NOT NULL, source_file TEXT NOT NULL, ingest_ts TEXT NOT NULL)")
+        _ensure_schema(con)
+        con.executemany("INSERT INTO events(ts, kind, payload_json, source_file, ingest_ts) VALUES(?,?,?,?,?)",
+                        [(t["datetime"], "tick_fop_v1", json.dumps(t), "regtest", t["datetime"]) for t in ticks])
+        con.commit(); con.close()
+    build_bars_1m_from_events(db_path=db_full, since_ymd=None, kinds=["tick_fop_v1"])
+
+    rx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    rx.bind(("127.0.0.1", 0)); rx.settimeout(1.0)
+    qs = QueueBarSinkV1()
+    sub = qs.subscribe(maxsize=10000)
+    agg = StreamBarAggregatorV1(intervals_sec=[5, 60, 300])
+    sink = BarsDbSinkV1(db_stream)
+    agg.add_sink(sink)
+    agg.add_late_tick_sink(sink.on_late_tick)
+    agg.add_sink(qs)
+    agg.add_sink(UdpBarSinkV1("127.0.0.1", rx.getsockname()[1]))
+    for t in ticks:
+        assert agg.on_tick_payload(t)
+    agg.flush_all()
+    sink.flush()
+
+    q = "SELECT ts_min, asset_class, symbol, o, h, l, c, v, n_trades FROM bars_1m ORDER BY ts_min"
+    a = sqlite3.connect(db_full).execute(q).fetchall()
+    b = sqlite3.connect(db_stream).execute(q).fetchall()
+    assert a == b and len(a) == 30, (len(a), len(b))
+
+    got = []
+    while not sub.empty():
+        got.append(sub.get_nowait())
+    n_by_iv = {iv: sum(1 for x in got if x["interval_sec"] == iv) for iv in (5, 60, 300)}
+    assert n_by_iv == {5: 360, 60: 30, 300: 6}, n_by_iv
+    assert all(not k.startswith("_") for k in got[0])
+    d = json.loads(rx.recv(65536).decode("utf-8"))
+    assert d["kind"] == "bar_v1" and d["closed"] is True, d
+
+    # incremental builder leaves stream-owned bars alone
+    r = build_bars_1m_incremental(db_path=db_stream, since_ymd=None, kinds=["tick_fop_v1"])
+    assert r["stream_owned"] == len(ticks) and r["bars_upserted"] == 0, r
+    c = sqlite3.connect(db_stream).execute(q).fetchall()
+    assert c == b
+    assert sqlite3.connect(db_stream).execute("SELECT COUNT(1) FROM bars_1m WHERE source != ?", (STREAM_SOURCE,)).fetchone()[0] == 0
+    print(f"[OK] stream bars == rebuild bars_1m={len(a)} stats={agg.stats}")
+
+    # sinks run outside the aggregator lock; the DB sink only enqueues (writer thread commits)
+    seen = []
+    agg2 = StreamBarAggregatorV1(intervals_sec=[60], keep_closed=1)
+    agg2.add_sink(lambda b: seen.append(agg2._lock.locked()))
+    late_db = str(Path(td) / "late.sqlite3")
+    con = sqlite3.connect(late_db); _ensure_schema(con); con.close()
+    sink2 = BarsDbSinkV1(late_db)
+    agg2.add_sink(sink2)
+    agg2.add_late_tick_sink(sink2.on_late_tick)
+    from datetime import datetime
+    for m in range(4):
+        agg2.on_tick("TMFB6", datetime(2026, 2, 6, 9, m, 10), 20000.0 + m, 1.0)
+    assert seen and not any(seen), seen
+    # late tick for 09:00 (trimmed: keep_closed=1 holds only 09:02) -> merged into the stored stream bar
+    agg2.on_tick("TMFB6", datetime(2026, 2, 6, 9, 0, 50), 19990.0, 2.0)
+    # late tick for a minute that was never written -> the incremental builder keeps owning it
+    agg2.on_tick("TMFB6", datetime(2026, 2, 6, 8, 59, 50), 19995.0, 1.0)
+    agg2.flush_all()
+    sink2.close()
+    rows = sqlite3.connect(late_db).execute("SELECT ts_min, o, h, l, c, v, n_trades FROM bars_1m ORDER BY ts_min").fetchall()
+    assert rows[0] == ("2026-02-06T09:00", 20000.0, 20000.0, 19990.0, 19990.0, 3.0, 2), rows
+    assert agg2.stats["late_routed"] == 2 and agg2.stats["late_dropped"] == 0, agg2.stats
+    assert sink2.stats["late_merged"] == 1 and sink2.stats["late_missing"] == 1 and sink2.stats["dropped"] == 0, sink2.stats
+    print(f"[OK] late ticks routed to the DB sink {sink2.stats}")
+PY
+
+echo "=== [m3 regression stream bars v1] PASS $(date -Iseconds) ==="
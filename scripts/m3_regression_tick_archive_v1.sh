@@ -0,0 +1,145 @@
+#!/bin/bash
+set -euo pipefail
+cd "$(dirname "$0")/.."
+
+echo "=== [m3 regression tick archive v1] start $(date -Iseconds) ==="
+
+TD="$(mktemp -d /tmp/tmf_tick_archive_reg_XXXXXX)"
+TMF_IGNORE_MARKET_CALENDAR=1 TMF_STRATEGIES=trend TMF_TREND_FORCE_FIRST_SIGNAL=1 TMF_TREND_FORCE_STOP_PTS=30 TMF_TD="$TD" \
+python3 - <<'PY'
+import json, os, sqlite3
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from src.data import tick_archive_v1 as ta
+from src.data.build_bars_1m_v1 import _ensure_schema, build_bars_1m_from_archive, build_bars_1m_from_events
+from src.sim.backtest_bars_v1 import load_bars_1m, load_bars_1m_from_archive
+from src.sim.replay_engine_v1 import ReplayConfigV1, ReplayEngineV1
+
+td = Path(os.environ["TMF_TD"])
+L0 = datetime(2025, 3, 5, 23, 57, 0)           # exchange local time; the log crosses local midnight
+TW = timezone(timedelta(hours=8))
+
+def rec(i, kind, payload):
+    loc = L0 + timedelta(milliseconds=500 * i)
+    utc = loc.replace(tzinfo=TW).astimezone(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+    payload = dict(payload, datetime=loc.isoformat(timespec="microseconds"), ingest_ts=utc, source_file="regtest")
+    return {"ts": utc, "kind": kind, "payload": payload}
+
+rows = []
+for i in range(720):                               # 6 minutes, 2 quotes + 2 ticks per second
+    px = 20000.0 + (i % 37) * 0.5 + i // 10
+    rows.append(rec(i, "bidask_fop_v1", {"code": "TMFB6", "bid_price": [px - k for k in range(5)],
+                                          "ask_price": [px + 1 + k for k in range(5)], "bid_volume": [3, 4, 5, 6, 7],
+                                          "ask_volume": [7, 6, 5, 4, 3], "synthetic": False}))
+    rows.append(rec(i, "tick_fop_v1", {"code": "TMFB6", "close": px + 0.5, "volume": 1 + i % 3, "tick_type": 1 + i % 2,
+                                        "simtrade": False, "synthetic": False}))
+    if i % 4 == 0:
+        rows.append(rec(i, "tick_fop_v1", {"code": "MXFB6", "close": 100.25, "volume": 2}))
+rows.append({"ts": rows[0]["ts"], "kind": "session_start", "payload": {"msg": "start"}})
+src = td / "rec.jsonl"
+src.write_text("".join(json.dumps(r) + "\n" for r in rows), encoding="utf-8")
+
+# CASE A: convert -> per day / code / kind files with sidecars; compact
+root = td / "archive"
+rep = ta.convert_jsonl([str(src)], str(root))
+st = rep["stats"]
+assert st["added"] == len(rows) - 1 and st["skipped_kind"] == 1 and st["price_off_grid"] == 0, st
+names = sorted(str(Path(f["path"]).relative_to(root)) for f in rep["files"])
+assert names == ["2025-03-05/MXFB6.tick_fop_v1.tav1", "2025-03-05/TMFB6.bidask_fop_v1.tav1", "2025-03-05/TMFB6.tick_fop_v1.tav1",
+                 "2025-03-06/MXFB6.tick_fop_v1.tav1", "2025-03-06/TMFB6.bidask_fop_v1.tav1", "2025-03-06/TMFB6.tick_fop_v1.tav1"], names
+assert ta.main(["--verify", "--out-dir", str(root)]) == 0
+size = sum(f["bytes"] for f in rep["files"])
+assert size * 5 < src.stat().st_size, (size, src.stat().st_size)
+p_tick = str(root / "2025-03-05/TMFB6.tick_fop_v1.tav1")
+with ta.TickArchiveV1(p_tick, verify=True) as a:
+    assert (a.code, a.day, a.kind, a.n, a.price_scale, a.tz_offset_min) == ("TMFB6", "2025-03-05", "tick_fop_v1", 360, 100, 480)
+bad = root / "2025-03-06/TMFB6.tick_fop_v1.tav1"
+raw = bytearray(bad.read_bytes()); raw[100] ^= 1; bad.write_bytes(bytes(raw))
+try:
+    ta.TickArchiveV1(str(bad), verify=True)
+    raise AssertionError("sha mismatch not detected")
+except ValueError:
+    pass
+try:
+    ta.convert_jsonl([str(src)], str(root))                     # a damaged day file is never merged into
+    raise AssertionError("merged into a damaged archive")
+except ValueError:
+    pass
+ta.convert_jsonl([str(src)], str(root), merge=False)
+print("[OK] CASE A convert", len(rep["files"]), "files", size, "bytes vs jsonl", src.stat().st_size)
+
+# CASE B: lossless round trip + zero-copy time-range slices
+with ta.TickArchiveV1(str(root / "2025-03-05/TMFB6.bidask_fop_v1.tav1")) as a:
+    got = list(a.iter_records())
+    want = [r for r in rows if r["kind"] == "bidask_fop_v1" and r["payload"]["datetime"] < "2025-03-06"]
+    assert len(got) == len(want) == 360
+    for (ns, kind, p), r in zip(got, want):
+        q = r["payload"]
+        assert kind == "bidask_fop_v1" and p["datetime"] == q["datetime"] and ns == ta.to_ns(r["ts"]), (p, q)
+        assert [p[k] for k in ("bid_price", "ask_price", "bid_volume", "ask_volume")] == [q[k] for k in ("bid_price", "ask_price", "bid_volume", "ask_volume")]
+    i0, i1 = a.index_range("2025-03-05T23:58:00", "2025-03-05T23:59:00")
+    assert (i0, i1) == (120, 240), (i0, i1)
+    c = a.slice("2025-03-05T23:58:00", "2025-03-05T23:59:00")
+    assert len(c["ts_ns"]) == 120 and c["bid_price_1"][0] == a.cols["bid_price_1"][120]
+    base = getattr(c["ts_ns"], "base", None) if ta.np is not None else c["ts_ns"].obj
+    assert base is not None                              # a view, not a copy
+with ta.TickArchiveV1(p_tick) as a:
+    t = [r for r in rows if r["kind"] == "tick_fop_v1" and r["payload"]["code"] == "TMFB6"][:360]
+    assert [(p["close"], p["volume"], p["tick_type"]) for _, _, p in a.iter_records()] == \
+        [(r["payload"]["close"], r["payload"]["volume"], r["payload"]["tick_type"]) for r in t]
+print("[OK] CASE B round trip + slice", (i0, i1), "numpy" if ta.np is not None else "memoryview")
+
+# CASE C: bar builder / backtest from the archive == from events / bars_1m
+db_e, db_a = td / "events.sqlite3", td / "archive.sqlite3"
+for db in (db_e, db_a):
+    con = sqlite3.connect(str(db))
+    con.execute("CREATE TABLE events (id INTEGER PRIMARY KEY AUTOINCREMENT, ts TEXT NOT NULL, kind TEXT NOT NULL, payload_json TEXT NOT NULL, source_file TEXT NOT NULL, ingest_ts TEXT NOT NULL)")
+    _ensure_schema(con)
+    if db == db_e:
+        con.executemany("INSERT INTO events(ts, kind, payload_json, source_file, ingest_ts) VALUES (?,?,?,?,?)",
+                        [(r["ts"], r["kind"], json.dumps(r["payload"]), "regtest", r["ts"]) for r in rows])
+    con.commit(); con.close()
+r1 = build_bars_1m_from_events(db_path=str(db_e), since_ymd=None, kinds=["tick_fop_v1"])
+r2 = build_bars_1m_from_archive(db_path=str(db_a), archive_paths=sorted(str(p) for p in root.glob("*/*.tick_fop_v1.tav1")))
+q = "SELECT ts_min, asset_class, symbol, o, h, l, c, v, n_trades FROM bars_1m ORDER BY symbol, ts_min"
+b1 = sqlite3.connect(str(db_e)).execute(q).fetchall()
+b2 = sqlite3.connect(str(db_a)).execute(q).fetchall()
+assert b1 == b2 and len(b1) == 12 and r1["tick_rows"] == r2["tick_rows"], (r1, r2, b1[:2], b2[:2])
+assert b1[3][0] == "2025-03-06T00:00", b1[3]
+x, y = load_bars_1m(str(db_a), "TMFB6"), load_bars_1m_from_archive(str(root), "TMFB6")
+assert x.ts == y.ts and list(x.c) == list(y.c) and list(x.v) == list(y.v)
+y2 = load_bars_1m_from_archive(str(root), "TMFB6", since="2025-03-05T23:59", until="2025-03-06T00:01")
+assert y2.ts == ["2025-03-05T23:59", "2025-03-06T00:00", "2025-03-06T00:01"], y2.ts
+rep_db = ta.convert_events_db(str(db_e), str(td / "archive_db"))
+assert sorted(f["sha256"] for f in rep_db["files"]) == sorted(f["sha256"] for f in ta.convert_jsonl([str(src)], str(td / "archive2"))["files"])
+print("[OK] CASE C bars from archive == bars from events", len(b1), "bars")
+
+# CASE D: replay engine over the archives takes the same decisions as over the JSONL
+cfg = ReplayConfigV1(fop_code="TMFB6", max_bidask_age_seconds=15)
+ra = ReplayEngineV1(db_path=str(td / "rj.sqlite3"), cfg=cfg).run([str(src)])
+paths = sorted(str(p) for p in root.glob("*/TMFB6.*.tav1"))
+rb = ReplayEngineV1(db_path=str(td / "ra.sqlite3"), cfg=cfg).run(paths)
+assert ra["counters"]["orders_sent"] == 1 and rb["counters"]["bars"] == ra["counters"]["bars"] == 6, (ra["counters"], rb["counters"])
+assert ra["decision_log_sha256"] == rb["decision_log_sha256"], (ra, rb)
+print("[OK] CASE D replay from archive", rb["counters"]["events"], "events, decisions sha", rb["decision_log_sha256"][:12])
+
+# CASE E: partial-day conversion (--db --since) merges into the day file; re-runs are no-ops
+root_e = td / "archive_e"
+full = {Path(f["path"]).name + Path(f["path"]).parent.name: f["sha256"] for f in rep_db["files"]}
+cut = rows[400]["ts"]
+assert ta.main(["--db", str(db_e), "--out-dir", str(root_e)]) == 0
+rep_p = ta.convert_events_db(str(db_e), str(root_e), since=cut)
+assert rep_p["stats"]["added"] < len(rows) - 1 and rep_p["stats"]["merged_kept"] > 0, rep_p["stats"]
+assert {Path(f["path"]).name + Path(f["path"]).parent.name: f["sha256"] for f in rep_p["files"]}.items() <= full.items()
+rep_r = ta.convert_events_db(str(db_e), str(root_e), since=cut, merge=False)         # explicit replace drops the earlier part
+with ta.TickArchiveV1(str(root_e / "2025-03-05/TMFB6.tick_fop_v1.tav1")) as a:
+    assert a.n < 360, a.n
+ta.convert_events_db(str(db_e), str(root_e))
+ta.convert_jsonl([str(src)], str(root_e))
+assert sorted(str(p.relative_to(root_e)) for p in root_e.glob("*/*.tav1")) == names
+assert all(ta._sha256_file(p) == full[p.name + p.parent.name] for p in root_e.glob("*/*.tav1"))
+assert ta.to_ns(1741190400000000000) == ta.to_ns(1741190400000000000.0) == ta.to_ns("2025-03-05T16:00:00Z")
+print("[OK] CASE E partial-day merge, idempotent re-convert", rep_p["stats"]["merged_kept"], "records kept")
+PY
+
+echo "=== [m3 regression tick archive v1] PASS $(date -Iseconds) ==="
@@ -0,0 +1,351 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from src.broker.recorder_db_v1 import DB_KINDS, INSERT_EVENT_SQL, ensure_events_table, event_row, sync_quotes_after_commit
+from src.ops.latency.artifacts import fresh_artifact, read_json_artifact
+
+# Async recorder writer (JSONL + sqlite dual-write off the quote callback thread).
+# - callback thread: submit() only appends (ts, kind, payload, t_enq) to a bounded ring buffer
+# - writer thread: json.dumps + one fp.write/flush per batch + executemany/commit per batch
+#   (events schema / row / INSERT from recorder_db_v1, shared with the synchronous _TmfDbDualWriter)
+# - overflow policy when the ring is full:
+#     block       : callback waits for space (lossless, can stall the feed)
+#     drop_oldest : oldest pending record is discarded (bounded latency, lossy)
+#     spill       : record is appended to a side JSONL (<out>.spill.jsonl); the writer thread replays it into
+#                   the main JSONL + DB once the ring is empty again and on close() (lossless; replayed
+#                   records land after newer ones, so the main file is not in ts order across a spill).
+#                   The spill file is renamed to .draining while replayed; a process that dies mid-drain
+#                   leaves it for the next writer on the same path (at-least-once: a partly replayed chunk repeats)
+# - counters are published to a small JSON file with LatencyBudgetV1 input names:
+#     oms_queue_depth = pending records, feed_age_ms = age of the oldest pending record
+# All configuration is read once (AsyncWriterConfigV1.from_env), never per event.
+
+OVERFLOW_POLICIES = ("block", "drop_oldest", "spill")
+DEFAULT_METRICS_PATH = "runtime/state/recorder_writer_metrics_latest.json"
+DB_KINDS_DEFAULT = DB_KINDS
+
+
+def _env(name: str, default: str) -> str:
+    return (os.environ.get(name, default) or default).strip()
+
+
+@dataclass(frozen=True)
+class AsyncWriterConfigV1:
+    capacity: int = 20000
+    overflow: str = "spill"
+    batch_max: int = 500
+    flush_interval_sec: float = 0.05
+    write_db: int = 1
+    db_path: str = "runtime/data/tmf_autotrader_v1.sqlite3"
+    db_kinds: Tuple[str, ...] = DB_KINDS_DEFAULT
+    metrics_path: str = DEFAULT_METRICS_PATH
+    metrics_every_sec: float = 1.0
+    write_quotes_l5: int = 1
+
+    @classmethod
+    def from_env(cls) -> "AsyncWriterConfigV1":
+        overflow = _env("TMF_RECORDER_QUEUE_OVERFLOW", "spill").lower()
+        if overflow not in OVERFLOW_POLICIES:
+            overflow = "spill"
+        return cls(
+            capacity=max(1, int(_env("TMF_RECORDER_QUEUE_CAPACITY", "20000"))),
+            overflow=overflow,
+            batch_max=max(1, int(_env("TMF_RECORDER_WRITER_BATCH_MAX", "500"))),
+            flush_interval_sec=max(0.001, float(_env("TMF_RECORDER_WRITER_FLUSH_SEC", "0.05"))),
+            write_db=1 if _env("TMF_RECORDER_WRITE_DB", "1") == "1" else 0,
+            db_path=_env("TMF_RECORDER_DB_PATH", "runtime/data/tmf_autotrader_v1.sqlite3"),
+            metrics_path=_env("TMF_RECORDER_WRITER_METRICS_PATH", DEFAULT_METRICS_PATH),
+            write_quotes_l5=1 if _env("TMF_QUOTES_L5", "1") == "1" else 0,
+        )
+
+
+class AsyncEventWriterV1:
+    def __init__(
+        self,
+        fp,
+        *,
+        cfg: Optional[AsyncWriterConfigV1] = None,
+        spill_path: Optional[Path] = None,
+        json_default: Optional[Callable[[Any], Any]] = None,
+    ):
+        self.fp = fp
+        self.cfg = cfg or AsyncWriterConfigV1.from_env()
+        self.spill_path = spill_path
+        self.json_default = json_default
+        self._q: Deque[Tuple[str, str, Dict[str, Any], float]] = deque()
+        self._cv = threading.Condition()
+        self._spill_lock = threading.Lock()
+        self._spill_fp = None
+        self._drain_lock = threading.Lock()
+        self._drain_fp = None
+        self._spill_pending = True  # leftovers of an earlier writer on the same path are replayed too
+        self._stop = False
+        self._thread: Optional[threading.Thread] = None
+        self._con: Optional[sqlite3.Connection] = None
+        self._lat_ms: Deque[float] = deque(maxlen=512)
+        self._last_metrics_ts = 0.0
+        self.counters: Dict[str, Any] = {
+            "enqueued": 0, "written": 0, "dropped": 0, "spilled": 0, "blocked": 0,
+            "db_rows": 0, "db_errors": 0, "write_errors": 0, "batches": 0, "quotes_l5_rows": 0, "quotes_l5_errors": 0,
+            "spill_replayed": 0, "spill_errors": 0,
+            "queue_depth_max": 0, "write_latency_ms_last": 0.0, "write_latency_ms_max": 0.0,
+        }
+
+    # ---- producer side (quote callback thread) ----
+    def submit(self, ts: str, kind: str, payload: Dict[str, Any]) -> bool:
+        """Enqueue one record; False if it went to the spill file instead of the ring."""
+        rec = (ts, kind, payload, time.monotonic())
+        spill = False
+        with self._cv:
+            if len(self._q) >= self.cfg.capacity:
+                if self.cfg.overflow == "block":
+                    self.counters["blocked"] += 1
+                    while len(self._q) >= self.cfg.capacity and not self._stop:
+                        self._cv.wait(0.1)
+                elif self.cfg.overflow == "drop_oldest":
+                    self._q.popleft()
+                    self.counters["dropped"] += 1
+                else:
+                    self.counters["spilled"] += 1
+                    spill = True
+            if not spill:
+                self._q.append(rec)
+                self.counters["enqueued"] += 1
+                if len(self._q) > self.counters["queue_depth_max"]:
+                    self.counters["queue_depth_max"] = len(self._q)
+                self._cv.notify()
+        if spill:
+            self._spill(rec)
+            return False
+        return True
+
+    def _spill_file(self) -> Path:
+        return Path(self.spill_path or (str(getattr(self.fp, "name", "recorder")) + ".spill.jsonl"))
+
+    def _spill(self, rec) -> None:
+        with self._spill_lock:
+            if self._spill_fp is None:
+                self._spill_fp = open(self._spill_file(), "a", encoding="utf-8")
+            self._spill_fp.write(self._line(rec))
+            self._spill_pending = True
+
+    def _drain_spill_step(self) -> bool:
+        """Replay up to batch_max spilled records into the main JSONL + DB; True while more are left."""
+        with self._drain_lock:
+            if self._drain_fp is None:
+                if not self._spill_pending:
+                    return False
+                p = self._spill_file()
+                dp = p.with_name(p.name + ".draining")
+                with self._spill_lock:
+                    self._spill_pending = False
+                    if not dp.exists():
+                        if self._spill_fp is not None:
+                            self._spill_fp.close()
+                            self._spill_fp = None
+                        if not p.exists():
+                            return False
+                        os.replace(p, dp)  # new spills go to a fresh file
+                    else:
+                        self._spill_pending = True  # interrupted drain first, the current spill file after it
+                try:
+                    self._drain_fp = open(dp, "r", encoding="utf-8")
+                except OSError:
+                    self.counters["spill_errors"] += 1
+                    return False
+            batch: List[Tuple[str, str, Dict[str, Any], float]] = []
+            eof = False
+            while len(batch) < self.cfg.batch_max:
+                line = self._drain_fp.readline()
+                if not line:
+                    eof = True
+                    break
+                try:
+                    r = json.loads(line)
+                    batch.append((str(r["ts"]), str(r["kind"]), r["payload"], time.monotonic()))
+                except Exception:
+                    self.counters["spill_errors"] += 1
+            if batch:
+                self._write_batch(batch)
+                self.counters["spill_replayed"] += len(batch)
+            if eof:
+                name = self._drain_fp.name
+                self._drain_fp.close()
+                self._drain_fp = None
+                try:
+                    os.unlink(name)
+                except OSError:
+                    pass
+                return self._spill_pending
+            return True
+
+    # ---- writer thread ----
+    def _line(self, rec) -> str:
+        ts, kind, payload, _t = rec
+        return json.dumps({"ts": ts, "kind": kind, "payload": payload}, ensure_ascii=False, default=self.json_default) + "\n"
+
+    def _ensure_db(self) -> sqlite3.Connection:
+        if self._con is None:
+            self._con = sqlite3.connect(self.cfg.db_path, timeout=10.0, check_same_thread=False)
+            self._con.execute("PRAGMA synchronous=NORMAL;")
+            self._con.execute("PRAGMA busy_timeout=10000;")
+            ensure_events_table(self._con)        # same schema as the synchronous dual-writer
+        return self._con
+
+    def _write_batch(self, batch: List[Tuple[str, str, Dict[str, Any], float]]) -> None:
+        lines: List[str] = []
+        rows: List[Tuple[str, str, str, Any, Any]] = []
+        for rec in batch:
+            ts, kind, payload, _t = rec
+            try:
+                lines.append(self._line(rec))
+            except Exception as e:
+                self.counters["write_errors"] += 1
+                lines.append(json.dumps({"ts": ts, "kind": "session_error", "payload": {"error": f"serialize_failed: {type(e).__name__}: {e}", "kind": kind}}) + "\n")
+                continue
+            if self.cfg.write_db and kind in self.cfg.db_kinds and isinstance(payload, dict):
+                try:
+                    rows.append(event_row(ts, kind, payload, default=self.json_default))
+                except Exception:
+                    self.counters["db_errors"] += 1
+        try:
+            self.fp.write("".join(lines))
+            self.fp.flush()
+        except Exception:
+            self.counters["write_errors"] += 1
+        if rows:
+            try:
+                con = self._ensure_db()
+                con.executemany(INSERT_EVENT_SQL, rows)
+                con.commit()
+                self.counters["db_rows"] += len(rows)
+                if self.cfg.write_quotes_l5:
+                    try:
+                        self.counters["quotes_l5_rows"] += sync_quotes_after_commit(con)
+                    except Exception:
+                        self.counters["quotes_l5_errors"] += 1
+            except Exception as e:
+                self.counters["db_errors"] += 1
+                try:
+                    if self._con is not None:
+                        self._con.rollback()  # a failed executemany leaves the write transaction (and the DB lock) open
+                except Exception:
+                    pass
+                # Do NOT crash recorder; record error into JSONL
+                try:
+                    self.fp.write(json.dumps({"ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z"),
+                                              "kind": "session_error",
+                                              "payload": {"error": f"db_dual_write_failed: {type(e).__name__}: {e}", "rows": len(rows)}}) + "\n")
+                    self.fp.flush()
+                except Exception:
+                    pass
+        now = time.monotonic()
+        lat = (now - batch[0][3]) * 1000.0
+        self._lat_ms.append(lat)
+        self.counters["written"] += len(batch)
+        self.counters["batches"] += 1
+        self.counters["write_latency_ms_last"] = round(lat, 3)
+        if lat > self.counters["write_latency_ms_max"]:
+            self.counters["write_latency_ms_max"] = round(lat, 3)
+
+    def _run(self) -> None:
+        while True:
+            with self._cv:
+                if not self._q and not self._stop and not (self._spill_pending or self._drain_fp is not None):
+                    self._cv.wait(self.cfg.flush_interval_sec)
+                if not self._q and self._stop:
+                    break
+                n = min(len(self._q), self.cfg.batch_max)
+                batch = [self._q.popleft() for _ in range(n)]
+                if batch:
+                    self._cv.notify_all()
+            if batch:
+                self._write_batch(batch)
+            elif self._spill_pending or self._drain_fp is not None:
+                # ring empty again: the feed has recovered, replay what was spilled meanwhile
+                self._drain_spill_step()
+            if time.monotonic() - self._last_metrics_ts >= self.cfg.metrics_every_sec:
+                self.publish_metrics()
+
+    # ---- lifecycle / metrics ----
+    def start(self) -> "AsyncEventWriterV1":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="tmf-recorder-writer", daemon=True)
+            self._thread.start()
+        return self
+
+    def close(self, timeout: float = 10.0) -> None:
+        with self._cv:
+            self._stop = True
+            self._cv.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        # drain leftovers synchronously (thread never started / join timed out)
+        with self._cv:
+            rest = list(self._q)
+            self._q.clear()
+        if rest:
+            self._write_batch(rest)
+        while self._drain_spill_step():
+            pass
+        with self._spill_lock:
+            if self._spill_fp is not None:
+                self._spill_fp.close()
+                self._spill_fp = None
+        if self._con is not None:
+            try:
+                self._con.close()
+            finally:
+                self._con = None
+        self.publish_metrics()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._cv:
+            depth = len(self._q)
+            oldest = self._q[0][3] if self._q else None
+            c = dict(self.counters)
+        lat = sorted(self._lat_ms)
+        p95 = lat[min(len(lat) - 1, int(0.95 * len(lat)))] if lat else 0.0
+        c.update({
+            "queue_depth": depth,
+            "oms_queue_depth": depth,
+            "feed_age_ms": int((time.monotonic() - oldest) * 1000.0) if oldest is not None else 0,
+            "write_latency_ms_p95": round(p95, 3),
+            "capacity": self.cfg.capacity,
+            "overflow": self.cfg.overflow,
+        })
+        return c
+
+    def publish_metrics(self) -> None:
+        self._last_metrics_ts = time.monotonic()
+        if not self.cfg.metrics_path:
+            return
+        try:
+            p = Path(self.cfg.metrics_path)
+            p.parent.mkdir(parents=True, exist_ok=True)
+            obj = {"ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z"),
+                   "epoch": time.time(), "pid": os.getpid(), "cfg": asdict(self.cfg), **self.snapshot()}
+            tmp = p.with_name(p.name + ".tmp")
+            tmp.write_text(json.dumps(obj, ensure_ascii=False, sort_keys=True) + "\n", encoding="utf-8")
+            os.replace(tmp, p)
+        except Exception:
+            pass
+
+
+def load_writer_metrics(path: str = "", max_age_sec: float = 5.0) -> Dict[str, Any]:
+    """
+    Latest published writer counters, or {} if missing/stale (recorder not running).
+    Keys oms_queue_depth / feed_age_ms match LatencyBudgetV1.check() inputs.
+    """
+    return fresh_artifact(read_json_artifact(path or _env("TMF_RECORDER_WRITER_METRICS_PATH", DEFAULT_METRICS_PATH)), max_age_sec)
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Recorder DB dual-write: the events rows written next to the raw JSONL for the market-truth feeds
+# PaperLive / Safety / MarketMetrics consume. One schema / row shape / INSERT for both writers:
+# shioaji_recorder._TmfDbDualWriter (synchronous, callback thread) and AsyncEventWriterV1 (writer thread).
+# NOTE: Python 3.9.6 compatible
+
+DB_KINDS: Tuple[str, ...] = ("bidask_fop_v1", "tick_fop_v1")
+
+EVENTS_DDL = """
+    CREATE TABLE IF NOT EXISTS events(
+      id INTEGER PRIMARY KEY AUTOINCREMENT,
+      ts TEXT NOT NULL,
+      kind TEXT NOT NULL,
+      payload_json TEXT NOT NULL,
+      source_file TEXT,
+      ingest_ts TEXT
+    )
+"""
+
+INSERT_EVENT_SQL = "INSERT INTO events(ts, kind, payload_json, source_file, ingest_ts) VALUES (?,?,?,?,?)"
+
+EventRow = Tuple[str, str, str, Any, Any]
+
+
+def ensure_events_table(con: sqlite3.Connection) -> None:
+    con.execute("PRAGMA journal_mode=WAL;")
+    con.execute(EVENTS_DDL)
+    con.commit()
+
+
+def event_row(ts: str, kind: str, payload: Dict[str, Any], *, default: Optional[Callable[[Any], Any]] = None) -> EventRow:
+    """INSERT_EVENT_SQL parameters for one recorder event (compact payload JSON; ingest_ts falls back to ts)."""
+    return (ts, kind, json.dumps(payload, ensure_ascii=False, separators=(",", ":"), default=default),
+            payload.get("source_file"), payload.get("ingest_ts") or ts)
+
+
+def sync_quotes_after_commit(con: sqlite3.Connection) -> int:
+    """
+    Writer step after committing bidask rows: catch quotes_l5 up (readers never sync). Rolls the sync's
+    transaction back and re-raises on failure; the committed events rows stay.
+    """
+    try:
+        from src.data.quotes_l5_v1 import sync_quotes_l5
+        return int(sync_quotes_l5(con))
+    except Exception:
+        try:
+            con.rollback()
+        except Exception:
+            pass
+        raise
@@ -157,54 +157,62 @@ class _TmfDbDualWriter:
         self._con = None
         self._n = 0
         self._last_commit_ts = 0.0
+        self._cfg = None
+
+    def _load_cfg(self):
+        # env is read once per process (not per event)
+        import os
+        if self._cfg is None:
+            self._cfg = (
+                _tmf_db_dual_write_enabled(),
+                (os.environ.get("TMF_RECORDER_DB_PATH") or "runtime/data/tmf_autotrader_v1.sqlite3").strip(),
+                int((os.environ.get("TMF_RECORDER_DB_COMMIT_EVERY_N", "50") or "50").strip()),
+                float((os.environ.get("TMF_RECORDER_DB_COMMIT_EVERY_SEC", "1.0") or "1.0").strip()),
+            )
+        return self._cfg
 
     def _ensure(self, db_path: str):
         import sqlite3
+        from src.broker.recorder_db_v1 import ensure_events_table
         if self._con is not None:
             return
         self._con = sqlite3.connect(db_path)
-        self._con.execute("PRAGMA journal_mode=WAL;")
-        self._con.execute("""
-            CREATE TABLE IF NOT EXISTS events(
-              id INTEGER PRIMARY KEY AUTOINCREMENT,
-              ts TEXT NOT NULL,
-              kind TEXT NOT NULL,
-              payload_json TEXT NOT NULL,
-              source_file TEXT,
-              ingest_ts TEXT
-            )
-        """)
-        self._con.commit()
+        ensure_events_table(self._con)
 
     def write(self, *, ts: str, kind: str, payload: dict):
-        import os, json, time
-        if not _tmf_db_dual_write_enabled():
+        import time
+        from src.broker.recorder_db_v1 import DB_KINDS, INSERT_EVENT_SQL, event_row
+        enabled, db_path, commit_n, commit_sec = self._load_cfg()
+        if not enabled:
             return
         # Only write market-truth feeds that PaperLive/Safety/MarketMetrics consume.
-        if kind not in ("bidask_fop_v1", "tick_fop_v1"):
+        if kind not in DB_KINDS:
             return
-        db_path = (os.environ.get("TMF_RECORDER_DB_PATH") or "runtime/data/tmf_autotrader_v1.sqlite3").strip()
-        commit_n = int((os.environ.get("TMF_RECORDER_DB_COMMIT_EVERY_N", "50") or "50").strip())
-        commit_sec = float((os.environ.get("TMF_RECORDER_DB_COMMIT_EVERY_SEC", "1.0") or "1.0").strip())
         self._ensure(db_path)
 
-        source_file = payload.get("source_file")
-        ingest_ts = payload.get("ingest_ts") or ts
-        self._con.execute(
-            "INSERT INTO events(ts, kind, payload_json, source_file, ingest_ts) VALUES (?,?,?,?,?)",
-            (ts, kind, json.dumps(payload, ensure_ascii=False, separators=(",",":")), source_file, ingest_ts),
-        )
+        self._con.execute(INSERT_EVENT_SQL, event_row(ts, kind, payload))
         self._n += 1
         now = time.time()
         if self._n >= commit_n or (now - self._last_commit_ts) >= commit_sec:
-            self._con.commit()
+            self._commit()
             self._n = 0
             self._last_commit_ts = now
 
+    def _commit(self):
+        # writer step: catch quotes_l5 up with the committed bidask rows (readers never sync)
+        self._con.commit()
+        if os.environ.get("TMF_QUOTES_L5", "1").strip() != "1":
+            return
+        try:
+            from src.broker.recorder_db_v1 import sync_quotes_after_commit
+            sync_quotes_after_commit(self._con)
+        except Exception:
+            pass
+
     def close(self):
         try:
             if self._con is not None:
-                self._con.commit()
+                self._commit()
                 self._con.close()
         finally:
             self._con = None
@@ -214,8 +222,61 @@ import atexit
 atexit.register(_tmf_db_writer.close)
 
 # ---- /DB dual-write ----
+
+# ---- Async writer (JSONL + DB off the quote callback thread) ----
+# Controls:
+#   TMF_RECORDER_ASYNC_WRITER=1            (default 1; 0 -> legacy synchronous _write_event)
+#   TMF_RECORDER_QUEUE_CAPACITY=20000
+#   TMF_RECORDER_QUEUE_OVERFLOW=spill      (block | drop_oldest | spill -> <out_file>.spill.jsonl, replayed when the ring drains)
+#   TMF_RECORDER_WRITER_BATCH_MAX=500
+#   TMF_RECORDER_WRITER_FLUSH_SEC=0.05
+#   TMF_RECORDER_WRITER_METRICS_PATH=runtime/state/recorder_writer_metrics_latest.json
+# Counters (oms_queue_depth / feed_age_ms / drops / write latency) are consumed by SystemSafety LATBP.
+_tmf_async_writer = None
+
+
+def _tmf_repo_on_syspath() -> None:
+    import sys as _sys
+    _repo_root = Path(__file__).resolve().parents[2]
+    if str(_repo_root) not in _sys.path:
+        _sys.path.insert(0, str(_repo_root))
+
+
+class _TmfAsyncWriterScope:
+    def __init__(self, fp, out_file: Path):
+        self.fp = fp
+        self.out_file = out_file
+        self.writer = None
+
+    def __enter__(self):
+        global _tmf_async_writer
+        if (os.environ.get("TMF_RECORDER_ASYNC_WRITER", "1") or "1").strip() != "1":
+            return None
+        _tmf_repo_on_syspath()
+        from src.broker.async_event_writer_v1 import AsyncEventWriterV1
+        self.writer = AsyncEventWriterV1(
+            self.fp,
+            spill_path=self.out_file.with_name(self.out_file.stem + ".spill.jsonl"),
+            json_default=_tmf_json_default,
+        ).start()
+        _tmf_async_writer = self.writer
+        return self.writer
+
+    def __exit__(self, *exc):
+        global _tmf_async_writer
+        if self.writer is not None:
+            _tmf_async_writer = None
+            self.writer.close()
+            self.writer = None
+        return False
+
+
 def _write_event(fp, kind: str, payload: dict) -> None:
     ts = _now_iso()
+    w = _tmf_async_writer
+    if w is not None:
+        w.submit(ts, kind, payload)
+        return
     rec = {"ts": ts, "kind": kind, "payload": payload}
     fp.write(json.dumps(rec, ensure_ascii=False, default=_tmf_json_default) + "\n")
     fp.flush()
@@ -231,6 +292,53 @@ def _write_event(fp, kind: str, payload: dict) -> None:
             pass
 
 
+# ---- In-process streaming bars (tick -> closed OHLCV bar in ms, no DB polling) ----
+# Controls:
+#   TMF_RECORDER_STREAM_BARS=1            (default 0)
+#   TMF_RECORDER_STREAM_BAR_SECS=60       (comma list, e.g. 5,15,60,300; 60 -> bars_1m)
+#   TMF_RECORDER_STREAM_BARS_DB=1         (default 1; writes closed 1m bars to TMF_RECORDER_DB_PATH bars_1m
+#                                          from a writer thread, never on the tick callback)
+#   TMF_RECORDER_STREAM_BARS_UDP=127.0.0.1:48611  (optional; JSON datagram per closed bar)
+#   TMF_RECORDER_STREAM_BAR_GRACE_SEC=2.0
+#   TMF_RECORDER_STREAM_QUOTES_UDP=1      (default 0; also send each bidask_fop_v1 payload to the UDP target)
+# Best-effort: any failure is logged as session_error and the recorder keeps running.
+_tmf_quote_udp = None
+
+
+def _tmf_make_bar_stream(fp):
+    global _tmf_quote_udp
+    if (os.environ.get("TMF_RECORDER_STREAM_BARS", "0") or "0").strip() != "1":
+        return None
+    try:
+        _tmf_repo_on_syspath()
+        from src.data.stream_bars_v1 import (
+            BarsDbSinkV1, StreamBarAggregatorV1, UdpBarSinkV1, parse_host_port, parse_intervals,
+        )
+        intervals = parse_intervals(os.environ.get("TMF_RECORDER_STREAM_BAR_SECS", "60") or "60")
+        grace = float((os.environ.get("TMF_RECORDER_STREAM_BAR_GRACE_SEC", "2.0") or "2.0").strip())
+        agg = StreamBarAggregatorV1(intervals_sec=intervals, close_grace_sec=grace)
+        sinks = []
+        if (os.environ.get("TMF_RECORDER_STREAM_BARS_DB", "1") or "1").strip() == "1" and 60 in intervals:
+            db_path = (os.environ.get("TMF_RECORDER_DB_PATH") or "runtime/data/tmf_autotrader_v1.sqlite3").strip()
+            sinks.append(BarsDbSinkV1(db_path))
+        hp = parse_host_port(os.environ.get("TMF_RECORDER_STREAM_BARS_UDP", ""))
+        if hp is not None:
+            sinks.append(UdpBarSinkV1(hp[0], hp[1]))
+            if (os.environ.get("TMF_RECORDER_STREAM_QUOTES_UDP", "0") or "0").strip() == "1":
+                _tmf_quote_udp = sinks[-1]
+        for fn in sinks:
+            agg.add_sink(fn)
+            if isinstance(fn, BarsDbSinkV1):
+                agg.add_late_tick_sink(fn.on_late_tick)   # ticks for minutes already trimmed from memory
+            if hasattr(fn, "close"):
+                atexit.register(fn.close)
+        _write_event(fp, "stream_bars_ready", {"intervals_sec": intervals, "sinks": [type(x).__name__ for x in sinks]})
+        return agg
+    except Exception as e:
+        _write_event(fp, "session_error", {"error": f"stream_bars_init_failed: {type(e).__name__}: {e}"})
+        return None
+
+
 def main() -> int:
     project_root = Path(os.getenv("TMF_PROJECT_ROOT", str(Path.cwd()))).resolve()
     out_dir = project_root / "runtime" / "raw_events"
@@ -264,8 +372,9 @@ def main() -> int:
     run_seconds = int(os.getenv("TMF_SHIOAJI_RUN_SECONDS", "30"))
     source_tag = os.getenv("TMF_SOURCE_FILE", "shioaji_recorder").strip() or "shioaji_recorder"
 
-    with out_file.open("w", encoding="utf-8") as fp:
+    with out_file.open("w", encoding="utf-8") as fp, _TmfAsyncWriterScope(fp, out_file):
         _write_event(fp, "session_start", {"msg": "start", "cwd": str(project_root)})
+        bar_stream = _tmf_make_bar_stream(fp)
 
         # callbacks (v1)
         def _on_bidask_fop_v1(*args):
@@ -291,6 +400,8 @@ def main() -> int:
                 "ingest_ts": _now_iso(),
             })
             _write_event(fp, "bidask_fop_v1", payload)
+            if _tmf_quote_udp is not None:
+                _tmf_quote_udp.send_event("bidask_fop_v1", payload, ts=payload["ingest_ts"], json_default=_tmf_json_default)
 
         def _on_tick_fop_v1(*args):
             exchange = args[0] if len(args) > 1 else None
@@ -305,6 +416,11 @@ def main() -> int:
                 "ingest_ts": _now_iso(),
             })
             _write_event(fp, "tick_fop_v1", payload)
+            if bar_stream is not None:
+                try:
+                    bar_stream.on_tick_payload(payload)
+                except Exception:
+                    pass
 
         # bind quote callbacks (OFFICIAL: use api.quote.set_on_*_callback for futures stream)
         try:
@@ -358,7 +474,12 @@ def main() -> int:
         t0 = time.time()
         while time.time() - t0 < run_seconds:
             time.sleep(0.2)
+            if bar_stream is not None:
+                bar_stream.flush_due()
 
+        if bar_stream is not None:
+            bar_stream.flush_all()
+            _write_event(fp, "stream_bars_stats", dict(bar_stream.stats))
         _write_event(fp, "session_stop", {"msg": "stop"})
     print(f"[OK] recorder wrote: {out_file}")
     return 0
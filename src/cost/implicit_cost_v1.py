@@ -0,0 +1,580 @@
+"""
+TMF AutoTrader - Implicit Cost Model v1 (calibrated spread / slippage / impact, SIM/PAPER/RESEARCH shared)
+
+Why:
+- research/cost_model/cost_model_os.estimate_cost returned zeros and slippage_model_v1 charged a fixed
+  1 point per side whatever the session, volatility or order size.
+
+What:
+- cells keyed (base symbol, session, vol regime); each cell holds three consecutive legs, in points per
+  contract per side (they add up, nothing is counted twice):
+    half_spread            mid -> touch: mean (ask1 - bid1) / 2 of bidask_fop_v1 quotes
+    impact[anchor]         touch -> VWAP of walking L1..L5 for anchor lots (mean of both sides)
+    slippage[anchor]       VWAP -> realized: mean paper fill price vs the touch in the order's market_metrics,
+                           minus the cell's impact at the same anchor
+  at qty anchors QTY_ANCHORS; lookups interpolate linearly between anchors (extrapolate past the last)
+- ImplicitCostV1.points_from(reference): cost vs the caller's reference price -- "mid" (bar close in the
+  backtest, estimate_cost), "touch", or "vwap" (depth-walking fills already paid spread + impact)
+- session: DAY 08:45-13:45 Asia/Taipei, else NIGHT (naive timestamps are taken as Taipei local time)
+- vol regime, one measure for quotes, fills and callers: the range in points of the previous completed
+  1-minute of tick_fop_v1 (= the last closed 1m bar's h - l): LOW < edges[0] <= MID < edges[1] <= HIGH
+- ImplicitCostCalibratorV1.update(): incremental, like ops/rejects/reject_stats_stream_v1 -- events.id /
+  fills.id watermarks + running sums in a checkpoint; each run reads only rows past the watermarks and
+  rewrites the compact table file (atomic tmp + os.replace). A fill newer than the last event read waits
+  for the next run (its regime minute is not complete yet), so incremental == full rebuild
+- ImplicitCostModelV1.lookup(): dict hit + anchor segment -> O(1); cells with fewer than min_samples
+  quotes fall back to (symbol, session, *) then (symbol, *, *); the table file is re-read when its mtime
+  changes (checked at most every reload_sec)
+
+NOTE: Python 3.9.6 compatible
+"""
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from bisect import bisect_right
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_TABLE = "runtime/state/implicit_cost_table_v1.json"
+DEFAULT_CHECKPOINT = "runtime/state/implicit_cost_calib_v1.json"
+QTY_ANCHORS: Tuple[float, ...] = (1.0, 2.0, 5.0, 10.0, 20.0, 50.0)
+TABLE_VERSION = 2
+REFERENCES: Tuple[str, ...] = ("mid", "touch", "vwap")
+TZ_TAIPEI = timezone(timedelta(hours=8))
+QUOTE_KIND = "bidask_fop_v1"
+TICK_KIND = "tick_fop_v1"
+
+_SQL_EVENTS = "SELECT id, ts, kind, payload_json FROM events WHERE id > ? AND kind IN (?, ?) ORDER BY id ASC LIMIT ?"
+_SQL_FILLS = (
+    "SELECT id, ts, symbol, side, qty, price, "
+    "json_extract(meta_json, '$.order_meta.market_metrics.bid'), json_extract(meta_json, '$.order_meta.market_metrics.ask') "
+    "FROM fills WHERE id > ? ORDER BY id ASC LIMIT ?"
+)
+_SQL_FILLS_PLAIN = "SELECT id, ts, symbol, side, qty, price, meta_json FROM fills WHERE id > ? ORDER BY id ASC LIMIT ?"
+
+
+def _env(name: str, default: str) -> str:
+    return (os.environ.get(name, default) or default).strip()
+
+
+def base_symbol(sym: Any) -> str:
+    s = str(sym or "").upper()
+    if s == "TX":
+        return "TXF"
+    if s == "MTX":
+        return "MXF"
+    for b in ("TMF", "TXF", "MXF"):
+        if s.startswith(b):
+            return b
+    return s
+
+
+def session_of(ts: Any) -> str:
+    """DAY (08:45 <= Taipei time < 13:45) / NIGHT; '' when ts does not parse."""
+    if isinstance(ts, datetime):
+        dt = ts
+    else:
+        try:
+            dt = datetime.fromisoformat(str(ts).strip().replace("Z", "+00:00"))
+        except Exception:
+            return ""
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(TZ_TAIPEI)
+    hm = dt.hour * 100 + dt.minute
+    return "DAY" if 845 <= hm < 1345 else "NIGHT"
+
+
+def _epoch(ts: Any) -> Optional[float]:
+    """Epoch seconds; naive timestamps are Taipei local time (as in session_of)."""
+    try:
+        dt = datetime.fromisoformat(str(ts).strip().replace("Z", "+00:00"))
+    except Exception:
+        return None
+    return (dt if dt.tzinfo is not None else dt.replace(tzinfo=TZ_TAIPEI)).timestamp()
+
+
+def vol_regime(range_points: Optional[float], edges: Tuple[float, float]) -> str:
+    if range_points is None:
+        return "NA"
+    r = float(range_points)
+    if r < edges[0]:
+        return "LOW"
+    return "MID" if r < edges[1] else "HIGH"
+
+
+def _edges(s: str) -> Tuple[float, float]:
+    try:
+        a, b = (float(x) for x in s.split(",")[:2])
+        return (a, b) if a <= b else (b, a)
+    except Exception:
+        return (4.0, 12.0)
+
+
+@dataclass(frozen=True)
+class ImplicitCostConfigV1:
+    table_path: str = DEFAULT_TABLE
+    checkpoint: str = DEFAULT_CHECKPOINT
+    vol_edges: Tuple[float, float] = (4.0, 12.0)   # 1-minute range (points): LOW / MID / HIGH
+    min_samples: int = 30                          # quotes per cell before it is served (else fallback)
+    chunk: int = 5000
+    reload_sec: float = 5.0
+    keep_minutes: int = 4320                       # completed 1-minute ranges kept per symbol (fill regimes)
+
+    @classmethod
+    def from_env(cls) -> "ImplicitCostConfigV1":
+        return cls(
+            table_path=_env("TMF_COST_TABLE_PATH", DEFAULT_TABLE),
+            checkpoint=_env("TMF_COST_CALIB_CHECKPOINT", DEFAULT_CHECKPOINT),
+            vol_edges=_edges(_env("TMF_COST_VOL_EDGES", "4,12")),
+            min_samples=max(1, int(_env("TMF_COST_MIN_SAMPLES", "30"))),
+            chunk=max(1, int(_env("TMF_COST_CALIB_CHUNK", "5000"))),
+            reload_sec=max(0.0, float(_env("TMF_COST_TABLE_RELOAD_SEC", "5"))),
+            keep_minutes=max(1, int(_env("TMF_COST_REGIME_KEEP_MINUTES", "4320"))),
+        )
+
+
+@dataclass(frozen=True)
+class ImplicitCostV1:
+    """Points per contract per side at the requested qty: mid -> touch -> book VWAP -> realized fill."""
+    key: str
+    n: int
+    half_spread: float
+    impact: float
+    slippage: float
+
+    @property
+    def per_side_points(self) -> float:
+        return self.points_from("mid")
+
+    def points_from(self, reference: str = "mid") -> float:
+        """Cost vs the caller's reference price: mid (all legs), touch (impact + slippage), vwap (slippage)."""
+        if reference == "vwap":
+            return float(self.slippage)
+        if reference == "touch":
+            return float(self.impact + self.slippage)
+        if reference != "mid":
+            raise ValueError(f"reference must be one of {REFERENCES}")
+        return float(self.half_spread + self.impact + self.slippage)
+
+
+# ---- calibration ----
+def _new_cell() -> Dict[str, Any]:
+    a = len(QTY_ANCHORS)
+    return {"n": 0, "spread_sum": 0.0, "imp_sum": [0.0] * a, "imp_n": [0] * a, "slp_sum": [0.0] * a, "slp_n": [0] * a}
+
+
+def _levels(prices: Any, vols: Any) -> List[Tuple[float, float]]:
+    out: List[Tuple[float, float]] = []
+    if not isinstance(prices, (list, tuple)) or not isinstance(vols, (list, tuple)):
+        return out
+    for p, v in zip(prices[:5], vols[:5]):
+        try:
+            p, v = float(p), float(v)
+        except (TypeError, ValueError):
+            continue
+        if p > 0.0 and v > 0.0:
+            out.append((p, v))
+    return out
+
+
+def _walk_impact(levels: List[Tuple[float, float]], qty: float) -> Optional[float]:
+    """VWAP of the first qty lots minus the touch (absolute points); None when L1..L5 cannot fill qty."""
+    got = notional = 0.0
+    for p, v in levels:
+        a = min(v, qty - got)
+        got += a
+        notional += a * p
+        if got >= qty - 1e-9:
+            return abs(notional / got - levels[0][0])
+    return None
+
+
+def _anchor_index(qty: float) -> int:
+    """Nearest anchor at or above qty (last anchor for larger orders)."""
+    i = 0
+    while i < len(QTY_ANCHORS) - 1 and QTY_ANCHORS[i] < qty:
+        i += 1
+    return i
+
+
+class ImplicitCostCalibratorV1:
+    """Incremental calibration from events (bidask_fop_v1 / tick_fop_v1) and fills of one DB."""
+
+    def __init__(self, db_path: str, *, cfg: Optional[ImplicitCostConfigV1] = None):
+        self.db_path = str(db_path)
+        self.cfg = cfg or ImplicitCostConfigV1.from_env()
+        self.last_update: Dict[str, Any] = {}
+        self._reset()
+        self._load()
+
+    def _reset(self) -> None:
+        self.events_watermark = 0
+        self.fills_watermark = 0
+        self.cells: Dict[str, Dict[str, Any]] = {}
+        self.minute: Dict[str, List[Any]] = {}   # base symbol -> [minute index, hi, lo] of the open minute
+        self.ranges: Dict[str, Dict[str, float]] = {}   # base symbol -> {minute index: range} of completed minutes
+        self.events_epoch = 0.0                  # newest event time read (fills past it wait)
+        self.skipped = {"quotes": 0, "ticks": 0, "fills": 0}
+
+    def _load(self) -> None:
+        p = self.cfg.checkpoint
+        if not p or not os.path.exists(p):
+            return
+        try:
+            obj = json.loads(Path(p).read_text(encoding="utf-8"))
+            if int(obj.get("version") or 0) != TABLE_VERSION or obj.get("db") != os.path.abspath(self.db_path) \
+                    or list(obj.get("anchors") or []) != list(QTY_ANCHORS) or list(obj.get("vol_edges") or []) != list(self.cfg.vol_edges):
+                return
+            self.events_watermark = int(obj.get("events_watermark") or 0)
+            self.fills_watermark = int(obj.get("fills_watermark") or 0)
+            self.cells = dict(obj.get("cells") or {})
+            self.minute = dict(obj.get("minute") or {})
+            self.ranges = {k: dict(v) for k, v in (obj.get("ranges") or {}).items()}
+            self.events_epoch = float(obj.get("events_epoch") or 0.0)
+            self.skipped.update(obj.get("skipped") or {})
+        except Exception:
+            self._reset()
+
+    def _save(self) -> None:
+        if not self.cfg.checkpoint:
+            return
+        _atomic_write(self.cfg.checkpoint, {
+            "version": TABLE_VERSION, "db": os.path.abspath(self.db_path), "updated_utc": _utc_now_z(),
+            "anchors": list(QTY_ANCHORS), "vol_edges": list(self.cfg.vol_edges),
+            "events_watermark": self.events_watermark, "fills_watermark": self.fills_watermark,
+            "cells": self.cells, "minute": self.minute, "ranges": self.ranges, "events_epoch": self.events_epoch,
+            "skipped": self.skipped,
+        })
+
+    def _cell(self, sym: str, session: str, regime: str) -> Dict[str, Any]:
+        k = f"{sym}|{session}|{regime}"
+        c = self.cells.get(k)
+        if c is None:
+            c = self.cells[k] = _new_cell()
+        return c
+
+    def _regime(self, sym: str, ep: float) -> str:
+        """Regime of the minute before ep's minute (NA when it had no ticks or is no longer kept)."""
+        mi = int(ep // 60)
+        r = (self.ranges.get(sym) or {}).get(str(mi - 1))
+        if r is None:
+            m = self.minute.get(sym)
+            if m is not None and m[0] == mi - 1:
+                r = m[1] - m[2]
+        return vol_regime(r, self.cfg.vol_edges)
+
+    def _on_tick(self, ts: str, p: Dict[str, Any]) -> None:
+        sym = base_symbol(p.get("code"))
+        ep = _epoch(ts)
+        try:
+            px = float(p.get("close"))
+        except (TypeError, ValueError):
+            ep = None
+        if ep is None:
+            self.skipped["ticks"] += 1
+            return
+        mi = int(ep // 60)
+        m = self.minute.get(sym)
+        if m is None:
+            self.minute[sym] = [mi, px, px]
+        elif mi != m[0]:
+            if mi > m[0]:
+                rs = self.ranges.setdefault(sym, {})
+                rs[str(m[0])] = float(m[1] - m[2])
+                while len(rs) > self.cfg.keep_minutes:
+                    del rs[next(iter(rs))]
+                m[0], m[1], m[2] = mi, px, px
+        else:
+            m[1] = max(m[1], px)
+            m[2] = min(m[2], px)
+
+    def _on_quote(self, ts: str, p: Dict[str, Any]) -> None:
+        if p.get("synthetic"):
+            return
+        bids = _levels(p.get("bid_price"), p.get("bid_volume"))
+        asks = _levels(p.get("ask_price"), p.get("ask_volume"))
+        session = session_of(ts)
+        ep = _epoch(ts)
+        if not bids or not asks or asks[0][0] < bids[0][0] or not session or ep is None:
+            self.skipped["quotes"] += 1
+            return
+        sym = base_symbol(p.get("code"))
+        c = self._cell(sym, session, self._regime(sym, ep))
+        c["n"] += 1
+        c["spread_sum"] += asks[0][0] - bids[0][0]
+        for i, a in enumerate(QTY_ANCHORS):
+            ib, ia = _walk_impact(bids, a), _walk_impact(asks, a)
+            if ib is None or ia is None:
+                break                                   # deeper anchors cannot be filled either
+            c["imp_sum"][i] += 0.5 * (ib + ia)
+            c["imp_n"][i] += 1
+
+    def _on_fill(self, ts: str, symbol: Any, side: Any, qty: Any, price: Any, bid: Any, ask: Any) -> None:
+        """Realized price vs the touch; the impact leg is taken out in build_table."""
+        try:
+            q, px, b, a = float(qty), float(price), float(bid), float(ask)
+        except (TypeError, ValueError):
+            self.skipped["fills"] += 1
+            return
+        session = session_of(ts)
+        ep = _epoch(ts)
+        if q <= 0.0 or b <= 0.0 or a <= 0.0 or not session or ep is None:
+            self.skipped["fills"] += 1
+            return
+        slp = px - a if str(side).upper() == "BUY" else b - px
+        sym = base_symbol(symbol)
+        c = self._cell(sym, session, self._regime(sym, ep))
+        i = _anchor_index(q)
+        c["slp_sum"][i] += slp
+        c["slp_n"][i] += 1
+
+    def update(self, con: Optional[sqlite3.Connection] = None) -> Dict[str, Any]:
+        """Fold events / fills past the watermarks into the sums; writes checkpoint + table. Returns update stats."""
+        t0 = time.perf_counter()
+        own = con is None
+        if own:
+            con = sqlite3.connect(self.db_path, timeout=5.0)
+        n_ev = n_fill = deferred = 0
+        reset = False
+        try:
+            max_ev = int(con.execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0])
+            max_fill = int(con.execute("SELECT COALESCE(MAX(id), 0) FROM fills").fetchone()[0])
+            if max_ev < self.events_watermark or max_fill < self.fills_watermark:
+                self._reset()                            # DB replaced / rebuilt -> full recalibration
+                reset = True
+            chunk = self.cfg.chunk
+            while True:
+                rows = con.execute(_SQL_EVENTS, (self.events_watermark, QUOTE_KIND, TICK_KIND, chunk)).fetchall()
+                for _id, ts, kind, pj in rows:
+                    ep = _epoch(ts)
+                    if ep is not None and ep > self.events_epoch:
+                        self.events_epoch = ep
+                    try:
+                        p = json.loads(pj)
+                    except Exception:
+                        p = None
+                    if isinstance(p, dict):
+                        if kind == QUOTE_KIND:
+                            self._on_quote(ts, p)
+                        else:
+                            self._on_tick(ts, p)
+                    self.events_watermark = int(_id)
+                    n_ev += 1
+                if len(rows) < chunk:
+                    break
+            try:
+                con.execute("SELECT json_extract('{\"a\":1}', '$.a')").fetchone()
+                json1 = True
+            except sqlite3.OperationalError:
+                json1 = False
+            while True:
+                rows = con.execute(_SQL_FILLS if json1 else _SQL_FILLS_PLAIN, (self.fills_watermark, chunk)).fetchall()
+                for r in rows:
+                    ep = _epoch(r[1])
+                    if ep is not None and ep > self.events_epoch:
+                        deferred = int(con.execute("SELECT COUNT(*) FROM fills WHERE id > ?",
+                                                   (self.fills_watermark,)).fetchone()[0])
+                        break
+                    if json1:
+                        self._on_fill(r[1], r[2], r[3], r[4], r[5], r[6], r[7])
+                    else:
+                        try:
+                            mm = (json.loads(r[6] or "{}").get("order_meta") or {}).get("market_metrics") or {}
+                        except Exception:
+                            mm = {}
+                        self._on_fill(r[1], r[2], r[3], r[4], r[5], mm.get("bid"), mm.get("ask"))
+                    self.fills_watermark = int(r[0])
+                    n_fill += 1
+                if deferred or len(rows) < chunk:
+                    break
+        finally:
+            if own:
+                con.close()
+        self._save()
+        table = self.build_table()
+        if self.cfg.table_path:
+            _atomic_write(self.cfg.table_path, table)
+        self.last_update = {"new_events": n_ev, "new_fills": n_fill, "deferred_fills": deferred, "reset": reset,
+                            "cells": len(table["cells"]),
+                            "events_watermark": self.events_watermark, "fills_watermark": self.fills_watermark,
+                            "ms": round((time.perf_counter() - t0) * 1000.0, 3)}
+        return self.last_update
+
+    def build_table(self) -> Dict[str, Any]:
+        """Compact serving table: per cell [n, half_spread, impact[anchors], slippage[anchors]] + (sym, session, *) /
+        (sym, *, *) aggregates; anchors without samples are interpolated / extrapolated from their neighbours.
+        slippage = fill vs touch - impact at anchors with fills (realized cost beyond the book-walk VWAP)."""
+        merged: Dict[str, Dict[str, Any]] = {}
+        for k, c in self.cells.items():
+            sym, ses, reg = k.split("|")
+            for kk in ((k,) if reg != "NA" else ()) + (f"{sym}|{ses}|*", f"{sym}|*|*"):
+                m = merged.get(kk)
+                if m is None:
+                    m = merged[kk] = _new_cell()
+                m["n"] += c["n"]
+                m["spread_sum"] += c["spread_sum"]
+                for i in range(len(QTY_ANCHORS)):
+                    m["imp_sum"][i] += c["imp_sum"][i]
+                    m["imp_n"][i] += c["imp_n"][i]
+                    m["slp_sum"][i] += c["slp_sum"][i]
+                    m["slp_n"][i] += c["slp_n"][i]
+        cells: Dict[str, List[Any]] = {}
+        for k in sorted(merged):
+            m = merged[k]
+            hs = 0.5 * m["spread_sum"] / m["n"] if m["n"] else 0.0
+            imp = _fill_curve([m["imp_sum"][i] / m["imp_n"][i] if m["imp_n"][i] else None for i in range(len(QTY_ANCHORS))])
+            slp = _fill_curve([m["slp_sum"][i] / m["slp_n"][i] - imp[i] if m["slp_n"][i] else None
+                               for i in range(len(QTY_ANCHORS))], slope=False)
+            cells[k] = [int(m["n"]), round(hs, 4), [round(x, 4) for x in imp], [round(x, 4) for x in slp]]
+        return {"version": TABLE_VERSION, "generated_utc": _utc_now_z(), "anchors": list(QTY_ANCHORS),
+                "vol_edges": list(self.cfg.vol_edges), "cells": cells}
+
+
+def _fill_curve(v: List[Optional[float]], slope: bool = True) -> List[float]:
+    """Fill missing anchors: linear between known neighbours, flat before the first, after the last
+    the last-segment slope (impact grows with size) or flat (slope=False: realized slippage)."""
+    known = [i for i, x in enumerate(v) if x is not None]
+    if not known:
+        return [0.0] * len(v)
+    out = list(v)
+    for i in range(len(v)):
+        if out[i] is not None:
+            continue
+        lo = max((j for j in known if j < i), default=None)
+        hi = min((j for j in known if j > i), default=None)
+        if lo is None:
+            out[i] = v[hi]
+        elif hi is None:
+            lo2 = max((j for j in known if j < lo), default=None)
+            if lo2 is None or not slope:
+                out[i] = v[lo]
+            else:
+                k = (v[lo] - v[lo2]) / (QTY_ANCHORS[lo] - QTY_ANCHORS[lo2])
+                out[i] = v[lo] + k * (QTY_ANCHORS[i] - QTY_ANCHORS[lo])
+        else:
+            w = (QTY_ANCHORS[i] - QTY_ANCHORS[lo]) / (QTY_ANCHORS[hi] - QTY_ANCHORS[lo])
+            out[i] = v[lo] + w * (v[hi] - v[lo])
+    return [float(x) for x in out]
+
+
+# ---- serving ----
+def _interp(curve: Tuple[float, ...], i: int, w: float) -> float:
+    return curve[i] + w * (curve[i + 1] - curve[i])
+
+
+def _segment(qty: float) -> Tuple[int, float]:
+    """(i, w): value = curve[i] + w * (curve[i+1] - curve[i]); w > 1 extrapolates the last segment."""
+    n = len(QTY_ANCHORS)
+    i = min(max(bisect_right(QTY_ANCHORS, qty) - 1, 0), n - 2)
+    w = (max(qty, QTY_ANCHORS[0]) - QTY_ANCHORS[i]) / (QTY_ANCHORS[i + 1] - QTY_ANCHORS[i])
+    return i, w
+
+
+class ImplicitCostModelV1:
+    """Read-only view of a calibrated table file (reloaded when the file changes)."""
+
+    def __init__(self, table_path: str = "", *, cfg: Optional[ImplicitCostConfigV1] = None):
+        self.cfg = cfg or ImplicitCostConfigV1.from_env()
+        self.table_path = str(table_path or self.cfg.table_path)
+        self._cells: Dict[str, Tuple[int, float, Tuple[float, ...], Tuple[float, ...]]] = {}
+        self._resolved: Dict[Tuple[str, str, str], Tuple[str, Any, str]] = {}   # args -> (key, cell, stat)
+        self._mtime_ns: Optional[int] = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self.stats = {"loads": 0, "lookups": 0, "hits": 0, "fallbacks": 0, "misses": 0}
+        self._maybe_reload(force=True)
+
+    def _maybe_reload(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now < self._next_check:
+            return
+        with self._lock:
+            self._next_check = now + self.cfg.reload_sec
+            try:
+                mt = os.stat(self.table_path).st_mtime_ns
+            except OSError:
+                mt = None
+            if mt == self._mtime_ns and not force:
+                return
+            cells: Dict[str, Tuple[int, float, Tuple[float, ...], Tuple[float, ...]]] = {}
+            if mt is not None:
+                try:
+                    obj = json.loads(Path(self.table_path).read_text(encoding="utf-8"))
+                    if int(obj.get("version") or 0) == TABLE_VERSION and list(obj.get("anchors") or []) == list(QTY_ANCHORS):
+                        for k, (n, hs, imp, slp) in (obj.get("cells") or {}).items():
+                            cells[k] = (int(n), float(hs), tuple(float(x) for x in imp), tuple(float(x) for x in slp))
+                except Exception:
+                    cells = {}
+            self._cells = cells
+            self._resolved = {}
+            self._mtime_ns = mt
+            self.stats["loads"] += 1
+
+    def ready(self) -> bool:
+        self._maybe_reload()
+        return bool(self._cells)
+
+    def lookup(self, symbol: str, *, qty: float = 1.0, session: str = "*", regime: str = "*") -> Optional[ImplicitCostV1]:
+        """Calibrated points per contract per side; None when no cell of the symbol has enough samples."""
+        self._maybe_reload()
+        self.stats["lookups"] += 1
+        r = self._resolved.get((symbol, session, regime))
+        if r is None:
+            r = self._resolved[(symbol, session, regime)] = self._resolve(symbol, session, regime)
+        key, c, stat = r
+        self.stats[stat] += 1
+        if c is None:
+            return None
+        i, w = _segment(float(qty))
+        return ImplicitCostV1(key=key, n=c[0], half_spread=c[1], impact=max(0.0, _interp(c[2], i, w)),
+                              slippage=_interp(c[3], i, min(w, 1.0)))
+
+
+    def _resolve(self, symbol: str, session: str, regime: str) -> Tuple[str, Any, str]:
+        sym = base_symbol(symbol)
+        ses = str(session or "*").upper()
+        reg = str(regime or "*").upper()
+        ms = self.cfg.min_samples
+        key = f"{sym}|{ses}|{reg}"
+        c = self._cells.get(key)
+        if c is not None and c[0] >= ms:
+            return key, c, "hits"
+        for key in (f"{sym}|{ses}|*", f"{sym}|*|*"):
+            c = self._cells.get(key)
+            if c is not None and c[0] >= ms:
+                return key, c, "fallbacks"
+        return "", None, "misses"
+
+
+_MODELS: Dict[str, ImplicitCostModelV1] = {}
+_MODELS_LOCK = threading.Lock()
+
+
+def get_implicit_cost_model(table_path: str = "") -> ImplicitCostModelV1:
+    """Process-wide model per table file (abspath)."""
+    p = os.path.abspath(table_path or ImplicitCostConfigV1.from_env().table_path)
+    m = _MODELS.get(p)
+    if m is None:
+        with _MODELS_LOCK:
+            m = _MODELS.get(p)
+            if m is None:
+                m = _MODELS[p] = ImplicitCostModelV1(p)
+    return m
+
+
+def _utc_now_z() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z")
+
+
+def _atomic_write(path: str, obj: Dict[str, Any]) -> None:
+    p = Path(path)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    tmp = p.with_name(p.name + f".{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(obj, ensure_ascii=False, separators=(",", ":")) + "\n", encoding="utf-8")
+    os.replace(tmp, p)
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import json
+import os
+import select
+import socket
+import sqlite3
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Deque, Dict, Optional
+
+from src.data.build_bars_1m_v1 import STREAM_SOURCE
+from src.data.stream_bars_v1 import parse_host_port
+
+# Bar-close / quote-update notifications for event-driven runners (replaces fixed-interval bars_1m polling).
+# Sources (same wait_bar() contract):
+# - UdpEventSourceV1: JSON datagrams from the recorder (UdpBarSinkV1 closed bars; bidask_fop_v1 quotes when
+#   TMF_RECORDER_STREAM_QUOTES_UDP=1). Blocks in select() and wakes on the datagram itself.
+# - DbChangeEventSourceV1: SQLite change detection for any writer. One long-lived read connection checks
+#   PRAGMA data_version (changes only when another connection commits, no table access); bars_1m is
+#   read only on change, by id watermark. Quote changes pre-warm the shared quote cache.
+# Both start at the current end of bars_1m: only bars closed after subscription are delivered.
+# NOTE: Python 3.9.6 compatible
+
+
+def _epoch_from_iso(s: Any) -> Optional[float]:
+    try:
+        return datetime.fromisoformat(str(s)).timestamp()
+    except Exception:
+        return None
+
+
+@dataclass(frozen=True)
+class BarCloseEventV1:
+    bar: Dict[str, Any]        # same shape as run_strategies_paper_loop_v1._fetch_last_bar_1m
+    close_wall: float          # epoch sec the close was published (producer emit_ts), else detect_wall
+    detect_wall: float         # epoch sec this process saw it
+    via: str                   # "udp" | "db"
+    revision: int = 0
+
+
+class UdpEventSourceV1:
+    def __init__(self, host: str, port: int, *, symbol: str, quote_cache: Any = None):
+        self.symbol = str(symbol)
+        self.quote_cache = quote_cache
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.bind((host, int(port)))
+        self._sock.setblocking(False)
+        self.stats = {"bars": 0, "quotes": 0, "ignored": 0, "bad": 0}
+
+    @property
+    def address(self) -> Any:
+        return self._sock.getsockname()
+
+    def _handle(self, data: bytes) -> Optional[BarCloseEventV1]:
+        now = time.time()
+        try:
+            d = json.loads(data.decode("utf-8"))
+        except Exception:
+            self.stats["bad"] += 1
+            return None
+        kind = d.get("kind")
+        if kind == "bar_v1":
+            if int(d.get("interval_sec") or 0) != 60 or str(d.get("symbol")) != self.symbol or not d.get("closed"):
+                self.stats["ignored"] += 1
+                return None
+            self.stats["bars"] += 1
+            bar = {
+                "ts_min": str(d["ts_start"]),
+                "o": float(d["o"]), "h": float(d["h"]), "l": float(d["l"]), "c": float(d["c"]),
+                "v": float(d.get("v") or 0.0), "n_trades": int(d.get("n_trades") or 0),
+                "source": STREAM_SOURCE,
+            }
+            return BarCloseEventV1(bar=bar, close_wall=_epoch_from_iso(d.get("emit_ts")) or now, detect_wall=now,
+                                   via="udp", revision=int(d.get("revision") or 0))
+        if kind == "bidask_fop_v1" and isinstance(d.get("payload"), dict):
+            self.stats["quotes"] += 1
+            if self.quote_cache is not None:
+                try:
+                    self.quote_cache.feed_payload(d["payload"], ts=str(d.get("ts") or ""))
+                except Exception:
+                    self.stats["bad"] += 1
+            return None
+        self.stats["ignored"] += 1
+        return None
+
+    def wait_bar(self, timeout: float) -> Optional[BarCloseEventV1]:
+        """Next closed 1m bar for symbol; quote datagrams are applied while waiting. None on timeout."""
+        deadline = time.monotonic() + max(0.0, float(timeout))
+        while True:
+            try:
+                ev = self._handle(self._sock.recv(65536))
+                if ev is not None:
+                    return ev
+                continue
+            except BlockingIOError:
+                pass
+            left = deadline - time.monotonic()
+            if left <= 0:
+                return None
+            select.select([self._sock], [], [], left)
+
+    def close(self) -> None:
+        try:
+            self._sock.close()
+        except Exception:
+            pass
+
+
+class DbChangeEventSourceV1:
+    def __init__(self, db_path: str, *, symbol: str, quote_cache: Any = None, poll_ms: Optional[float] = None):
+        self.db_path = str(db_path)
+        self.symbol = str(symbol)
+        self.quote_cache = quote_cache
+        if poll_ms is None:
+            poll_ms = float((os.environ.get("TMF_BAR_EVENTS_POLL_MS", "20") or "20").strip())
+        self.poll_sec = max(0.001, float(poll_ms) / 1000.0)
+        self._con = sqlite3.connect(self.db_path, timeout=5.0, check_same_thread=False)
+        self._con.execute("PRAGMA busy_timeout=5000;")
+        self._version = self._data_version()
+        row = self._con.execute("SELECT MAX(id), MAX(ts_min) FROM bars_1m WHERE symbol=?", (self.symbol,)).fetchone()
+        self._wm = int(row[0] or 0)
+        self._last_ts = str(row[1] or "")
+        self._pending: Deque[BarCloseEventV1] = deque()
+        self.stats = {"checks": 0, "changes": 0, "bars": 0, "quote_refreshes": 0}
+
+    def _data_version(self) -> int:
+        return int(self._con.execute("PRAGMA data_version").fetchone()[0])
+
+    def _scan(self) -> None:
+        now = time.time()
+        rows = self._con.execute(
+            "SELECT id, ts_min, o, h, l, c, v, n_trades, source FROM bars_1m WHERE symbol=? AND id > ? ORDER BY id ASC",
+            (self.symbol, self._wm),
+        ).fetchall()
+        for r in rows:
+            self._wm = max(self._wm, int(r[0]))
+            ts_min = str(r[1])
+            if ts_min <= self._last_ts:
+                continue  # rebuilt / back-filled rows of bars already delivered
+            self._last_ts = ts_min
+            bar = {"ts_min": ts_min, "o": float(r[2]), "h": float(r[3]), "l": float(r[4]), "c": float(r[5]),
+                   "v": float(r[6]), "n_trades": int(r[7]), "source": r[8]}
+            self._pending.append(BarCloseEventV1(bar=bar, close_wall=now, detect_wall=now, via="db"))
+            self.stats["bars"] += 1
+        if self.quote_cache is not None:
+            try:
+                self.quote_cache.refresh(force=True)
+                self.stats["quote_refreshes"] += 1
+            except Exception:
+                pass
+
+    def wait_bar(self, timeout: float) -> Optional[BarCloseEventV1]:
+        deadline = time.monotonic() + max(0.0, float(timeout))
+        while True:
+            if self._pending:
+                return self._pending.popleft()
+            self.stats["checks"] += 1
+            v = self._data_version()
+            if v != self._version:
+                self._version = v
+                self.stats["changes"] += 1
+                self._scan()
+                continue
+            left = deadline - time.monotonic()
+            if left <= 0:
+                return None
+            time.sleep(min(self.poll_sec, left))
+
+    def close(self) -> None:
+        try:
+            self._con.close()
+        except Exception:
+            pass
+
+
+def make_bar_event_source(db_path: str, *, symbol: str, quote_cache: Any = None) -> Any:
+    """TMF_BAR_EVENTS_UDP=host:port -> UdpEventSourceV1 (listen), else DbChangeEventSourceV1."""
+    hp = parse_host_port(os.environ.get("TMF_BAR_EVENTS_UDP", ""))
+    if hp is not None:
+        return UdpEventSourceV1(hp[0], hp[1], symbol=symbol, quote_cache=quote_cache)
+    return DbChangeEventSourceV1(db_path, symbol=symbol, quote_cache=quote_cache)
@@ -97,28 +97,49 @@ def _iter_tick_events(con: sqlite3.Connection, *, since_ymd: Optional[str], kind
     q += " ORDER BY id ASC"
     out: List[Tuple[str, str, float, float]] = []
     for ts, kind, payload_json in con.execute(q, params):
-        try:
-            payload = json.loads(payload_json) if payload_json else {}
-        except Exception:
-            payload = {}
-        if not isinstance(payload, dict):
-            continue
-        sym = (payload.get("code") or payload.get("symbol") or "").strip()
-        if not sym:
-            continue
-        dt = _parse_ts_any(payload.get("datetime") or payload.get("ts") or payload.get("recv_ts") or ts)
-        if not dt:
-            continue
-        px = _pick_price(payload)
-        if px is None:
-            continue
-        vol = _pick_volume(payload)
-        if vol is None:
-            # allow zero-volume ticks, but keep as 0.0 (better than dropping)
-            vol = 0.0
-        out.append((_ts_minute(dt), sym, float(px), float(vol)))
+        t = _tick_from_event(ts, payload_json)
+        if t is not None:
+            out.append(t)
     return out
 
+def _tick_from_event(ts: Any, payload_json: Any) -> Optional[Tuple[str, str, float, float]]:
+    """
+    Parse one events row into (ts_min, symbol, price, volume); None if not a usable trade tick.
+    """
+    try:
+        payload = json.loads(payload_json) if payload_json else {}
+    except Exception:
+        payload = {}
+    if not isinstance(payload, dict):
+        return None
+    sym = (payload.get("code") or payload.get("symbol") or "").strip()
+    if not sym:
+        return None
+    dt = _parse_ts_any(payload.get("datetime") or payload.get("ts") or payload.get("recv_ts") or ts)
+    if not dt:
+        return None
+    px = _pick_price(payload)
+    if px is None:
+        return None
+    vol = _pick_volume(payload)
+    if vol is None:
+        # allow zero-volume ticks, but keep as 0.0 (better than dropping)
+        vol = 0.0
+    return (_ts_minute(dt), sym, float(px), float(vol))
+
+def _asset_for_symbol(sym: str) -> str:
+    return _asset_from_kind("fop" if sym.endswith(("B6","R1")) else "stk")  # heuristic; kind info not kept per tick row
+
+_UPSERT_BAR_SQL = """
+    INSERT INTO bars_1m (ts_min, asset_class, symbol, o, h, l, c, v, n_trades, source)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(ts_min, asset_class, symbol) DO UPDATE SET
+        asset_class=excluded.asset_class,
+        o=excluded.o, h=excluded.h, l=excluded.l, c=excluded.c,
+        v=excluded.v, n_trades=excluded.n_trades,
+        source=excluded.source
+"""
+
 def _ensure_schema(con: sqlite3.Connection) -> None:
     # bars_1m is expected to exist from init_db; but keep it safe
     con.execute(
@@ -170,17 +191,9 @@ def build_bars_1m_from_events(*, db_path: str, since_ymd: Optional[str], kinds:
 
         up = 0
         for (ts_min, sym), b in agg.items():
-            asset = _asset_from_kind("fop" if sym.endswith(("B6","R1")) else "stk")  # heuristic; kind info not kept per tick row
+            asset = _asset_for_symbol(sym)
             con.execute(
-                """
-                INSERT INTO bars_1m (ts_min, asset_class, symbol, o, h, l, c, v, n_trades, source)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ON CONFLICT(ts_min, asset_class, symbol) DO UPDATE SET
-                    asset_class=excluded.asset_class,
-                    o=excluded.o, h=excluded.h, l=excluded.l, c=excluded.c,
-                    v=excluded.v, n_trades=excluded.n_trades,
-                    source=excluded.source
-                """,
+                _UPSERT_BAR_SQL,
                 (ts_min, asset, sym, b["o"], b["h"], b["l"], b["c"], b["v"], int(b["n"]), "build_bars_1m_v1.events_v2"),
             )
             up += 1
@@ -189,12 +202,222 @@ def build_bars_1m_from_events(*, db_path: str, since_ymd: Optional[str], kinds:
     finally:
         con.close()
 
+ARCHIVE_SOURCE = "build_bars_1m_v1.archive_v1"
+
+def build_bars_1m_from_archive(*, db_path: str, archive_paths: List[str], dry: bool = False) -> Dict[str, Any]:
+    """
+    bars_1m from tick archives (src/data/tick_archive_v1.py; one .tav1 per day/code/kind):
+    one pass over the mmap'ed tick columns, no JSON parsing. Same bars as build_bars_1m_from_events
+    over the same ticks (ts_min in exchange local time).
+    """
+    from src.data.tick_archive_v1 import RT_TICK, TickArchiveV1
+
+    con = sqlite3.connect(db_path)
+    try:
+        _ensure_schema(con)
+        ticks = 0
+        up = 0
+        for p in archive_paths:
+            with TickArchiveV1(p) as a:
+                if a.record_type != RT_TICK:
+                    continue
+                rows = a.bars_1m_rows()
+                ticks += a.n
+                asset = _asset_for_symbol(a.code)
+                for ts_min, o, h, l, c, v, n in rows:
+                    if not dry:
+                        con.execute(_UPSERT_BAR_SQL, (ts_min, asset, a.code, o, h, l, c, v, int(n), ARCHIVE_SOURCE))
+                    up += 1
+        if not dry:
+            con.commit()
+        return {"ok": True, "archives": len(archive_paths), "tick_rows": ticks, "bars_upserted": up, "dry": bool(dry)}
+    finally:
+        con.close()
+
+# ---- Incremental mode (watermark) ----
+# Persist the last consumed events.id so each pass only reads new tick rows and only
+# upserts the bars those ticks touched (the open bar + any late-touched bars).
+# - scan cursor: bars_1m_watermark(symbol='*')  -> events.id > cursor
+# - per-symbol rows: last events.id merged into that symbol's bars (skip guard + ops visibility)
+# Bars + watermarks are committed in one transaction, so a crash never double-counts ticks.
+# First pass (no cursor) rebuilds touched bars from scratch, identical to build_bars_1m_from_events.
+# Bars written by the recorder's in-process stream (src/data/stream_bars_v1.py) are authoritative for
+# their minute: the incremental pass advances its watermark past those ticks but leaves the bar alone.
+WATERMARK_ALL = "*"
+INCREMENTAL_SOURCE = "build_bars_1m_v1.events_v2.incr"
+STREAM_SOURCE = "shioaji_recorder.stream_v1"
+
+def _ensure_watermark_schema(con: sqlite3.Connection) -> None:
+    con.execute(
+        """
+        CREATE TABLE IF NOT EXISTS bars_1m_watermark (
+            symbol TEXT PRIMARY KEY,
+            last_event_id INTEGER NOT NULL,
+            updated_ts TEXT NOT NULL
+        )
+        """
+    )
+    con.commit()
+
+def _load_watermarks(con: sqlite3.Connection) -> Dict[str, int]:
+    return {str(r[0]): int(r[1]) for r in con.execute("SELECT symbol, last_event_id FROM bars_1m_watermark")}
+
+def build_bars_1m_incremental(
+    *,
+    db_path: str,
+    since_ymd: Optional[str],
+    kinds: List[str],
+    max_rows: int = 50000,
+    dry: bool = False,
+    con: Optional[sqlite3.Connection] = None,
+) -> Dict[str, Any]:
+    """
+    One incremental pass: read events with id > watermark (up to max_rows), merge into bars_1m.
+    Pass an open connection (daemon mode) to avoid reconnecting every cycle.
+    """
+    own = con is None
+    if con is None:
+        con = sqlite3.connect(db_path)
+    try:
+        _ensure_schema(con)
+        _ensure_watermark_schema(con)
+        wm = _load_watermarks(con)
+        cursor = wm.get(WATERMARK_ALL)
+        first = cursor is None
+
+        q = "SELECT id, ts, payload_json FROM events WHERE kind IN (%s) AND id > ?" % (",".join(["?"] * len(kinds)))
+        params: List[Any] = list(kinds) + [int(cursor or 0)]
+        if since_ymd:
+            q += " AND ts >= ?"
+            params.append(since_ymd)
+        q += " ORDER BY id ASC LIMIT ?"
+        params.append(max(1, int(max_rows)))
+        rows = con.execute(q, params).fetchall()
+        if not rows:
+            return {"ok": True, "mode": "incremental", "event_rows": 0, "tick_rows": 0, "bars_upserted": 0,
+                    "watermark": int(cursor or 0)}
+
+        last_id = int(rows[-1][0])
+        agg: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        sym_last: Dict[str, int] = {}
+        tick_rows = 0
+        skipped = 0
+        stream_owned = 0
+        owned_keys = set()
+        for eid, ts, payload_json in rows:
+            t = _tick_from_event(ts, payload_json)
+            if t is None:
+                continue
+            ts_min, sym, px, vol = t
+            if int(eid) <= wm.get(sym, 0):
+                skipped += 1
+                continue
+            tick_rows += 1
+            sym_last[sym] = int(eid)
+            key = (ts_min, sym)
+            if key in owned_keys:
+                stream_owned += 1
+                continue
+            b = agg.get(key)
+            if b is None:
+                base = con.execute(
+                    "SELECT o, h, l, c, v, n_trades, source FROM bars_1m WHERE ts_min=? AND asset_class=? AND symbol=?",
+                    (ts_min, _asset_for_symbol(sym), sym),
+                ).fetchone()
+                if base is not None and base[6] == STREAM_SOURCE:
+                    owned_keys.add(key)
+                    stream_owned += 1
+                    continue
+                if first:
+                    base = None
+                if base is None:
+                    b = {"o": px, "h": px, "l": px, "c": px, "v": float(vol), "n": 1}
+                else:
+                    b = {"o": float(base[0]), "h": max(float(base[1]), px), "l": min(float(base[2]), px),
+                         "c": px, "v": float(base[4]) + float(vol), "n": int(base[5]) + 1}
+                agg[key] = b
+            else:
+                b["h"] = max(b["h"], px)
+                b["l"] = min(b["l"], px)
+                b["c"] = px
+                b["v"] += float(vol)
+                b["n"] += 1
+
+        if dry:
+            return {"ok": True, "mode": "incremental", "event_rows": len(rows), "tick_rows": tick_rows,
+                    "bars_upserted": len(agg), "skipped": skipped, "stream_owned": stream_owned, "watermark": last_id, "dry": True}
+
+        now = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        try:
+            for (ts_min, sym), b in agg.items():
+                con.execute(
+                    _UPSERT_BAR_SQL,
+                    (ts_min, _asset_for_symbol(sym), sym, b["o"], b["h"], b["l"], b["c"], b["v"], int(b["n"]), INCREMENTAL_SOURCE),
+                )
+            wm_rows = [(sym, eid, now) for sym, eid in sym_last.items()]
+            wm_rows.append((WATERMARK_ALL, last_id, now))
+            con.executemany(
+                "INSERT INTO bars_1m_watermark(symbol, last_event_id, updated_ts) VALUES(?,?,?) "
+                "ON CONFLICT(symbol) DO UPDATE SET last_event_id=excluded.last_event_id, updated_ts=excluded.updated_ts",
+                wm_rows,
+            )
+            con.commit()
+        except Exception:
+            con.rollback()
+            raise
+        return {"ok": True, "mode": "incremental", "event_rows": len(rows), "tick_rows": tick_rows,
+                "bars_upserted": len(agg), "skipped": skipped, "stream_owned": stream_owned, "watermark": last_id,
+                "symbols": sorted(sym_last.keys())}
+    finally:
+        if own:
+            con.close()
+
+def run_incremental_daemon(
+    *,
+    db_path: str,
+    since_ymd: Optional[str],
+    kinds: List[str],
+    interval_sec: float = 1.0,
+    max_rows: int = 50000,
+    max_iter: int = 0,
+) -> int:
+    """
+    Long-lived follower: drain new ticks (max_rows per pass), sleep interval_sec when idle.
+    max_iter=0 means run forever (Ctrl-C to stop).
+    """
+    import time
+    con = sqlite3.connect(db_path, timeout=10.0)
+    con.execute("PRAGMA busy_timeout=10000;")
+    it = 0
+    try:
+        while True:
+            it += 1
+            r = build_bars_1m_incremental(db_path=db_path, since_ymd=since_ymd, kinds=kinds, max_rows=max_rows, con=con)
+            if int(r.get("event_rows") or 0) > 0:
+                print(json.dumps(r, ensure_ascii=False), flush=True)
+            if max_iter and it >= max_iter:
+                break
+            # backlog still draining -> loop immediately
+            if int(r.get("event_rows") or 0) < int(max_rows):
+                time.sleep(max(0.05, float(interval_sec)))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        con.close()
+    return 0
+
 def main() -> int:
     p = argparse.ArgumentParser(description="build bars_1m from TMF sqlite db (v2: events-first)")
     p.add_argument("--db", default="runtime/data/tmf_autotrader_v1.sqlite3")
     p.add_argument("--since", default="", help="YYYY-MM-DD (optional; filters events.ts >= since)")
     p.add_argument("--kinds", default="tick_fop_v1,tick_stk_v1", help="comma-separated event kinds to treat as ticks")
+    p.add_argument("--archive", default="", help="glob of tick archives (.tav1, src/data/tick_archive_v1.py) instead of events")
     p.add_argument("--dry", action="store_true")
+    p.add_argument("--incremental", action="store_true", help="only read events.id > persisted watermark; upsert touched bars")
+    p.add_argument("--follow", action="store_true", help="daemon mode (implies --incremental)")
+    p.add_argument("--interval-sec", type=float, default=1.0)
+    p.add_argument("--max-rows", type=int, default=50000, help="max events per incremental pass")
+    p.add_argument("--max-iter", type=int, default=0, help="daemon passes (0 = forever)")
     args = p.parse_args()
 
     since = (args.since or "").strip() or None
@@ -202,7 +425,20 @@ def main() -> int:
     if not kinds:
         kinds = ["tick_fop_v1", "tick_stk_v1"]
 
-    r = build_bars_1m_from_events(db_path=str(args.db), since_ymd=since, kinds=kinds, dry=bool(args.dry))
+    if args.archive:
+        import glob
+        r = build_bars_1m_from_archive(db_path=str(args.db), archive_paths=sorted(glob.glob(args.archive)), dry=bool(args.dry))
+        print(json.dumps(r, ensure_ascii=False, indent=2))
+        return 0 if r.get("ok") else 1
+    if args.follow:
+        return run_incremental_daemon(db_path=str(args.db), since_ymd=since, kinds=kinds,
+                                      interval_sec=float(args.interval_sec), max_rows=int(args.max_rows),
+                                      max_iter=int(args.max_iter))
+    if args.incremental:
+        r = build_bars_1m_incremental(db_path=str(args.db), since_ymd=since, kinds=kinds,
+                                      max_rows=int(args.max_rows), dry=bool(args.dry))
+    else:
+        r = build_bars_1m_from_events(db_path=str(args.db), since_ymd=since, kinds=kinds, dry=bool(args.dry))
     print(json.dumps(r, ensure_ascii=False, indent=2))
     return 0 if r.get("ok") else 1
 
@@ -0,0 +1,293 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# quotes_l5: typed L1..L5 bid/ask table derived from bidask events (one row per events.id).
+# - populated by the writers only (ingest / recorder call sync_quotes_l5 after commit), from a per-kind
+#   events.id watermark; readers never write
+# - readers (market metrics / safety / drift) do one indexed lookup; no payload_json decoding.
+#   While the watermark lags events (rows from a path that did not sync), reads raise
+#   QuotesL5BehindError and callers fall back to the events scan, so no row is ever missed
+# - events stays the truth-source: every quote row carries its source events.id
+# NOTE: stdlib only, no src.* imports (store_sqlite_v1 imports this when run as a script)
+
+QUOTE_KINDS_DEFAULT = ("bidask_fop_v1",)
+LEVELS = 5
+
+_LEVEL_COLS = (
+    [f"bid_px{i}" for i in range(1, LEVELS + 1)]
+    + [f"bid_vol{i}" for i in range(1, LEVELS + 1)]
+    + [f"ask_px{i}" for i in range(1, LEVELS + 1)]
+    + [f"ask_vol{i}" for i in range(1, LEVELS + 1)]
+)
+_ROW_COLS = ["event_id", "ts", "kind", "code", "synthetic", "source_file", "db_ingest_ts", "recv_ts", "ingest_ts"] + _LEVEL_COLS
+
+QUOTES_L5_SCHEMA = """
+CREATE TABLE IF NOT EXISTS quotes_l5 (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  event_id INTEGER NOT NULL UNIQUE,
+  ts TEXT NOT NULL,
+  kind TEXT NOT NULL,
+  code TEXT NOT NULL,
+  synthetic INTEGER NOT NULL DEFAULT 0,
+  source_file TEXT,
+  db_ingest_ts TEXT,
+  recv_ts TEXT,
+  ingest_ts TEXT,
+  %s
+);
+CREATE INDEX IF NOT EXISTS idx_quotes_l5_code_ts ON quotes_l5(code, ts);
+CREATE INDEX IF NOT EXISTS idx_quotes_l5_kind_code_eid ON quotes_l5(kind, code, event_id);
+
+CREATE TABLE IF NOT EXISTS quotes_l5_watermark (
+  kind TEXT PRIMARY KEY,
+  last_event_id INTEGER NOT NULL
+);
+""" % (",\n  ".join(f"{c} REAL" for c in _LEVEL_COLS),)
+
+
+class QuotesL5BehindError(sqlite3.DatabaseError):
+    """quotes_l5 has not been synced up to the newest events row of this kind."""
+
+
+def ensure_quotes_l5_schema(con: sqlite3.Connection) -> None:
+    con.executescript(QUOTES_L5_SCHEMA)
+
+
+def _require_synced(con: sqlite3.Connection, kind: str) -> None:
+    ev_mx, synced = con.execute(
+        "SELECT (SELECT MAX(id) FROM events WHERE kind=?), (SELECT last_event_id FROM quotes_l5_watermark WHERE kind=?)",
+        (kind, kind),
+    ).fetchone()
+    if int(ev_mx or 0) > int(synced or 0):
+        raise QuotesL5BehindError("quotes_l5 behind events for %s (%s < %s)" % (kind, int(synced or 0), int(ev_mx or 0)))
+
+
+def _f(x: Any) -> Optional[float]:
+    try:
+        return None if x is None else float(x)
+    except Exception:
+        return None
+
+
+def _levels(payload: Dict[str, Any], key: str, scalar_key: Optional[str]) -> List[Optional[float]]:
+    v = payload.get(key)
+    out: List[Optional[float]] = []
+    if isinstance(v, (list, tuple)):
+        out = [_f(x) for x in list(v)[:LEVELS]]
+    # fallback schema: bid/ask scalars (level-1 only)
+    if (not out or out[0] is None) and scalar_key and payload.get(scalar_key) is not None:
+        out = [_f(payload.get(scalar_key))] + out[1:]
+    return (out + [None] * LEVELS)[:LEVELS]
+
+
+def quote_row_from_payload(
+    *,
+    event_id: int,
+    ts: str,
+    kind: str,
+    payload: Dict[str, Any],
+    source_file: Any = None,
+    db_ingest_ts: Any = None,
+) -> Optional[Tuple[Any, ...]]:
+    """events row -> quotes_l5 row tuple (column order = _ROW_COLS), None if payload has no code."""
+    if not isinstance(payload, dict):
+        return None
+    code = str(payload.get("code", "") or "")
+    if not code:
+        return None
+    return tuple(
+        [int(event_id), str(ts), str(kind), code, 1 if bool(payload.get("synthetic")) else 0,
+         (None if source_file is None else str(source_file)),
+         (None if db_ingest_ts is None else str(db_ingest_ts)),
+         (None if payload.get("recv_ts") is None else str(payload.get("recv_ts"))),
+         (None if payload.get("ingest_ts") is None else str(payload.get("ingest_ts")))]
+        + _levels(payload, "bid_price", "bid")
+        + _levels(payload, "bid_volume", None)
+        + _levels(payload, "ask_price", "ask")
+        + _levels(payload, "ask_volume", None)
+    )
+
+
+_INSERT_SQL = "INSERT OR IGNORE INTO quotes_l5(%s) VALUES(%s)" % (",".join(_ROW_COLS), ",".join(["?"] * len(_ROW_COLS)))
+
+# Set-based sync: quote_row_from_payload in SQL (json_extract once per field; no Python per row).
+# JSON null and a missing key both read as None there, so plain json_extract values map 1:1:
+# numbers / booleans -> REAL levels (float(True) == 1.0), a non-array level key -> NULL elements.
+# Rows SQL cannot map exactly (invalid JSON such as NaN, string levels / synthetic, non-text code or
+# timestamps) are left out and go through quote_row_from_payload afterwards.
+_LEVEL_KEYS = (("bid_price", "bid"), ("bid_volume", None), ("ask_price", "ask"), ("ask_volume", None))
+
+
+def _sync_sql() -> Tuple[str, str]:
+    ext = [("code", "json_extract(payload_json, '$.code')"), ("t_code", "json_type(payload_json, '$.code')"),
+           ("syn", "json_extract(payload_json, '$.synthetic')")]
+    for k in ("recv_ts", "ingest_ts"):
+        ext += [(k, "json_extract(payload_json, '$.%s')" % k), ("t_" + k, "json_type(payload_json, '$.%s')" % k)]
+    ext += [(k, "json_extract(payload_json, '$.%s')" % k) for k in ("bid", "ask")]
+    levels: List[str] = []
+    for key, scalar_key in _LEVEL_KEYS:
+        for i in range(LEVELS):
+            c = "%s%d" % (key, i)
+            ext.append((c, "json_extract(payload_json, '$.%s[%d]')" % (key, i)))
+            levels.append("CAST(%s AS REAL)" % c if not (i == 0 and scalar_key) else
+                          "COALESCE(CAST(%s AS REAL), CAST(%s AS REAL))" % (c, scalar_key))
+    nums = [c for c, _ in ext[7:]]   # bid, ask and the level elements
+    sel = ["id", "CAST(ts AS TEXT)", "kind", "code", "syn IS NOT NULL AND syn <> 0", "CAST(source_file AS TEXT)",
+           "CAST(ingest_ts AS TEXT)", "recv_ts", "ingest_ts_"] + levels
+    ok = (["t_code = 'text'", "code <> ''", "typeof(syn) <> 'text'"]
+          + ["COALESCE(t_%s IN ('null','text'), 1)" % k for k in ("recv_ts", "ingest_ts")]
+          + ["typeof(%s) <> 'text'" % c for c in nums])
+    cte = ("WITH r AS MATERIALIZED (SELECT id, ts, kind, source_file, ingest_ts, %s FROM events "
+           "WHERE kind=? AND id > ? AND id <= ? AND json_valid(payload_json))"
+           % (", ".join("%s AS %s" % (e, ("ingest_ts_" if c == "ingest_ts" else c)) for c, e in ext),))
+    insert = "INSERT OR IGNORE INTO quotes_l5(%s) %s SELECT %s FROM r WHERE %s ORDER BY id" % (
+        ",".join(_ROW_COLS), cte, ", ".join(sel), " AND ".join(ok))
+    rest = ("SELECT id, ts, payload_json, source_file, ingest_ts FROM events e WHERE kind=? AND id > ? AND id <= ? "
+            "AND NOT EXISTS (SELECT 1 FROM quotes_l5 q WHERE q.event_id = e.id) ORDER BY id")
+    return insert, rest
+
+
+_SYNC_INSERT_SQL, _SYNC_REST_SQL = _sync_sql()
+
+
+def _sync_rest(con: sqlite3.Connection, kind: str, lo: int, hi: int) -> int:
+    """Rows the SQL mapping left out (no code, or not mappable in SQL): quote_row_from_payload decides."""
+    out = []
+    for eid, ts, pj, sf, its in con.execute(_SYNC_REST_SQL, (kind, lo, hi)):
+        try:
+            payload = json.loads(pj) if pj else {}
+        except Exception:
+            payload = {}
+        row = quote_row_from_payload(event_id=int(eid), ts=str(ts), kind=kind, payload=payload,
+                                     source_file=sf, db_ingest_ts=its)
+        if row is not None:
+            out.append(row)
+    if not out:
+        return 0
+    return max(0, con.executemany(_INSERT_SQL, out).rowcount)
+
+
+def sync_quotes_l5(
+    con: sqlite3.Connection,
+    *,
+    kinds: Sequence[str] = QUOTE_KINDS_DEFAULT,
+    commit: bool = True,
+) -> int:
+    """
+    Catch quotes_l5 up with events (id > watermark per kind). Returns rows inserted.
+    Cheap when nothing is new: one MAX(id) probe per kind (idx_events_kind).
+    Set-based: one INSERT .. SELECT json_extract(..) per kind; only payloads the SQL mapping cannot
+    reproduce exactly (and rows without a code) go through quote_row_from_payload.
+    A transaction opened here is rolled back on any error, so a shared autocommit connection
+    never keeps the write lock after a failed sync (a caller's own transaction is left to the caller).
+    """
+    n_ins = 0
+    began = False
+    try:
+        for kind in kinds:
+            try:
+                r = con.execute("SELECT last_event_id FROM quotes_l5_watermark WHERE kind=?", (kind,)).fetchone()
+            except sqlite3.OperationalError:
+                ensure_quotes_l5_schema(con)
+                r = None
+            wm = int(r[0]) if r else 0
+            mx = con.execute("SELECT MAX(id) FROM events WHERE kind=?", (kind,)).fetchone()[0]
+            mx = int(mx or 0)
+            if mx == wm:
+                continue
+            if commit and not con.in_transaction:
+                # autocommit connections (isolation_level=None) would otherwise commit row by row;
+                # IMMEDIATE: a deferred read-then-write transaction fails at once (no busy wait) when
+                # another writer commits in between (recorder writer, bars sink, OMS)
+                con.execute("BEGIN IMMEDIATE")
+                began = True
+            if mx < wm:
+                # events rebuilt/truncated under us: rebuild this kind from scratch
+                con.execute("DELETE FROM quotes_l5 WHERE kind=?", (kind,))
+                wm = 0
+            # bounded by mx: rows committed after the probe wait for the next sync
+            n_ins += max(0, con.execute(_SYNC_INSERT_SQL, (kind, wm, mx)).rowcount)
+            n_ins += _sync_rest(con, kind, wm, mx)
+            con.execute(
+                "INSERT INTO quotes_l5_watermark(kind, last_event_id) VALUES(?,?) "
+                "ON CONFLICT(kind) DO UPDATE SET last_event_id=excluded.last_event_id",
+                (kind, mx),
+            )
+        if commit:
+            con.commit()
+    except BaseException:
+        if began and con.in_transaction:
+            con.rollback()
+        raise
+    return n_ins
+
+
+def _quote_dict(r: Sequence[Any], cols: Sequence[str]) -> Dict[str, Any]:
+    d = dict(zip(cols, r))
+    q: Dict[str, Any] = {k: d.get(k) for k in ("event_id", "ts", "kind", "code", "source_file", "db_ingest_ts", "recv_ts", "ingest_ts")}
+    q["synthetic"] = bool(d.get("synthetic"))
+
+    def _side(prefix: str) -> List[float]:
+        xs = [d.get(f"{prefix}{i}") for i in range(1, LEVELS + 1)]
+        # trailing empty levels are dropped (payload arrays can be shorter than 5)
+        while xs and xs[-1] is None:
+            xs.pop()
+        return xs
+
+    q["bid_price"] = _side("bid_px")
+    q["bid_volume"] = _side("bid_vol")
+    q["ask_price"] = _side("ask_px")
+    q["ask_volume"] = _side("ask_vol")
+    return q
+
+
+def latest_quote(
+    con: sqlite3.Connection,
+    *,
+    code: str,
+    kind: str = "bidask_fop_v1",
+    reject_synthetic: bool = True,
+    asof_ts: Optional[str] = None,
+    exclude_source_prefix: Optional[str] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Latest (highest events.id) quote for code. The dict is payload-shaped
+    (bid_price/ask_price/bid_volume/ask_volume lists, synthetic, recv_ts, ingest_ts) plus event_id/ts.
+    Read-only. Raises sqlite3.Error if the table cannot be used or is not synced
+    (QuotesL5BehindError); callers fall back to the events scan.
+    """
+    _require_synced(con, str(kind))
+    cols = _ROW_COLS
+    q = "SELECT %s FROM quotes_l5 WHERE kind=? AND code=?" % (",".join(cols),)
+    params: List[Any] = [str(kind), str(code)]
+    if reject_synthetic:
+        q += " AND synthetic=0"
+    if exclude_source_prefix:
+        q += " AND (source_file IS NULL OR substr(source_file, 1, ?) != ?)"
+        params += [len(exclude_source_prefix), exclude_source_prefix]
+    if asof_ts:
+        q += " AND ts <= ?"
+        params.append(str(asof_ts))
+    q += " ORDER BY event_id DESC LIMIT 1"
+    r = con.execute(q, params).fetchone()
+    return _quote_dict(tuple(r), cols) if r is not None else None
+
+
+def recent_spreads(
+    con: sqlite3.Connection,
+    *,
+    code: str,
+    kind: str = "bidask_fop_v1",
+    limit: int = 300,
+) -> List[float]:
+    """Level-1 spreads (ask_px1 - bid_px1) of the last `limit` non-synthetic quotes, newest first. Read-only."""
+    _require_synced(con, str(kind))
+    rows = con.execute(
+        "SELECT ask_px1, bid_px1 FROM quotes_l5 WHERE kind=? AND code=? AND synthetic=0 "
+        "AND ask_px1 IS NOT NULL AND bid_px1 IS NOT NULL ORDER BY event_id DESC LIMIT ?",
+        (str(kind), str(code), int(limit)),
+    ).fetchall()
+    return [float(a) - float(b) for a, b in rows]
@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from src.ops.latency.gate_timing import trace_queries
+
+# Shared SQLite connection manager (PaperOMS / Risk / Safety / market metrics).
+# - one long-lived connection per (db file, thread); PRAGMAs applied once, consistently
+# - sqlite3 keeps a per-connection prepared-statement cache (cached_statements), which only pays
+#   off on long-lived connections; the fixed SQL strings in OMS/gates hit it on every call
+# - transaction(): groups writes (e.g. one order's fill/status/trade rows) into ONE commit;
+#   nested transaction() blocks join the outer one; commit() on a borrowed handle inside a
+#   transaction is deferred to the outermost exit
+# - borrow(): handle whose close() is a no-op, so existing `con = self._con(); ... con.close()`
+#   call sites keep working unchanged
+# Disable with TMF_SQLITE_SHARED_CONN=0 (every _con() opens a fresh connection as before).
+# NOTE: Python 3.9.6 compatible
+
+DEFAULT_PRAGMAS: Tuple[Tuple[str, str], ...] = (
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("busy_timeout", "5000"),
+    ("temp_store", "MEMORY"),
+)
+
+
+def shared_conn_enabled() -> bool:
+    return (os.environ.get("TMF_SQLITE_SHARED_CONN", "1") or "1").strip().lower() in ("1", "true", "yes", "y", "on")
+
+
+def _pragmas_from_env() -> Tuple[Tuple[str, str], ...]:
+    sync = (os.environ.get("TMF_SQLITE_SYNCHRONOUS", "NORMAL") or "NORMAL").strip().upper()
+    if sync not in ("OFF", "NORMAL", "FULL", "EXTRA"):
+        sync = "NORMAL"
+    return tuple((k, (sync if k == "synchronous" else v)) for k, v in DEFAULT_PRAGMAS)
+
+
+class BorrowedConnectionV1:
+    """Thin handle over a managed connection: per-handle row_factory, no-op close, tx-aware commit."""
+
+    __slots__ = ("_mgr", "_con", "row_factory")
+
+    def __init__(self, mgr: "SqliteConnManagerV1", con: sqlite3.Connection, row_factory: Any = None):
+        self._mgr = mgr
+        self._con = con
+        self.row_factory = row_factory
+
+    def cursor(self) -> sqlite3.Cursor:
+        cur = self._con.cursor()
+        cur.row_factory = self.row_factory
+        return cur
+
+    def execute(self, sql: str, params: Any = ()) -> sqlite3.Cursor:
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql: str, seq: Any) -> sqlite3.Cursor:
+        return self.cursor().executemany(sql, seq)
+
+    def executescript(self, script: str) -> sqlite3.Cursor:
+        if self._mgr.in_transaction():
+            raise sqlite3.OperationalError("executescript inside a managed transaction")
+        return self._con.executescript(script)
+
+    def commit(self) -> None:
+        # inside transaction(): the outermost block commits
+        if not self._mgr.in_transaction() and self._con.in_transaction:
+            self._con.commit()
+
+    def rollback(self) -> None:
+        if not self._mgr.in_transaction() and self._con.in_transaction:
+            self._con.rollback()
+
+    def close(self) -> None:
+        return None
+
+    @property
+    def in_transaction(self) -> bool:
+        return bool(self._con.in_transaction)
+
+    @property
+    def total_changes(self) -> int:
+        return int(self._con.total_changes)
+
+    def __enter__(self) -> "BorrowedConnectionV1":
+        return self
+
+    def __exit__(self, et: Any, ev: Any, tb: Any) -> None:
+        return None
+
+
+class SqliteConnManagerV1:
+    def __init__(self, db_path: str, *, pragmas: Optional[Tuple[Tuple[str, str], ...]] = None, cached_statements: int = 256):
+        self.db_path = str(db_path)
+        self.pragmas = tuple(pragmas) if pragmas is not None else _pragmas_from_env()
+        self.cached_statements = int(cached_statements)
+        self._local = threading.local()
+        self._all: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {"opened": 0, "tx_commits": 0, "tx_rollbacks": 0}
+
+    def _open(self) -> sqlite3.Connection:
+        # isolation_level=None: autocommit outside transaction(); BEGIN/COMMIT are explicit
+        con = sqlite3.connect(self.db_path, timeout=5.0, isolation_level=None, cached_statements=self.cached_statements)
+        trace_queries(con)  # per-thread SQL statement counts for the gate-chain timing
+        for k, v in self.pragmas:
+            try:
+                con.execute(f"PRAGMA {k}={v};")
+            except sqlite3.Error:
+                pass
+        with self._lock:
+            self._all.append(con)
+            self.stats["opened"] += 1
+        return con
+
+    def connection(self) -> sqlite3.Connection:
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = self._open()
+            self._local.con = con
+            self._local.depth = 0
+        return con
+
+    def borrow(self, *, row_factory: Any = None) -> BorrowedConnectionV1:
+        return BorrowedConnectionV1(self, self.connection(), row_factory=row_factory)
+
+    def in_transaction(self) -> bool:
+        return int(getattr(self._local, "depth", 0) or 0) > 0
+
+    @contextmanager
+    def transaction(self, *, immediate: bool = True) -> Iterator[BorrowedConnectionV1]:
+        con = self.connection()
+        depth = int(getattr(self._local, "depth", 0) or 0)
+        if depth == 0:
+            con.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+        self._local.depth = depth + 1
+        try:
+            yield BorrowedConnectionV1(self, con)
+        except BaseException:
+            self._local.depth = depth
+            if depth == 0 and con.in_transaction:
+                con.rollback()
+                self.stats["tx_rollbacks"] += 1
+            raise
+        else:
+            self._local.depth = depth
+            if depth == 0 and con.in_transaction:
+                con.commit()
+                self.stats["tx_commits"] += 1
+
+    def close_all(self) -> None:
+        """Close every connection opened by this manager (call at process shutdown)."""
+        with self._lock:
+            cons, self._all = self._all, []
+        for c in cons:
+            try:
+                c.close()
+            except Exception:
+                pass
+        self._local = threading.local()
+
+
+_MANAGERS: Dict[str, SqliteConnManagerV1] = {}
+_MANAGERS_LOCK = threading.Lock()
+
+
+_RESOLVED: Dict[str, str] = {}
+
+
+def get_conn_manager(db_path: Any) -> SqliteConnManagerV1:
+    """Process-wide manager per db file (resolved path)."""
+    raw = str(db_path)
+    key = _RESOLVED.get(raw)
+    if key is None:
+        key = str(Path(raw).resolve())
+        if os.path.isabs(raw):   # relative paths depend on the cwd; resolve them every time
+            _RESOLVED[raw] = key
+    with _MANAGERS_LOCK:
+        m = _MANAGERS.get(key)
+        if m is None:
+            m = SqliteConnManagerV1(str(db_path))
+            _MANAGERS[key] = m
+        return m
+
+
+def connect_shared(db_path: Any, *, row_factory: Any = None) -> Any:
+    """
+    Drop-in for sqlite3.connect() at `con = ...; try: ... finally: con.close()` call sites.
+    Returns a borrowed long-lived connection when TMF_SQLITE_SHARED_CONN is on, else a fresh one.
+    """
+    if shared_conn_enabled():
+        return get_conn_manager(db_path).borrow(row_factory=row_factory)
+    con = sqlite3.connect(str(db_path))
+    if row_factory is not None:
+        con.row_factory = row_factory
+    return con
+
+
+@contextmanager
+def shared_transaction(db_path: Any) -> Iterator[None]:
+    """One transaction for every connect_shared() write in this thread; no-op when sharing is off."""
+    if not shared_conn_enabled():
+        yield None
+        return
+    with get_conn_manager(db_path).transaction():
+        yield None
@@ -2,6 +2,7 @@ from __future__ import annotations
 import json, sqlite3, hashlib, time
 from pathlib import Path
 from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 SCHEMA_SQL = """
 PRAGMA journal_mode=WAL;
@@ -174,9 +175,35 @@ def ingest_jsonl(db_path: Path, jsonl_path: Path) -> None:
         print(f"[OK] ingested: {src}")
         print(f"[INFO] sha256={sh}")
         print(f"[INFO] total={lines_total} ok={lines_ok} bad={lines_bad} secs={dt:.2f}")
+        sync_quotes_best_effort(con)
     finally:
         con.close()
 
+def sync_quotes_best_effort(con: sqlite3.Connection) -> int:
+    """Catch quotes_l5 up with freshly ingested bidask events (never fails the ingest)."""
+    try:
+        try:
+            from src.data.quotes_l5_v1 import ensure_quotes_l5_schema, sync_quotes_l5
+        except ImportError:
+            from quotes_l5_v1 import ensure_quotes_l5_schema, sync_quotes_l5  # run as script from src/data
+        ensure_quotes_l5_schema(con)
+        in_tx = con.isolation_level is None
+        if in_tx:
+            con.execute("BEGIN")
+        try:
+            n = sync_quotes_l5(con, commit=not in_tx)
+            if in_tx:
+                con.execute("COMMIT")
+        except BaseException:
+            if con.in_transaction:
+                con.rollback()
+            raise
+        print(f"[INFO] quotes_l5 synced rows={n}")
+        return n
+    except Exception as e:
+        print(f"[WARN] quotes_l5 sync skipped: {type(e).__name__}: {e}")
+        return 0
+
 def kind_counts(db_path: Path):
     con = connect(db_path)
     try:
@@ -187,15 +214,275 @@ def kind_counts(db_path: Path):
     finally:
         con.close()
 
-if __name__ == "__main__":
-    import sys
-    db = Path(sys.argv[1])
-    jl = Path(sys.argv[2])
-    ingest_jsonl(db, jl)
+# ---- Bulk ingest (large raw_events days) ----
+# ingest_jsonl() is kept as the reference path (one INSERT + json re-encode per line).
+# ingest_jsonl_bulk() is the high-volume path:
+#   - streams lines in chunks into executemany (one transaction per file; atomic with ingest_runs)
+#   - keeps the original payload text (recorder lines end with "payload": {...}) instead of decode+re-encode
+#   - validates payload text inside SQLite (json_valid) so bad lines are still counted, not stored
+#   - optionally drops idx_events_* and rebuilds them once after all files (large backfills)
+EVENTS_INDEX_SQL = {
+    "idx_events_ts": "CREATE INDEX IF NOT EXISTS idx_events_ts ON events(ts)",
+    "idx_events_kind": "CREATE INDEX IF NOT EXISTS idx_events_kind ON events(kind)",
+    "idx_events_source": "CREATE INDEX IF NOT EXISTS idx_events_source ON events(source_file)",
+}
+
+_BULK_INSERT_SQL = (
+    "INSERT INTO events(ts, kind, payload_json, source_file, ingest_ts) "
+    "SELECT ?1, ?2, ?3, ?4, ?5 WHERE json_valid(?3)"
+)
+
+_PAYLOAD_KEY = '"payload":'
+
+
+def _decode_event_line(line: str) -> Optional[Tuple[str, str, str]]:
+    # reference decode (same semantics as ingest_jsonl)
+    obj = json.loads(line)
+    if not isinstance(obj, dict):
+        return None
+    payload = obj.get("payload", {})
+    return (str(obj.get("ts", "")), str(obj.get("kind", "")), json.dumps(payload, ensure_ascii=False))
+
+
+def _split_event_line(line: str) -> Optional[Tuple[str, str, str]]:
+    """
+    Return (ts, kind, payload_text) for one JSONL line, or None if the line is not an object.
+
+    Fast path: recorder/audit lines are {"ts": ..., "kind": ..., "payload": {...}} with payload LAST.
+    Only the small head (ts/kind) is decoded; payload text is passed through untouched.
+    Any other shape falls back to a full decode + compact re-encode of payload.
+    """
+    i = line.find(_PAYLOAD_KEY)
+    if i > 0 and line.endswith("}"):
+        head = line[:i].rstrip()
+        if head.endswith(","):
+            try:
+                obj = json.loads(head[:-1] + "}")
+            except Exception:
+                obj = None
+            body = line[i + len(_PAYLOAD_KEY):-1].strip()
+            if isinstance(obj, dict) and body[:1] == "{" and body[-1:] == "}":
+                return (str(obj.get("ts", "")), str(obj.get("kind", "")), body)
+    return _decode_event_line(line)
+
+
+def _drop_events_indexes(con: sqlite3.Connection) -> List[str]:
+    dropped = []
+    for name in EVENTS_INDEX_SQL:
+        con.execute(f"DROP INDEX IF EXISTS {name}")
+        dropped.append(name)
+    return dropped
+
+
+def _rebuild_events_indexes(con: sqlite3.Connection) -> None:
+    for sql in EVENTS_INDEX_SQL.values():
+        con.execute(sql)
+
+
+def _ingest_one_bulk(con: sqlite3.Connection, jsonl_path: Path, *, chunk_size: int) -> Dict[str, Any]:
+    src = str(jsonl_path.resolve())
+    if already_ingested(con, src):
+        print(f"[SKIP] already ingested: {src}")
+        return {"source_file": src, "skipped": True}
+
+    sh = sha256_file(jsonl_path)
+    ingest_ts = datetime.now().isoformat(timespec="seconds")
+    lines_total = 0
+    lines_ok = 0
+    lines_bad = 0
+    t0 = time.time()
+
+    cur = con.cursor()
+    batch: List[Tuple[str, str, str, str, str]] = []
+    lines: List[str] = []
+
+    def _flush() -> Tuple[int, int]:
+        cur.execute("SAVEPOINT bulk_chunk")
+        cur.executemany(_BULK_INSERT_SQL, batch)
+        if max(0, cur.rowcount) == len(batch):
+            cur.execute("RELEASE bulk_chunk")
+            return len(batch), 0
+        # Rare: some fast-path payload slices failed json_valid (e.g. keys after "payload").
+        # Replay this chunk row by row (keeps events.id in file order) with the reference decode.
+        cur.execute("ROLLBACK TO bulk_chunk")
+        n_ok = 0
+        n_bad = 0
+        for row, raw in zip(batch, lines):
+            cur.execute(_BULK_INSERT_SQL, row)
+            if cur.rowcount == 1:
+                n_ok += 1
+                continue
+            try:
+                dec = _decode_event_line(raw)
+            except Exception:
+                dec = None
+            if dec is None:
+                n_bad += 1
+                continue
+            cur.execute(
+                "INSERT INTO events(ts, kind, payload_json, source_file, ingest_ts) VALUES(?,?,?,?,?)",
+                (dec[0], dec[1], dec[2], src, ingest_ts),
+            )
+            n_ok += 1
+        cur.execute("RELEASE bulk_chunk")
+        return n_ok, n_bad
+
+    try:
+        cur.execute("BEGIN")
+        with jsonl_path.open("r", encoding="utf-8") as f:
+            for line in f:
+                lines_total += 1
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    row = _split_event_line(line)
+                except Exception:
+                    row = None
+                if row is None:
+                    lines_bad += 1
+                    continue
+                batch.append((row[0], row[1], row[2], src, ingest_ts))
+                lines.append(line)
+                if len(batch) >= chunk_size:
+                    n_ok, n_bad = _flush()
+                    lines_ok += n_ok
+                    lines_bad += n_bad
+                    batch = []
+                    lines = []
+        if batch:
+            n_ok, n_bad = _flush()
+            lines_ok += n_ok
+            lines_bad += n_bad
+            batch = []
+            lines = []
+        cur.execute(
+            "INSERT INTO ingest_runs(ts, source_file, sha256, lines_total, lines_ok, lines_bad) VALUES(?,?,?,?,?,?)",
+            (ingest_ts, src, sh, lines_total, lines_ok, lines_bad),
+        )
+        cur.execute("COMMIT")
+    except Exception:
+        cur.execute("ROLLBACK")
+        raise
+
+    dt = time.time() - t0
+    rps = (lines_ok / dt) if dt > 0 else 0.0
+    print(f"[OK] ingested(bulk): {src}")
+    print(f"[INFO] sha256={sh}")
+    print(f"[INFO] total={lines_total} ok={lines_ok} bad={lines_bad} secs={dt:.2f} rows_per_sec={rps:.0f}")
+    return {
+        "source_file": src,
+        "skipped": False,
+        "sha256": sh,
+        "lines_total": lines_total,
+        "lines_ok": lines_ok,
+        "lines_bad": lines_bad,
+        "secs": dt,
+        "rows_per_sec": rps,
+    }
+
+
+def ingest_jsonl_bulk(
+    db_path: Path,
+    jsonl_paths: Sequence[Path],
+    *,
+    chunk_size: int = 20000,
+    rebuild_indexes: str = "auto",
+    rebuild_min_bytes: int = 64 * 1024 * 1024,
+    sync_quotes: bool = False,
+) -> Dict[str, Any]:
+    """
+    Bulk-ingest one or many JSONL files in a single pass (one connection, one index rebuild).
+
+    rebuild_indexes:
+      - "auto"   : drop/rebuild idx_events_* only when the files to ingest total >= rebuild_min_bytes
+      - "always" : always drop/rebuild
+      - "never"  : keep indexes live during ingest
+    Each file is one transaction (events rows + ingest_runs row), so a crash never leaves
+    a half-ingested file that would be skipped on the next run.
+    sync_quotes: also catch quotes_l5 up once after the files (timed separately as sync_secs).
+    Off by default to keep the bulk path ingest-only; until a writer syncs, quotes_l5 readers
+    fall back to the events scan.
+    """
+    paths = [Path(p) for p in jsonl_paths]
+    for p in paths:
+        if not p.exists():
+            raise FileNotFoundError(str(p))
+    mode = str(rebuild_indexes or "auto").strip().lower()
+    if mode not in ("auto", "always", "never"):
+        raise ValueError("rebuild_indexes must be auto/always/never")
+
+    init_db(db_path)
+    con = connect(db_path)
+    # explicit BEGIN/COMMIT per file
+    con.isolation_level = None
+    try:
+        con.execute("PRAGMA temp_store=MEMORY;")
+        con.execute("PRAGMA cache_size=-65536;")
+
+        pending = [p for p in paths if not already_ingested(con, str(p.resolve()))]
+        pending_bytes = sum(p.stat().st_size for p in pending)
+        drop = bool(pending) and (mode == "always" or (mode == "auto" and pending_bytes >= int(rebuild_min_bytes)))
+
+        t0 = time.time()
+        dropped: List[str] = []
+        files: List[Dict[str, Any]] = []
+        try:
+            if drop:
+                dropped = _drop_events_indexes(con)
+            for p in paths:
+                files.append(_ingest_one_bulk(con, p, chunk_size=max(1, int(chunk_size))))
+        finally:
+            if dropped:
+                t_idx = time.time()
+                _rebuild_events_indexes(con)
+                print(f"[INFO] rebuilt indexes={','.join(dropped)} secs={time.time() - t_idx:.2f}")
+        dt = time.time() - t0
+        rows_ok = sum(int(x.get("lines_ok", 0)) for x in files)
+        rps = (rows_ok / dt) if dt > 0 else 0.0
+        print(f"[OK] bulk ingest files={len(paths)} rows_ok={rows_ok} secs={dt:.2f} rows_per_sec={rps:.0f}")
+        q_rows, sync_dt = 0, 0.0
+        if sync_quotes:
+            t_sync = time.time()
+            q_rows = sync_quotes_best_effort(con)
+            sync_dt = time.time() - t_sync
+        return {
+            "ok": True,
+            "files": files,
+            "rows_ok": rows_ok,
+            "secs": dt,
+            "rows_per_sec": rps,
+            "indexes_rebuilt": dropped,
+            "quotes_l5_rows": q_rows,
+            "sync_secs": sync_dt,
+        }
+    finally:
+        con.close()
+
+
+def _main(argv: Optional[Sequence[str]] = None) -> int:
+    import argparse
+    ap = argparse.ArgumentParser(description="ingest raw_events JSONL into TMF sqlite db")
+    ap.add_argument("db")
+    ap.add_argument("jsonl", nargs="+")
+    ap.add_argument("--bulk", action="store_true", help="use batched executemany ingest (also implied by >1 file)")
+    ap.add_argument("--chunk-size", type=int, default=20000)
+    ap.add_argument("--rebuild-indexes", default="auto", choices=["auto", "always", "never"])
+    ap.add_argument("--sync-quotes", action="store_true", help="bulk: also catch quotes_l5 up after the ingest")
+    args = ap.parse_args(argv)
+
+    db = Path(args.db)
+    jls = [Path(x) for x in args.jsonl]
+    if args.bulk or len(jls) > 1:
+        ingest_jsonl_bulk(db, jls, chunk_size=args.chunk_size, rebuild_indexes=args.rebuild_indexes,
+                          sync_quotes=args.sync_quotes)
+    else:
+        ingest_jsonl(db, jls[0])
     rows = kind_counts(db)
     print("=== [KIND COUNTS top30] ===")
     for k,n in rows:
         print(f"{k}\t{n}")
+    return 0
 
 
 def _migrate_orders_audit_cols_v1(con) -> None:
@@ -224,3 +511,7 @@ def ensure_sqlite_schema_v1(*, db_path: str) -> None:
     # Accept str path; normalize to Path for connect()/init_db().
     p = Path(db_path)
     init_db(p)
+
+
+if __name__ == "__main__":
+    raise SystemExit(_main())
@@ -0,0 +1,391 @@
+from __future__ import annotations
+
+import json
+import queue
+import socket
+import sqlite3
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+from src.data.build_bars_1m_v1 import (
+    STREAM_SOURCE,
+    _asset_for_symbol,
+    _parse_ts_any,
+    _pick_price,
+    _pick_volume,
+    _ts_minute,
+)
+from src.ops.clock_v1 import clock_monotonic, clock_now
+
+# In-process streaming OHLCV aggregator (fed directly by recorder tick callbacks).
+# - buckets are aligned in the tick's own clock (exchange time), same minute key as build_bars_1m_v1
+# - a bar is closed when a later-bucket tick arrives for the same (symbol, interval),
+#   or by flush_due() once the estimated exchange clock passes bucket_end + grace
+# - late ticks for a recently closed bar re-emit that bar (revision+1); older ones (trimmed by keep_closed)
+#   go to the late-tick sinks (BarsDbSinkV1.on_late_tick merges them into the stored bar), else are dropped
+# - sinks: bars_1m (60s only), in-process queues, optional localhost UDP JSON datagrams
+#   (the UDP sink can also carry quote-update events, see UdpBarSinkV1.send_event)
+# - sinks run after the aggregator lock is released, in emit order (one drainer at a time); BarsDbSinkV1
+#   only enqueues by default, its writer thread does the SQLite upserts + commit
+# Sinks are best-effort: a failing sink never breaks the recorder callback.
+
+BarDict = Dict[str, Any]
+
+
+def _bucket_start(dt: datetime, interval_sec: int) -> datetime:
+    sod = dt.hour * 3600 + dt.minute * 60 + dt.second
+    return dt.replace(microsecond=0) - timedelta(seconds=sod % int(interval_sec))
+
+
+def _bucket_key(dt: datetime, interval_sec: int) -> str:
+    if int(interval_sec) == 60:
+        return _ts_minute(dt)
+    return _bucket_start(dt, interval_sec).isoformat(timespec="seconds")
+
+
+def parse_intervals(spec: str) -> List[int]:
+    """'5,15,60,300' -> [5, 15, 60, 300]; only divisors of one day are accepted."""
+    out: List[int] = []
+    for x in (spec or "").split(","):
+        x = x.strip().lower()
+        if not x:
+            continue
+        mult = 1
+        if x.endswith("m"):
+            mult, x = 60, x[:-1]
+        elif x.endswith("s"):
+            x = x[:-1]
+        n = int(float(x) * mult)
+        if n <= 0 or 86400 % n != 0:
+            raise ValueError(f"bad bar interval: {x}")
+        if n not in out:
+            out.append(n)
+    return sorted(out) or [60]
+
+
+class StreamBarAggregatorV1:
+    def __init__(self, *, intervals_sec: Sequence[int] = (60,), close_grace_sec: float = 2.0, keep_closed: int = 3):
+        self.intervals = sorted(set(int(x) for x in intervals_sec)) or [60]
+        self.close_grace_sec = float(close_grace_sec)
+        self.keep_closed = max(0, int(keep_closed))
+        self._lock = threading.Lock()
+        self._open: Dict[Tuple[str, int], BarDict] = {}
+        self._closed: Dict[Tuple[str, int], List[BarDict]] = {}
+        self._sinks: List[Callable[[BarDict], None]] = []
+        self._late_sinks: List[Callable[[Dict[str, Any]], None]] = []
+        self._outbox: Deque[Tuple[bool, Dict[str, Any]]] = deque()   # (is_bar, record), filled under _lock
+        self._emit_lock = threading.Lock()
+        # exchange clock estimate: last tick dt + monotonic elapsed since it arrived
+        self._clock_dt: Optional[datetime] = None
+        self._clock_mono = 0.0
+        self.stats = {"ticks": 0, "ticks_bad": 0, "bars_closed": 0, "bars_revised": 0, "late_routed": 0,
+                      "late_dropped": 0, "sink_errors": 0}
+
+    def add_sink(self, fn: Callable[[BarDict], None]) -> None:
+        self._sinks.append(fn)
+
+    def add_late_tick_sink(self, fn: Callable[[Dict[str, Any]], None]) -> None:
+        """fn({symbol, asset_class, interval_sec, ts_start, price, volume}) for late ticks of bars no longer kept."""
+        self._late_sinks.append(fn)
+
+    def _emit(self, bar: BarDict) -> None:
+        # under _lock: snapshot now (the bar may still be revised); sinks run in _deliver()
+        out = dict(bar)
+        out["emit_ts"] = clock_now().isoformat(timespec="milliseconds")
+        self._outbox.append((True, out))
+
+    def _deliver(self) -> None:
+        """Run the sinks outside _lock; _emit_lock keeps emit order across callback threads."""
+        while self._outbox:
+            with self._emit_lock:
+                with self._lock:
+                    batch = list(self._outbox)
+                    self._outbox.clear()
+                for is_bar, rec in batch:
+                    for fn in (self._sinks if is_bar else self._late_sinks):
+                        try:
+                            fn(rec)
+                        except Exception:
+                            self.stats["sink_errors"] += 1
+
+    def _close(self, key: Tuple[str, int]) -> None:
+        b = self._open.pop(key, None)
+        if b is None:
+            return
+        b["closed"] = True
+        self.stats["bars_closed"] += 1
+        if self.keep_closed:
+            xs = self._closed.setdefault(key, [])
+            xs.append(b)
+            del xs[:-self.keep_closed]
+        self._emit(b)
+
+    def on_tick(self, symbol: str, dt: datetime, price: float, volume: float) -> None:
+        with self._lock:
+            self.stats["ticks"] += 1
+            if self._clock_dt is None or dt >= self._clock_dt:
+                self._clock_dt = dt
+                self._clock_mono = clock_monotonic()
+            for iv in self.intervals:
+                key = (symbol, iv)
+                bstart = _bucket_start(dt, iv)
+                b = self._open.get(key)
+                if b is not None and bstart < b["_start"]:
+                    self._late_tick(key, bstart, price, volume)
+                    continue
+                if b is not None and bstart > b["_start"]:
+                    self._close(key)
+                    b = None
+                if b is None:
+                    self._open[key] = {
+                        "kind": "bar_v1",
+                        "interval_sec": iv,
+                        "symbol": symbol,
+                        "asset_class": _asset_for_symbol(symbol),
+                        "ts_start": _bucket_key(dt, iv),
+                        "_start": bstart,
+                        "o": price, "h": price, "l": price, "c": price,
+                        "v": float(volume), "n_trades": 1,
+                        "closed": False, "revision": 0,
+                    }
+                else:
+                    b["h"] = max(b["h"], price)
+                    b["l"] = min(b["l"], price)
+                    b["c"] = price
+                    b["v"] += float(volume)
+                    b["n_trades"] += 1
+        self._deliver()
+
+    def _late_tick(self, key: Tuple[str, int], bstart: datetime, price: float, volume: float) -> None:
+        for b in reversed(self._closed.get(key, [])):
+            if b["_start"] == bstart:
+                b["h"] = max(b["h"], price)
+                b["l"] = min(b["l"], price)
+                b["c"] = price
+                b["v"] += float(volume)
+                b["n_trades"] += 1
+                b["revision"] += 1
+                self.stats["bars_revised"] += 1
+                self._emit(b)
+                return
+        if not self._late_sinks:
+            self.stats["late_dropped"] += 1
+            return
+        self.stats["late_routed"] += 1
+        sym, iv = key
+        self._outbox.append((False, {"symbol": sym, "asset_class": _asset_for_symbol(sym), "interval_sec": iv,
+                                     "ts_start": _bucket_key(bstart, iv), "price": price, "volume": float(volume)}))
+
+    def on_tick_payload(self, payload: Dict[str, Any], *, ts: Any = None) -> bool:
+        """Feed one recorder tick payload (same field picking as build_bars_1m_v1). False if unusable."""
+        sym = (payload.get("code") or payload.get("symbol") or "").strip()
+        dt = _parse_ts_any(payload.get("datetime") or payload.get("ts") or payload.get("recv_ts") or ts)
+        px = _pick_price(payload)
+        if not sym or dt is None or px is None:
+            with self._lock:
+                self.stats["ticks_bad"] += 1
+            return False
+        vol = _pick_volume(payload)
+        self.on_tick(sym, dt, float(px), float(vol or 0.0))
+        return True
+
+    def flush_due(self) -> int:
+        """Close open bars whose bucket ended (estimated exchange clock) more than close_grace_sec ago."""
+        with self._lock:
+            if self._clock_dt is None:
+                return 0
+            now_dt = self._clock_dt + timedelta(seconds=clock_monotonic() - self._clock_mono)
+            due = [k for k, b in self._open.items()
+                   if now_dt >= b["_start"] + timedelta(seconds=b["interval_sec"] + self.close_grace_sec)]
+            for k in due:
+                self._close(k)
+        self._deliver()
+        return len(due)
+
+    def flush_all(self) -> int:
+        with self._lock:
+            keys = list(self._open.keys())
+            for k in keys:
+                self._close(k)
+        self._deliver()
+        return len(keys)
+
+
+def bar_public(bar: BarDict) -> BarDict:
+    return {k: v for k, v in bar.items() if not k.startswith("_")}
+
+
+_BAR_UPDATE_SQL = "UPDATE bars_1m SET o=?, h=?, l=?, c=?, v=?, n_trades=?, source=? WHERE ts_min=? AND asset_class=? AND symbol=?"
+_BAR_INSERT_SQL = "INSERT INTO bars_1m (ts_min, asset_class, symbol, o, h, l, c, v, n_trades, source) VALUES (?,?,?,?,?,?,?,?,?,?)"
+# same fold as the builders (tick order: c = last tick seen); only rows this stream wrote
+_LATE_MERGE_SQL = ("UPDATE bars_1m SET h=MAX(h, ?), l=MIN(l, ?), c=?, v=v+?, n_trades=n_trades+1 "
+                   "WHERE ts_min=? AND asset_class=? AND symbol=? AND source=?")
+
+
+class BarsDbSinkV1:
+    """Write closed 60s bars into bars_1m (works with or without the UNIQUE(ts_min, asset_class, symbol) schema).
+
+    background=True: the call only enqueues (bounded; full -> counted in stats["dropped"]); a writer thread
+    applies queued bars / late ticks in emit order, many per transaction. flush() waits for the queue,
+    close() drains it. background=False writes in the calling thread (callers that already run off the
+    hot path, e.g. the async supervisor's persist thread).
+    """
+
+    def __init__(self, db_path: str, *, background: bool = True, maxsize: int = 10000, batch_max: int = 500):
+        self.db_path = db_path
+        self.background = bool(background)
+        self.batch_max = max(1, int(batch_max))
+        self._con: Optional[sqlite3.Connection] = None
+        self._q: "queue.Queue[Optional[Tuple[str, Tuple[Any, ...]]]]" = queue.Queue(maxsize=max(1, int(maxsize)))
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self.stats = {"bars": 0, "late_merged": 0, "late_missing": 0, "dropped": 0, "batches": 0, "db_errors": 0}
+
+    def _ensure(self) -> sqlite3.Connection:
+        if self._con is None:
+            self._con = sqlite3.connect(self.db_path, timeout=5.0, check_same_thread=False)
+            self._con.execute("PRAGMA journal_mode=WAL;")
+            self._con.execute("PRAGMA busy_timeout=5000;")
+        return self._con
+
+    def __call__(self, bar: BarDict) -> None:
+        if int(bar.get("interval_sec") or 0) != 60:
+            return
+        vals = (bar["o"], bar["h"], bar["l"], bar["c"], float(bar["v"]), int(bar["n_trades"]), STREAM_SOURCE)
+        self._put(("bar", vals + (bar["ts_start"], bar["asset_class"], bar["symbol"])))
+
+    def on_late_tick(self, t: Dict[str, Any]) -> None:
+        """Late tick of a 60s bar the aggregator no longer holds: merge it into the stored stream bar."""
+        if int(t.get("interval_sec") or 0) != 60:
+            return
+        px = float(t["price"])
+        self._put(("late", (px, px, px, float(t["volume"]), t["ts_start"], t["asset_class"], t["symbol"], STREAM_SOURCE)))
+
+    def _put(self, item: Tuple[str, Tuple[Any, ...]]) -> None:
+        if not self.background:
+            self._write([item])
+            return
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="tmf-bars-db-sink", daemon=True)
+                    self._thread.start()
+        try:
+            self._q.put_nowait(item)
+        except queue.Full:
+            self.stats["dropped"] += 1
+
+    def _write(self, items: Sequence[Tuple[str, Tuple[Any, ...]]]) -> None:
+        con = self._ensure()
+        with con:
+            for kind, args in items:
+                if kind == "bar":
+                    if con.execute(_BAR_UPDATE_SQL, args).rowcount == 0:
+                        con.execute(_BAR_INSERT_SQL, args[7:] + args[:7])
+                    self.stats["bars"] += 1
+                elif con.execute(_LATE_MERGE_SQL, args).rowcount:
+                    self.stats["late_merged"] += 1
+                else:
+                    self.stats["late_missing"] += 1   # no stream row: the incremental builder owns that minute
+        self.stats["batches"] += 1
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            batch = [self._q.get()]
+            while len(batch) < self.batch_max:
+                try:
+                    batch.append(self._q.get_nowait())
+                except queue.Empty:
+                    break
+            items = [x for x in batch if x is not None]
+            stop = len(items) != len(batch)
+            try:
+                if items:
+                    self._write(items)
+            except Exception:
+                self.stats["db_errors"] += 1
+            finally:
+                for _ in batch:
+                    self._q.task_done()
+
+    def flush(self) -> None:
+        """Wait until every queued bar / late tick is committed."""
+        if self._thread is not None:
+            self._q.join()
+
+    def close(self) -> None:
+        th = self._thread
+        if th is not None:
+            self._q.put(None)
+            th.join()
+            self._thread = None
+        if self._con is not None:
+            try:
+                self._con.close()
+            finally:
+                self._con = None
+
+
+class QueueBarSinkV1:
+    """In-process fan-out: every subscriber gets its own bounded queue (full queue -> bar dropped for that subscriber)."""
+
+    def __init__(self):
+        self._subs: List["queue.Queue[BarDict]"] = []
+        self.dropped = 0
+
+    def subscribe(self, maxsize: int = 1000) -> "queue.Queue[BarDict]":
+        q: "queue.Queue[BarDict]" = queue.Queue(maxsize=max(1, int(maxsize)))
+        self._subs.append(q)
+        return q
+
+    def __call__(self, bar: BarDict) -> None:
+        pub = bar_public(bar)
+        for q in list(self._subs):
+            try:
+                q.put_nowait(pub)
+            except queue.Full:
+                self.dropped += 1
+
+
+class UdpBarSinkV1:
+    """Fire-and-forget JSON datagrams to a local subscriber (never blocks the recorder)."""
+
+    def __init__(self, host: str, port: int):
+        self.addr = (host, int(port))
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.setblocking(False)
+
+    def __call__(self, bar: BarDict) -> None:
+        data = json.dumps(bar_public(bar), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        try:
+            self._sock.sendto(data, self.addr)
+        except (BlockingIOError, ConnectionRefusedError):
+            pass
+
+    def send_event(self, kind: str, payload: Dict[str, Any], *, ts: str = "", json_default: Any = None) -> None:
+        """Quote-update notification on the same socket ({"kind","ts","payload"}, same as recorder JSONL)."""
+        try:
+            data = json.dumps({"kind": kind, "ts": ts, "payload": payload}, ensure_ascii=False,
+                              separators=(",", ":"), default=json_default).encode("utf-8")
+            self._sock.sendto(data, self.addr)
+        except (BlockingIOError, ConnectionRefusedError, TypeError, ValueError):
+            pass
+
+    def close(self) -> None:
+        try:
+            self._sock.close()
+        except Exception:
+            pass
+
+
+def parse_host_port(spec: str, default_host: str = "127.0.0.1") -> Optional[Tuple[str, int]]:
+    s = (spec or "").strip()
+    if not s:
+        return None
+    if ":" in s:
+        h, p = s.rsplit(":", 1)
+        return ((h.strip() or default_host), int(p))
+    return (default_host, int(s))
@@ -0,0 +1,572 @@
+"""
+TMF AutoTrader — binary tick / bidask archive v1 (fixed-width columns, mmap readers)
+
+Why:
+- runtime/raw_events JSONL (and events.payload_json) is the truth source, but it is verbose text
+  (a recorder bidask line is ~0.5-1 KB) and every consumer (bar builder, replay, backtest) re-parses it.
+
+Format (one file per day per code per kind: <root>/<YYYY-MM-DD>/<code>.<kind>.tav1 + .sha256.txt sidecar):
+- 64-byte header: magic, version, record type (tick / bidask), price_scale, n records,
+  tz_offset_min (exchange local time = UTC + offset; day and naive timestamps use it), code, day
+- then one contiguous column per field (each column 8-byte aligned), records sorted by ts_ns:
+    tick   : ts_ns int64 | price int32 | volume int32 | flags uint8
+    bidask : ts_ns int64 | bid_price_1..5 int32 | ask_price_1..5 int32 | bid_volume_1..5 int32
+             | ask_volume_1..5 int32 | flags uint8
+  prices are int units of 1/price_scale point (default 100 -> 0.01; exact for TAIFEX / TWSE prices),
+  empty book levels are 0; flags bit0 = synthetic, bits1-2 = tick_type
+- ts_ns: exchange event time (payload datetime; else record ts / ingest_ts), epoch ns
+- not kept: recv_ts / ingest_ts and every other payload field; volumes are int32 (fractional volumes
+  are rounded, counted in stats['vol_off_int']). So replay over .tav1 runs on exchange event time while
+  replay over the JSONL runs on the recorder record ts (receive time): decisions gated on quote age can
+  differ by the feed latency between the two
+
+Readers:
+- TickArchiveV1: np.memmap column views when numpy is installed, else mmap + memoryview.cast;
+  slice(start, end) bisects ts_ns and returns zero-copy column slices for the time range
+- consumers: ticks_1m() (bar builder: build_bars_1m_from_archive), bars_1m_rows() (backtest:
+  load_bars_1m_from_archive), iter_records() (replay_engine_v1 accepts .tav1 inputs)
+
+Converter: convert_jsonl() / convert_events_db() group every input by (day, code, kind) and write one
+file per group (atomic replace). An existing day file is merged, not overwritten: its records that are
+not in the new batch are kept (multiset difference on the full record), so partial days
+(--db --since, one more JSONL of the same day) add to the file and re-converting the same input is a
+no-op. merge=False / --replace rewrites the day files from the new batch only.
+
+NOTE: Python 3.9.6 compatible
+"""
+from __future__ import annotations
+
+import argparse
+import bisect
+import glob
+import hashlib
+import json
+import mmap
+import os
+import sqlite3
+import struct
+import sys
+from array import array
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+try:  # optional accelerator; every reader has a stdlib path
+    import numpy as np  # type: ignore
+except Exception:  # pragma: no cover
+    np = None  # type: ignore
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+MAGIC = b"TMFTAV1\x00"
+VERSION = 1
+HEADER = struct.Struct("<8sHHIQiI16s10s6x")  # 64 bytes
+SUFFIX = ".tav1"
+DEFAULT_ROOT = "runtime/archive/ticks"
+DEFAULT_PRICE_SCALE = 100
+EXCHANGE_TZ_OFFSET_MIN = 480  # TAIFEX (Asia/Taipei, no DST)
+LEVELS = 5
+
+RT_TICK = 1
+RT_BIDASK = 2
+KIND_TO_RT = {"tick_fop_v1": RT_TICK, "tick_stk_v1": RT_TICK, "bidask_fop_v1": RT_BIDASK, "bidask_stk_v1": RT_BIDASK}
+
+_LEVEL_COLS = tuple(f"{side}_{i}" for side in ("bid_price", "ask_price", "bid_volume", "ask_volume") for i in range(1, LEVELS + 1))
+COLUMNS: Dict[int, Tuple[Tuple[str, str], ...]] = {
+    RT_TICK: (("ts_ns", "q"), ("price", "i"), ("volume", "i"), ("flags", "B")),
+    RT_BIDASK: (("ts_ns", "q"),) + tuple((c, "i") for c in _LEVEL_COLS) + (("flags", "B"),),
+}
+_NP_DTYPE = {"q": "<i8", "i": "<i4", "B": "u1"}
+_I32 = (1 << 31) - 1
+
+
+def _layout(rt: int, n: int) -> List[Tuple[str, str, int]]:
+    out = []
+    off = HEADER.size
+    for name, fmt in COLUMNS[rt]:
+        out.append((name, fmt, off))
+        off += n * struct.calcsize(fmt)
+        off = (off + 7) // 8 * 8
+    return out
+
+
+def _sha256_file(p: Path) -> str:
+    h = hashlib.sha256()
+    with p.open("rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def archive_path(root: str, day: str, code: str, kind: str) -> Path:
+    return Path(root) / day / f"{code}.{kind}{SUFFIX}"
+
+
+# ---------------------------------------------------------------------------
+# time
+# ---------------------------------------------------------------------------
+
+def to_ns(x: Any, tz_offset_min: int = EXCHANGE_TZ_OFFSET_MIN) -> Optional[int]:
+    """epoch ns from epoch ns (int or float) / datetime / ISO string (naive = exchange local time)."""
+    if x is None or isinstance(x, bool):
+        return None
+    if isinstance(x, int):
+        return x
+    if isinstance(x, float):
+        return int(x)  # numbers are always epoch ns, never seconds
+    dt = x
+    if not isinstance(dt, datetime):
+        s = str(x).strip()
+        if not s:
+            return None
+        try:
+            dt = datetime.fromisoformat(s.replace("Z", "+00:00"))
+        except Exception:
+            try:
+                dt = datetime.strptime(s, "%Y/%m/%d %H:%M:%S.%f")
+            except Exception:
+                return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone(timedelta(minutes=int(tz_offset_min))))
+    d = dt - datetime(1970, 1, 1, tzinfo=timezone.utc)
+    return (d.days * 86400 + d.seconds) * 1_000_000_000 + d.microseconds * 1000
+
+
+def ns_to_local(ns: int, tz_offset_min: int) -> datetime:
+    """Exchange local naive datetime (what tick payload 'datetime' carries)."""
+    return datetime(1970, 1, 1) + timedelta(microseconds=(int(ns) // 1000) + int(tz_offset_min) * 60_000_000)
+
+
+# ---------------------------------------------------------------------------
+# writer / converter
+# ---------------------------------------------------------------------------
+
+class _Bucket:
+    __slots__ = ("rt", "cols")
+
+    def __init__(self, rt: int):
+        self.rt = rt
+        self.cols = {name: array(fmt) for name, fmt in COLUMNS[rt]}
+
+
+def _scaled(x: Any, scale: int, stats: Dict[str, int]) -> int:
+    try:
+        v = float(x) * scale
+    except Exception:
+        return 0
+    r = int(round(v))
+    if abs(v - r) > 1e-6:
+        stats["price_off_grid"] += 1
+    if not -_I32 <= r <= _I32:
+        stats["clipped"] += 1
+        r = max(-_I32, min(_I32, r))
+    return r
+
+
+def _vol(x: Any, stats: Dict[str, int]) -> int:
+    try:
+        f = float(x)
+        v = int(round(f))
+    except Exception:
+        return 0
+    if f != v:
+        stats["vol_off_int"] += 1
+    if not -_I32 <= v <= _I32:
+        stats["clipped"] += 1
+        v = max(-_I32, min(_I32, v))
+    return v
+
+
+def _levels(xs: Any) -> List[Any]:
+    xs = list(xs) if isinstance(xs, (list, tuple)) else ([] if xs is None else [xs])
+    return (xs + [0] * LEVELS)[:LEVELS]
+
+
+class ArchiveWriterV1:
+    """Collects tick / bidask payloads per (day, code, kind); write() emits the files."""
+
+    def __init__(self, *, price_scale: int = DEFAULT_PRICE_SCALE, tz_offset_min: int = EXCHANGE_TZ_OFFSET_MIN):
+        self.price_scale = int(price_scale)
+        self.tz_offset_min = int(tz_offset_min)
+        self._buckets: Dict[Tuple[str, str, str], _Bucket] = {}
+        self.stats = {"seen": 0, "added": 0, "skipped_kind": 0, "skipped_bad": 0, "price_off_grid": 0, "vol_off_int": 0,
+                      "clipped": 0, "merged_kept": 0}
+
+    def add(self, kind: str, payload: Dict[str, Any], *, ts: Any = None) -> bool:
+        self.stats["seen"] += 1
+        rt = KIND_TO_RT.get(str(kind))
+        if rt is None:
+            self.stats["skipped_kind"] += 1
+            return False
+        code = str(payload.get("code") or payload.get("symbol") or "").strip() if isinstance(payload, dict) else ""
+        ns = to_ns(payload.get("datetime") or ts or payload.get("ingest_ts"), self.tz_offset_min) if code else None
+        if ns is None or len(code.encode("utf-8")) > 16:
+            self.stats["skipped_bad"] += 1
+            return False
+        day = ns_to_local(ns, self.tz_offset_min).date().isoformat()
+        key = (day, code, str(kind))
+        b = self._buckets.get(key)
+        if b is None:
+            b = self._buckets[key] = _Bucket(rt)
+        c, sc = b.cols, self.price_scale
+        if rt == RT_TICK:
+            px = None
+            for k in ("close", "price", "last_price", "deal_price", "trade_price", "last"):
+                if payload.get(k) is not None:
+                    px = payload.get(k)
+                    break
+            if isinstance(px, (list, tuple)):
+                px = px[0] if px else None
+            if px is None:
+                self.stats["skipped_bad"] += 1
+                return False
+            c["price"].append(_scaled(px, sc, self.stats))
+            c["volume"].append(_vol(payload.get("volume") or 0, self.stats))
+        else:
+            for side in ("bid_price", "ask_price"):
+                for i, x in enumerate(_levels(payload.get(side)), 1):
+                    c[f"{side}_{i}"].append(_scaled(x, sc, self.stats))
+            for side in ("bid_volume", "ask_volume"):
+                for i, x in enumerate(_levels(payload.get(side)), 1):
+                    c[f"{side}_{i}"].append(_vol(x, self.stats))
+        tt = payload.get("tick_type")
+        tt = int(tt) & 3 if isinstance(tt, int) else 0
+        c["flags"].append((1 if payload.get("synthetic") else 0) | (tt << 1))
+        c["ts_ns"].append(int(ns))
+        self.stats["added"] += 1
+        return True
+
+    def write(self, root: str, *, merge: bool = True) -> List[Dict[str, Any]]:
+        """Emit one file per (day, code, kind); merge=True keeps records of an existing file not in this batch."""
+        out = []
+        for (day, code, kind), b in sorted(self._buckets.items()):
+            p = archive_path(root, day, code, kind)
+            cols, kept = b.cols, 0
+            if merge and p.exists():
+                cols, kept = _merge_existing(p, b.rt, cols, price_scale=self.price_scale, tz_offset_min=self.tz_offset_min)
+                self.stats["merged_kept"] += kept
+            info = write_archive(p, rt=b.rt, code=code, day=day, cols=cols,
+                                 price_scale=self.price_scale, tz_offset_min=self.tz_offset_min)
+            info["kept"] = kept
+            out.append(info)
+        self._buckets.clear()
+        return out
+
+
+def _merge_existing(p: Path, rt: int, cols: Dict[str, Any], *, price_scale: int,
+                    tz_offset_min: int) -> Tuple[Dict[str, Any], int]:
+    """Existing file records minus the new batch (as a multiset of full records), then the new batch.
+    The existing file must match its sha256 sidecar (a damaged file is never merged; rewrite with merge=False)."""
+    names = [name for name, _fmt in COLUMNS[rt]]
+    with TickArchiveV1(str(p), verify=True) as a:
+        if (a.record_type, a.price_scale, a.tz_offset_min) != (rt, int(price_scale), int(tz_offset_min)):
+            raise ValueError(f"cannot merge into {p}: record type / price_scale / tz_offset_min differ "
+                             f"({a.record_type}, {a.price_scale}, {a.tz_offset_min})")
+        old = {}
+        for name, fmt in COLUMNS[rt]:
+            x = array(fmt)
+            x.frombytes(a.cols[name].tobytes())
+            if sys.byteorder != "little":
+                x.byteswap()
+            old[name] = x
+    pending = Counter(zip(*(cols[k] for k in names)))
+    out = {k: array(cols[k].typecode) for k in names}
+    kept = 0
+    for row in zip(*(old[k] for k in names)):
+        if pending[row] > 0:
+            pending[row] -= 1  # same record re-converted: the new batch carries it
+            continue
+        for k, v in zip(names, row):
+            out[k].append(v)
+        kept += 1
+    for k in names:
+        out[k].extend(cols[k])
+    return out, kept
+
+
+def write_archive(p: Path, *, rt: int, code: str, day: str, cols: Dict[str, Any], price_scale: int,
+                  tz_offset_min: int) -> Dict[str, Any]:
+    """One archive file (columns sorted by ts_ns, stable) + sha256 sidecar; atomic replace."""
+    ts = cols["ts_ns"]
+    n = len(ts)
+    order = sorted(range(n), key=ts.__getitem__)
+    if order != list(range(n)):
+        cols = {k: array(v.typecode, (v[i] for i in order)) for k, v in cols.items()}
+    p.parent.mkdir(parents=True, exist_ok=True)
+    tmp = p.with_name(p.name + f".{os.getpid()}.tmp")
+    with tmp.open("wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, rt, int(price_scale), n, int(tz_offset_min), 0,
+                            code.encode("utf-8"), day.encode("ascii")))
+        for name, _fmt, off in _layout(rt, n):
+            f.write(b"\x00" * (off - f.tell()))
+            a = cols[name]
+            if sys.byteorder != "little":
+                a = array(a.typecode, a)
+                a.byteswap()
+            f.write(a.tobytes())
+    os.replace(tmp, p)
+    sha = _sha256_file(p)
+    p.with_name(p.name + ".sha256.txt").write_text(f"{sha}  {p.name}\n", encoding="utf-8")
+    return {"path": str(p), "n": n, "bytes": p.stat().st_size, "sha256": sha}
+
+
+def iter_jsonl_records(paths: Sequence[str]) -> Iterator[Tuple[Any, str, Dict[str, Any]]]:
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except Exception:
+                    continue
+                if isinstance(rec, dict) and isinstance(rec.get("payload"), dict):
+                    yield rec.get("ts"), str(rec.get("kind") or ""), rec["payload"]
+
+
+def convert_jsonl(paths: Sequence[str], root: str = DEFAULT_ROOT, *, merge: bool = True, **kw: Any) -> Dict[str, Any]:
+    w = ArchiveWriterV1(**kw)
+    for ts, kind, payload in iter_jsonl_records(paths):
+        w.add(kind, payload, ts=ts)
+    files = w.write(root, merge=merge)
+    return {"inputs": [str(p) for p in paths], "files": files, "stats": w.stats}
+
+
+def convert_events_db(db_path: str, root: str = DEFAULT_ROOT, *, since: Optional[str] = None, merge: bool = True,
+                      **kw: Any) -> Dict[str, Any]:
+    w = ArchiveWriterV1(**kw)
+    kinds = sorted(KIND_TO_RT)
+    q = "SELECT ts, kind, payload_json FROM events WHERE kind IN (%s)" % ",".join("?" * len(kinds))
+    params: List[Any] = list(kinds)
+    if since:
+        q += " AND ts >= ?"
+        params.append(str(since))
+    con = sqlite3.connect(str(db_path))
+    try:
+        for ts, kind, pj in con.execute(q + " ORDER BY id ASC", params):
+            try:
+                payload = json.loads(pj) if pj else {}
+            except Exception:
+                payload = {}
+            w.add(kind, payload if isinstance(payload, dict) else {}, ts=ts)
+    finally:
+        con.close()
+    files = w.write(root, merge=merge)
+    return {"db": str(db_path), "files": files, "stats": w.stats}
+
+
+# ---------------------------------------------------------------------------
+# reader
+# ---------------------------------------------------------------------------
+
+class TickArchiveV1:
+    """Zero-copy reader over one .tav1 file (np.memmap column views, else mmap + memoryview.cast)."""
+
+    def __init__(self, path: str, *, verify: bool = False):
+        self.path = Path(path)
+        if verify:
+            side = self.path.with_name(self.path.name + ".sha256.txt")
+            want = side.read_text(encoding="utf-8").split()[0]
+            got = _sha256_file(self.path)
+            if got != want:
+                raise ValueError(f"archive sha256 mismatch: {self.path} {got} != {want}")
+        with self.path.open("rb") as f:
+            head = f.read(HEADER.size)
+            magic, ver, rt, scale, n, tzm, _res, code, day = HEADER.unpack(head)
+            if magic != MAGIC or ver != VERSION or rt not in COLUMNS:
+                raise ValueError(f"not a tick archive v1: {self.path}")
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if np is None else None
+        self.record_type = int(rt)
+        self.kind = self.path.name[:-len(SUFFIX)].rsplit(".", 1)[-1]
+        self.price_scale = int(scale)
+        self.n = int(n)
+        self.tz_offset_min = int(tzm)
+        self.code = code.rstrip(b"\x00").decode("utf-8")
+        self.day = day.decode("ascii")
+        self.cols: Dict[str, Any] = {}
+        if np is not None:
+            raw = np.memmap(str(self.path), dtype=np.uint8, mode="r")
+            for name, fmt, off in _layout(self.record_type, self.n):
+                self.cols[name] = raw[off:off + self.n * struct.calcsize(fmt)].view(_NP_DTYPE[fmt])
+        else:
+            mv = memoryview(self._mm)
+            for name, fmt, off in _layout(self.record_type, self.n):
+                self.cols[name] = mv[off:off + self.n * struct.calcsize(fmt)].cast(fmt)
+
+    def __len__(self) -> int:
+        return self.n
+
+    def __enter__(self) -> "TickArchiveV1":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.cols = {}
+        if self._mm is None:
+            return
+        try:
+            self._mm.close()
+        except BufferError:
+            pass  # slices still held by the caller; the map goes with them
+
+    def index_range(self, start: Any = None, end: Any = None) -> Tuple[int, int]:
+        """[i0, i1) of records with start <= ts < end (datetime / ISO / epoch ns; naive = exchange time)."""
+        ts = self.cols.get("ts_ns")
+        if ts is None or self.n == 0:
+            return 0, 0
+        t0 = to_ns(start, self.tz_offset_min) if start is not None else None
+        t1 = to_ns(end, self.tz_offset_min) if end is not None else None
+        if np is not None:
+            i0 = int(np.searchsorted(ts, t0, side="left")) if t0 is not None else 0
+            i1 = int(np.searchsorted(ts, t1, side="left")) if t1 is not None else self.n
+        else:
+            i0 = bisect.bisect_left(ts, t0) if t0 is not None else 0
+            i1 = bisect.bisect_left(ts, t1) if t1 is not None else self.n
+        return i0, max(i0, i1)
+
+    def slice(self, start: Any = None, end: Any = None) -> Dict[str, Any]:
+        """Zero-copy column slices for the time range (views into the map)."""
+        i0, i1 = self.index_range(start, end)
+        return {k: v[i0:i1] for k, v in self.cols.items()}
+
+    def prices(self, col: Any) -> Any:
+        """int price column -> points (numpy array, else list)."""
+        s = float(self.price_scale)
+        return col / s if np is not None else [x / s for x in col]
+
+    def ticks_1m(self, start: Any = None, end: Any = None) -> Iterator[Tuple[str, str, float, float]]:
+        """(ts_min, code, price, volume) like build_bars_1m_v1._tick_from_event (ts_min in exchange time)."""
+        if self.record_type != RT_TICK:
+            return
+        c = self.slice(start, end)
+        off_ns = self.tz_offset_min * 60_000_000_000
+        s = float(self.price_scale)
+        last_m = None
+        ts_min = ""
+        for t, px, v in zip(c["ts_ns"], c["price"], c["volume"]):
+            m = (int(t) + off_ns) // 60_000_000_000
+            if m != last_m:
+                last_m = m
+                ts_min = (datetime(1970, 1, 1) + timedelta(minutes=m)).isoformat(timespec="minutes")
+            yield ts_min, self.code, int(px) / s, float(v)
+
+    def bars_1m_rows(self, start: Any = None, end: Any = None) -> List[Tuple[str, float, float, float, float, float, int]]:
+        """(ts_min, o, h, l, c, v, n_trades) ascending, built straight from the tick columns."""
+        if self.record_type != RT_TICK:
+            return []
+        c = self.slice(start, end)
+        n = len(c["ts_ns"])
+        if n == 0:
+            return []
+        off_ns = self.tz_offset_min * 60_000_000_000
+        s = float(self.price_scale)
+        if np is not None:
+            m = (c["ts_ns"] + off_ns) // 60_000_000_000
+            px = c["price"].astype(np.float64) / s
+            vol = c["volume"].astype(np.float64)
+            starts = np.flatnonzero(np.r_[True, m[1:] != m[:-1]])
+            ends = np.r_[starts[1:], n] - 1
+            o, cl = px[starts], px[ends]
+            h, lo = np.maximum.reduceat(px, starts), np.minimum.reduceat(px, starts)
+            v = np.add.reduceat(vol, starts)
+            cnt = (ends - starts + 1).tolist()
+            keys = m[starts].tolist()
+            cols = (o.tolist(), h.tolist(), lo.tolist(), cl.tolist(), v.tolist())
+            return [(_minute_iso(k), cols[0][j], cols[1][j], cols[2][j], cols[3][j], cols[4][j], int(cnt[j]))
+                    for j, k in enumerate(keys)]
+        out: List[Any] = []
+        cur = None
+        for t, p, vv in zip(c["ts_ns"], c["price"], c["volume"]):
+            k = (t + off_ns) // 60_000_000_000
+            x = p / s
+            if cur is None or k != cur[0]:
+                if cur is not None:
+                    out.append((_minute_iso(cur[0]), cur[1], cur[2], cur[3], cur[4], cur[5], cur[6]))
+                cur = [k, x, x, x, x, float(vv), 1]
+            else:
+                if x > cur[2]:
+                    cur[2] = x
+                if x < cur[3]:
+                    cur[3] = x
+                cur[4] = x
+                cur[5] += vv
+                cur[6] += 1
+        out.append((_minute_iso(cur[0]), cur[1], cur[2], cur[3], cur[4], cur[5], cur[6]))
+        return out
+
+    def iter_records(self, start: Any = None, end: Any = None) -> Iterator[Tuple[int, str, Dict[str, Any]]]:
+        """(ts_ns, kind, recorder-shaped payload) for replay; payload datetime is exchange local time."""
+        c = self.slice(start, end)
+        s = float(self.price_scale)
+        names = [k for k in c if k not in ("ts_ns", "flags")]
+        for row in zip(c["ts_ns"], c["flags"], *[c[k] for k in names]):
+            t, fl = int(row[0]), int(row[1])
+            vals = dict(zip(names, row[2:]))
+            p: Dict[str, Any] = {"code": self.code, "datetime": ns_to_local(t, self.tz_offset_min).isoformat(timespec="microseconds"),
+                                 "synthetic": bool(fl & 1), "source_file": self.path.name}
+            if self.record_type == RT_TICK:
+                p.update({"close": vals["price"] / s, "volume": int(vals["volume"]), "tick_type": (fl >> 1) & 3})
+            else:
+                for side in ("bid", "ask"):
+                    pxs = [vals[f"{side}_price_{i}"] for i in range(1, LEVELS + 1)]
+                    k = LEVELS
+                    while k and pxs[k - 1] == 0:
+                        k -= 1
+                    p[f"{side}_price"] = [x / s for x in pxs[:k]]
+                    p[f"{side}_volume"] = [int(vals[f"{side}_volume_{i}"]) for i in range(1, k + 1)]
+            yield t, self.kind, p
+
+
+def _minute_iso(m: int) -> str:
+    return (datetime(1970, 1, 1) + timedelta(minutes=int(m))).isoformat(timespec="minutes")
+
+
+def find_archives(root: str, code: str, kind: str, *, since: Optional[str] = None, until: Optional[str] = None) -> List[str]:
+    """Archive files for code/kind, day-ascending; since/until: 'YYYY-MM-DD' (inclusive)."""
+    out = []
+    for p in sorted(glob.glob(str(Path(root) / "*" / f"{code}.{kind}{SUFFIX}"))):
+        day = Path(p).parent.name
+        if (since and day < since[:10]) or (until and day > until[:10]):
+            continue
+        out.append(p)
+    return out
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="TMF AutoTrader tick/bidask archive v1: convert JSONL / events to .tav1, verify")
+    ap.add_argument("inputs", nargs="*", help="recorder JSONL files (globs ok)")
+    ap.add_argument("--db", default="", help="convert events table of this DB instead")
+    ap.add_argument("--since", default=None, help="events.ts lower bound (with --db)")
+    ap.add_argument("--out-dir", default=DEFAULT_ROOT)
+    ap.add_argument("--price-scale", type=int, default=DEFAULT_PRICE_SCALE)
+    ap.add_argument("--tz-offset-min", type=int, default=EXCHANGE_TZ_OFFSET_MIN)
+    ap.add_argument("--replace", action="store_true", help="rewrite existing day files from these inputs only (default: merge)")
+    ap.add_argument("--verify", action="store_true", help="check every .tav1 under --out-dir against its sidecar")
+    args = ap.parse_args(argv)
+
+    if args.verify:
+        bad = 0
+        for p in sorted(glob.glob(str(Path(args.out_dir) / "*" / f"*{SUFFIX}"))):
+            try:
+                with TickArchiveV1(p, verify=True) as a:
+                    print(f"[OK] {p} n={a.n}")
+            except Exception as e:
+                bad += 1
+                print(f"[FAIL] {p}: {e}")
+        return 1 if bad else 0
+    kw = {"price_scale": args.price_scale, "tz_offset_min": args.tz_offset_min, "merge": not args.replace}
+    if args.db:
+        rep = convert_events_db(args.db, args.out_dir, since=args.since, **kw)
+    else:
+        paths = [p for x in args.inputs for p in (sorted(glob.glob(x)) or [x])]
+        if not paths:
+            raise SystemExit("[FATAL] no inputs (JSONL files or --db)")
+        rep = convert_jsonl(paths, args.out_dir, **kw)
+    print(json.dumps(rep, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
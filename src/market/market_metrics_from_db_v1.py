@@ -1,9 +1,12 @@
 from __future__ import annotations
 import json
+import os
 import sqlite3
 from dataclasses import dataclass
 from typing import Any, Dict, List, Optional, Tuple
 
+from src.data.sqlite_conn_v1 import connect_shared
+
 # NOTE: Python 3.9.6 compatible
 
 @dataclass(frozen=True)
@@ -37,6 +40,43 @@ def _loads(s: Any) -> Dict[str, Any]:
         return {}
 
 
+def _asof_ceiling(asof_ts: str) -> str:
+    # If given as minute string 'YYYY-MM-DDTHH:MM', treat as end-of-minute ceiling.
+    tsu = str(asof_ts).strip()
+    if len(tsu) == 16 and "T" in tsu and tsu.count(":") == 1:
+        tsu = tsu + ":59.999999"
+    return tsu
+
+
+def _quotes_l5_enabled() -> bool:
+    return (os.environ.get("TMF_QUOTES_L5", "1") or "1").strip().lower() in ("1", "true", "yes", "y", "on")
+
+
+def _pick_latest_quote_by_code(
+    con: sqlite3.Connection,
+    *,
+    kind: str,
+    code: str,
+    reject_synthetic: bool = True,
+    asof_ts: Optional[str] = None,
+) -> Optional[Tuple[int, str, Dict[str, Any], str, str]]:
+    """
+    Same contract as _pick_latest_event_by_code, served from the typed quotes_l5 table.
+    Raises on any table/db problem so the caller can fall back to the events scan.
+    """
+    from src.data.quotes_l5_v1 import latest_quote
+    q = latest_quote(
+        con,
+        code=str(code),
+        kind=str(kind),
+        reject_synthetic=bool(reject_synthetic),
+        asof_ts=(_asof_ceiling(asof_ts) if asof_ts else None),
+    )
+    if not q:
+        return None
+    return (int(q["event_id"]), str(q["ts"]), q, str(q.get("source_file") or ""), str(q.get("db_ingest_ts") or ""))
+
+
 def _pick_latest_event_by_code(
     con: sqlite3.Connection,
     *,
@@ -58,12 +98,8 @@ def _pick_latest_event_by_code(
     params = [kind]
 
     if asof_ts:
-        # If given as minute string 'YYYY-MM-DDTHH:MM', treat as end-of-minute ceiling.
-        tsu = str(asof_ts).strip()
-        if len(tsu) == 16 and "T" in tsu and tsu.count(":") == 1:
-            tsu = tsu + ":59.999999"
         q += " AND ts <= ?"
-        params.append(tsu)
+        params.append(_asof_ceiling(asof_ts))
 
     q += " ORDER BY id DESC LIMIT ?"
     params.append(int(scan_limit))
@@ -149,6 +185,7 @@ def get_market_metrics_from_db(
     bars_symbol_for_atr: Optional[str] = None,
     atr_n: int = 20,
     asof_ts: Optional[str] = None,
+    quote_cache: Any = None,
 ) -> Dict[str, Any]:
     """
     Fetch latest bidask_fop_v1 for `fop_code` and compute:
@@ -157,10 +194,28 @@ def get_market_metrics_from_db(
       - liquidity_score from top-5 volumes
       - atr_points from bars_1m (FOP, symbol=bars_symbol_for_atr or fop_code)
     Returns a dict suitable to be embedded into order meta as meta['market_metrics'].
+    quote_cache: optional shared LatestQuoteCacheV1; asof lookups it cannot answer go to the DB.
     """
-    con = sqlite3.connect(db_path)
+    con = connect_shared(db_path)
     try:
-        ev = _pick_latest_event_by_code(con, kind="bidask_fop_v1", code=fop_code, reject_synthetic=True, asof_ts=asof_ts)
+        ev = None
+        served = False
+        if quote_cache is not None and _quotes_l5_enabled() and str(getattr(quote_cache, "kind", "")) == "bidask_fop_v1":
+            try:
+                snap = quote_cache.get(str(fop_code), reject_synthetic=True, asof_ts=(_asof_ceiling(asof_ts) if asof_ts else None))
+                if snap is not None:
+                    ev = (int(snap.event_id or 0), str(snap.ts), snap.to_payload(), str(snap.source_file or ""), str(snap.db_ingest_ts or ""))
+                served = True
+            except Exception:
+                ev = None
+        if (not served) and _quotes_l5_enabled():
+            try:
+                ev = _pick_latest_quote_by_code(con, kind="bidask_fop_v1", code=fop_code, reject_synthetic=True, asof_ts=asof_ts)
+                served = True
+            except Exception:
+                ev = None
+        if not served:
+            ev = _pick_latest_event_by_code(con, kind="bidask_fop_v1", code=fop_code, reject_synthetic=True, asof_ts=asof_ts)
         if not ev:
             return {}
 
@@ -0,0 +1,316 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from src.data.quotes_l5_v1 import _ROW_COLS, _quote_dict, quote_row_from_payload
+from src.ops.latency.gate_timing import trace_queries
+
+# NOTE: Python 3.9.6 compatible
+#
+# Process-local latest-quote cache (one snapshot per FOP code) shared by the pre-trade gates.
+# - refresh(): incremental from quotes_l5 (event_id > watermark) over ONE long-lived connection;
+#   gated by PRAGMA data_version (moves only when another connection commits, no table access), so a
+#   read with no new commit is served from memory; optional extra throttle TMF_QUOTE_CACHE_REFRESH_SEC
+#   (default 0.0 = check data_version on every read, same answers as DB)
+# - refresh() is read-only: quotes_l5 is kept in sync by the writers (recorder / ingest, see
+#   sync_quotes_l5). While quotes_l5 lags events, get() raises QuotesBehindError -> callers use the DB.
+# - feed_payload(): optional direct feed from an in-process recorder
+# - every snapshot carries the events.id it came from, so the DB stays the truth-source for audit
+# Slots per code: latest clean (non-synthetic, non ops_seed_*), latest non-synthetic, latest any.
+# As-of reads (asof_ts older than the latest slot) are served from a per-slot ring of the last
+# TMF_QUOTE_CACHE_RING DB rows (default 2048); outside the ring -> AsofNotServedError.
+
+OPS_SEED_PREFIX = "ops_seed_"
+
+
+@dataclass(frozen=True)
+class QuoteSnapshotV1:
+    code: str
+    kind: str
+    event_id: Optional[int]
+    ts: str
+    bid_price: Tuple[float, ...]
+    ask_price: Tuple[float, ...]
+    bid_volume: Tuple[float, ...]
+    ask_volume: Tuple[float, ...]
+    synthetic: bool = False
+    recv_ts: Optional[str] = None
+    ingest_ts: Optional[str] = None
+    source_file: Optional[str] = None
+    db_ingest_ts: Optional[str] = None
+    mono_ts: float = field(default_factory=time.monotonic)
+
+    @property
+    def bid(self) -> Optional[float]:
+        return self.bid_price[0] if self.bid_price else None
+
+    @property
+    def ask(self) -> Optional[float]:
+        return self.ask_price[0] if self.ask_price else None
+
+    def age_monotonic_sec(self, now: Optional[float] = None) -> float:
+        """Seconds since this process learned the quote (monotonic; immune to wall-clock jumps)."""
+        return float((time.monotonic() if now is None else now) - self.mono_ts)
+
+    def to_payload(self) -> Dict[str, Any]:
+        """bidask payload-shaped dict (what the events-scan paths hand to the gates)."""
+        return {
+            "code": self.code,
+            "kind": self.kind,
+            "bid_price": list(self.bid_price),
+            "ask_price": list(self.ask_price),
+            "bid_volume": list(self.bid_volume),
+            "ask_volume": list(self.ask_volume),
+            "synthetic": bool(self.synthetic),
+            "recv_ts": self.recv_ts,
+            "ingest_ts": self.ingest_ts,
+            "event_id": self.event_id,
+            "ts": self.ts,
+            "source_file": self.source_file,
+            "db_ingest_ts": self.db_ingest_ts,
+        }
+
+    @classmethod
+    def from_quote_dict(cls, q: Dict[str, Any], *, mono_ts: Optional[float] = None) -> "QuoteSnapshotV1":
+        def _t(xs: Any) -> Tuple[float, ...]:
+            return tuple(float(x) for x in (xs or []) if x is not None)
+        return cls(
+            code=str(q.get("code") or ""),
+            kind=str(q.get("kind") or "bidask_fop_v1"),
+            event_id=(None if q.get("event_id") is None else int(q["event_id"])),
+            ts=str(q.get("ts") or ""),
+            bid_price=_t(q.get("bid_price")),
+            ask_price=_t(q.get("ask_price")),
+            bid_volume=_t(q.get("bid_volume")),
+            ask_volume=_t(q.get("ask_volume")),
+            synthetic=bool(q.get("synthetic")),
+            recv_ts=q.get("recv_ts"),
+            ingest_ts=q.get("ingest_ts"),
+            source_file=q.get("source_file"),
+            db_ingest_ts=q.get("db_ingest_ts"),
+            mono_ts=(time.monotonic() if mono_ts is None else float(mono_ts)),
+        )
+
+
+class AsofNotServedError(LookupError):
+    """asof_ts is older than what the cache still holds; caller must ask the DB."""
+
+
+class QuotesBehindError(LookupError):
+    """quotes_l5 has not caught up with events yet (no writer synced); caller must ask the DB."""
+
+
+class _Ring:
+    """Last N DB snapshots of one slot, in events.id order (a contiguous suffix of that slot's rows)."""
+
+    __slots__ = ("items", "complete")
+
+    def __init__(self, maxlen: int):
+        self.items: Deque[QuoteSnapshotV1] = deque(maxlen=maxlen)
+        self.complete = True  # nothing evicted yet: the ring holds every row of the slot
+
+    def append(self, snap: QuoteSnapshotV1) -> None:
+        if len(self.items) == self.items.maxlen:
+            self.complete = False
+        self.items.append(snap)
+
+    def asof(self, asof_ts: str) -> Optional[QuoteSnapshotV1]:
+        # same answer as "ts <= asof ORDER BY event_id DESC LIMIT 1": every row newer than the
+        # oldest ring entry is in the ring, so the first hit scanning back is the DB answer
+        for snap in reversed(self.items):
+            if str(snap.ts) <= asof_ts:
+                return snap
+        if not self.complete:
+            raise AsofNotServedError(asof_ts)
+        return None
+
+
+def _is_ops_seed(snap: QuoteSnapshotV1) -> bool:
+    return str(snap.source_file or "").startswith(OPS_SEED_PREFIX)
+
+
+class LatestQuoteCacheV1:
+    def __init__(self, db_path: str, *, kind: str = "bidask_fop_v1", min_refresh_sec: Optional[float] = None):
+        self.db_path = str(db_path)
+        self.kind = str(kind)
+        if min_refresh_sec is None:
+            min_refresh_sec = float((os.environ.get("TMF_QUOTE_CACHE_REFRESH_SEC", "0") or "0").strip())
+        self.min_refresh_sec = max(0.0, float(min_refresh_sec))
+        self._lock = threading.RLock()
+        self._con: Optional[sqlite3.Connection] = None
+        self._wm = 0
+        self._version: Optional[int] = None
+        self._last_refresh = 0.0
+        self.ring_len = max(1, int((os.environ.get("TMF_QUOTE_CACHE_RING", "2048") or "2048").strip()))
+        self._behind = False
+        # code -> [clean, non_synthetic, any]
+        self._slots: Dict[str, List[Optional[QuoteSnapshotV1]]] = {}
+        # code -> rings for the same three slots (DB rows only; fed snapshots have no events.id)
+        self._rings: Dict[str, List[_Ring]] = {}
+        self.stats = {"refreshes": 0, "db_rows": 0, "fed": 0, "hits": 0, "resets": 0, "asof_hits": 0, "behind": 0,
+                      "probes": 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._con is None:
+            self._con = trace_queries(sqlite3.connect(self.db_path, timeout=5.0, check_same_thread=False))
+            self._con.execute("PRAGMA busy_timeout=5000;")
+        return self._con
+
+    def close(self) -> None:
+        with self._lock:
+            if self._con is not None:
+                try:
+                    self._con.close()
+                finally:
+                    self._con = None
+                    self._version = None
+
+    def _put(self, snap: QuoteSnapshotV1, *, from_db: bool = False) -> None:
+        slots = self._slots.setdefault(snap.code, [None, None, None])
+        ranks = [0, 1, 2] if (not snap.synthetic and not _is_ops_seed(snap)) else ([1, 2] if not snap.synthetic else [2])
+        for i in ranks:
+            cur = slots[i]
+            if cur is None or self._newer(snap, cur):
+                slots[i] = snap
+        if from_db:
+            rings = self._rings.get(snap.code)
+            if rings is None:
+                rings = self._rings[snap.code] = [_Ring(self.ring_len) for _ in range(3)]
+            for i in ranks:
+                rings[i].append(snap)
+
+    @staticmethod
+    def _newer(a: QuoteSnapshotV1, b: QuoteSnapshotV1) -> bool:
+        if a.event_id is not None and b.event_id is not None:
+            return a.event_id > b.event_id
+        # fed snapshot (no id) vs DB row: compare recorder ingest_ts (same clock), else arrival order
+        if a.ingest_ts and b.ingest_ts:
+            return str(a.ingest_ts) >= str(b.ingest_ts)
+        return a.mono_ts >= b.mono_ts
+
+    def refresh(self, *, force: bool = False) -> int:
+        """Pull quotes_l5 rows newer than the watermark (read-only). Returns rows applied."""
+        with self._lock:
+            now = time.monotonic()
+            if (not force) and self.min_refresh_sec > 0 and (now - self._last_refresh) < self.min_refresh_sec:
+                return 0
+            con = self._connect()
+            v = int(con.execute("PRAGMA data_version").fetchone()[0])
+            if v == self._version:
+                self._last_refresh = now
+                return 0   # no commit from another connection since the last probe
+            self.stats["probes"] += 1
+            try:
+                # one statement = one read snapshot of events vs the quotes_l5 watermark
+                ev_mx, synced, mx = con.execute(
+                    "SELECT (SELECT MAX(id) FROM events WHERE kind=?), "
+                    "(SELECT last_event_id FROM quotes_l5_watermark WHERE kind=?), "
+                    "(SELECT MAX(event_id) FROM quotes_l5 WHERE kind=?)",
+                    (self.kind, self.kind, self.kind),
+                ).fetchone()
+            except sqlite3.OperationalError:
+                # quotes_l5 not created yet (no writer synced): nothing to pull
+                ev_mx = con.execute("SELECT MAX(id) FROM events WHERE kind=?", (self.kind,)).fetchone()[0]
+                synced, mx = None, None
+            self._behind = int(ev_mx or 0) > int(synced or 0)
+            if self._behind:
+                self.stats["behind"] += 1
+            mx = int(mx or 0)
+            if mx < self._wm:
+                # quotes rebuilt under us -> drop everything learned from the DB
+                self._slots = {}
+                self._rings = {}
+                self._wm = 0
+                self.stats["resets"] += 1
+            n = 0
+            if mx > self._wm:
+                rows = con.execute(
+                    "SELECT %s FROM quotes_l5 WHERE kind=? AND event_id > ? ORDER BY event_id ASC" % (",".join(_ROW_COLS),),
+                    (self.kind, self._wm),
+                ).fetchall()
+                for r in rows:
+                    self._put(QuoteSnapshotV1.from_quote_dict(_quote_dict(tuple(r), _ROW_COLS), mono_ts=now), from_db=True)
+                n = len(rows)
+                self._wm = mx
+            self._version = v
+            self._last_refresh = now
+            self.stats["refreshes"] += 1
+            self.stats["db_rows"] += n
+            return n
+
+    def feed_payload(self, payload: Dict[str, Any], *, ts: str = "", event_id: Optional[int] = None) -> Optional[QuoteSnapshotV1]:
+        """Direct feed (in-process recorder). Same level normalisation as quotes_l5."""
+        row = quote_row_from_payload(event_id=int(event_id or 0), ts=str(ts), kind=self.kind, payload=payload,
+                                     source_file=payload.get("source_file"), db_ingest_ts=None)
+        if row is None:
+            return None
+        q = _quote_dict(row, _ROW_COLS)
+        q["event_id"] = event_id
+        snap = QuoteSnapshotV1.from_quote_dict(q)
+        with self._lock:
+            self._put(snap)
+            self.stats["fed"] += 1
+        return snap
+
+    def get(
+        self,
+        code: str,
+        *,
+        reject_synthetic: bool = True,
+        exclude_ops_seed: bool = False,
+        asof_ts: Optional[str] = None,
+        refresh: bool = True,
+    ) -> Optional[QuoteSnapshotV1]:
+        """
+        Latest snapshot for code under the same filters as the DB lookups
+        (exclude_ops_seed only applies together with reject_synthetic, as in the safety gate).
+        asof_ts: latest snapshot with ts <= asof_ts; older than the ring holds -> AsofNotServedError.
+        Raises QuotesBehindError while quotes_l5 lags events (last refresh saw unsynced events).
+        """
+        if refresh:
+            self.refresh()
+        with self._lock:
+            if self._behind:
+                raise QuotesBehindError(str(code))
+            rank = (0 if exclude_ops_seed else 1) if reject_synthetic else 2
+            slots = self._slots.get(str(code))
+            snap = slots[rank] if slots else None
+            self.stats["hits"] += 1
+            if asof_ts and snap is not None and str(snap.ts) > str(asof_ts):
+                rings = self._rings.get(str(code))
+                if rings is None:
+                    raise AsofNotServedError(str(asof_ts))
+                snap = rings[rank].asof(str(asof_ts))
+                self.stats["asof_hits"] += 1
+        return snap
+
+
+_CACHES: Dict[Tuple[str, str], LatestQuoteCacheV1] = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def quote_cache_enabled() -> bool:
+    return (os.environ.get("TMF_QUOTE_CACHE", "1") or "1").strip().lower() in ("1", "true", "yes", "y", "on")
+
+
+def get_quote_cache(db_path: str, *, kind: str = "bidask_fop_v1") -> LatestQuoteCacheV1:
+    """Process-wide shared cache per (db file, kind)."""
+    key = (str(Path(db_path).resolve()), str(kind))
+    with _CACHES_LOCK:
+        c = _CACHES.get(key)
+        if c is None:
+            c = LatestQuoteCacheV1(str(db_path), kind=kind)
+            _CACHES[key] = c
+        return c
+
+
+def shared_quote_cache_or_none(db_path: str) -> Optional[LatestQuoteCacheV1]:
+    """Runner helper: the shared cache when TMF_QUOTE_CACHE is on, else None (DB lookups only)."""
+    return get_quote_cache(str(db_path)) if quote_cache_enabled() else None
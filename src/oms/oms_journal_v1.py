@@ -0,0 +1,368 @@
+from __future__ import annotations
+
+import atexit
+import fcntl
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+from src.risk.risk_state_v1 import notify_trade_open
+
+# Ordered write-behind journal for PaperOMS (TMF_OMS_WRITE_BEHIND=1).
+# - PaperOMS keeps the order / position / open-trade tables in memory; each order event (fill + order
+#   status + trade open/close) becomes ONE journal record: encoded once, appended to <db>.oms_journal
+#   with one os.write (survives a process crash; TMF_OMS_JOURNAL_FSYNC=1 also survives an OS crash)
+# - writer thread applies the records to SQLite in seq order, many per transaction, every
+#   TMF_OMS_JOURNAL_FLUSH_SEC (default 0.05) or as soon as TMF_OMS_JOURNAL_BATCH_MAX (default 200)
+#   records are pending; order status is coalesced per order (last wins, meta_json merged as before)
+# - the last applied seq is committed with the rows (oms_journal_applied) -> exactly-once replay:
+#   on open, records past that seq are applied, then the file is truncated
+# - one owner per DB (flock on the journal file); another process on the same DB writes synchronously
+# - flush(): synchronous drain (readers that need the rows; never inside a shared_transaction of the
+#   calling thread: the writer uses its own connection). close() / interpreter exit drain everything.
+# - trades.id is only known after the flush: notify_trade_open fires from the writer after COMMIT;
+#   RiskStateV1 does not rebuild from trades while this journal has pending records (journal_pending).
+# NOTE: Python 3.9.6 compatible
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS oms_journal_applied (
+  journal TEXT PRIMARY KEY,
+  seq INTEGER NOT NULL,
+  ts TEXT NOT NULL
+)
+"""
+
+
+def _env(name: str, default: str) -> str:
+    return (os.environ.get(name, default) or default).strip()
+
+
+def write_behind_enabled() -> bool:
+    return _env("TMF_OMS_WRITE_BEHIND", "0").lower() in ("1", "true", "yes", "y", "on")
+
+
+def _j(x) -> str:
+    return json.dumps(x, ensure_ascii=False, default=str)
+
+
+@dataclass(frozen=True)
+class OmsJournalConfigV1:
+    flush_interval_sec: float = 0.05
+    batch_max: int = 200
+    file: int = 1          # 0 -> memory only (no crash recovery)
+    fsync: int = 0
+
+    @classmethod
+    def from_env(cls) -> "OmsJournalConfigV1":
+        return cls(
+            flush_interval_sec=max(0.001, float(_env("TMF_OMS_JOURNAL_FLUSH_SEC", "0.05"))),
+            batch_max=max(1, int(_env("TMF_OMS_JOURNAL_BATCH_MAX", "200"))),
+            file=1 if _env("TMF_OMS_JOURNAL_FILE", "1") == "1" else 0,
+            fsync=1 if _env("TMF_OMS_JOURNAL_FSYNC", "0") == "1" else 0,
+        )
+
+
+def journal_path(db_path: str) -> str:
+    return os.path.abspath(str(db_path)) + ".oms_journal"
+
+
+class OmsJournalV1:
+    def __init__(self, db_path: str, *, cfg: Optional[OmsJournalConfigV1] = None):
+        self.db_path = os.path.abspath(str(db_path))
+        self.cfg = cfg or OmsJournalConfigV1.from_env()
+        self.path = journal_path(self.db_path)
+        self._q: Deque[Tuple[int, str, float]] = deque()   # (seq, encoded record, t_enq)
+        self._cv = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._stop = False
+        self._thread: Optional[threading.Thread] = None
+        self._con: Optional[sqlite3.Connection] = None
+        self._fd: Optional[int] = None
+        self.counters: Dict[str, Any] = {
+            "records": 0, "applied": 0, "batches": 0, "db_errors": 0, "recovered": 0, "truncated_tail": 0,
+            "pending_max": 0, "flush_ms_last": 0.0, "flush_ms_max": 0.0, "lag_ms_max": 0.0,
+        }
+        applied = self._applied_seq(self._db())
+        last = applied
+        if self.cfg.file:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                raise
+            self._fd = fd
+            last = max(last, self._recover(applied))
+        self._seq = last
+
+    # ---- DB side (writer thread / flush callers, serialized by _flush_lock) ----
+    def _db(self) -> sqlite3.Connection:
+        if self._con is None:
+            con = sqlite3.connect(self.db_path, timeout=10.0, isolation_level=None, check_same_thread=False)
+            con.execute("PRAGMA busy_timeout=10000;")
+            con.execute(SCHEMA)
+            self._con = con
+        return self._con
+
+    def _applied_seq(self, con: sqlite3.Connection) -> int:
+        row = con.execute("SELECT seq FROM oms_journal_applied WHERE journal=?", (self.path,)).fetchone()
+        return int(row[0]) if row else 0
+
+    def _apply(self, batch: Sequence[Tuple[int, str, float]]) -> List[int]:
+        """Apply records in seq order in ONE transaction; returns trades.id of the trades opened."""
+        con = self._db()
+        opened: List[int] = []
+        status: Dict[str, Tuple[str, float]] = {}
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            for _seq, line, _t in batch:
+                for op in json.loads(line)[1]:
+                    k = op[0]
+                    if k == "fill":
+                        con.execute(
+                            "INSERT INTO fills(ts, broker_order_id, symbol, side, qty, price, fee, tax, meta_json) VALUES (?,?,?,?,?,?,?,?,?)",
+                            tuple(op[1:9]) + (_j(op[9]),),
+                        )
+                    elif k == "order":
+                        status[op[1]] = (op[2], float(op[3]))
+                    elif k == "trade_open":
+                        cur = con.execute(
+                            "INSERT INTO trades(open_ts, close_ts, symbol, side, qty, entry, exit, pnl, pnl_pct, reason_open, reason_close, meta_json) VALUES (?,?,?,?,?,?,?,?,?,?,?,?)",
+                            tuple(op[1:12]) + (_j(op[12]),),
+                        )
+                        opened.append(int(cur.lastrowid))
+                    elif k == "trade_close":
+                        con.execute(
+                            "UPDATE trades SET close_ts=?, exit=?, pnl=?, pnl_pct=?, reason_close=? WHERE symbol=? AND close_ts IS NULL ORDER BY id DESC LIMIT 1",
+                            (op[2], op[3], op[4], op[5], op[6], op[1]),
+                        )
+            if status:
+                # v1_1 merge (preserve stop_price / market_metrics / other fields), once per order per batch
+                ids = list(status)
+                metas: Dict[str, Any] = {}
+                for i in range(0, len(ids), 500):
+                    chunk = ids[i:i + 500]
+                    q = "SELECT broker_order_id, meta_json FROM orders WHERE broker_order_id IN (%s)" % ",".join("?" * len(chunk))
+                    for oid, mj in con.execute(q, chunk):
+                        metas[oid] = mj
+                rows = []
+                for oid, (st, filled) in status.items():
+                    base = {}
+                    mj = metas.get(oid)
+                    if mj:
+                        try:
+                            base = json.loads(mj) if isinstance(mj, str) else {}
+                        except Exception:
+                            base = {}
+                    if not isinstance(base, dict):
+                        base = {}
+                    base["filled_qty"] = float(filled)
+                    rows.append((st, _j(base), oid))
+                con.executemany("UPDATE orders SET status=?, meta_json=? WHERE broker_order_id=?", rows)
+            con.execute(
+                "INSERT INTO oms_journal_applied(journal, seq, ts) VALUES (?,?,?) "
+                "ON CONFLICT(journal) DO UPDATE SET seq=excluded.seq, ts=excluded.ts",
+                (self.path, int(batch[-1][0]), time.strftime("%Y-%m-%dT%H:%M:%S")),
+            )
+            con.execute("COMMIT")
+        except BaseException:
+            if con.in_transaction:
+                con.execute("ROLLBACK")
+            raise
+        return opened
+
+    def _recover(self, applied: int) -> int:
+        """Replay records past the applied seq (a previous owner died before flushing them); -> last seq seen."""
+        with open(self.path, "rb") as f:
+            raw = f.read()
+        last = applied
+        todo: List[Tuple[int, str, float]] = []
+        for ln in raw.split(b"\n"):
+            if not ln:
+                continue
+            try:
+                line = ln.decode("utf-8")
+                seq = int(json.loads(line)[0])
+            except Exception:
+                self.counters["truncated_tail"] += 1   # torn last write of a crashed owner (never acknowledged)
+                continue
+            last = max(last, seq)
+            if seq > applied:
+                todo.append((seq, line, 0.0))
+        if todo:
+            for i in range(0, len(todo), self.cfg.batch_max):
+                for tid in self._apply(todo[i:i + self.cfg.batch_max]):
+                    notify_trade_open(self.db_path, tid)
+            self.counters["recovered"] = len(todo)
+        os.ftruncate(self._fd, 0)
+        return last
+
+    def _flush_some(self, limit: int) -> int:
+        with self._flush_lock:
+            with self._cv:
+                n = min(len(self._q), limit)
+                batch = [self._q[i] for i in range(n)]
+            if not batch:
+                return 0
+            t0 = time.monotonic()
+            try:
+                opened = self._apply(batch)
+            except Exception:
+                self.counters["db_errors"] += 1   # records stay queued (and in the file); retried next tick
+                return -1
+            for tid in opened:
+                notify_trade_open(self.db_path, tid)
+            with self._cv:
+                for _ in range(n):
+                    self._q.popleft()
+                if not self._q and self._fd is not None:
+                    try:
+                        os.ftruncate(self._fd, 0)
+                    except OSError:
+                        pass
+                self._cv.notify_all()
+            now = time.monotonic()
+            ms = (now - t0) * 1000.0
+            self.counters["applied"] += n
+            self.counters["batches"] += 1
+            self.counters["flush_ms_last"] = round(ms, 3)
+            self.counters["flush_ms_max"] = max(self.counters["flush_ms_max"], round(ms, 3))
+            self.counters["lag_ms_max"] = max(self.counters["lag_ms_max"], round((now - batch[0][2]) * 1000.0, 3))
+            return n
+
+    def _run(self) -> None:
+        while True:
+            with self._cv:
+                if len(self._q) < self.cfg.batch_max and not self._stop:
+                    self._cv.wait(self.cfg.flush_interval_sec)
+                if self._stop:
+                    break
+            if self._flush_some(self.cfg.batch_max) < 0:
+                time.sleep(self.cfg.flush_interval_sec)
+
+    # ---- producer side (PaperOMS, hot path) ----
+    def append(self, ops: List[list]) -> int:
+        """Queue one order event (list of ops); returns its seq. Memory + one os.write, no SQLite."""
+        with self._cv:
+            self._seq += 1
+            seq = self._seq
+            line = json.dumps([seq, ops], ensure_ascii=False, default=str)
+            if self._fd is not None:
+                os.write(self._fd, (line + "\n").encode("utf-8"))
+                if self.cfg.fsync:
+                    os.fsync(self._fd)
+            self._q.append((seq, line, time.monotonic()))
+            self.counters["records"] += 1
+            if len(self._q) > self.counters["pending_max"]:
+                self.counters["pending_max"] = len(self._q)
+            if len(self._q) >= self.cfg.batch_max:
+                self._cv.notify()
+        if self._stop:
+            self.flush()          # closed: no writer thread any more
+        elif self._thread is None:
+            self.start()
+        return seq
+
+    def pending(self) -> int:
+        return len(self._q)
+
+    # ---- lifecycle ----
+    def start(self) -> "OmsJournalV1":
+        with self._cv:
+            if self._thread is None and not self._stop:
+                self._thread = threading.Thread(target=self._run, name="tmf-oms-journal", daemon=True)
+                self._thread.start()
+        return self
+
+    def flush(self) -> int:
+        """Apply every pending record now (calling thread); returns records still pending (0 unless the DB failed)."""
+        while self._q:
+            if self._flush_some(len(self._q)) < 0:
+                break
+        return len(self._q)
+
+    def close(self, timeout: float = 10.0) -> None:
+        with self._cv:
+            self._stop = True
+            self._cv.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        left = self.flush()
+        if self._fd is not None:
+            if left == 0:
+                try:
+                    os.unlink(self.path)
+                except OSError:
+                    pass
+            os.close(self._fd)
+            self._fd = None
+        if self._con is not None:
+            try:
+                self._con.close()
+            finally:
+                self._con = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._cv:
+            depth = len(self._q)
+            oldest = self._q[0][2] if self._q else None
+            c = dict(self.counters)
+        c.update({"pending": depth, "seq": self._seq, "path": self.path if self.cfg.file else None,
+                  "oldest_pending_ms": int((time.monotonic() - oldest) * 1000.0) if oldest is not None else 0})
+        return c
+
+
+_JOURNALS: Dict[str, OmsJournalV1] = {}
+_JOURNALS_LOCK = threading.Lock()
+
+
+def get_oms_journal(db_path: Any) -> Optional[OmsJournalV1]:
+    """Process-wide journal per DB (recovers on first open); None if another process owns it."""
+    k = os.path.abspath(str(db_path))
+    with _JOURNALS_LOCK:
+        j = _JOURNALS.get(k)
+        if j is None:
+            try:
+                j = _JOURNALS[k] = OmsJournalV1(k)
+            except OSError:
+                return None
+        return j
+
+
+def journal_pending(db_path: Any) -> int:
+    if not _JOURNALS:
+        return 0
+    j = _JOURNALS.get(os.path.abspath(str(db_path)))
+    return 0 if j is None else j.pending()
+
+
+def flush_oms_journal(db_path: Any) -> int:
+    if not _JOURNALS:
+        return 0
+    j = _JOURNALS.get(os.path.abspath(str(db_path)))
+    return 0 if j is None else j.flush()
+
+
+def close_oms_journal(db_path: Any) -> None:
+    with _JOURNALS_LOCK:
+        j = _JOURNALS.pop(os.path.abspath(str(db_path)), None)
+    if j is not None:
+        j.close()
+
+
+@atexit.register
+def _close_all() -> None:
+    with _JOURNALS_LOCK:
+        js = list(_JOURNALS.values())
+        _JOURNALS.clear()
+    for j in js:
+        try:
+            j.close()
+        except Exception:
+            pass
@@ -1,7 +1,8 @@
 from __future__ import annotations
+import os
 from dataclasses import asdict
 from pathlib import Path
-from typing import Any, Dict, Optional, Union
+from typing import Any, Dict, List, Optional, Sequence, Union
 
 from src.oms.paper_oms_v1 import PaperOMS
 from src.risk.risk_engine_v1 import RiskEngineV1
@@ -9,9 +10,13 @@ from src.safety.system_safety_v1 import SystemSafetyEngineV1
 from execution.order_guard import guard_order_v1
 from execution.tw_market_calendar_v1 import market_open_verdict
 
-from execution.reject_taxonomy import load_policy, decision_from_verdict
+from execution.reject_taxonomy import CompiledRejectPolicyV1, load_policy_cached, decision_from_verdict
 from src.execution.order_result_types import is_rejected_order
+from src.data.sqlite_conn_v1 import connect_shared, shared_transaction
 from src.data.store_sqlite_v1 import init_db as init_orders_db
+from src.ops.clock_v1 import clock_now
+from src.ops.latency.gate_timing import GateTimerV1, gate_timing_enabled, get_gate_recorder, outcome_of, trace_queries
+from src.safety.reject_storm_v1 import get_storm_detector, publish_reject
 
 
 
@@ -63,6 +68,58 @@ def _ensure_intent_envelope(meta: dict) -> dict:
         return meta
 
 
+def split_batch_enabled() -> bool:
+    # TMF_SPLIT_BATCH=0 -> SPLIT children go one by one through place_order() (full gate chain each)
+    return (os.environ.get("TMF_SPLIT_BATCH", "1") or "1").strip().lower() in ("1", "true", "yes", "y", "on")
+
+
+def _split_child_safe(ch: Any) -> Dict[str, Any]:
+    # --- v18 audit: make split_children JSON-safe (Order objects are not serializable) ---
+    if isinstance(ch, dict):
+        return ch
+    # likely Order dataclass-like object
+    try:
+        return {
+            "ok": True,
+            "status": getattr(ch, "status", None),
+            "broker_order_id": getattr(ch, "order_id", None),
+            "order": {
+                "order_id": getattr(ch, "order_id", None),
+                "ts": getattr(ch, "ts", None),
+                "symbol": getattr(ch, "symbol", None),
+                "side": getattr(ch, "side", None),
+                "qty": getattr(ch, "qty", None),
+                "order_type": getattr(ch, "order_type", None),
+                "price": getattr(ch, "price", None),
+                "status": getattr(ch, "status", None),
+                "filled_qty": getattr(ch, "filled_qty", None),
+                "meta": getattr(ch, "meta", None),
+            },
+        }
+    except Exception:
+        return {"ok": True, "status": "ORDER", "repr": repr(ch)}
+
+
+def _split_steps(qty: float, lim: float, max_children: int) -> List[float]:
+    steps: List[float] = []
+    remaining = float(qty)
+    while remaining > 0 and len(steps) < max_children:
+        step = lim if remaining > lim else remaining
+        steps.append(float(step))
+        remaining -= float(step)
+    return steps
+
+
+def _attach_timing(meta: Any, timer: Optional[GateTimerV1]) -> None:
+    # compact gate timing breakdown (laps so far) for the persisted order meta; never raises
+    if timer is None or not isinstance(meta, dict):
+        return
+    try:
+        meta["gate_timing"] = timer.compact()
+    except Exception:
+        pass
+
+
 class PaperOMSRiskSafetyWrapperV1:
     """
     v1 wrapper order: SAFETY first (disconnect/session/expiry guards) -> RISK -> place to OMS.
@@ -81,13 +138,17 @@ class PaperOMSRiskSafetyWrapperV1:
         except Exception:
             # schema init must never break execution path
             pass
-        self._reject_policy = None  # lazy-loaded
+        self._reject_policy: Optional[str] = None  # policy path, resolved lazily
+        # real-time reject-storm detector (COOLDOWN/KILL via self.safety); fed by _insert_rejected_order
+        try:
+            self.storm = get_storm_detector(self.safety)
+        except Exception:
+            self.storm = None
 
 
     def _now(self) -> str:
         # milliseconds for better ordering in logs
-        from datetime import datetime
-        return datetime.now().isoformat(timespec="milliseconds")
+        return clock_now().isoformat(timespec="milliseconds")
 
     def _insert_rejected_order(
         self,
@@ -108,7 +169,7 @@ class PaperOMSRiskSafetyWrapperV1:
         """
         import json, uuid, sqlite3
 
-        con = sqlite3.connect(self.db_path)
+        con = trace_queries(sqlite3.connect(self.db_path))
         try:
             broker_order_id = uuid.uuid4().hex
             ts = self._now()
@@ -169,18 +230,467 @@ class PaperOMSRiskSafetyWrapperV1:
                 ),
             )
             con.commit()
+            publish_reject({"db_path": self.db_path, "ts": ts, "broker_order_id": broker_order_id, "symbol": symbol,
+                            "code": verdict, "domain": decision, "action": action})
             return broker_order_id
         finally:
             con.close()
 
-    def _load_reject_policy(self) -> Dict[str, Any]:
-        if self._reject_policy is not None:
-            return self._reject_policy
-        # repo root is 3 levels above this file: tmf_autotrader/src/oms/...
-        repo = Path(__file__).resolve().parents[2]
-        pol_path = repo / "execution" / "reject_policy.yaml"
-        self._reject_policy = load_policy(str(pol_path))
-        return self._reject_policy
+    def _load_reject_policy(self) -> CompiledRejectPolicyV1:
+        # process-wide compiled policy; picks up edits to the file (mtime/sha256), no per-reject file I/O
+        if self._reject_policy is None:
+            # repo root is 3 levels above this file: tmf_autotrader/src/oms/...
+            repo = Path(__file__).resolve().parents[2]
+            self._reject_policy = str(repo / "execution" / "reject_policy.yaml")
+        return load_policy_cached(self._reject_policy)
+
+    def _accepted_meta(self, meta: Any, sv: Any, rv: Any) -> Dict[str, Any]:
+        meta_ok = dict(meta) if isinstance(meta, dict) else {}
+        meta_ok = _ensure_intent_envelope(meta_ok)
+        if "safety_verdict" not in meta_ok:
+            meta_ok["safety_verdict"] = {"ok": True, "code": sv.code, "reason": sv.reason, "details": sv.details}
+        if "risk_verdict" not in meta_ok:
+            meta_ok["risk_verdict"] = {"ok": True, "code": rv.code, "reason": rv.reason, "details": rv.details}
+
+        if "preflight_verdict" not in meta_ok:
+            meta_ok["preflight_verdict"] = {"ok": True, "code": "OK", "reason": "taifex preflight pass", "details": {}}
+        return meta_ok
+
+    def _insert_split_parent(self, con: Any, *, symbol: str, side: str, qty: float, price: Optional[float], order_type: str,
+                             meta: Any, parent_id: str, lim: float, children: List[Any], pv: Any, dec: Any) -> None:
+        import json
+        row = con.execute("SELECT 1 FROM orders WHERE broker_order_id=? LIMIT 1", (parent_id,)).fetchone()
+        if row is not None:
+            return
+        ts = self._now()
+        meta_parent = dict(meta) if isinstance(meta, dict) else {}
+        meta_parent = _ensure_intent_envelope(meta_parent)
+        meta_parent.setdefault("split_parent_id", parent_id)
+        meta_parent.setdefault("split_limit", float(lim))
+        meta_parent.setdefault("split_requested_qty", float(qty))
+        meta_parent.setdefault("split_children", [_split_child_safe(ch) for ch in children])
+
+        con.execute(
+            "INSERT INTO orders(ts, broker_order_id, symbol, side, qty, price, order_type, status, verdict, decision, action, meta_json) "
+            "VALUES(?,?,?,?,?,?,?,?,?,?,?,?)",
+            (
+                ts,
+                parent_id,
+                symbol,
+                side,
+                float(qty),
+                (float(price) if price is not None else None),
+                order_type,
+                "SPLIT_SUBMITTED",
+                str(pv.code),
+                str(dec.domain),
+                str(dec.action),
+                json.dumps(meta_parent, ensure_ascii=False),
+            ),
+        )
+
+    def _decision(self, verdict: Any) -> Any:
+        return decision_from_verdict({"ok": bool(getattr(verdict, "ok", False)), "code": getattr(verdict, "code", None),
+                                      "reason": getattr(verdict, "reason", None), "details": getattr(verdict, "details", {})},
+                                     policy=self._load_reject_policy())
+
+    @staticmethod
+    def _is_split(pv: Any, dec: Any) -> bool:
+        # policy-driven SPLIT (TAIFEX market qty limit)
+        return str(dec.action).upper() == "SPLIT" and str(pv.code) == "EXEC_TAIFEX_MKT_QTY_LIMIT"
+
+    @staticmethod
+    def _reject_meta(meta: Any, dec: Any, **verdicts: Any) -> Any:
+        # persist decision (+ the failing gate verdict) into meta for v18 audit
+        try:
+            meta = dict(meta) if isinstance(meta, dict) else {}
+            meta = _ensure_intent_envelope(meta)
+            meta.setdefault("reject_decision", {"ok": dec.ok, "code": dec.code, "domain": dec.domain, "severity": dec.severity, "action": dec.action, "reason": dec.reason, "details": dec.details})
+            for k, v in verdicts.items():
+                meta.setdefault(k, {"ok": v.ok, "code": v.code, "reason": v.reason, "details": v.details})
+        except Exception:
+            pass
+        return meta
+
+    def _reject(self, timer: Optional[GateTimerV1], stage: str, verdict: Any, *, symbol: str, side: str, qty: float,
+                order_type: str, price: Optional[float], meta: Any, sv: Any, dec: Any = None) -> Dict[str, Any]:
+        """
+        One REJECTED order for the failing gate (stage: safety / calendar / preflight / risk): reject_decision in
+        meta, policy COOLDOWN/KILL (safety / risk), persisted REJECTED row -> place_order() reject dict.
+        Shared by place_order() and the batch path, which passes the verdicts it already evaluated.
+        """
+        if dec is None:
+            dec = self._decision(verdict)
+        extra = {"calendar": "market_calendar_verdict", "preflight": "preflight_verdict"}.get(stage)
+        meta = self._reject_meta(meta, dec, **({extra: verdict} if extra else {}))
+        if stage in ("safety", "risk"):
+            # execute safety actions (COOLDOWN/KILL) via SystemSafetyEngineV1 state
+            try:
+                if dec.action == "COOLDOWN":
+                    cd_sec = int(meta.get("cooldown_seconds", 60)) if isinstance(meta, dict) else 60
+                    self.safety.request_cooldown(seconds=cd_sec, code=dec.code, reason=dec.reason, details=dec.details)
+                elif dec.action == "KILL":
+                    self.safety.request_kill(code=dec.code, reason=dec.reason, details=dec.details)
+            except Exception:
+                pass
+        _attach_timing(meta, timer)
+        oid = self._insert_rejected_order(
+            symbol=symbol,
+            side=side,
+            qty=float(qty),
+            price=price,
+            order_type=order_type,
+            meta=meta,
+            safety_verdict=sv,
+            risk_verdict=(verdict if stage == "risk" else None),
+        )
+        gate = verdict if stage == "calendar" else sv
+        res: Dict[str, Any] = {
+            "ok": False,
+            "status": "REJECTED",
+            "broker_order_id": oid,
+            "safety": {"code": gate.code, "reason": gate.reason, "details": gate.details},
+        }
+        if stage == "preflight":
+            res["exec"] = {"code": verdict.code, "reason": verdict.reason, "details": verdict.details, "policy_action": dec.action}
+        elif stage == "risk":
+            res["risk"] = {"code": verdict.code, "reason": verdict.reason, "details": verdict.details}
+        return res
+
+    def _split_order(self, *, symbol: str, side: str, qty: float, order_type: str, price: Optional[float], meta: Any,
+                     pv: Any, dec: Any) -> Dict[str, Any]:
+        """Policy SPLIT of a MARKET order over the TAIFEX qty limit; every child goes through the gates."""
+        lim = float((pv.details or {}).get("limit", 0) or 0)
+        if lim <= 0:
+            # fallback to TAIFEX documented limits (day=10, after-hours=5)
+            sess = str((pv.details or {}).get("session_hint", "") or "").upper()
+            lim = 5.0 if sess in {"NIGHT","AFTER_HOURS","AH"} else 10.0
+
+
+        # v18: effective split limit must satisfy BOTH EXEC(TAIFEX) and RISK(max_qty_per_order)
+        try:
+            _cfg = getattr(self.risk, "cfg", None)
+            _risk_lim = getattr(_cfg, "max_qty_per_order", None)
+            if _risk_lim is not None:
+                _risk_lim = float(_risk_lim)
+                if _risk_lim > 0 and _risk_lim < lim:
+                    lim = _risk_lim
+        except Exception:
+            pass
+
+        parent_id = f"SPLIT_{self._now()}"
+        if split_batch_enabled():
+            # shared gates once, children validated in memory, children + parent row in one transaction
+            return self._split_batch(symbol=symbol, side=side, qty=float(qty), order_type=order_type, price=price,
+                                     meta=meta, parent_id=parent_id, lim=lim, pv=pv, dec=dec)
+        results = []
+        remaining = float(qty)
+
+        # adaptive split: must satisfy both TAIFEX limit and RiskEngine per-order qty limit
+        i = 0
+        hard_max_children = 2000  # safety bound
+        while remaining > 0 and i < hard_max_children:
+            step = lim if remaining > lim else remaining
+
+            meta_child = dict(meta) if isinstance(meta, dict) else {}
+            meta_child.setdefault("split_parent_id", parent_id)
+            meta_child.setdefault("split_index", i)
+            meta_child.setdefault("split_limit", lim)
+
+            # Attempt submit through full wrapper gates
+            res = self.place_order(symbol=symbol, side=side, qty=float(step), order_type=order_type, price=price, meta=meta_child)
+            results.append(res)
+
+            # If rejected due to Risk qty cap, adapt lim downward and retry WITHOUT consuming remaining
+            if isinstance(res, dict) and (not bool(res.get("ok", True))) and str(res.get("status","")) == "REJECTED":
+                r = res.get("risk") if isinstance(res.get("risk"), dict) else {}
+                if str(r.get("code","")) == "RISK_QTY_LIMIT":
+                    try:
+                        mx = float((r.get("details") or {}).get("max_qty_per_order", 0) or 0)
+                    except Exception:
+                        mx = 0.0
+                    if mx > 0 and mx < lim:
+                        lim = mx  # tighten split size
+                        # re-chunk existing steps to respect tightened lim
+                        try:
+                            _new_steps = []
+                            for _s in steps:
+                                _s = float(_s)
+                                if _s <= float(lim) + 1e-9:
+                                    _new_steps.append(_s)
+                                else:
+                                    _n_full = int(_s // float(lim))
+                                    _rem = _s - (_n_full * float(lim))
+                                    _new_steps.extend([float(lim)] * _n_full)
+                                    if _rem > 1e-9:
+                                        _new_steps.append(_rem)
+                            steps = _new_steps
+                        except Exception:
+                            # fail-safe: keep original steps if anything goes wrong
+                            pass
+                        # drop this failed attempt record? keep for audit; but do not progress
+                        results.pop()  # drop failed adaptive attempt record
+                        continue
+                # other rejections -> stop
+                return {
+                    "ok": False,
+                    "status": "REJECTED",
+                    "exec": {"code": pv.code, "reason": pv.reason, "details": {"policy_action": dec.action, "limit": lim, "split_parent_id": parent_id, "children": results}},
+                }
+
+            # success path: consume remaining and advance index
+            remaining -= float(step)
+            i += 1
+
+        # finalize
+        if remaining > 0:
+            return {
+                "ok": False,
+                "status": "REJECTED",
+                "exec": {"code": "EXEC_SPLIT_LOOP_GUARD", "reason": "split loop exceeded safety bound; refusing to continue", "details": {"split_parent_id": parent_id, "children": results, "limit": lim}},
+            }
+
+        # fill split_total for all children meta (best-effort; children may be dict or order objects)
+        n = i
+        # v18 audit: INSERT split parent row (orders)
+        # Record the split event itself as a parent row for audit/replay.
+        # Children orders are inserted separately by the normal success-path insert logic.
+        try:
+            import sqlite3
+            con = trace_queries(sqlite3.connect(self.db_path))
+            try:
+                self._insert_split_parent(con, symbol=symbol, side=side, qty=qty, price=price, order_type=order_type,
+                                          meta=meta, parent_id=parent_id, lim=lim, children=results, pv=pv, dec=dec)
+                con.commit()
+            finally:
+                con.close()
+        except Exception:
+            # Audit must not break execution path
+            pass
+
+        return {
+            "ok": True,
+            "status": "SPLIT_SUBMITTED",
+            "exec": {"code": "OK_SPLIT", "reason": f"split market order into {n} children (limit={lim})", "details": {"split_parent_id": parent_id, "children": results, "limit": lim}},
+        }
+
+
+    def place_orders_batch(self, orders: Sequence[Dict[str, Any]], *, stop_on_reject: bool = True) -> List[Union[Dict[str, Any], Any]]:
+        """
+        Submit several orders with ONE pass of the shared gates (system safety incl. feed freshness and
+        kill/cooldown, market calendar, risk state) evaluated on the first order's meta, per-order gates
+        (TAIFEX preflight, risk sizing/stop) in memory, and the accepted orders inserted in one transaction.
+        orders: dicts with symbol / side / qty / order_type / price / meta (place_order() keywords).
+        Results are per order and match place_order(): Order when accepted, REJECTED dict otherwise. A rejected
+        order is persisted from the batch verdicts (same reject rows, policy actions, reject-storm feed as
+        place_order(), no second gate pass); an order over the TAIFEX MARKET qty limit is SPLIT as in place_order().
+        stop_on_reject=True leaves the orders after the first reject unsubmitted (not in the result list).
+        """
+        return self._submit_batch(list(orders), stop_on_reject=stop_on_reject)[0]
+
+    def _submit_batch(self, orders: List[Dict[str, Any]], *, stop_on_reject: bool,
+                      parent: Optional[Dict[str, Any]] = None) -> tuple:
+        """
+        -> (results, index of the first REJECTED result or None). parent: split parent row kwargs for
+        _insert_split_parent, written in the same transaction as the children when every child is accepted.
+        """
+        if not orders:
+            return [], None
+        timer = GateTimerV1() if gate_timing_enabled() else None
+        meta0 = orders[0].get("meta") or {}
+
+        # shared gates (once per batch)
+        try:
+            sv = self.safety.check_pre_trade(meta=meta0)
+        except AttributeError:
+            try:
+                sv = self.safety.check(meta=meta0)
+            except TypeError:
+                sv = self.safety.check(meta0)
+        if timer is not None:
+            timer.lap("safety")
+        mv = None
+        if sv.ok:
+            mv = market_open_verdict(meta=meta0)
+            if timer is not None:
+                timer.lap("calendar")
+
+        # per-order gates in memory: preflight, then risk (risk state evaluated once by check_pre_trade_batch)
+        n = len(orders)
+        accepted: List[Optional[Dict[str, Any]]] = [None] * n
+        # per-order verdicts, kept so a reject is persisted from the batch decision (no second gate pass)
+        pre: List[Dict[str, Any]] = []
+        rvs_by: Dict[int, Any] = {}
+        if sv.ok and mv.ok:
+            for o in orders:
+                meta = o.get("meta") or {}
+                pv = guard_order_v1(symbol=o["symbol"], side=o["side"], qty=float(o["qty"]), order_type=o["order_type"],
+                                    price=o.get("price"), meta=meta)
+                meta = dict(meta) if isinstance(meta, dict) else {}
+                meta.setdefault("preflight_verdict", {"ok": bool(pv.ok), "code": pv.code, "reason": pv.reason, "details": pv.details})
+                pre.append({"ok": bool(pv.ok), "pv": pv, "meta": meta,
+                            "entry_price": float(meta.get("ref_price", 0.0)) if meta.get("ref_price") is not None else 0.0})
+            if timer is not None:
+                timer.lap("preflight")
+            idx = [i for i in range(n) if pre[i]["ok"]]
+            rq = [{"symbol": orders[i]["symbol"], "side": orders[i]["side"], "qty": float(orders[i]["qty"]),
+                   "entry_price": pre[i]["entry_price"], "meta": pre[i]["meta"]} for i in idx]
+            if hasattr(self.risk, "check_pre_trade_batch"):
+                rvs = self.risk.check_pre_trade_batch(rq)
+            else:
+                rvs = [self.risk.check_pre_trade(symbol=q["symbol"], side=q["side"], qty=q["qty"], entry_price=q["entry_price"],
+                                                 meta=q["meta"]) for q in rq]
+            if timer is not None:
+                timer.lap("risk")
+            for i, rv in zip(idx, rvs):
+                rvs_by[i] = rv
+                if rv.ok:
+                    accepted[i] = self._accepted_meta(pre[i]["meta"], sv, rv)
+
+        all_ok = all(m is not None for m in accepted)
+        first_reject: Optional[int] = None
+        results: List[Any] = []
+        ok_dec = None
+        try:
+            ok_dec = decision_from_verdict({"ok": True, "code": "OK", "reason": "pre-trade pass", "details": {}},
+                                           policy=self._load_reject_policy())
+        except Exception:
+            pass
+        audit = {"verdict": getattr(ok_dec, "code", None), "decision": getattr(ok_dec, "domain", None),
+                 "action": getattr(ok_dec, "action", None)}
+        i = 0
+        while i < n:
+            # accepted run [i, j): one transaction (plus the split parent row after the last child)
+            j = i
+            while j < n and accepted[j] is not None:
+                j += 1
+            if j > i:
+                run = []
+                for k in range(i, j):
+                    _attach_timing(accepted[k], timer)
+                    if isinstance(accepted[k].get("gate_timing"), dict):
+                        accepted[k]["gate_timing"]["batch_size"] = n
+                    run.append(dict(orders[k], meta=accepted[k]))
+                with shared_transaction(self.db_path):
+                    placed = self.paper_oms.submit_orders(run, audit=audit)
+                    results.extend(placed)
+                    if parent is not None and all_ok and j == n:
+                        try:
+                            con = connect_shared(self.db_path)
+                            try:
+                                self._insert_split_parent(con, children=results, **parent)
+                            finally:
+                                con.close()
+                        except Exception:
+                            # Audit must not break execution path
+                            pass
+                if timer is not None:
+                    timer.lap("oms")
+            if j < n:
+                # reject from the batch verdicts: same REJECTED row / policy actions / result as place_order()
+                res = self._batch_reject(timer, orders[j], sv, mv, pre[j] if pre else None, rvs_by.get(j))
+                results.append(res)
+                if is_rejected_order(res):
+                    if first_reject is None:
+                        first_reject = j
+                    if stop_on_reject:
+                        break
+                j += 1
+            i = j
+        if timer is not None:
+            timer.lap("audit")
+            for m in accepted:
+                if m is not None:
+                    _attach_timing(m, timer)  # in-memory order meta gets the full breakdown
+                    if isinstance(m.get("gate_timing"), dict):
+                        m["gate_timing"]["batch_size"] = n
+            try:
+                get_gate_recorder(self.db_path).record(timer, "ACCEPTED" if first_reject is None else "REJECTED")
+            except Exception:
+                pass
+        return results, first_reject
+
+    def _batch_reject(self, timer: Optional[GateTimerV1], order: Dict[str, Any], sv: Any, mv: Any,
+                      pre: Optional[Dict[str, Any]], rv: Any) -> Union[Dict[str, Any], Any]:
+        # the first gate that failed for this order in the batch pass, in place_order() gate order
+        kw = dict(symbol=order["symbol"], side=order["side"], qty=float(order["qty"]), order_type=order["order_type"],
+                  price=order.get("price"))
+        meta = order.get("meta") or {}
+        if not sv.ok:
+            return self._reject(timer, "safety", sv, meta=meta, sv=sv, **kw)
+        if not mv.ok:
+            return self._reject(timer, "calendar", mv, meta=meta, sv=sv, **kw)
+        pv = pre["pv"]
+        if not pv.ok:
+            dec = self._decision(pv)
+            meta = self._reject_meta(pre["meta"], dec, preflight_verdict=pv)
+            if self._is_split(pv, dec):
+                return self._split_order(meta=meta, pv=pv, dec=dec, **kw)
+            return self._reject(timer, "preflight", pv, meta=meta, sv=sv, dec=dec, **kw)
+        if rv is None or rv.ok:
+            raise RuntimeError("batch reject without a failing verdict")   # accepted orders never get here
+        return self._reject(timer, "risk", rv, meta=pre["meta"], sv=sv, **kw)
+
+    def _split_batch(self, *, symbol: str, side: str, qty: float, order_type: str, price: Optional[float], meta: Dict[str, Any],
+                     parent_id: str, lim: float, pv: Any, dec: Any) -> Dict[str, Any]:
+        # same children / results / parent row as the one-by-one SPLIT loop in _place_order
+        hard_max_children = 2000  # safety bound
+        results: List[Any] = []
+        remaining = float(qty)
+        i0 = 0
+        while remaining > 0 and i0 < hard_max_children:
+            steps = _split_steps(remaining, lim, hard_max_children - i0)
+            children = []
+            for k, step in enumerate(steps):
+                meta_child = dict(meta) if isinstance(meta, dict) else {}
+                meta_child.setdefault("split_parent_id", parent_id)
+                meta_child.setdefault("split_index", i0 + k)
+                meta_child.setdefault("split_limit", lim)
+                children.append({"symbol": symbol, "side": side, "qty": float(step), "order_type": order_type, "price": price,
+                                 "meta": meta_child})
+            last = (sum(steps) >= remaining - 1e-9)
+            parent = dict(symbol=symbol, side=side, qty=qty, price=price, order_type=order_type, meta=meta,
+                          parent_id=parent_id, lim=lim, pv=pv, dec=dec) if last else None
+            res, first_reject = self._submit_batch(children, stop_on_reject=True, parent=parent)
+            if first_reject is None:
+                results.extend(res)
+                remaining -= sum(steps)
+                i0 += len(steps)
+                continue
+            results.extend(res[:first_reject])
+            remaining -= sum(steps[:first_reject])
+            i0 += first_reject
+            rej = res[first_reject]
+            # If rejected due to Risk qty cap, adapt lim downward and retry WITHOUT consuming remaining
+            if isinstance(rej, dict) and (not bool(rej.get("ok", True))) and str(rej.get("status", "")) == "REJECTED":
+                r = rej.get("risk") if isinstance(rej.get("risk"), dict) else {}
+                if str(r.get("code", "")) == "RISK_QTY_LIMIT":
+                    try:
+                        mx = float((r.get("details") or {}).get("max_qty_per_order", 0) or 0)
+                    except Exception:
+                        mx = 0.0
+                    if mx > 0 and mx < lim:
+                        lim = mx  # tighten split size; the failed attempt stays in orders (audit), not in children
+                        continue
+            # other rejections -> stop
+            results.append(rej)
+            return {
+                "ok": False,
+                "status": "REJECTED",
+                "exec": {"code": pv.code, "reason": pv.reason, "details": {"policy_action": dec.action, "limit": lim, "split_parent_id": parent_id, "children": results}},
+            }
+
+        if remaining > 0:
+            return {
+                "ok": False,
+                "status": "REJECTED",
+                "exec": {"code": "EXEC_SPLIT_LOOP_GUARD", "reason": "split loop exceeded safety bound; refusing to continue", "details": {"split_parent_id": parent_id, "children": results, "limit": lim}},
+            }
+        return {
+            "ok": True,
+            "status": "SPLIT_SUBMITTED",
+            "exec": {"code": "OK_SPLIT", "reason": f"split market order into {i0} children (limit={lim})", "details": {"split_parent_id": parent_id, "children": results, "limit": lim}},
+        }
 
     def place_order(
         self,
@@ -191,6 +701,30 @@ class PaperOMSRiskSafetyWrapperV1:
         order_type: str,
         price: Optional[float] = None,
         meta: Optional[Dict[str, Any]] = None,
+    ) -> Union[Dict[str, Any], Any]:
+        # per-stage timing (ms + SQL statements) of every attempt -> meta["gate_timing"] + ring buffer
+        timer = GateTimerV1() if gate_timing_enabled() else None
+        res = self._place_order(timer, symbol=symbol, side=side, qty=qty, order_type=order_type, price=price, meta=meta)
+        if timer is not None:
+            try:
+                outcome = outcome_of(res)
+                if outcome != "ACCEPTED":
+                    timer.lap("persist")  # REJECTED / SPLIT audit rows
+                get_gate_recorder(self.db_path).record(timer, outcome)
+            except Exception:
+                pass
+        return res
+
+    def _place_order(
+        self,
+        timer: Optional[GateTimerV1],
+        *,
+        symbol: str,
+        side: str,
+        qty: float,
+        order_type: str,
+        price: Optional[float] = None,
+        meta: Optional[Dict[str, Any]] = None,
     ) -> Union[Dict[str, Any], Any]:
         meta = meta or {}
 
@@ -203,77 +737,27 @@ class PaperOMSRiskSafetyWrapperV1:
                 sv = self.safety.check(meta=meta)
             except TypeError:
                 sv = self.safety.check(meta)
+        if timer is not None:
+            timer.lap("safety")
 
         if not sv.ok:
-
-            pol = self._load_reject_policy()
-            dec = decision_from_verdict({"ok": bool(getattr(sv,"ok",False)), "code": getattr(sv,"code",None), "reason": getattr(sv,"reason",None), "details": getattr(sv,"details",{})}, policy=pol)
-            # persist decision into meta for v18 audit
-            try:
-                meta = dict(meta) if isinstance(meta, dict) else {}
-                meta = _ensure_intent_envelope(meta)
-                meta.setdefault("reject_decision", {"ok": dec.ok, "code": dec.code, "domain": dec.domain, "severity": dec.severity, "action": dec.action, "reason": dec.reason, "details": dec.details})
-            except Exception:
-                pass
-            # execute safety actions (COOLDOWN/KILL) via SystemSafetyEngineV1 state
-            try:
-                if dec.action == "COOLDOWN":
-                    cd_sec = int(meta.get("cooldown_seconds", 60)) if isinstance(meta, dict) else 60
-                    self.safety.request_cooldown(seconds=cd_sec, code=dec.code, reason=dec.reason, details=dec.details)
-                elif dec.action == "KILL":
-                    self.safety.request_kill(code=dec.code, reason=dec.reason, details=dec.details)
-            except Exception:
-                pass
-            oid = self._insert_rejected_order(
-                symbol=symbol,
-                side=side,
-                qty=float(qty),
-                price=price,
-                order_type=order_type,
-                meta=meta,
-                safety_verdict=sv,
-                risk_verdict=None,
-            )
-            return {
-                "ok": False,
-                "status": "REJECTED",
-                "broker_order_id": oid,
-                "safety": {"code": sv.code, "reason": sv.reason, "details": sv.details},
-            }
+            return self._reject(timer, "safety", sv, symbol=symbol, side=side, qty=qty, order_type=order_type, price=price,
+                                meta=meta, sv=sv)
 
 
         # 1.4) Market calendar gate (TWSE/TAIFEX holidays/weekends/session gaps) (v18.1-C)
         mv = market_open_verdict(meta=meta)
+        if timer is not None:
+            timer.lap("calendar")
         if not mv.ok:
-            pol = self._load_reject_policy()
-            dec = decision_from_verdict({"ok": False, "code": mv.code, "reason": mv.reason, "details": mv.details}, policy=pol)
-            try:
-                meta = dict(meta) if isinstance(meta, dict) else {}
-                meta = _ensure_intent_envelope(meta)
-                meta.setdefault("reject_decision", {"ok": dec.ok, "code": dec.code, "domain": dec.domain, "severity": dec.severity, "action": dec.action, "reason": dec.reason, "details": dec.details})
-                meta.setdefault("market_calendar_verdict", {"ok": mv.ok, "code": mv.code, "reason": mv.reason, "details": mv.details})
-            except Exception:
-                pass
-            oid = self._insert_rejected_order(
-                symbol=symbol,
-                side=side,
-                qty=float(qty),
-                price=price,
-                order_type=order_type,
-                meta=meta,
-                safety_verdict=sv,
-                risk_verdict=None,
-            )
-            return {
-                "ok": False,
-                "status": "REJECTED",
-                "broker_order_id": oid,
-                "safety": {"code": mv.code, "reason": mv.reason, "details": mv.details},
-            }
+            return self._reject(timer, "calendar", mv, symbol=symbol, side=side, qty=qty, order_type=order_type, price=price,
+                                meta=meta, sv=sv)
 
         # 1.5) TAIFEX preflight hard constraints (v18.1-B)
 
         pv = guard_order_v1(symbol=symbol, side=side, qty=float(qty), order_type=order_type, price=price, meta=meta)
+        if timer is not None:
+            timer.lap("preflight")
 
         # v18 audit: always persist preflight verdict into meta once SAFETY passed.
         # This ensures Risk REJECTs still carry preflight_verdict for post-mortem.
@@ -283,202 +767,13 @@ class PaperOMSRiskSafetyWrapperV1:
         except Exception:
             pass
         if not pv.ok:
-            pol = self._load_reject_policy()
-            dec = decision_from_verdict({"ok": False, "code": pv.code, "reason": pv.reason, "details": pv.details}, policy=pol)
-
-            # persist decision + preflight verdict into meta for v18 audit
-            try:
-                meta = dict(meta) if isinstance(meta, dict) else {}
-                meta = _ensure_intent_envelope(meta)
-                meta.setdefault("reject_decision", {"ok": dec.ok, "code": dec.code, "domain": dec.domain, "severity": dec.severity, "action": dec.action, "reason": dec.reason, "details": dec.details})
-                meta.setdefault("preflight_verdict", {"ok": pv.ok, "code": pv.code, "reason": pv.reason, "details": pv.details})
-            except Exception:
-                pass
-
-            # policy-driven SPLIT (TAIFEX market qty limit)
-            if str(dec.action).upper() == "SPLIT" and str(pv.code) == "EXEC_TAIFEX_MKT_QTY_LIMIT":
-                import math
-                lim = float((pv.details or {}).get("limit", 0) or 0)
-                if lim <= 0:
-                    # fallback to TAIFEX documented limits (day=10, after-hours=5)
-                    sess = str((pv.details or {}).get("session_hint", "") or "").upper()
-                    lim = 5.0 if sess in {"NIGHT","AFTER_HOURS","AH"} else 10.0
-
-
-                # v18: effective split limit must satisfy BOTH EXEC(TAIFEX) and RISK(max_qty_per_order)
-                try:
-                    _cfg = getattr(self.risk, "cfg", None)
-                    _risk_lim = getattr(_cfg, "max_qty_per_order", None)
-                    if _risk_lim is not None:
-                        _risk_lim = float(_risk_lim)
-                        if _risk_lim > 0 and _risk_lim < lim:
-                            lim = _risk_lim
-                except Exception:
-                    pass
-
-                parent_id = f"SPLIT_{self._now()}"
-                results = []
-                remaining = float(qty)
-
-                # adaptive split: must satisfy both TAIFEX limit and RiskEngine per-order qty limit
-                i = 0
-                hard_max_children = 2000  # safety bound
-                while remaining > 0 and i < hard_max_children:
-                    step = lim if remaining > lim else remaining
-
-                    meta_child = dict(meta) if isinstance(meta, dict) else {}
-                    meta_child.setdefault("split_parent_id", parent_id)
-                    meta_child.setdefault("split_index", i)
-                    meta_child.setdefault("split_limit", lim)
-
-                    # Attempt submit through full wrapper gates
-                    res = self.place_order(symbol=symbol, side=side, qty=float(step), order_type=order_type, price=price, meta=meta_child)
-                    results.append(res)
-
-                    # If rejected due to Risk qty cap, adapt lim downward and retry WITHOUT consuming remaining
-                    if isinstance(res, dict) and (not bool(res.get("ok", True))) and str(res.get("status","")) == "REJECTED":
-                        r = res.get("risk") if isinstance(res.get("risk"), dict) else {}
-                        if str(r.get("code","")) == "RISK_QTY_LIMIT":
-                            try:
-                                mx = float((r.get("details") or {}).get("max_qty_per_order", 0) or 0)
-                            except Exception:
-                                mx = 0.0
-                            if mx > 0 and mx < lim:
-                                lim = mx  # tighten split size
-                                # re-chunk existing steps to respect tightened lim
-                                try:
-                                    _new_steps = []
-                                    for _s in steps:
-                                        _s = float(_s)
-                                        if _s <= float(lim) + 1e-9:
-                                            _new_steps.append(_s)
-                                        else:
-                                            _n_full = int(_s // float(lim))
-                                            _rem = _s - (_n_full * float(lim))
-                                            _new_steps.extend([float(lim)] * _n_full)
-                                            if _rem > 1e-9:
-                                                _new_steps.append(_rem)
-                                    steps = _new_steps
-                                except Exception:
-                                    # fail-safe: keep original steps if anything goes wrong
-                                    pass
-                                # drop this failed attempt record? keep for audit; but do not progress
-                                results.pop()  # drop failed adaptive attempt record
-                                continue
-                        # other rejections -> stop
-                        return {
-                            "ok": False,
-                            "status": "REJECTED",
-                            "exec": {"code": pv.code, "reason": pv.reason, "details": {"policy_action": dec.action, "limit": lim, "split_parent_id": parent_id, "children": results}},
-                        }
-
-                    # success path: consume remaining and advance index
-                    remaining -= float(step)
-                    i += 1
-
-                # finalize
-                if remaining > 0:
-                    return {
-                        "ok": False,
-                        "status": "REJECTED",
-                        "exec": {"code": "EXEC_SPLIT_LOOP_GUARD", "reason": "split loop exceeded safety bound; refusing to continue", "details": {"split_parent_id": parent_id, "children": results, "limit": lim}},
-                    }
-
-                # fill split_total for all children meta (best-effort; children may be dict or order objects)
-                n = i
-                # v18 audit: INSERT split parent row (orders)
-                # Record the split event itself as a parent row for audit/replay.
-                # Children orders are inserted separately by the normal success-path insert logic.
-                try:
-                    import sqlite3, json
-                    con = sqlite3.connect(self.db_path)
-                    try:
-                        row = con.execute("SELECT 1 FROM orders WHERE broker_order_id=? LIMIT 1", (parent_id,)).fetchone()
-                        if row is None:
-                            ts = self._now()
-                            meta_parent = dict(meta) if isinstance(meta, dict) else {}
-                            meta_parent = _ensure_intent_envelope(meta_parent)
-                            meta_parent.setdefault("split_parent_id", parent_id)
-                            meta_parent.setdefault("split_limit", float(lim))
-                            meta_parent.setdefault("split_requested_qty", float(qty))
-                            # --- v18 audit: make split_children JSON-safe (Order objects are not serializable) ---
-                            children_safe = []
-                            for ch in results:
-                                if isinstance(ch, dict):
-                                    children_safe.append(ch)
-                                else:
-                                    # likely Order dataclass-like object
-                                    try:
-                                        children_safe.append({
-                                            "ok": True,
-                                            "status": getattr(ch, "status", None),
-                                            "broker_order_id": getattr(ch, "order_id", None),
-                                            "order": {
-                                                "order_id": getattr(ch, "order_id", None),
-                                                "ts": getattr(ch, "ts", None),
-                                                "symbol": getattr(ch, "symbol", None),
-                                                "side": getattr(ch, "side", None),
-                                                "qty": getattr(ch, "qty", None),
-                                                "order_type": getattr(ch, "order_type", None),
-                                                "price": getattr(ch, "price", None),
-                                                "status": getattr(ch, "status", None),
-                                                "filled_qty": getattr(ch, "filled_qty", None),
-                                                "meta": getattr(ch, "meta", None),
-                                            },
-                                        })
-                                    except Exception:
-                                        children_safe.append({"ok": True, "status": "ORDER", "repr": repr(ch)})
-                            meta_parent.setdefault("split_children", children_safe)
-
-                            con.execute(
-                                "INSERT INTO orders(ts, broker_order_id, symbol, side, qty, price, order_type, status, verdict, decision, action, meta_json) "
-                                "VALUES(?,?,?,?,?,?,?,?,?,?,?,?)",
-                                (
-                                    ts,
-                                    parent_id,
-                                    symbol,
-                                    side,
-                                    float(qty),
-                                    (float(price) if price is not None else None),
-                                    order_type,
-                                    "SPLIT_SUBMITTED",
-                                    str(pv.code),
-                                    str(dec.domain),
-                                    str(dec.action),
-                                    json.dumps(meta_parent, ensure_ascii=False),
-                                ),
-                            )
-                            con.commit()
-                    finally:
-                        con.close()
-                except Exception:
-                    # Audit must not break execution path
-                    pass
-
-                return {
-                    "ok": True,
-                    "status": "SPLIT_SUBMITTED",
-                    "exec": {"code": "OK_SPLIT", "reason": f"split market order into {n} children (limit={lim})", "details": {"split_parent_id": parent_id, "children": results, "limit": lim}},
-                }
-
-            # default: reject and persist as REJECTED
-            oid = self._insert_rejected_order(
-                symbol=symbol,
-                side=side,
-                qty=float(qty),
-                price=price,
-                order_type=order_type,
-                meta=meta,
-                safety_verdict=sv,
-                risk_verdict=None,
-            )
-            return {
-                "ok": False,
-                "status": "REJECTED",
-                "broker_order_id": oid,
-                "safety": {"code": sv.code, "reason": sv.reason, "details": sv.details},
-                "exec": {"code": pv.code, "reason": pv.reason, "details": pv.details, "policy_action": dec.action},
-            }
+            dec = self._decision(pv)
+            meta = self._reject_meta(meta, dec, preflight_verdict=pv)
+            if self._is_split(pv, dec):
+                return self._split_order(symbol=symbol, side=side, qty=qty, order_type=order_type, price=price,
+                                         meta=meta, pv=pv, dec=dec)
+            return self._reject(timer, "preflight", pv, symbol=symbol, side=side, qty=qty, order_type=order_type,
+                                price=price, meta=meta, sv=sv, dec=dec)
 
 
         # 2) risk pre-trade
@@ -492,57 +787,19 @@ class PaperOMSRiskSafetyWrapperV1:
                 rv = self.risk.check_pre_trade(symbol, side, float(qty), float(entry_price), meta)
             except TypeError:
                 rv = self.risk.check_pre_trade(symbol=symbol, side=side, qty=float(qty), price=float(entry_price), meta=meta)
+        if timer is not None:
+            timer.lap("risk")
         if not rv.ok:
-
-            pol = self._load_reject_policy()
-            dec = decision_from_verdict({"ok": bool(getattr(rv,"ok",False)), "code": getattr(rv,"code",None), "reason": getattr(rv,"reason",None), "details": getattr(rv,"details",{})}, policy=pol)
-            # persist decision into meta for v18 audit
-            try:
-                meta = dict(meta) if isinstance(meta, dict) else {}
-                meta = _ensure_intent_envelope(meta)
-                meta.setdefault("reject_decision", {"ok": dec.ok, "code": dec.code, "domain": dec.domain, "severity": dec.severity, "action": dec.action, "reason": dec.reason, "details": dec.details})
-            except Exception:
-                pass
-            # execute safety actions (COOLDOWN/KILL) via SystemSafetyEngineV1 state
-            try:
-                if dec.action == "COOLDOWN":
-                    cd_sec = int(meta.get("cooldown_seconds", 60)) if isinstance(meta, dict) else 60
-                    self.safety.request_cooldown(seconds=cd_sec, code=dec.code, reason=dec.reason, details=dec.details)
-                elif dec.action == "KILL":
-                    self.safety.request_kill(code=dec.code, reason=dec.reason, details=dec.details)
-            except Exception:
-                pass
-            oid = self._insert_rejected_order(
-                symbol=symbol,
-                side=side,
-                qty=float(qty),
-                price=price,
-                order_type=order_type,
-                meta=meta,
-                safety_verdict=sv,
-                risk_verdict=rv,
-            )
-            return {
-                "ok": False,
-                "status": "REJECTED",
-                "broker_order_id": oid,
-                "safety": {"code": sv.code, "reason": sv.reason, "details": sv.details},
-                "risk": {"code": rv.code, "reason": rv.reason, "details": rv.details},
-            }
+            return self._reject(timer, "risk", rv, symbol=symbol, side=side, qty=qty, order_type=order_type, price=price,
+                                meta=meta, sv=sv)
 
         # 3) accept -> submit to paper OMS
         # 3) accept -> submit to paper OMS (persist PASS verdicts into meta for audit)
-        meta_ok = dict(meta) if isinstance(meta, dict) else {}
-        meta_ok = _ensure_intent_envelope(meta_ok)
-        if "safety_verdict" not in meta_ok:
-            meta_ok["safety_verdict"] = {"ok": True, "code": sv.code, "reason": sv.reason, "details": sv.details}
-        if "risk_verdict" not in meta_ok:
-            meta_ok["risk_verdict"] = {"ok": True, "code": rv.code, "reason": rv.reason, "details": rv.details}
-
-        if "preflight_verdict" not in meta_ok:
-            meta_ok["preflight_verdict"] = {"ok": True, "code": "OK", "reason": "taifex preflight pass", "details": {}}
-
+        meta_ok = self._accepted_meta(meta, sv, rv)
+        _attach_timing(meta_ok, timer)
         order = self.paper_oms.place_order(symbol=symbol, side=side, qty=float(qty), order_type=order_type, price=price, meta=meta_ok)
+        if timer is not None:
+            timer.lap("oms")
 
         # v18: persist allow decision into orders(verdict/decision/action) for audit/statistics
         try:
@@ -566,7 +823,7 @@ class PaperOMSRiskSafetyWrapperV1:
 
             if broker_order_id:
                 import sqlite3, json
-                con = sqlite3.connect(self.db_path)
+                con = trace_queries(sqlite3.connect(self.db_path))
                 try:
                     # v18 audit: if this broker_order_id does NOT exist yet, INSERT a row now.
                     row = con.execute("SELECT 1 FROM orders WHERE broker_order_id=? LIMIT 1", (broker_order_id,)).fetchone()
@@ -616,5 +873,8 @@ class PaperOMSRiskSafetyWrapperV1:
         except Exception:
             # never break trading flow for audit
             pass
+        if timer is not None:
+            timer.lap("audit")
+            _attach_timing(meta_ok, timer)  # in-memory order meta gets the full breakdown
 
         return order
@@ -1,11 +1,15 @@
 from __future__ import annotations
 import json, sqlite3, uuid
+from contextlib import contextmanager
 from dataclasses import asdict
-from datetime import datetime
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Sequence
 
 from .models_v1 import Order, Fill, Trade, Position
+from src.data.sqlite_conn_v1 import connect_shared, shared_transaction
+from src.oms.oms_journal_v1 import OmsJournalV1, get_oms_journal, write_behind_enabled
+from src.ops.clock_v1 import clock_now
+from src.risk.risk_state_v1 import notify_position, notify_trade_close, notify_trade_open
 
 # Conservative defaults (can be moved to config later)
 MULTIPLIER_BY_SYMBOL = {"TMF": 10.0, "MXF": 50.0, "TXF": 200.0}
@@ -26,22 +30,135 @@ def _base_symbol(sym: str) -> str:
     return s
 
 def _now_ms() -> str:
-    return datetime.now().isoformat(timespec="milliseconds")
+    return clock_now().isoformat(timespec="milliseconds")
 
 def _j(x) -> str:
     return json.dumps(x, ensure_ascii=False, default=str)
 
+def _loads(s) -> Dict[str, Any]:
+    try:
+        v = json.loads(s) if isinstance(s, str) else {}
+    except Exception:
+        v = {}
+    return v if isinstance(v, dict) else {}
+
 class PaperOMS:
+    # In-memory book (authoritative for this instance): working orders, positions, open trades.
+    # Loaded once from SQLite on first use (_boot), then maintained by submit/match without DB reads.
+    # Writes: one transaction per order event, or with TMF_OMS_WRITE_BEHIND=1 one record per order
+    # event in the write-behind journal (src.oms.oms_journal_v1; flush()/close() drain it).
+    # Risk-state hooks (src.risk.risk_state_v1 notify_*) are held until the event is durable.
     def __init__(self, db_path: Path):
         self.db_path = Path(db_path)
         self.pos: Dict[str, Position] = {}
         self.open_trade: Dict[str, Trade] = {}  # symbol -> Trade
+        self.orders: Dict[str, Order] = {}      # order_id -> working order (NEW / PARTIALLY_FILLED)
+        self.journal: Optional[OmsJournalV1] = get_oms_journal(self.db_path) if write_behind_enabled() else None
+        self._ops: Optional[List[list]] = None
+        self._notes: Optional[List[tuple]] = None
+        self._booted = False
 
     # --- DB helpers ---
     def _con(self) -> sqlite3.Connection:
-        con = sqlite3.connect(str(self.db_path))
+        # long-lived per-thread connection (src.data.sqlite_conn_v1); close() on it is a no-op
+        con = connect_shared(self.db_path)
         return con
 
+    def _tx(self):
+        """One transaction for all writes of a single order event (fill + status + position/trade)."""
+        return shared_transaction(self.db_path)
+
+    @contextmanager
+    def _event(self):
+        """One order event: one transaction, or one journal record (write-behind).
+        Risk-state notifications fire after COMMIT / the journal append; an exception drops them."""
+        self._notes = []
+        try:
+            if self.journal is None:
+                with self._tx():
+                    yield
+            else:
+                self._ops = []
+                try:
+                    yield
+                    ops = self._ops
+                finally:
+                    self._ops = None
+                if ops:
+                    self.journal.append(ops)
+            notes = self._notes
+        finally:
+            self._notes = None
+        for fn, args in notes:
+            fn(self.db_path, *args)
+
+    def _notify(self, fn, *args) -> None:
+        if self._notes is not None:
+            self._notes.append((fn, args))
+        else:
+            fn(self.db_path, *args)
+
+    def _journal(self, op: list) -> None:
+        if self._ops is not None:
+            self._ops.append(op)
+        else:
+            self.journal.append([op])
+
+    def _boot(self) -> None:
+        # BOOTSTRAP_FROM_DB_OPEN_TRADE (once): a new process continues the open trades / working orders in the DB
+        # instead of treating close fills as new opens.
+        if self._booted:
+            return
+        self._booted = True
+        con = self._con()
+        try:
+            trades = con.execute(
+                "SELECT open_ts, symbol, side, qty, entry, reason_open, meta_json FROM trades WHERE close_ts IS NULL ORDER BY id DESC"
+            ).fetchall()
+            orders = con.execute(
+                "SELECT ts, broker_order_id, symbol, side, qty, price, order_type, status, meta_json FROM orders "
+                "WHERE status IN ('NEW','PARTIALLY_FILLED')"
+            ).fetchall()
+        finally:
+            con.close()
+        for open_ts, sym, side, qty, entry, reason_open, mj in trades:
+            # single position per symbol (v1): the latest open row wins (rows come newest first)
+            try:
+                db_side = str(side or "")
+                db_qty = float(qty or 0.0)
+                db_entry = float(entry or 0.0)
+                if not (db_qty > 0 and db_entry > 0 and db_side in ("LONG", "SHORT")):
+                    continue
+                if sym in self.pos and self.pos[sym].qty != 0.0:
+                    continue   # already trading this symbol in this instance
+                self.pos[sym] = Position(symbol=sym, side=db_side, qty=db_qty, avg_price=db_entry, open_ts=str(open_ts or ""))
+                self.open_trade[sym] = Trade(trade_id="", open_ts=str(open_ts or ""), close_ts=None, symbol=sym, side=db_side,
+                                             qty=db_qty, entry=db_entry, reason_open=reason_open, meta=_loads(mj))
+            except Exception:
+                pass
+        for ts, oid, sym, side, qty, price, order_type, status, mj in orders:
+            if oid in self.orders:
+                continue
+            meta = _loads(mj)
+            try:
+                filled = float(meta.get("filled_qty", 0.0) or 0.0)
+            except Exception:
+                filled = 0.0
+            self.orders[oid] = Order(order_id=oid, ts=ts, symbol=sym, side=side, qty=float(qty), order_type=order_type,
+                                     price=None if price is None else float(price), status=status, filled_qty=filled, meta=meta)
+
+    def get_order(self, order_id: str) -> Optional[Order]:
+        """Working order from the in-memory book (None once FILLED / REJECTED or unknown)."""
+        self._boot()
+        return self.orders.get(order_id)
+
+    def flush(self) -> int:
+        """Write-behind: apply pending journal records to SQLite now; returns records still pending."""
+        return 0 if self.journal is None else self.journal.flush()
+
+    def close(self) -> None:
+        self.flush()
+
     def _ins_order(self, o: Order):
         con = self._con()
         try:
@@ -54,7 +171,27 @@ class PaperOMS:
         finally:
             con.close()
 
+    def _ins_orders(self, orders: Sequence[Order], *, audit: Optional[Dict[str, Any]] = None):
+        # one executemany for a batch; audit -> verdict/decision/action columns set at insert time
+        a = audit or {}
+        con = self._con()
+        try:
+            con.executemany(
+                "INSERT INTO orders(ts, broker_order_id, symbol, side, qty, price, order_type, status, verdict, decision, action, meta_json) "
+                "VALUES (?,?,?,?,?,?,?,?,?,?,?,?)",
+                [(o.ts, o.order_id, o.symbol, o.side, float(o.qty), None if o.price is None else float(o.price),
+                  o.order_type, o.status, a.get("verdict"), a.get("decision"), a.get("action"), _j(o.meta)) for o in orders],
+            )
+            con.commit()
+        finally:
+            con.close()
+
     def _upd_order_status(self, order_id: str, status: str, filled_qty: float):
+        if status in ("FILLED", "REJECTED", "CANCELLED"):
+            self.orders.pop(order_id, None)
+        if self.journal is not None:
+            self._journal(["order", order_id, status, float(filled_qty)])
+            return
         con = self._con()
         try:
             # v1_1: merge meta_json (preserve stop_price / market_metrics / other fields)
@@ -77,6 +214,10 @@ class PaperOMS:
             con.close()
 
     def _ins_fill(self, f: Fill):
+        if self.journal is not None:
+            self._journal(["fill", f.ts, f.order_id, f.symbol, f.side, float(f.qty), float(f.price),
+                           float(f.fee_ntd), float(f.tax_ntd), f.meta])
+            return
         con = self._con()
         try:
             con.execute(
@@ -89,9 +230,17 @@ class PaperOMS:
             con.close()
 
     def _ins_trade(self, t: Trade):
+        if self.journal is not None:
+            # trades.id is assigned at flush; notify_trade_open fires from the journal writer
+            self._journal(["trade_open", t.open_ts, t.close_ts, t.symbol, t.side, float(t.qty), float(t.entry),
+                           None if t.exit is None else float(t.exit),
+                           None if t.pnl_ntd is None else float(t.pnl_ntd),
+                           None if t.pnl_pct is None else float(t.pnl_pct),
+                           t.reason_open, t.reason_close, t.meta])
+            return
         con = self._con()
         try:
-            con.execute(
+            cur = con.execute(
                 "INSERT INTO trades(open_ts, close_ts, symbol, side, qty, entry, exit, pnl, pnl_pct, reason_open, reason_close, meta_json) VALUES (?,?,?,?,?,?,?,?,?,?,?,?)",
                 (t.open_ts, t.close_ts, t.symbol, t.side, float(t.qty), float(t.entry),
                  None if t.exit is None else float(t.exit),
@@ -99,17 +248,25 @@ class PaperOMS:
                  None if t.pnl_pct is None else float(t.pnl_pct),
                  t.reason_open, t.reason_close, _j(t.meta)),
             )
+            self._notify(notify_trade_open, cur.lastrowid)
             con.commit()
         finally:
             con.close()
 
     def _upd_trade_close(self, symbol: str, close_ts: str, exit_px: float, pnl_ntd: float, pnl_pct: float, reason_close: str):
+        if self.journal is not None:
+            self._journal(["trade_close", symbol, close_ts, float(exit_px), float(pnl_ntd), float(pnl_pct), reason_close])
+            if symbol in self.open_trade:
+                self._notify(notify_trade_close, close_ts, pnl_ntd)
+            return
         con = self._con()
         try:
-            con.execute(
+            cur = con.execute(
                 "UPDATE trades SET close_ts=?, exit=?, pnl=?, pnl_pct=?, reason_close=? WHERE symbol=? AND close_ts IS NULL ORDER BY id DESC LIMIT 1",
                 (close_ts, float(exit_px), float(pnl_ntd), float(pnl_pct), reason_close, symbol),
             )
+            if cur.rowcount:
+                self._notify(notify_trade_close, close_ts, pnl_ntd)
             con.commit()
         finally:
             con.close()
@@ -142,9 +299,36 @@ class PaperOMS:
             meta=meta or {},
         )
         self._ins_order(o)
+        self.orders[oid] = o
         return o
 
-    def match(self, order: Order, *, market_price: float, liquidity_qty: Optional[float]=None, reason: str="match") -> list[Fill]:
+    def submit_orders(self, orders: Sequence[Dict[str, Any]], *, audit: Optional[Dict[str, Any]] = None) -> List[Order]:
+        """
+        Batch submit_order: orders are dicts with symbol/side/qty/order_type/price/meta; one INSERT per batch
+        (inside the caller's shared_transaction when there is one). Same Order objects as submit_order().
+        """
+        out: List[Order] = []
+        for x in orders:
+            price = x.get("price")
+            out.append(Order(
+                order_id=uuid.uuid4().hex,
+                ts=_now_ms(),
+                symbol=x["symbol"],
+                side=x["side"],
+                qty=float(x["qty"]),
+                order_type=x["order_type"],
+                price=None if price is None else float(price),
+                status="NEW",
+                meta=x.get("meta") or {},
+            ))
+        if out:
+            self._ins_orders(out, audit=audit)
+            for o in out:
+                self.orders[o.order_id] = o
+        return out
+
+    def match(self, order: Order, *, market_price: float, liquidity_qty: Optional[float]=None, reason: str="match",
+              fill_meta: Optional[Dict[str, Any]]=None) -> list[Fill]:
         # HARDGUARD: PaperOMSRiskSafetyWrapperV1 returns dict on REJECTED, Order on accepted.
         # If caller accidentally passes the REJECT dict here, fail-fast with a clear error.
         if not isinstance(order, Order):
@@ -157,7 +341,9 @@ class PaperOMS:
         - MARKET: fill immediately at market_price
         - LIMIT: BUY fills if market_price <= limit; SELL fills if market_price >= limit
         - liquidity_qty: max qty fill this call (supports partial fill)
+        - fill_meta: extra keys for the fill meta (e.g. depth-walk levels from src/sim/depth_fill_v1)
         """
+        self._boot()
         px = float(market_price)
         remaining = float(order.qty - order.filled_qty)
         if remaining <= 0:
@@ -169,7 +355,8 @@ class PaperOMS:
         elif order.order_type == "LIMIT":
             if order.price is None:
                 order.status = "REJECTED"
-                self._upd_order_status(order.order_id, order.status, order.filled_qty)
+                with self._event():
+                    self._upd_order_status(order.order_id, order.status, order.filled_qty)
                 return []
             if order.side == "BUY" and px <= float(order.price):
                 ok = True
@@ -183,64 +370,46 @@ class PaperOMS:
         if fill_qty <= 0:
             return []
 
-        fee, tax = self._per_side_cost(order.symbol, px, fill_qty)
-        fid = uuid.uuid4().hex
-        f = Fill(
-            fill_id=fid,
-            ts=_now_ms(),
-            order_id=order.order_id,
-            symbol=order.symbol,
-            side=order.side,
-            qty=float(fill_qty),
-            price=px,
-            fee_ntd=float(fee),
-            tax_ntd=float(tax),
-            meta={"reason": reason, "order_meta": (order.meta or {})},
-        )
-        self._ins_fill(f)
+        with self._event():
+            fee, tax = self._per_side_cost(order.symbol, px, fill_qty)
+            fid = uuid.uuid4().hex
+            fmeta = {"reason": reason, "order_meta": (order.meta or {})}
+            if fill_meta:
+                fmeta.update(fill_meta)
+            f = Fill(
+                fill_id=fid,
+                ts=_now_ms(),
+                order_id=order.order_id,
+                symbol=order.symbol,
+                side=order.side,
+                qty=float(fill_qty),
+                price=px,
+                fee_ntd=float(fee),
+                tax_ntd=float(tax),
+                meta=fmeta,
+            )
+            self._ins_fill(f)
 
-        order.filled_qty += fill_qty
-        if order.filled_qty + 1e-9 >= order.qty:
-            order.status = "FILLED"
-        else:
-            order.status = "PARTIALLY_FILLED"
-        self._upd_order_status(order.order_id, order.status, order.filled_qty)
+            order.filled_qty += fill_qty
+            if order.filled_qty + 1e-9 >= order.qty:
+                order.status = "FILLED"
+            else:
+                order.status = "PARTIALLY_FILLED"
+            self._upd_order_status(order.order_id, order.status, order.filled_qty)
 
-        # Position / Trade book (single-position per symbol v1)
-        self._apply_fill_to_position_and_trade(f)
+            # Position / Trade book (single-position per symbol v1)
+            self._apply_fill_to_position_and_trade(f)
+            pos = self.pos.get(order.symbol)
+            if pos is not None:
+                self._notify(notify_position, order.symbol, pos.side, pos.qty)
 
         return [f]
 
     def _apply_fill_to_position_and_trade(self, f: Fill):
         sym = f.symbol
         mult = MULTIPLIER_BY_SYMBOL.get(_base_symbol(sym), 1.0)
+        # open trades of earlier processes were loaded once by _boot() (no per-fill trades query)
         pos = self.pos.get(sym) or Position(symbol=sym)
-        # BOOTSTRAP_FROM_DB_OPEN_TRADE:
-        # PaperOMS position/trade book is in-memory; when running in a new process,
-        # reload the latest open trade from DB to avoid treating close fills as new opens.
-        if pos.qty == 0.0:
-            con = self._con()
-            try:
-                row = con.execute(
-                    "SELECT side, qty, entry, open_ts FROM trades WHERE symbol=? AND close_ts IS NULL ORDER BY id DESC LIMIT 1",
-                    (sym,),
-                ).fetchone()
-            finally:
-                con.close()
-            if row:
-                try:
-                    db_side = str(row[0] or "")
-                    db_qty  = float(row[1] or 0.0)
-                    db_entry= float(row[2] or 0.0)
-                    db_open = str(row[3] or "")
-                    if db_qty > 0 and db_entry > 0 and db_side in ("LONG","SHORT"):
-                        pos.qty = db_qty
-                        pos.side = db_side
-                        pos.avg_price = db_entry
-                        pos.open_ts = db_open
-                except Exception:
-                    pass
-
         self.pos[sym] = pos
 
         side = f.side  # BUY/SELL
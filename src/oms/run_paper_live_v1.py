@@ -18,6 +18,7 @@ from src.oms.paper_oms_risk_safety_wrapper_v1 import PaperOMSRiskSafetyWrapperV1
 from src.risk.risk_engine_v1 import RiskEngineV1, RiskConfigV1
 from src.safety.system_safety_v1 import SystemSafetyEngineV1, SafetyConfigV1
 from src.market.market_metrics_from_db_v1 import get_market_metrics_from_db
+from src.market.quote_cache_v1 import shared_quote_cache_or_none
 from src.execution.order_result_types import get_reject_codes
 
 def _db_counts(db_path: Path):
@@ -80,11 +81,12 @@ def main():
     )
     if (os.environ.get("TMF_DEV_ALLOW_STALE_BIDASK", "0").strip() == "1"):
         print("[WARN] TMF_DEV_ALLOW_STALE_BIDASK=1 -> stale override requested (NOTE: SystemSafetyEngineV1 HARDGUARD disables this during in-session); intended for after-hours/offline smoke")
-    safety = SystemSafetyEngineV1(db_path=str(db), cfg=safety_cfg)
+    quote_cache = shared_quote_cache_or_none(str(db))
+    safety = SystemSafetyEngineV1(db_path=str(db), cfg=safety_cfg, quote_cache=quote_cache)
     wrap = PaperOMSRiskSafetyWrapperV1(paper_oms=oms, risk=risk, safety=safety, db_path=str(db))
 
     # ---- Market snapshot from DB (truthy only; do NOT fabricate market_metrics) ----
-    mm = get_market_metrics_from_db(db_path=str(db), fop_code=fop_code, bars_symbol_for_atr=bars_symbol, atr_n=20) or {}
+    mm = get_market_metrics_from_db(db_path=str(db), fop_code=fop_code, bars_symbol_for_atr=bars_symbol, atr_n=20, quote_cache=quote_cache) or {}
 
     # Always keep a numeric ref_price fallback for local smoke/demo flows,
     # BUT: only populate meta['market_metrics'] when bid/ask are truly present from DB events.
@@ -3,13 +3,41 @@ from __future__ import annotations
 import json
 import os
 import sqlite3
+import subprocess
+import sys
 import tempfile
+import time
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
+from pathlib import Path
 from typing import Any, Dict, List, Optional
 
+from src.data.quotes_l5_v1 import sync_quotes_l5
+from src.data.store_sqlite_v1 import init_db
+from src.market.quote_cache_v1 import LatestQuoteCacheV1
+from src.ops.clock_v1 import SimClockV1, use_clock
+from src.safety.safety_state_shm_v1 import get_safety_state_shm
 from src.safety.system_safety_v1 import SafetyConfigV1, SystemSafetyEngineV1
 
+_REPO_ROOT = Path(__file__).resolve().parents[3]
+SAFETY_CHECK_TARGET_US = 100.0
+
+# child process for the bench: flips the kill switch through its own engine (same DB, same mirror file);
+# every value carries its flip index so a reader can tell a torn read (enabled parity != i parity)
+_TOGGLER = r"""
+import sys
+from src.safety.system_safety_v1 import SafetyConfigV1, SystemSafetyEngineV1
+db, n = sys.argv[1], int(sys.argv[2])
+ss = SystemSafetyEngineV1(db_path=db, cfg=SafetyConfigV1())
+for i in range(n):
+    if i % 2 == 0:
+        ss.request_kill(code="CHAOS_TOGGLE", reason="bench toggle", details={"i": i, "pad": "x" * (i % 512)})
+    else:
+        ss._set_state("kill", {"enabled": False, "details": {"i": i}})
+ss.clear_kill()
+print("done", n)
+"""
+
 
 def _iso(dt: datetime) -> str:
     # keep timezone info (SystemSafetyEngineV1 tolerates Z / +00:00)
@@ -46,6 +74,111 @@ def _insert_bidask(con: sqlite3.Connection, *, ts: str, code: str = "TMFB6", sou
     con.commit()
 
 
+def _pcts(samples_us: List[float]) -> Dict[str, float]:
+    xs = sorted(samples_us)
+    n = len(xs)
+    return {"n": n, "p50_us": round(xs[n // 2], 1), "p99_us": round(xs[min(n - 1, int(n * 0.99))], 1), "max_us": round(xs[-1], 1)}
+
+
+def _run_child(db_path: str, code: str, *args: str) -> "subprocess.Popen[str]":
+    return subprocess.Popen([sys.executable, "-c", code, db_path, *args], cwd=str(_REPO_ROOT),
+                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+
+
+def bench_safety_check(db_path: str, cfg: SafetyConfigV1, *, n: int = 2000, toggles: int = 200) -> Dict[str, Any]:
+    """
+    check_pre_trade latency (shared-memory kill/cooldown mirror vs safety_state reads) and cross-process
+    propagation of kill/cooldown through the mirror, on a recorder-schema DB (init_db) with the shared
+    quote cache, as in the paper stack. Sim clock pinned so the seeded quote stays fresh.
+    """
+    out: Dict[str, Any] = {"db_path": db_path, "target_p50_us": SAFETY_CHECK_TARGET_US}
+    prev = os.environ.get("TMF_SAFETY_STATE_SHM")
+    init_db(Path(db_path))
+    now = datetime.now(timezone.utc)
+    con = sqlite3.connect(db_path)
+    try:
+        con.execute(
+            "INSERT INTO events(ts, kind, payload_json, source_file, ingest_ts) VALUES(?,?,?,?,?)",
+            (_iso(now), cfg.bidask_kind, json.dumps({"code": cfg.fop_code, "bid_price": [31774.0], "ask_price": [31775.0],
+                                                     "bid_volume": [1], "ask_volume": [1], "ingest_ts": _iso(now)}),
+             "chaos_drill", _iso(now)),
+        )
+        con.commit()
+        sync_quotes_l5(con, kinds=(cfg.bidask_kind,))
+    finally:
+        con.close()
+    qc = LatestQuoteCacheV1(db_path, kind=cfg.bidask_kind)
+    meta = {"broker_rtt_ms": 0, "oms_queue_depth": 0}
+    try:
+        with use_clock(SimClockV1(now.timestamp() + 0.1)):
+            # 1) latency: same engine config / quote cache, kill+cooldown from the mirror vs from SQLite
+            for mode in ("shm", "db"):
+                os.environ["TMF_SAFETY_STATE_SHM"] = "1" if mode == "shm" else "0"
+                ss = SystemSafetyEngineV1(db_path=db_path, cfg=cfg, quote_cache=qc)
+                ss.clear_cooldown()
+                ss.clear_kill()
+                codes = set()
+                for _ in range(min(200, n)):
+                    codes.add(ss.check_pre_trade(meta=meta).code)
+                samples = []
+                for _ in range(n):
+                    t = time.perf_counter()
+                    v = ss.check_pre_trade(meta=meta)
+                    samples.append((time.perf_counter() - t) * 1e6)
+                    codes.add(v.code)
+                out[mode] = dict(_pcts(samples), codes=sorted(codes))
+            out["speedup_p50"] = round(out["db"]["p50_us"] / max(1e-9, out["shm"]["p50_us"]), 2)
+            out["within_target"] = bool(out["shm"]["p50_us"] <= SAFETY_CHECK_TARGET_US)
+
+            # 2) propagation: another process flips kill while this one checks; no torn kill state
+            os.environ["TMF_SAFETY_STATE_SHM"] = "1"
+            ss = SystemSafetyEngineV1(db_path=db_path, cfg=cfg, quote_cache=qc)
+            m = get_safety_state_shm(db_path)
+            v0 = m.read_hot()[0] if m else -1
+            child = _run_child(db_path, _TOGGLER, str(int(toggles)))
+            reads = torn = blocked = 0
+            while child.poll() is None:
+                st = ss._get_state("kill") or {}
+                i = (st.get("details") or {}).get("i")
+                reads += 1
+                if i is not None and bool(st.get("enabled")) != (int(i) % 2 == 0):
+                    torn += 1
+                blocked += int(ss.check_pre_trade(meta=meta).code == "SAFETY_KILL_SWITCH")
+            child_out = child.communicate()[0]
+            v1 = m.read_hot()[0] if m else -1
+            after = ss.check_pre_trade(meta=meta).code
+            out["propagation"] = {"toggles": int(toggles), "child_rc": child.returncode, "reads": reads, "torn_reads": torn,
+                                  "blocked_checks": blocked, "version_delta": v1 - v0, "after_clear": after,
+                                  "child": child_out.strip()[-200:]}
+
+            # 3) direct SQL writer (bypasses the engine): the very next check sees it (PRAGMA data_version moved)
+            c2 = sqlite3.connect(db_path)
+            try:
+                c2.execute("UPDATE safety_state SET value_json=? WHERE key='cooldown'",
+                           (json.dumps({"until_epoch": now.timestamp() + 3600, "code": "CHAOS_SQL"}),))
+                c2.commit()
+            finally:
+                c2.close()
+            t = time.perf_counter()
+            code = ss.check_pre_trade(meta=meta).code
+            out["resync"] = {"code": code, "first_check_us": round((time.perf_counter() - t) * 1e6, 1)}
+            ss.clear_cooldown()
+    finally:
+        if prev is None:
+            os.environ.pop("TMF_SAFETY_STATE_SHM", None)
+        else:
+            os.environ["TMF_SAFETY_STATE_SHM"] = prev
+        qc.close()
+
+    pr = out["propagation"]
+    out["pass"] = bool(
+        out["shm"]["codes"] == ["OK"] and out["db"]["codes"] == ["OK"]
+        and pr["child_rc"] == 0 and pr["torn_reads"] == 0 and pr["version_delta"] >= int(toggles) and pr["after_clear"] == "OK"
+        and out["resync"]["code"] == "SAFETY_COOLDOWN_ACTIVE"
+    )
+    return out
+
+
 @dataclass
 class Scenario:
     name: str
@@ -124,11 +257,25 @@ def run_drills(out_json: str, out_log: str) -> Dict[str, Any]:
                 # fail-fast: record and stop
                 break
 
+        passed = all(r["pass"] for r in results) if results else False
+        bench = None
+        bench_n = int(os.getenv("TMF_CHAOS_DRILL_BENCH_N", "2000") or 0)
+        if passed and bench_n > 0:
+            bench = bench_safety_check(os.path.join(tmpdir, "tmf_chaos_bench.sqlite3"), cfg, n=bench_n)
+            passed = bool(bench["pass"])
+            lines.append(
+                f"[bench_safety_check] shm p50={bench['shm']['p50_us']}us p99={bench['shm']['p99_us']}us "
+                f"db p50={bench['db']['p50_us']}us p99={bench['db']['p99_us']}us "
+                f"target_p50={SAFETY_CHECK_TARGET_US}us within_target={bench['within_target']} "
+                f"torn_reads={bench['propagation']['torn_reads']} sql_write_code={bench['resync']['code']} ok={bench['pass']}"
+            )
+
         summary = {
             "ts": datetime.now(timezone.utc).isoformat(timespec="seconds"),
             "db_path": db_path,
             "results": results,
-            "pass": all(r["pass"] for r in results) if results else False,
+            "bench_safety_check": bench,
+            "pass": passed,
         }
 
         with open(out_json, "w", encoding="utf-8") as f:
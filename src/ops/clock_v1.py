@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone, tzinfo
+from typing import Any, Iterator, Optional
+
+# Process clock seam for deterministic replay (src.sim.replay_engine_v1).
+# - clock_now(tz=None): drop-in for datetime.now(tz) in safety / risk / preflight / calendar / in-trade
+#   controls / OMS timestamps; wall clock unless a SimClockV1 is installed
+# - clock_monotonic(): drop-in for time.monotonic() in windowed logic (reject storm, bar flush);
+#   under a sim clock it is the sim epoch, so windows are measured in replay time
+# - use_clock(clock): installs a SimClockV1 process-wide for the duration of a replay (single-threaded use)
+# NOTE: Python 3.9.6 compatible
+
+_CLOCK: Optional["SimClockV1"] = None
+_LOCK = threading.Lock()
+
+
+def _to_epoch(ts: Any) -> Optional[float]:
+    if isinstance(ts, (int, float)):
+        return float(ts)
+    if isinstance(ts, datetime):
+        return ts.timestamp()
+    try:
+        return datetime.fromisoformat(str(ts).strip().replace("Z", "+00:00")).timestamp()
+    except Exception:
+        return None
+
+
+class SimClockV1:
+    """Replay time: an epoch that only moves forward (set() to an earlier time is ignored)."""
+
+    __slots__ = ("epoch",)
+
+    def __init__(self, start: Any = 0.0):
+        self.epoch = float(_to_epoch(start) or 0.0)
+
+    def set(self, ts: Any) -> bool:
+        """Advance to ts (epoch / datetime / ISO string; naive = local time). False if unparsable or earlier."""
+        ep = _to_epoch(ts)
+        if ep is None or ep < self.epoch:
+            return False
+        self.epoch = ep
+        return True
+
+    def advance(self, sec: float) -> None:
+        self.epoch += max(0.0, float(sec))
+
+    def now(self, tz: Optional[tzinfo] = None) -> datetime:
+        dt = datetime.fromtimestamp(self.epoch, timezone.utc)
+        return dt.astimezone(tz) if tz is not None else dt.astimezone().replace(tzinfo=None)
+
+
+def clock_now(tz: Optional[tzinfo] = None) -> datetime:
+    c = _CLOCK
+    return datetime.now(tz) if c is None else c.now(tz)
+
+
+def clock_monotonic() -> float:
+    c = _CLOCK
+    return time.monotonic() if c is None else c.epoch
+
+
+def sim_clock() -> Optional[SimClockV1]:
+    return _CLOCK
+
+
+@contextmanager
+def use_clock(clock: SimClockV1) -> Iterator[SimClockV1]:
+    global _CLOCK
+    with _LOCK:
+        if _CLOCK is not None:
+            raise RuntimeError("a sim clock is already installed")
+        _CLOCK = clock
+    try:
+        yield clock
+    finally:
+        with _LOCK:
+            _CLOCK = None
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Tuple
+
+# Small JSON artifacts that feed LatencyBudgetV1 / backpressure on every safety check
+# (<db>.gate_latency.json from gate_timing, recorder_writer_metrics_latest.json from the async writer):
+# - read_json_artifact: parsed once per file version; a hit costs one os.stat (writers os.replace a tmp
+#   file, so a new version means a new inode / mtime / size)
+# - fresh_artifact: the object as a dict when its "epoch" is within max_age_sec, else {} (producer gone)
+# NOTE: Python 3.9.6 compatible
+
+_ARTIFACT_CACHE: Dict[str, Tuple[Tuple[int, int, int], Any]] = {}
+
+
+def read_json_artifact(path: str) -> Any:
+    """Parsed JSON artifact, re-read only when the file changed (os.replace -> new inode); None if missing/invalid."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    sig = (st.st_ino, st.st_mtime_ns, st.st_size)
+    hit = _ARTIFACT_CACHE.get(path)
+    if hit is not None and hit[0] == sig:
+        return hit[1]
+    try:
+        obj = json.loads(Path(path).read_text(encoding="utf-8"))
+    except Exception:
+        return None
+    _ARTIFACT_CACHE[path] = (sig, obj)
+    return obj
+
+
+def fresh_artifact(obj: Any, max_age_sec: float) -> Dict[str, Any]:
+    """obj if it is a dict published (epoch) within max_age_sec, else {}."""
+    if not isinstance(obj, dict):
+        return {}
+    try:
+        if time.time() - float(obj.get("epoch") or 0.0) > float(max_age_sec):
+            return {}
+    except Exception:
+        return {}
+    return obj
@@ -17,6 +17,7 @@ class BackpressureConfigV1:
     max_feed_age_ms: int = 1500
     max_broker_rtt_ms: int = 1200
     max_oms_queue_depth: int = 50
+    max_gate_latency_ms: int = 1000
 @dataclass(frozen=True)
 class BackpressureDecisionV1:
     ok: bool
@@ -40,8 +41,9 @@ def decide(metrics: Dict[str, Any], cfg: BackpressureConfigV1) -> BackpressureDe
     feed_age_ms = int(metrics.get("feed_age_ms", 0) or 0)
     broker_rtt_ms = int(metrics.get("broker_rtt_ms", 0) or 0)
     oms_q = int(metrics.get("oms_queue_depth", 0) or 0)
+    gate_ms = int(metrics.get("gate_latency_ms", 0) or 0)
 
-    details = {"feed_age_ms": feed_age_ms, "broker_rtt_ms": broker_rtt_ms, "oms_queue_depth": oms_q, "cfg": cfg.__dict__}
+    details = {"feed_age_ms": feed_age_ms, "broker_rtt_ms": broker_rtt_ms, "oms_queue_depth": oms_q, "gate_latency_ms": gate_ms, "cfg": cfg.__dict__}
 
     # extreme condition (MVP): very stale feed implies system is blind
     if cfg.kill_on_extreme and feed_age_ms >= 5000:
@@ -55,6 +57,7 @@ def decide(metrics: Dict[str, Any], cfg: BackpressureConfigV1) -> BackpressureDe
         feed_age_ms >= int(getattr(cfg, 'max_feed_age_ms', 1500))
         or broker_rtt_ms >= int(getattr(cfg, 'max_broker_rtt_ms', 1200))
         or oms_q >= int(getattr(cfg, 'max_oms_queue_depth', 50))
+        or gate_ms >= int(getattr(cfg, 'max_gate_latency_ms', 1000))
     ):
         return BackpressureDecisionV1(
             ok=False, action="COOLDOWN", code="BP_COOLDOWN",
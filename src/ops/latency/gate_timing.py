@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from src.ops.latency.artifacts import fresh_artifact, read_json_artifact
+from src.ops.latency.latency_histogram import percentile
+
+# Pre-trade gate chain timing (PaperOMSRiskSafetyWrapperV1.place_order):
+# - GateTimerV1: one per order attempt; lap(stage) records monotonic ms and the number of SQL
+#   statements this thread ran since the previous lap (sqlite trace callback -> thread-local counter)
+# - GateLatencyRecorderV1: one per DB (get_gate_recorder(db_path)), ring buffer of the last
+#   TMF_GATE_TIMING_RING attempts; rolling p50/p95/p99 per stage, exported (throttled, atomic) next to
+#   the DB as <db>.gate_latency.json (TMF_GATE_LATENCY_PATH overrides; "" = no file)
+# - LatencyBudgetV1 / backpressure inputs: broker_rtt_ms = p95 submit -> paper OMS ack (whole attempt),
+#   gate_latency_ms = p95 of the gate stages only (safety..risk); both over ALL attempts (accepted and
+#   rejected) of the last TMF_GATE_TIMING_WINDOW_SEC, so a spike ages out even while a backpressure
+#   cooldown rejects everything; see load_gate_latency()
+# Off with TMF_GATE_TIMING=0 (no timers; trace callbacks are removed from connections traced afterwards).
+# NOTE: Python 3.9.6 compatible
+
+GATE_LATENCY_SUFFIX = ".gate_latency.json"
+GATE_STAGES = ("safety", "calendar", "preflight", "risk")
+
+_tls = threading.local()
+
+
+def _env(name: str, default: str) -> str:
+    return (os.environ.get(name, default) or default).strip()
+
+
+def gate_timing_enabled() -> bool:
+    return _env("TMF_GATE_TIMING", "1").lower() in ("1", "true", "yes", "y", "on")
+
+
+def _on_sql(_stmt: str) -> None:
+    _tls.q = getattr(_tls, "q", 0) + 1
+
+
+def trace_queries(con: Any) -> Any:
+    """Count every statement run on con (in the executing thread) while timing is on. Returns con."""
+    try:
+        con.set_trace_callback(_on_sql if gate_timing_enabled() else None)
+    except Exception:
+        pass
+    return con
+
+
+def gate_latency_path(db_path: str = "") -> str:
+    """Export file: TMF_GATE_LATENCY_PATH when set ("" = none), else <db>.gate_latency.json (none without a DB)."""
+    p = os.environ.get("TMF_GATE_LATENCY_PATH")
+    if p is not None:
+        return p.strip()
+    return os.path.abspath(str(db_path)) + GATE_LATENCY_SUFFIX if db_path else ""
+
+
+def queries_in_thread() -> int:
+    return int(getattr(_tls, "q", 0))
+
+
+class GateTimerV1:
+    __slots__ = ("t0", "_t", "q0", "_q", "stages")
+
+    def __init__(self) -> None:
+        self.t0 = self._t = time.perf_counter()
+        self.q0 = self._q = queries_in_thread()
+        self.stages: List[Tuple[str, float, int]] = []   # (stage, ms, sql statements)
+
+    def lap(self, stage: str) -> None:
+        now = time.perf_counter()
+        q = queries_in_thread()
+        self.stages.append((stage, (now - self._t) * 1000.0, q - self._q))
+        self._t = now
+        self._q = q
+
+    def total_ms(self) -> float:
+        return (self._t - self.t0) * 1000.0
+
+    def compact(self) -> Dict[str, Any]:
+        """Breakdown attached to order meta (laps so far)."""
+        return {
+            "total_ms": round(self.total_ms(), 3),
+            "db_queries": int(self._q - self.q0),
+            "ms": {s: round(ms, 3) for s, ms, _q in self.stages},
+            "q": {s: int(q) for s, _ms, q in self.stages},
+        }
+
+
+def outcome_of(result: Any) -> str:
+    if isinstance(result, dict):
+        return str(result.get("status") or ("REJECTED" if not result.get("ok", True) else "OK"))
+    return "ACCEPTED"
+
+
+class GateLatencyRecorderV1:
+    def __init__(self, *, ring: int = 2048, path: str = "", every_sec: float = 1.0, window_sec: float = 60.0):
+        self.path = str(path)
+        self.every_sec = float(every_sec)
+        self.window_sec = float(window_sec)
+        self._ring: Deque[Tuple[float, str, float, int, Tuple[Tuple[str, float, int], ...]]] = deque(maxlen=max(1, int(ring)))
+        self._lock = threading.Lock()
+        self._last_export = 0.0
+        self._latest: Dict[str, Any] = {}
+        self.n = 0
+
+    @classmethod
+    def from_env(cls, db_path: str = "") -> "GateLatencyRecorderV1":
+        return cls(
+            ring=int(_env("TMF_GATE_TIMING_RING", "2048")),
+            path=gate_latency_path(db_path),
+            every_sec=float(_env("TMF_GATE_LATENCY_EVERY_SEC", "1.0")),
+            window_sec=float(_env("TMF_GATE_TIMING_WINDOW_SEC", "60")),
+        )
+
+    def record(self, timer: GateTimerV1, outcome: str) -> None:
+        rec = (time.time(), str(outcome), timer.total_ms(), int(timer._q - timer.q0), tuple(timer.stages))
+        with self._lock:
+            self._ring.append(rec)
+            self.n += 1
+            due = time.monotonic() - self._last_export >= self.every_sec
+            if due:
+                self._last_export = time.monotonic()
+        if due:
+            self.export()
+
+    def latest(self) -> Dict[str, Any]:
+        """Summary as of the last export (refreshed at most every every_sec; cheap on the hot path)."""
+        return self._latest
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            recs = list(self._ring)
+            n = self.n
+        per_ms: Dict[str, List[float]] = {}
+        per_q: Dict[str, List[int]] = {}
+        totals: List[float] = []
+        gates: List[float] = []
+        recent_totals: List[float] = []
+        recent_gates: List[float] = []
+        outcomes: Dict[str, int] = {}
+        since = time.time() - self.window_sec
+        for ts, outcome, tot, _q, stages in recs:
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+            totals.append(tot)
+            g = 0.0
+            for s, ms, q in stages:
+                per_ms.setdefault(s, []).append(ms)
+                per_q.setdefault(s, []).append(q)
+                if s in GATE_STAGES:
+                    g += ms
+            gates.append(g)
+            if ts >= since:
+                recent_totals.append(tot)
+                recent_gates.append(g)
+
+        def _pct(xs: List[float]) -> Dict[str, Any]:
+            xs = sorted(xs)
+            return {"n": len(xs), "p50_ms": percentile(xs, 50), "p95_ms": percentile(xs, 95), "p99_ms": percentile(xs, 99),
+                    "max_ms": (xs[-1] if xs else None)}
+
+        stages_out: Dict[str, Any] = {}
+        for s, xs in per_ms.items():
+            d = _pct(xs)
+            d["db_queries_mean"] = round(sum(per_q[s]) / float(len(per_q[s])), 3)
+            stages_out[s] = d
+        # budget inputs: every attempt of the time window (a cooldown's fast rejects count too); none -> 0
+        rtt = _pct(recent_totals)["p95_ms"]
+        gl = _pct(recent_gates)["p95_ms"]
+        return {
+            "attempts": n,
+            "window": len(recs),
+            "budget_window_sec": self.window_sec,
+            "budget_window_n": len(recent_totals),
+            "outcomes": outcomes,
+            "total": _pct(totals),
+            "gates": _pct(gates),
+            "stages": stages_out,
+            # LatencyBudgetV1 / backpressure inputs (integer ms like the other metrics)
+            "broker_rtt_ms": int(round(rtt)) if rtt is not None else 0,
+            "gate_latency_ms": int(round(gl)) if gl is not None else 0,
+        }
+
+    def export(self) -> None:
+        obj = {"ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z"),
+               "epoch": time.time(), "pid": os.getpid(), **self.summary()}
+        self._latest = obj
+        if not self.path:
+            return
+        try:
+            p = Path(self.path)
+            p.parent.mkdir(parents=True, exist_ok=True)
+            tmp = p.with_name(p.name + f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(obj, ensure_ascii=False, sort_keys=True) + "\n", encoding="utf-8")
+            os.replace(tmp, p)
+        except Exception:
+            pass
+
+
+_RECORDERS: Dict[str, GateLatencyRecorderV1] = {}
+_RECORDER_LOCK = threading.Lock()
+
+
+def get_gate_recorder(db_path: str = "") -> GateLatencyRecorderV1:
+    """Process-wide recorder per DB (abspath; "" = attempts not tied to a DB, never exported by default)."""
+    k = os.path.abspath(str(db_path)) if db_path else ""
+    rec = _RECORDERS.get(k)
+    if rec is None:
+        with _RECORDER_LOCK:
+            rec = _RECORDERS.get(k)
+            if rec is None:
+                rec = _RECORDERS[k] = GateLatencyRecorderV1.from_env(k)
+    return rec
+
+
+def load_gate_latency(path: str = "", max_age_sec: float = 5.0, *, db_path: str = "") -> Dict[str, Any]:
+    """
+    Rolling gate-chain latency of one DB (broker_rtt_ms / gate_latency_ms for LatencyBudgetV1 and
+    backpressure), or {} if missing/stale. This process's recorder for the DB when it has exported,
+    else the DB's artifact on disk (written by another process trading the same DB).
+    """
+    rec = _RECORDERS.get(os.path.abspath(str(db_path)) if db_path else "")
+    obj: Any = rec.latest() if (rec is not None and not path) else {}
+    if not obj:
+        p = path or gate_latency_path(db_path)
+        obj = read_json_artifact(p) if p else None
+    return fresh_artifact(obj, max_age_sec)
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import bisect
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Sequence
+
+# Latency histogram (ms):
+# - fixed bucket counts over the whole run (cheap, unbounded number of observations)
+# - exact percentiles over the last `keep` samples (ring buffer)
+# to_dict() is the JSON shape used by runner summaries / latency artifacts.
+
+DEFAULT_BOUNDS_MS: Sequence[float] = (
+    0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000,
+)
+
+
+def percentile(sorted_xs: Sequence[float], p: float) -> Optional[float]:
+    """Nearest-rank percentile (p in 0..100) of an already sorted sequence."""
+    if not sorted_xs:
+        return None
+    k = max(0, min(len(sorted_xs) - 1, int(-(-float(p) * len(sorted_xs) // 100)) - 1))
+    return float(sorted_xs[k])
+
+
+class LatencyHistogramV1:
+    def __init__(self, *, bounds_ms: Sequence[float] = DEFAULT_BOUNDS_MS, keep: int = 4096):
+        self.bounds_ms: List[float] = sorted(float(x) for x in bounds_ms)
+        self.counts: List[int] = [0] * (len(self.bounds_ms) + 1)  # last bucket: > max bound
+        self._recent: Deque[float] = deque(maxlen=max(1, int(keep)))
+        self.n = 0
+        self.total_ms = 0.0
+        self.min_ms: Optional[float] = None
+        self.max_ms: Optional[float] = None
+
+    def observe(self, ms: float) -> None:
+        x = max(0.0, float(ms))
+        self.counts[bisect.bisect_left(self.bounds_ms, x)] += 1
+        self._recent.append(x)
+        self.n += 1
+        self.total_ms += x
+        if self.min_ms is None or x < self.min_ms:
+            self.min_ms = x
+        if self.max_ms is None or x > self.max_ms:
+            self.max_ms = x
+
+    def percentiles(self, ps: Sequence[float] = (50, 95, 99)) -> Dict[str, Optional[float]]:
+        xs = sorted(self._recent)
+        return {f"p{int(p) if float(p).is_integer() else p}": percentile(xs, p) for p in ps}
+
+    def to_dict(self) -> Dict[str, Any]:
+        buckets: Dict[str, int] = {}
+        for i, c in enumerate(self.counts):
+            if c:
+                key = f"le_{self.bounds_ms[i]:g}" if i < len(self.bounds_ms) else f"gt_{self.bounds_ms[-1]:g}"
+                buckets[key] = c
+        out: Dict[str, Any] = {
+            "n": self.n,
+            "min_ms": self.min_ms,
+            "max_ms": self.max_ms,
+            "mean_ms": (self.total_ms / self.n) if self.n else None,
+        }
+        out.update({f"{k}_ms": v for k, v in self.percentiles().items()})
+        out["window"] = len(self._recent)
+        out["buckets"] = buckets
+        return out
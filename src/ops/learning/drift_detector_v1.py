@@ -39,6 +39,14 @@ def _recent_spreads(con: sqlite3.Connection, *, kind: str = "bidask_fop_v1", cod
     # events table schema in this project is stable enough for basic queries:
     # we rely on payload.ask / payload.bid JSON paths via stored columns or JSON extraction.
     # For portability, attempt both:
+    # preferred: typed quotes_l5 (level-1 px columns, synthetic rows excluded)
+    try:
+        from src.data.quotes_l5_v1 import recent_spreads
+        spreads = recent_spreads(con, code=code, kind=kind, limit=limit)
+        if spreads:
+            return (len(spreads), sum(spreads)/len(spreads))
+    except Exception:
+        pass
     cur = con.cursor()
     # try: columns bid/ask
     for sql in (
@@ -0,0 +1,329 @@
+"""
+TMF AutoTrader — Parameter Sweep v1 (feeds stat_gate_v1 with real trials)
+
+- grid over TrendStrategyV1 (lookback, atr_n, atr_mult) and MeanReversionConfigV1 (lookback_n, entry_z, stop_pts)
+- bars_1m loaded once, written as a read-only float64 file and mmap'ed by every worker
+  (pool initializer); tasks carry only (config_id, family, params)
+- each config runs through BacktestEngineV1 (indicator kernels) and yields a per-day return series
+  (net daily PnL / capital_ntd)
+- results stream into a SQLite store (one row per config, returns as a float64 BLOB); configs already in
+  the store are skipped, so an interrupted sweep resumes where it stopped
+- run_stat_gate_v1 is called over every stored series with n_trials = number of configs tried
+  (matrix engine stat_gate_fast_v1 by default; TMF_STAT_GATE_ENGINE=ref for the reference loops)
+OFFICIAL-LOCKED compatible (no extra deps; numpy used only if installed).
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.research.stat_gate_fast_v1 import run_stat_gate_fast_v1
+from src.research.stat_gate_v1 import run_stat_gate_v1
+from src.sim.backtest_bars_v1 import (
+    BacktestConfigV1,
+    BacktestEngineV1,
+    BarArraysV1,
+    load_bars_1m,
+    open_bars_shared,
+    save_bars_shared,
+)
+
+ROOT = Path(__file__).resolve().parents[2]
+OUT_DIR = ROOT / "runtime" / "research"
+
+TaskV1 = Tuple[str, str, Dict[str, Any]]  # (config_id, family, params)
+
+
+@dataclass(frozen=True)
+class SweepGridV1:
+    trend_lookback: Tuple[int, ...] = (10, 20, 40)
+    trend_atr_n: Tuple[int, ...] = (14,)
+    trend_atr_mult: Tuple[float, ...] = (1.5, 2.0, 3.0)
+    mr_lookback_n: Tuple[int, ...] = (20, 40)
+    mr_entry_z: Tuple[float, ...] = (1.5, 2.0, 2.5)
+    mr_stop_pts: Tuple[float, ...] = (30.0,)
+
+    def tasks(self) -> List[TaskV1]:
+        out: List[TaskV1] = []
+        for lb, an, am in itertools.product(self.trend_lookback, self.trend_atr_n, self.trend_atr_mult):
+            p = {"lookback": int(lb), "atr_n": int(an), "atr_mult": float(am)}
+            out.append((config_id("trend", p), "trend", p))
+        for lb, ez, sp in itertools.product(self.mr_lookback_n, self.mr_entry_z, self.mr_stop_pts):
+            p = {"lookback_n": int(lb), "entry_z": float(ez), "stop_pts": float(sp)}
+            out.append((config_id("mean_reversion", p), "mean_reversion", p))
+        return out
+
+
+def config_id(family: str, params: Dict[str, Any]) -> str:
+    return family + ":" + ",".join(f"{k}={params[k]}" for k in sorted(params))
+
+
+def _csv(s: str, typ: Any) -> Tuple[Any, ...]:
+    return tuple(typ(x) for x in str(s).split(",") if x.strip())
+
+
+# ---------------------------------------------------------------------------
+# worker side
+# ---------------------------------------------------------------------------
+
+_W_BARS: Optional[BarArraysV1] = None
+_W_DAY_IDX: Optional[List[int]] = None
+_W_OPTS: Dict[str, Any] = {}
+
+
+def _day_ends(ts: Sequence[str]) -> List[int]:
+    """Index of the last bar of each calendar day (ts_min[:10])."""
+    ends: List[int] = []
+    for i in range(1, len(ts)):
+        if ts[i][:10] != ts[i - 1][:10]:
+            ends.append(i - 1)
+    if ts:
+        ends.append(len(ts) - 1)
+    return ends
+
+
+def _worker_init(bars_dir: str, opts: Dict[str, Any]) -> None:
+    global _W_BARS, _W_DAY_IDX, _W_OPTS
+    _W_BARS = open_bars_shared(Path(bars_dir))
+    _W_DAY_IDX = _day_ends(_W_BARS.ts)
+    _W_OPTS = dict(opts)
+
+
+def _make_strategy(family: str, p: Dict[str, Any], qty: float) -> Any:
+    if family == "trend":
+        from src.strat.trend_v1 import TrendStrategyV1
+        return TrendStrategyV1(qty=qty, lookback=int(p["lookback"]), atr_n=int(p["atr_n"]), atr_mult=float(p["atr_mult"]))
+    if family == "mean_reversion":
+        from src.strat.mean_reversion_v1 import MeanReversionConfigV1, MeanReversionStrategyV1
+        return MeanReversionStrategyV1(MeanReversionConfigV1(lookback_n=int(p["lookback_n"]), entry_z=float(p["entry_z"]),
+                                                             stop_pts=float(p["stop_pts"]), qty=qty))
+    raise ValueError(f"unknown family={family}")
+
+
+def run_config(task: TaskV1) -> Tuple[str, str, Dict[str, Any], bytes, Dict[str, Any]]:
+    """One backtest -> (config_id, family, params, daily returns float64 bytes, summary)."""
+    cid, family, p = task
+    bars = _W_BARS
+    assert bars is not None and _W_DAY_IDX is not None, "worker not initialised"
+    opts = _W_OPTS
+    strat = _make_strategy(family, p, float(opts.get("qty", 1.0)))
+    res = BacktestEngineV1([strat], BacktestConfigV1(symbol=bars.symbol, use_kernels=True,
+                                                     honor_stops=bool(opts.get("honor_stops", False)))).run(bars)
+    cap = float(opts.get("capital_ntd", 1_000_000.0))
+    eq = res.equity
+    rets = array("d")
+    prev = 0.0
+    for i in _W_DAY_IDX:
+        e = float(eq[i])
+        rets.append((e - prev) / cap)
+        prev = e
+    summ = {k: res.summary.get(k) for k in ("n_fills", "n_trades_closed", "net_pnl_ntd", "max_drawdown_ntd", "costs_ntd")}
+    return cid, family, p, rets.tobytes(), summ
+
+
+# ---------------------------------------------------------------------------
+# store
+# ---------------------------------------------------------------------------
+
+STORE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sweep_meta (k TEXT PRIMARY KEY, v TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS sweep_results (
+  config_id TEXT PRIMARY KEY,
+  family TEXT NOT NULL,
+  params_json TEXT NOT NULL,
+  n INTEGER NOT NULL,
+  returns BLOB NOT NULL,
+  summary_json TEXT NOT NULL,
+  ts TEXT NOT NULL
+);
+"""
+
+
+def open_store(path: Path, *, run_key: str, fresh: bool = False) -> sqlite3.Connection:
+    """Store bound to one run key (bars sha256 + engine options); resuming with a different key is refused."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if fresh and path.exists():
+        path.unlink()
+    con = sqlite3.connect(str(path))
+    con.execute("PRAGMA journal_mode=WAL;")
+    con.execute("PRAGMA synchronous=NORMAL;")
+    con.executescript(STORE_SCHEMA)
+    r = con.execute("SELECT v FROM sweep_meta WHERE k='run_key'").fetchone()
+    if r is None:
+        con.execute("INSERT INTO sweep_meta(k, v) VALUES('run_key', ?)", (run_key,))
+        con.commit()
+    elif r[0] != run_key:
+        con.close()
+        raise RuntimeError(f"sweep store {path} was built with different bars/options ({r[0]} != {run_key}); use --fresh")
+    return con
+
+
+def done_ids(con: sqlite3.Connection) -> set:
+    return {r[0] for r in con.execute("SELECT config_id FROM sweep_results")}
+
+
+def load_returns(con: sqlite3.Connection) -> Dict[str, List[float]]:
+    out: Dict[str, List[float]] = {}
+    for cid, blob in con.execute("SELECT config_id, returns FROM sweep_results ORDER BY config_id"):
+        a = array("d")
+        a.frombytes(blob)
+        out[str(cid)] = a.tolist()
+    return out
+
+
+# ---------------------------------------------------------------------------
+# driver
+# ---------------------------------------------------------------------------
+
+def run_sweep(
+    *,
+    bars: BarArraysV1,
+    tasks: Sequence[TaskV1],
+    store_path: Path,
+    workers: int = 0,
+    qty: float = 1.0,
+    capital_ntd: float = 1_000_000.0,
+    honor_stops: bool = False,
+    fresh: bool = False,
+    max_tasks: int = 0,
+) -> Dict[str, Any]:
+    """Fan the grid out over a process pool; returns run stats. Safe to re-run (resumes)."""
+    t0 = time.perf_counter()
+    with tempfile.TemporaryDirectory(prefix="tmf_sweep_bars_") as td:
+        meta = save_bars_shared(bars, Path(td))
+        opts = {"qty": float(qty), "capital_ntd": float(capital_ntd), "honor_stops": bool(honor_stops)}
+        run_key = str(meta["sha256"]) + ":" + json.dumps(opts, sort_keys=True)
+        con = open_store(store_path, run_key=run_key, fresh=fresh)
+        try:
+            have = done_ids(con)
+            todo = [t for t in tasks if t[0] not in have]
+            n_pending = len(todo)
+            if max_tasks > 0:
+                todo = todo[: int(max_tasks)]
+            workers = int(workers) if int(workers) > 0 else (os.cpu_count() or 1)
+            n_done = 0
+            if todo:
+                if workers == 1:
+                    _worker_init(td, opts)
+                    it: Iterable[Any] = (run_config(t) for t in todo)
+                    for row in it:
+                        _store_row(con, row)
+                        n_done += 1
+                else:
+                    with ProcessPoolExecutor(max_workers=workers, initializer=_worker_init, initargs=(td, opts)) as ex:
+                        futs = [ex.submit(run_config, t) for t in todo]
+                        for fu in as_completed(futs):
+                            _store_row(con, fu.result())
+                            n_done += 1
+            n_total = int(con.execute("SELECT COUNT(1) FROM sweep_results").fetchone()[0])
+        finally:
+            con.close()
+    return {"n_grid": len(tasks), "n_skipped": len(tasks) - n_pending, "n_run": n_done, "n_pending": n_pending - n_done, "n_store": n_total,
+            "workers": workers, "secs": round(time.perf_counter() - t0, 3), "bars_sha256": meta["sha256"]}
+
+
+def _store_row(con: sqlite3.Connection, row: Tuple[str, str, Dict[str, Any], bytes, Dict[str, Any]]) -> None:
+    cid, family, p, blob, summ = row
+    con.execute(
+        "INSERT OR REPLACE INTO sweep_results(config_id, family, params_json, n, returns, summary_json, ts) VALUES(?,?,?,?,?,?,?)",
+        (cid, family, json.dumps(p, sort_keys=True), len(blob) // 8, sqlite3.Binary(blob), json.dumps(summ, ensure_ascii=False),
+         datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")),
+    )
+    con.commit()  # one commit per config: an interrupted sweep loses at most in-flight configs
+
+
+def stat_gate_from_store(store_path: Path, *, n_trials: Optional[int] = None, **kw: Any) -> Dict[str, Any]:
+    con = sqlite3.connect(str(store_path))
+    try:
+        rets = load_returns(con)
+    finally:
+        con.close()
+    n = int(n_trials) if n_trials is not None else len(rets)
+    engine = (os.environ.get("TMF_STAT_GATE_ENGINE", "fast") or "fast").strip().lower()
+    gate = run_stat_gate_v1 if engine == "ref" else run_stat_gate_fast_v1
+    res = gate(rets, n_trials=max(1, n), **kw)
+    return {"ok": res.ok, "code": res.code, "reason": res.reason, "details": res.details, "n_trials": n, "n_series": len(rets)}
+
+
+def _write_sidecar(p: Path) -> str:
+    import hashlib
+    sha = hashlib.sha256(p.read_bytes()).hexdigest()
+    p.with_name(p.name + ".sha256.txt").write_text(f"{sha}  {p.name}\n", encoding="utf-8")
+    return sha
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="TMF AutoTrader parameter sweep -> stat gate (v1)")
+    ap.add_argument("--db", default=os.environ.get("TMF_DB_PATH", "runtime/data/tmf_autotrader_v1.sqlite3"))
+    ap.add_argument("--symbol", default=(os.environ.get("TMF_FOP_CODE", "TMFB6") or "TMFB6").strip())
+    ap.add_argument("--since", default=None)
+    ap.add_argument("--until", default=None)
+    ap.add_argument("--store", default=str(OUT_DIR / "param_sweep_v1.sqlite3"))
+    ap.add_argument("--workers", type=int, default=0, help="0 = os.cpu_count()")
+    ap.add_argument("--fresh", action="store_true", help="drop the store and start over")
+    ap.add_argument("--max-tasks", type=int, default=0, help="run at most N pending configs (then stop; resumable)")
+    ap.add_argument("--qty", type=float, default=1.0)
+    ap.add_argument("--capital-ntd", type=float, default=1_000_000.0)
+    ap.add_argument("--honor-stops", action="store_true")
+    ap.add_argument("--trend-lookback", default="10,20,40")
+    ap.add_argument("--trend-atr-n", default="14")
+    ap.add_argument("--trend-atr-mult", default="1.5,2.0,3.0")
+    ap.add_argument("--mr-lookback", default="20,40")
+    ap.add_argument("--mr-entry-z", default="1.5,2.0,2.5")
+    ap.add_argument("--mr-stop-pts", default="30")
+    ap.add_argument("--pbo-max", type=float, default=float(os.environ.get("TMF_STAT_PBO_MAX", "0.10")))
+    ap.add_argument("--dsr-min", type=float, default=float(os.environ.get("TMF_STAT_DSR_MIN", "0.95")))
+    ap.add_argument("--ann-factor", type=float, default=float(os.environ.get("TMF_STAT_ANN_FACTOR", "252")))
+    ap.add_argument("--out", default=str(OUT_DIR / "PARAM_SWEEP_latest.json"))
+    args = ap.parse_args(argv)
+
+    grid = SweepGridV1(
+        trend_lookback=_csv(args.trend_lookback, int), trend_atr_n=_csv(args.trend_atr_n, int),
+        trend_atr_mult=_csv(args.trend_atr_mult, float), mr_lookback_n=_csv(args.mr_lookback, int),
+        mr_entry_z=_csv(args.mr_entry_z, float), mr_stop_pts=_csv(args.mr_stop_pts, float),
+    )
+    tasks = grid.tasks()
+    bars = load_bars_1m(str(args.db), str(args.symbol), since=args.since, until=args.until)
+    if len(bars) == 0:
+        print(f"[FAIL] no bars_1m rows for symbol={args.symbol}")
+        return 2
+    stats = run_sweep(bars=bars, tasks=tasks, store_path=Path(args.store), workers=int(args.workers), qty=float(args.qty),
+                      capital_ntd=float(args.capital_ntd), honor_stops=bool(args.honor_stops), fresh=bool(args.fresh),
+                      max_tasks=int(args.max_tasks))
+    print(f"[OK] sweep {json.dumps(stats)}")
+    out = {"ts_utc": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"), "symbol": args.symbol,
+           "n_bars": len(bars), "grid": grid.__dict__, "sweep": stats}
+    if stats["n_pending"] > 0:
+        print(f"[INFO] sweep incomplete ({stats['n_pending']} configs pending); stat gate deferred (re-run to resume)")
+        out["stat_gate"] = None
+    else:
+        # every config ever tried on these bars counts as a trial (DSR deflation)
+        out["stat_gate"] = stat_gate_from_store(Path(args.store), n_trials=int(stats["n_store"]), pbo_max=args.pbo_max,
+                                                dsr_min=args.dsr_min, ann_factor=args.ann_factor)
+        print(f"[OK] stat_gate {out['stat_gate']['code']} {out['stat_gate']['reason']} n_trials={stats['n_store']}")
+    outp = Path(args.out)
+    outp.parent.mkdir(parents=True, exist_ok=True)
+    outp.write_text(json.dumps(out, ensure_ascii=False, indent=2, default=list) + "\n", encoding="utf-8")
+    sha = _write_sidecar(outp)
+    print(f"[OK] wrote {outp} sha256={sha}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
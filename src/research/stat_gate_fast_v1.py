@@ -0,0 +1,232 @@
+"""
+TMF AutoTrader — Statistical Gate v1, matrix engine (PBO-CSCV / block-bootstrap RealityCheck)
+
+Same contracts as stat_gate_v1 (reference), built for large N (strategies) / S (slices):
+- returns are a (T x N) matrix (column per strategy, truncated to the common length)
+- PBO-CSCV: per-slice sums and sums of squares are computed once; every C(S, S/2) split
+  is an indicator row, so IS/OOS Sharpe for all strategies is (C x S) @ (S x N), evaluated in chunks
+- RealityCheck: the bootstrap block starts are drawn from random.Random(seed) in exactly the
+  reference order (same seed -> same resamples), kept as one index array; a resample mean is a sum
+  of circular block sums read off a prefix-sum table, evaluated in chunks of resamples
+- numpy when installed; otherwise the same algorithm in plain Python (still O(S) per split and
+  O(T/block) per resample instead of O(T))
+- parity: the plain-Python path returns the reference numbers (regression CASE A). The numpy path
+  sums in a different order (matrix products, cumsum), so a split or resample sitting on a rounding
+  tie can flip: PBO / p-value may differ by one count (1/C(S, S/2), 1/(n_boot+1)) from the
+  reference; regression CASE D checks that bound whenever numpy is importable
+OFFICIAL-LOCKED compatible (no extra deps).
+"""
+from __future__ import annotations
+
+import itertools
+import math
+import random
+from operator import itemgetter
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+try:
+    import numpy as np  # type: ignore
+except Exception:  # pragma: no cover
+    np = None  # type: ignore
+
+from src.research.stat_gate_v1 import StatGateResult, deflated_sharpe_ratio, sharpe_ratio
+
+_EPS = 1e-12
+
+
+def _matrix(strat_returns: Mapping[str, Sequence[float]]) -> Tuple[List[str], int, Any]:
+    """names, common length m, columns (np (m x N) array, or list of per-strategy lists)."""
+    names = list(strat_returns.keys())
+    if not names:
+        return names, 0, None
+    m = min(len(strat_returns[n]) for n in names)
+    if np is not None:
+        X = np.empty((m, len(names)), dtype=np.float64)
+        for j, n in enumerate(names):
+            X[:, j] = np.asarray(list(strat_returns[n])[:m], dtype=np.float64)
+        return names, m, X
+    return names, m, [[float(x) for x in list(strat_returns[n])[:m]] for n in names]
+
+
+def _sharpe_from_sums(s: float, ss: float, n: int) -> float:
+    if n < 2:
+        return 0.0
+    mu = s / n
+    var = (ss - s * mu) / (n - 1)
+    sd = math.sqrt(var) if var > 0 else 0.0
+    return 0.0 if sd <= _EPS else mu / sd
+
+
+def pbo_cscv_fast(
+    strat_returns: Mapping[str, Sequence[float]],
+    *,
+    n_slices: int = 8,
+    chunk: int = 2048,
+) -> float:
+    names = list(strat_returns.keys())
+    if len(names) < 2:
+        return 1.0
+    S = int(n_slices)
+    if S < 4 or S % 2 != 0:
+        raise ValueError("n_slices must be even and >=4")
+    names, m, X = _matrix(strat_returns)
+    if m < S * 5:
+        return 1.0
+    L = m // S
+    half = S // 2
+    n_half = half * L
+    combs = list(itertools.combinations(range(S), half))
+    N = len(names)
+
+    if np is not None:
+        Xs = X[: L * S].reshape(S, L, N)
+        s_sum = Xs.sum(axis=1)                      # (S x N)
+        s_sq = (Xs * Xs).sum(axis=1)
+        tot, tot_sq = s_sum.sum(axis=0), s_sq.sum(axis=0)
+        overfit = 0
+        for a in range(0, len(combs), max(1, int(chunk))):
+            cc = combs[a:a + max(1, int(chunk))]
+            M = np.zeros((len(cc), S), dtype=np.float64)
+            rows = np.repeat(np.arange(len(cc)), half)
+            M[rows, np.asarray(cc, dtype=np.int64).ravel()] = 1.0
+            is_s, is_q = M @ s_sum, M @ s_sq         # (C x N)
+            oos_s, oos_q = tot - is_s, tot_sq - is_q
+
+            def _sr(s: Any, q: Any) -> Any:
+                mu = s / n_half
+                var = (q - s * mu) / (n_half - 1)
+                sd = np.sqrt(np.where(var > 0, var, 0.0))
+                return np.where(sd <= _EPS, 0.0, mu / np.where(sd <= _EPS, 1.0, sd))
+
+            is_sr, oos_sr = _sr(is_s, is_q), _sr(oos_s, oos_q)
+            best = np.argmax(is_sr, axis=1)          # first max, like max(names, key=...)
+            med = np.sort(oos_sr, axis=1)[:, N // 2]
+            overfit += int(np.count_nonzero(oos_sr[np.arange(len(cc)), best] < med))
+        return overfit / max(1, len(combs))
+
+    s_sum = [[sum(col[i * L:(i + 1) * L]) for i in range(S)] for col in X]
+    s_sq = [[sum(x * x for x in col[i * L:(i + 1) * L]) for i in range(S)] for col in X]
+    tot = [sum(r) for r in s_sum]
+    tot_sq = [sum(r) for r in s_sq]
+    overfit = 0
+    for IS in combs:
+        best_j, best_sr = 0, -math.inf
+        oos_sr: List[float] = []
+        for j in range(N):
+            a = sum(s_sum[j][i] for i in IS)
+            q = sum(s_sq[j][i] for i in IS)
+            sr = _sharpe_from_sums(a, q, n_half)
+            if sr > best_sr:
+                best_j, best_sr = j, sr
+            oos_sr.append(_sharpe_from_sums(tot[j] - a, tot_sq[j] - q, n_half))
+        if oos_sr[best_j] < sorted(oos_sr)[N // 2]:
+            overfit += 1
+    return overfit / max(1, len(combs))
+
+
+def bootstrap_block_starts(m: int, *, block: int, n_boot: int, seed: int) -> List[List[int]]:
+    """Block starts per resample, drawn exactly like stat_gate_v1.reality_check_pvalue."""
+    rng = random.Random(seed)
+    nb = -(-int(m) // int(block))
+    return [[rng.randrange(0, m) for _ in range(nb)] for _ in range(int(n_boot))]
+
+
+def reality_check_pvalue_fast(
+    strat_returns: Mapping[str, Sequence[float]],
+    *,
+    block: int = 10,
+    n_boot: int = 1000,
+    seed: int = 7,
+    chunk: int = 256,
+) -> float:
+    names = list(strat_returns.keys())
+    if not names:
+        return 1.0
+    names, m, X = _matrix(strat_returns)
+    if m < 5:
+        return 1.0
+    block = max(1, int(block))
+    n_boot = max(200, int(n_boot))
+    nb = -(-m // block)
+    last = m - (nb - 1) * block                       # length of the (possibly truncated) last block
+    starts = bootstrap_block_starts(m, block=block, n_boot=n_boot, seed=seed)
+
+    if np is not None:
+        obs = float((X.sum(axis=0) / m).max())
+        Xc = np.concatenate([X, X[:block]], axis=0)    # circular: blocks wrap around
+        P = np.vstack([np.zeros((1, X.shape[1])), np.cumsum(Xc, axis=0)])
+        full_tab = P[block:block + m] - P[:m]          # (m x N) block sum starting at k
+        tail_tab = P[last:last + m] - P[:m]
+        ST = np.asarray(starts, dtype=np.int64)        # (n_boot x nb), one index array
+        ge = 0
+        for a in range(0, n_boot, max(1, int(chunk))):
+            st = ST[a:a + max(1, int(chunk))]
+            c = st.shape[0]
+            # (c x m) block-start counts per resample; memory is c*m + m*N, not c*nb*N
+            rows = np.repeat(np.arange(c, dtype=np.int64), st.shape[1] - 1)
+            W = np.bincount(rows * m + st[:, :-1].ravel(), minlength=c * m).reshape(c, m).astype(np.float64)
+            boot = ((W @ full_tab + tail_tab[st[:, -1]]) / m).max(axis=1)
+            ge += int(np.count_nonzero(boot >= obs))
+        return (ge + 1) / (n_boot + 1)
+
+    obs = max(sum(col) / m for col in X)
+    full_rows: List[List[float]] = []                   # circular block sum starting at k, per strategy
+    tail_rows: List[List[float]] = []
+    for col in X:
+        p = [0.0]
+        acc = 0.0
+        for x in col + col[:block]:
+            acc += x
+            p.append(acc)
+        full_rows.append([p[k + block] - p[k] for k in range(m)])
+        tail_rows.append([p[k + last] - p[k] for k in range(m)])
+    ge = 0
+    for st in starts:
+        t = st[-1]
+        head = st[:-1]
+        if head:
+            get = itemgetter(*head) if len(head) > 1 else (lambda row, _k=head[0]: (row[_k],))
+            boot = max(sum(get(ft)) + tt[t] for ft, tt in zip(full_rows, tail_rows)) / m
+        else:
+            boot = max(tt[t] for tt in tail_rows) / m
+        if boot >= obs:
+            ge += 1
+    return (ge + 1) / (n_boot + 1)
+
+
+def _best_by_sharpe(strat_returns: Mapping[str, Sequence[float]]) -> str:
+    names = list(strat_returns.keys())
+    if np is not None and len(names) > 1:
+        srs = []
+        for n in names:
+            a = np.asarray(list(strat_returns[n]), dtype=np.float64)
+            sd = float(a.std(ddof=1)) if a.size >= 2 else 0.0
+            srs.append(0.0 if sd <= _EPS else float(a.mean()) / sd)
+        return names[int(np.argmax(srs))]
+    return max(names, key=lambda k: sharpe_ratio(strat_returns[k]))
+
+
+def run_stat_gate_fast_v1(
+    strat_returns: Mapping[str, Sequence[float]],
+    *,
+    pbo_max: float = 0.10,
+    dsr_min: float = 0.95,
+    n_trials: int = 1,
+    ann_factor: Optional[float] = None,
+) -> StatGateResult:
+    """Drop-in for stat_gate_v1.run_stat_gate_v1 (same thresholds, codes and details)."""
+    names = list(strat_returns.keys())
+    if not names:
+        return StatGateResult(False, "STAT_EMPTY", "no strategies provided", {})
+    best = _best_by_sharpe(strat_returns)
+    dsr = deflated_sharpe_ratio(strat_returns[best], n_trials=n_trials, ann_factor=ann_factor)
+    pbo = pbo_cscv_fast(strat_returns)
+    rc_p = reality_check_pvalue_fast(strat_returns)
+    ok = (pbo <= pbo_max) and (dsr >= dsr_min) and (rc_p <= 0.05)
+    code = "STAT_GATE_PASS" if ok else "STAT_GATE_FAIL"
+    reason = f"best={best} dsr={dsr:.4f} pbo={pbo:.4f} rc_p={rc_p:.4f}"
+    return StatGateResult(ok, code, reason, {"best": best, "dsr": dsr, "pbo": pbo, "rc_p": rc_p})
+
+
+def engine_info() -> Dict[str, Any]:
+    return {"numpy": bool(np is not None)}
@@ -5,6 +5,7 @@ from datetime import datetime
 from typing import Optional, Dict, Any
 
 from src.oms.paper_oms_v1 import PaperOMS
+from src.ops.clock_v1 import clock_now
 
 
 @dataclass(frozen=True)
@@ -60,7 +61,7 @@ def run_intrade_once(
     # Time-stop
     open_dt = _parse_iso(str(t.open_ts))
     if open_dt is not None and cfg.time_stop_seconds is not None and cfg.time_stop_seconds >= 0:
-        age = (datetime.now() - open_dt).total_seconds()
+        age = (clock_now() - open_dt).total_seconds()
         if age >= float(cfg.time_stop_seconds):
             side_close = "SELL" if pos.side == "LONG" else "BUY"
             o = oms.submit_order(
@@ -3,7 +3,12 @@ import json
 import sqlite3
 from dataclasses import dataclass, asdict
 from datetime import datetime
-from typing import Optional, Dict, Any, Tuple
+from typing import Optional, Dict, Any, List, Sequence, Tuple
+
+from src.data.sqlite_conn_v1 import connect_shared
+from src.oms.oms_journal_v1 import flush_oms_journal
+from src.ops.clock_v1 import clock_now
+from src.risk.risk_state_v1 import RiskStateV1, get_risk_state, risk_state_enabled
 
 
 
@@ -55,14 +60,16 @@ class RiskEngineV1:
     def __init__(self, *, db_path: str, cfg: Optional[RiskConfigV1] = None):
         self.db_path = db_path
         self.cfg = cfg or RiskConfigV1()
+        # daily pnl / loss streak / last loss / exposure from the incremental state (src.risk.risk_state_v1);
+        # TMF_RISK_STATE_CACHE=0 -> per-order queries over trades
+        self.state: Optional[RiskStateV1] = get_risk_state(db_path) if risk_state_enabled() else None
 
     def _con(self) -> sqlite3.Connection:
-        con = sqlite3.connect(self.db_path)
-        con.row_factory = sqlite3.Row
-        return con
+        # long-lived per-thread connection (src.data.sqlite_conn_v1); close() on it is a no-op
+        return connect_shared(self.db_path, row_factory=sqlite3.Row)
 
     def _today_prefix(self) -> str:
-        return datetime.now().strftime("%Y-%m-%d")
+        return clock_now().strftime("%Y-%m-%d")
 
     def _get_today_realized_pnl(self, con: sqlite3.Connection) -> float:
         # trades.pnl is assumed NTD (based on OMS demo)
@@ -95,10 +102,21 @@ class RiskEngineV1:
         ).fetchone()
         return str(row["close_ts"]) if row else None
 
+    def verify_risk_state(self, *, repair: bool = True) -> Dict[str, Any]:
+        """On-demand consistency check of the cached risk state against trades; rebuilds on mismatch."""
+        if self.state is None:
+            return {"ok": True, "diffs": {}, "cache": False}
+        self.state.sync()
+        out = self.state.verify()
+        if (not out["ok"]) and repair:
+            self.state.rebuild()
+            out["repaired"] = True
+        return out
+
     def _minutes_since(self, ts_iso: str) -> Optional[float]:
         try:
             dt = datetime.fromisoformat(ts_iso)
-            return (datetime.now() - dt).total_seconds() / 60.0
+            return (clock_now() - dt).total_seconds() / 60.0
         except Exception:
             return None
 
@@ -112,6 +130,59 @@ class RiskEngineV1:
         meta: Optional[Dict[str, Any]] = None,
     ) -> RiskVerdict:
         meta = meta or {}
+        ov = self._check_order(symbol=symbol, side=side, qty=qty, entry_price=entry_price, meta=meta)
+        if isinstance(ov, RiskVerdict):
+            return ov
+        return self._check_state() or self._pass_verdict(symbol, ov)
+
+    def check_pre_trade_batch(self, orders: Sequence[Dict[str, Any]]) -> List[RiskVerdict]:
+        """
+        check_pre_trade for several orders at once (same verdicts): per-order gates in memory, the
+        DB/state gates (daily loss, loss streak cooldown) evaluated once for the whole batch.
+        orders: dicts with symbol / side / qty / entry_price / meta.
+        """
+        out: List[RiskVerdict] = []
+        state: Any = None
+        for o in orders:
+            meta = o.get("meta") or {}
+            ov = self._check_order(symbol=o["symbol"], side=o["side"], qty=float(o["qty"]),
+                                   entry_price=float(o.get("entry_price") or 0.0), meta=meta)
+            if isinstance(ov, RiskVerdict):
+                out.append(ov)
+                continue
+            if state is None:
+                state = self._check_state() or False
+            out.append(state or self._pass_verdict(o["symbol"], ov))
+        return out
+
+    def _pass_verdict(self, symbol: str, ov: Tuple[str, float, Optional[float], float]) -> RiskVerdict:
+        side_u, entry_price, per_trade_risk_ntd, qty = ov
+        st = self.state
+        return RiskVerdict(
+            True,
+            "OK",
+            "pre-trade gates pass",
+            {
+                "symbol": symbol,
+                "side": side_u,
+                "qty": qty,
+                "entry_price": entry_price,
+                "per_trade_risk_ntd": per_trade_risk_ntd,
+                "open_exposure": (st.open_exposure(_base_symbol(symbol)) if st is not None else None),
+                "cfg": asdict(self.cfg),
+            },
+        )
+
+    def _check_order(
+        self,
+        *,
+        symbol: str,
+        side: str,
+        qty: float,
+        entry_price: float,
+        meta: Dict[str, Any],
+    ) -> Any:
+        """Per-order gates (no DB): a rejecting RiskVerdict, or (side_u, entry_price, per_trade_risk_ntd, qty)."""
         cfg = self.cfg
 
         # --- allowlist ---
@@ -241,10 +312,20 @@ class RiskEngineV1:
             return RiskVerdict(False, "RISK_LIQUIDITY_INVALID", "invalid liquidity_score", {"err": str(e), "liquidity_score": liq})
 
 
+        return (side_u, entry_price, per_trade_risk_ntd, qty)
+
+    def _check_state(self) -> Optional[RiskVerdict]:
+        """DB/state gates shared by every order (daily loss, consecutive losses cooldown); None = pass."""
+        cfg = self.cfg
         # --- DB-based gates: daily loss + consecutive losses + cooldown ---
-        con = self._con()
+        st = self.state
+        if st is not None:
+            st.sync()
+        else:
+            flush_oms_journal(self.db_path)   # PaperOMS write-behind: the trades queries need the queued rows
+        con = self._con() if st is None else None
         try:
-            today_pnl = self._get_today_realized_pnl(con)
+            today_pnl = self._get_today_realized_pnl(con) if st is None else st.day_pnl
             if today_pnl <= -abs(cfg.daily_max_loss_ntd):
                 return RiskVerdict(
                     False,
@@ -253,9 +334,9 @@ class RiskEngineV1:
                     {"today_realized_pnl_ntd": today_pnl, "daily_max_loss_ntd": cfg.daily_max_loss_ntd},
                 )
 
-            consec = self._get_consecutive_losses(con)
+            consec = self._get_consecutive_losses(con) if st is None else st.loss_streak
             if consec >= cfg.consecutive_losses_limit:
-                last_loss_ts = self._get_last_loss_ts(con)
+                last_loss_ts = self._get_last_loss_ts(con) if st is None else st.last_loss_ts
                 mins = self._minutes_since(last_loss_ts) if last_loss_ts else None
                 if mins is None or mins < cfg.cooldown_minutes_after_consecutive_losses:
                     return RiskVerdict(
@@ -271,19 +352,6 @@ class RiskEngineV1:
                         },
                     )
         finally:
-            con.close()
-
-        # PASS
-        return RiskVerdict(
-            True,
-            "OK",
-            "pre-trade gates pass",
-            {
-                "symbol": symbol,
-                "side": side_u,
-                "qty": qty,
-                "entry_price": entry_price,
-                "per_trade_risk_ntd": per_trade_risk_ntd,
-                "cfg": asdict(cfg),
-            },
-        )
+            if con is not None:
+                con.close()
+        return None
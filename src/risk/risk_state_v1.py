@@ -0,0 +1,378 @@
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from src.ops.clock_v1 import clock_now
+
+# Incremental risk state for RiskEngineV1 (replaces the per-order aggregate queries over trades):
+# - today's realized PnL, consecutive-loss streak, last-loss ts, open exposure per base symbol
+# - rebuilt from trades once (index-friendly close_ts range, not LIKE), or restored from the compact
+#   snapshot <db>.risk_state.json when its trades fingerprint still matches the DB
+#   (TMF_RISK_STATE_PATH overrides; set it empty for no snapshot, e.g. scratch DBs in replay / benchmarks)
+# - updated in-process by PaperOMS on trade open / close / position change (notify_* below), after the
+#   order event is durable (COMMIT, or the write-behind journal append): a rolled-back event never moves it
+# - snapshot writes are throttled to one per TMF_RISK_STATE_SAVE_SEC (default 1.0; 0 = every position
+#   change); a pending one is written by close() / at interpreter exit. A snapshot older than the trades
+#   is safe: its fingerprint no longer matches and load() rebuilds.
+# - other writers (seed scripts, a second process): a dedicated probe connection checks
+#   PRAGMA data_version (no table access); only when it moved, fingerprint = (MAX(id), MAX(close_ts))
+#   via rowid / idx_trades_close_ts; mismatch -> rebuild. Disable the probe with TMF_RISK_STATE_PROBE=0.
+# - PaperOMS write-behind (src.oms.oms_journal_v1): trades lag the in-process state until the journal
+#   flushes, so a mismatch is not rebuilt while the journal has pending records; rebuild()/verify()
+#   flush it first.
+# - verify(): on-demand consistency check against the original full queries.
+# Off with TMF_RISK_STATE_CACHE=0 (RiskEngineV1 queries trades per order as before).
+# NOTE: Python 3.9.6 compatible
+
+STATE_SUFFIX = ".risk_state.json"
+STREAK_SCAN = 50
+
+
+def _env(name: str, default: str) -> str:
+    return (os.environ.get(name, default) or default).strip()
+
+
+def risk_state_enabled() -> bool:
+    return _env("TMF_RISK_STATE_CACHE", "1").lower() in ("1", "true", "yes", "y", "on")
+
+
+def _base_symbol(sym: str) -> str:
+    s = str(sym or "")
+    for b in ("TMF", "TXF", "MXF"):
+        if s.startswith(b):
+            return b
+    return s
+
+
+def _today() -> str:
+    return clock_now().strftime("%Y-%m-%d")
+
+
+def _next_day(day: str) -> str:
+    return (datetime.strptime(day, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+
+
+def _db_key(db_path: Any) -> str:
+    return os.path.abspath(str(db_path))
+
+
+def risk_state_path(db_path: Any) -> str:
+    """Snapshot file: TMF_RISK_STATE_PATH when set ('' = none), else <db>.risk_state.json."""
+    p = os.environ.get("TMF_RISK_STATE_PATH")
+    if p is not None:
+        return p.strip()
+    return _db_key(db_path) + STATE_SUFFIX
+
+
+def _journal_pending(db_path: Any) -> int:
+    from src.oms.oms_journal_v1 import journal_pending
+    return journal_pending(db_path)
+
+
+def _flush_journal(db_path: Any) -> None:
+    from src.oms.oms_journal_v1 import flush_oms_journal
+    flush_oms_journal(db_path)
+
+
+class RiskStateV1:
+    def __init__(self, db_path: str, *, path: Optional[str] = None, probe: bool = True, save_every_sec: float = 1.0):
+        self.db_path = str(db_path)
+        self.path = _db_key(db_path) + STATE_SUFFIX if path is None else str(path)
+        self.probe = bool(probe)
+        self.save_every_sec = max(0.0, float(save_every_sec))
+        self._next_save = 0.0
+        self._dirty = False
+        self._lock = threading.RLock()
+        self._pcon: Optional[sqlite3.Connection] = None
+        self._version: Optional[int] = None
+        self.fp: Tuple[int, str] = (0, "")
+        self.day = _today()
+        self.day_pnl = 0.0
+        self.loss_streak = 0
+        self.last_loss_ts: Optional[str] = None
+        self.positions: Dict[str, float] = {}   # symbol -> signed qty (LONG > 0)
+        self.loaded = False
+        self.stats = {"rebuilds": 0, "snapshot_loads": 0, "probes": 0, "closes": 0, "saves": 0}
+
+    @classmethod
+    def from_env(cls, db_path: str) -> "RiskStateV1":
+        return cls(
+            db_path,
+            path=risk_state_path(db_path),
+            probe=_env("TMF_RISK_STATE_PROBE", "1").lower() in ("1", "true", "yes", "y", "on"),
+            save_every_sec=float(_env("TMF_RISK_STATE_SAVE_SEC", "1.0")),
+        )
+
+    # --- DB side (startup / external writes / verify) ---
+    def _probe_con(self) -> sqlite3.Connection:
+        if self._pcon is None:
+            self._pcon = sqlite3.connect(self.db_path, timeout=5.0, check_same_thread=False)
+            self._pcon.execute("PRAGMA busy_timeout=5000;")
+        return self._pcon
+
+    def _fingerprint(self, con: sqlite3.Connection) -> Tuple[int, str]:
+        a = con.execute("SELECT MAX(id) FROM trades").fetchone()
+        b = con.execute("SELECT MAX(close_ts) FROM trades").fetchone()
+        return (int((a[0] if a else 0) or 0), str((b[0] if b else "") or ""))
+
+    def _from_db(self, con: sqlite3.Connection) -> Dict[str, Any]:
+        day = _today()
+        row = con.execute(
+            "SELECT COALESCE(SUM(pnl),0) FROM trades WHERE close_ts >= ? AND close_ts < ?",
+            (day, _next_day(day)),
+        ).fetchone()
+        streak = 0
+        for (pnl,) in con.execute(
+            "SELECT pnl FROM trades WHERE close_ts IS NOT NULL ORDER BY id DESC LIMIT ?", (STREAK_SCAN,)
+        ):
+            if pnl is None or float(pnl) >= 0:
+                break
+            streak += 1
+        last = con.execute(
+            "SELECT close_ts FROM trades WHERE close_ts IS NOT NULL AND pnl < 0 ORDER BY id DESC LIMIT 1"
+        ).fetchone()
+        positions: Dict[str, float] = {}
+        for sym, side, qty in con.execute(
+            "SELECT symbol, side, qty FROM trades WHERE close_ts IS NULL ORDER BY id ASC"
+        ):
+            # single position per symbol (PaperOMS v1): the latest open row wins
+            q = float(qty or 0.0)
+            positions[str(sym)] = (-q if str(side) in ("SHORT", "SELL") else q)
+        return {
+            "day": day,
+            "day_pnl": float(row[0] if row else 0.0),
+            "loss_streak": streak,
+            "last_loss_ts": (str(last[0]) if last else None),
+            "positions": {k: v for k, v in positions.items() if v},
+        }
+
+    def _apply(self, d: Dict[str, Any]) -> None:
+        self.day = str(d["day"])
+        self.day_pnl = float(d["day_pnl"])
+        self.loss_streak = int(d["loss_streak"])
+        self.last_loss_ts = d.get("last_loss_ts")
+        self.positions = {str(k): float(v) for k, v in (d.get("positions") or {}).items()}
+
+    def rebuild(self) -> None:
+        _flush_journal(self.db_path)
+        with self._lock:
+            con = self._probe_con()
+            self._version = int(con.execute("PRAGMA data_version").fetchone()[0])
+            self.fp = self._fingerprint(con)
+            self._apply(self._from_db(con))
+            self.loaded = True
+            self.stats["rebuilds"] += 1
+        self.save()
+
+    def load(self) -> None:
+        """Startup: restore the snapshot if it describes this DB as it is now, else rebuild from trades."""
+        with self._lock:
+            snap = self._read_snapshot()
+            if snap:
+                con = self._probe_con()
+                self._version = int(con.execute("PRAGMA data_version").fetchone()[0])
+                if tuple(snap.get("fp") or ()) == self._fingerprint(con):
+                    self.fp = (int(snap["fp"][0]), str(snap["fp"][1]))
+                    self._apply(snap)
+                    self._roll_day()
+                    self.loaded = True
+                    self.stats["snapshot_loads"] += 1
+                    return
+            self.rebuild()
+
+    def sync(self) -> None:
+        """Called per pre-trade check: O(1) unless another connection committed since the last call."""
+        if not self.loaded:
+            self.load()
+            return
+        self._roll_day()
+        if not self.probe:
+            return
+        with self._lock:
+            con = self._probe_con()
+            v = int(con.execute("PRAGMA data_version").fetchone()[0])
+            if v == self._version:
+                return
+            self._version = v
+            self.stats["probes"] += 1
+            if self._fingerprint(con) == self.fp:
+                return
+            if _journal_pending(self.db_path):
+                self._version = None   # our own writes are still queued: probe again after they land
+                return
+        self.rebuild()
+
+    def verify(self) -> Dict[str, Any]:
+        """Consistency check: in-memory state vs the full queries over trades (does not modify state)."""
+        _flush_journal(self.db_path)
+        with self._lock:
+            self._roll_day()
+            db = self._from_db(self._probe_con())
+            mem = self.to_dict()
+        diffs = {}
+        for k in ("day", "loss_streak", "last_loss_ts", "positions"):
+            if mem[k] != db[k]:
+                diffs[k] = {"mem": mem[k], "db": db[k]}
+        if abs(mem["day_pnl"] - db["day_pnl"]) > 1e-6:
+            diffs["day_pnl"] = {"mem": mem["day_pnl"], "db": db["day_pnl"]}
+        return {"ok": not diffs, "diffs": diffs}
+
+    # --- in-process updates (PaperOMS) ---
+    def _roll_day(self) -> None:
+        day = _today()
+        if day != self.day:
+            with self._lock:
+                if day > self.day:
+                    self.day = day
+                    self.day_pnl = 0.0
+
+    def on_trade_open(self, trade_id: int) -> None:
+        with self._lock:
+            if trade_id and int(trade_id) > self.fp[0]:
+                self.fp = (int(trade_id), self.fp[1])
+
+    def on_trade_close(self, close_ts: str, pnl: float) -> None:
+        with self._lock:
+            ts = str(close_ts)
+            if ts > self.fp[1]:
+                self.fp = (self.fp[0], ts)
+            d = ts[:10]
+            if d > self.day:
+                self.day = d
+                self.day_pnl = 0.0
+            if d == self.day:
+                self.day_pnl += float(pnl)
+            if float(pnl) < 0:
+                self.loss_streak += 1
+                self.last_loss_ts = ts
+            else:
+                self.loss_streak = 0
+            self.stats["closes"] += 1
+
+    def on_position(self, symbol: str, side: Optional[str], qty: float) -> None:
+        with self._lock:
+            q = float(qty or 0.0)
+            if q <= 0 or not side:
+                self.positions.pop(str(symbol), None)
+            else:
+                self.positions[str(symbol)] = (-q if str(side) == "SHORT" else q)
+        self._save_throttled()   # last hook of a fill (after its trade open/close hooks)
+
+    # --- reads ---
+    def open_exposure(self, base: Optional[str] = None) -> Dict[str, float]:
+        out: Dict[str, float] = {}
+        for sym, q in list(self.positions.items()):
+            b = _base_symbol(sym)
+            out[b] = out.get(b, 0.0) + q
+        return out if base is None else {base: out.get(base, 0.0)}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "day": self.day,
+            "day_pnl": round(self.day_pnl, 6),
+            "loss_streak": self.loss_streak,
+            "last_loss_ts": self.last_loss_ts,
+            "positions": dict(self.positions),
+        }
+
+    # --- snapshot ---
+    def _read_snapshot(self) -> Dict[str, Any]:
+        if not self.path:
+            return {}
+        try:
+            obj = json.loads(Path(self.path).read_text(encoding="utf-8"))
+        except Exception:
+            return {}
+        if not isinstance(obj, dict) or obj.get("db") != _db_key(self.db_path):
+            return {}
+        return obj
+
+    def _save_throttled(self) -> None:
+        if not self.path:
+            return
+        now = time.monotonic()
+        if now < self._next_save:
+            self._dirty = True
+            return
+        self._next_save = now + self.save_every_sec
+        self.save()
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        with self._lock:
+            self._dirty = False
+            self.stats["saves"] += 1
+            obj = {"epoch": time.time(), "db": _db_key(self.db_path), "fp": list(self.fp), **self.to_dict()}
+        try:
+            p = Path(self.path)
+            p.parent.mkdir(parents=True, exist_ok=True)
+            tmp = p.with_name(p.name + f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(obj, ensure_ascii=False, sort_keys=True) + "\n", encoding="utf-8")
+            os.replace(tmp, p)
+        except Exception:
+            pass
+
+    def close(self) -> None:
+        if self._dirty:
+            self.save()
+        with self._lock:
+            if self._pcon is not None:
+                try:
+                    self._pcon.close()
+                except Exception:
+                    pass
+                self._pcon = None
+
+
+_STATES: Dict[str, RiskStateV1] = {}
+_STATES_LOCK = threading.Lock()
+
+
+def get_risk_state(db_path: Any) -> RiskStateV1:
+    """Process-wide state per DB file (shared by every RiskEngineV1 / PaperOMS on that DB)."""
+    k = _db_key(db_path)
+    with _STATES_LOCK:
+        st = _STATES.get(k)
+        if st is None:
+            st = _STATES[k] = RiskStateV1.from_env(str(db_path))
+        return st
+
+
+@atexit.register
+def _save_pending() -> None:
+    for st in list(_STATES.values()):
+        if st._dirty:
+            st.save()
+
+
+def _registered(db_path: Any) -> Optional[RiskStateV1]:
+    if not _STATES:
+        return None
+    return _STATES.get(_db_key(db_path))
+
+
+def notify_trade_open(db_path: Any, trade_id: Optional[int]) -> None:
+    st = _registered(db_path)
+    if st is not None and st.loaded and trade_id:
+        st.on_trade_open(int(trade_id))
+
+
+def notify_trade_close(db_path: Any, close_ts: str, pnl: float) -> None:
+    st = _registered(db_path)
+    if st is not None and st.loaded:
+        st.on_trade_close(close_ts, pnl)
+
+
+def notify_position(db_path: Any, symbol: str, side: Optional[str], qty: float) -> None:
+    st = _registered(db_path)
+    if st is not None and st.loaded:
+        st.on_position(symbol, side, qty)
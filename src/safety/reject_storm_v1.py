@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+import math
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from src.ops.clock_v1 import clock_monotonic
+
+# Real-time reject-storm detector (v18 Reject OS: storm -> cooldown / kill-switch).
+# - publish_reject(): called by PaperOMSRiskSafetyWrapperV1._insert_rejected_order right after the
+#   REJECTED row is written; synchronous in-process bus, listeners must be cheap and never raise
+# - RejectStormDetectorV1: SlidingWindowCounterV1 (time-bucketed ring, O(1) amortized add/count) per
+#   reject code and per domain, plus the total; thresholds from TMF_REJECT_STORM_*
+#   code  >= code_n   in window -> COOLDOWN (cooldown_sec) via SystemSafetyEngineV1.request_cooldown
+#   domain>= domain_n in window -> COOLDOWN
+#   total >= kill_n   in window -> KILL via request_kill (latched until reset())
+# - rejects caused by an active cooldown/kill (SAFETY_COOLDOWN_ACTIVE / SAFETY_KILL_SWITCH) are not counted,
+#   so the detector's own cooldown cannot escalate itself into a kill
+# Off with TMF_REJECT_STORM=0.
+# NOTE: Python 3.9.6 compatible
+
+IGNORE_CODES = ("SAFETY_COOLDOWN_ACTIVE", "SAFETY_KILL_SWITCH")
+STORM_COOLDOWN_CODE = "REJECT_STORM_COOLDOWN"
+STORM_KILL_CODE = "REJECT_STORM_KILL"
+
+
+def _env(name: str, default: str) -> str:
+    return (os.environ.get(name, default) or default).strip()
+
+
+def reject_storm_enabled() -> bool:
+    return _env("TMF_REJECT_STORM", "1").lower() in ("1", "true", "yes", "y", "on")
+
+
+class SlidingWindowCounterV1:
+    """Count of events in the last window_sec, at bucket_sec resolution (ring of ceil(window/bucket) slots)."""
+
+    __slots__ = ("bucket_sec", "n", "_counts", "_head", "total")
+
+    def __init__(self, window_sec: float, bucket_sec: float = 1.0):
+        self.bucket_sec = max(1e-3, float(bucket_sec))
+        self.n = max(1, int(math.ceil(float(window_sec) / self.bucket_sec)))
+        self._counts = [0] * self.n
+        self._head: Optional[int] = None   # newest bucket number seen
+        self.total = 0
+
+    def _advance(self, b: int) -> None:
+        if self._head is None:
+            self._head = b
+            return
+        if b <= self._head:
+            return
+        for i in range(1, min(b - self._head, self.n) + 1):
+            slot = (self._head + i) % self.n
+            self.total -= self._counts[slot]
+            self._counts[slot] = 0
+        self._head = b
+
+    def add(self, t: float, k: int = 1) -> None:
+        b = int(t // self.bucket_sec)
+        self._advance(b)
+        if b <= self._head - self.n:
+            return  # older than the window
+        self._counts[b % self.n] += k
+        self.total += k
+
+    def count(self, t: float) -> int:
+        self._advance(int(t // self.bucket_sec))
+        return self.total
+
+
+@dataclass(frozen=True)
+class RejectStormConfigV1:
+    window_sec: float = 60.0
+    bucket_sec: float = 1.0
+    code_n: int = 10            # same code within window -> COOLDOWN
+    domain_n: int = 20          # same domain within window -> COOLDOWN
+    kill_n: int = 60            # any rejects within window -> KILL (v18: reject storm cap per minute)
+    cooldown_sec: int = 120
+
+    @classmethod
+    def from_env(cls) -> "RejectStormConfigV1":
+        return cls(
+            window_sec=float(_env("TMF_REJECT_STORM_WINDOW_SEC", "60")),
+            bucket_sec=float(_env("TMF_REJECT_STORM_BUCKET_SEC", "1")),
+            code_n=int(_env("TMF_REJECT_STORM_CODE_N", "10")),
+            domain_n=int(_env("TMF_REJECT_STORM_DOMAIN_N", "20")),
+            kill_n=int(_env("TMF_REJECT_STORM_KILL_N", "60")),
+            cooldown_sec=int(_env("TMF_REJECT_STORM_COOLDOWN_SEC", "120")),
+        )
+
+
+def storm_action(cfg: RejectStormConfigV1, *, total: int, by_code: Dict[str, int], by_domain: Dict[str, int]) -> Optional[Dict[str, Any]]:
+    """Threshold rule shared by the live detector and the offline report: {action, key, n, limit} or None."""
+    if cfg.kill_n > 0 and total >= cfg.kill_n:
+        return {"action": "KILL", "key": "total", "n": int(total), "limit": cfg.kill_n}
+    for kind, counts, limit in (("code", by_code, cfg.code_n), ("domain", by_domain, cfg.domain_n)):
+        if limit <= 0:
+            continue
+        for k, n in sorted(counts.items(), key=lambda kv: -kv[1]):
+            if k in IGNORE_CODES:
+                continue
+            if n >= limit:
+                return {"action": "COOLDOWN", "key": f"{kind}:{k}", "n": int(n), "limit": int(limit)}
+            break
+    return None
+
+
+class RejectStormDetectorV1:
+    def __init__(self, *, cfg: Optional[RejectStormConfigV1] = None, safety: Any = None, db_path: str = ""):
+        self.cfg = cfg or RejectStormConfigV1()
+        self.safety = safety
+        self.db_path = str(db_path or getattr(safety, "db_path", "") or "")
+        self._lock = threading.Lock()
+        self._total = SlidingWindowCounterV1(self.cfg.window_sec, self.cfg.bucket_sec)
+        self._codes: Dict[str, SlidingWindowCounterV1] = {}
+        self._domains: Dict[str, SlidingWindowCounterV1] = {}
+        self._cooldown_until = 0.0
+        self._killed = False
+        self.decisions: Deque[Dict[str, Any]] = deque(maxlen=64)
+        self.stats = {"observed": 0, "ignored": 0, "cooldowns": 0, "kills": 0}
+
+    def _counter(self, m: Dict[str, SlidingWindowCounterV1], k: str) -> SlidingWindowCounterV1:
+        c = m.get(k)
+        if c is None:
+            c = m[k] = SlidingWindowCounterV1(self.cfg.window_sec, self.cfg.bucket_sec)
+        return c
+
+    def observe(self, code: Any, domain: Any = None, *, t: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Count one reject; returns the COOLDOWN/KILL decision it triggered (already executed), else None."""
+        t0 = time.perf_counter()
+        code = str(code or "UNKNOWN")
+        domain = str(domain or "UNKNOWN")
+        now = clock_monotonic() if t is None else float(t)
+        with self._lock:
+            if code in IGNORE_CODES:
+                self.stats["ignored"] += 1
+                return None
+            self.stats["observed"] += 1
+            self._total.add(now)
+            cc = self._counter(self._codes, code)
+            dc = self._counter(self._domains, domain)
+            cc.add(now)
+            dc.add(now)
+            # only the counters this reject touched can newly cross a threshold
+            hit = storm_action(self.cfg, total=self._total.total, by_code={code: cc.total}, by_domain={domain: dc.total})
+            if hit is None or self._killed:
+                return None
+            if hit["action"] == "COOLDOWN" and now < self._cooldown_until:
+                return None
+            dec = dict(hit, trigger_code=code, domain=domain, window_sec=self.cfg.window_sec, total=self._total.total)
+            if hit["action"] == "KILL":
+                self._killed = True
+                self.stats["kills"] += 1
+            else:
+                self._cooldown_until = now + float(self.cfg.cooldown_sec)
+                self.stats["cooldowns"] += 1
+        self._execute(dec)
+        dec["decide_ms"] = round((time.perf_counter() - t0) * 1000.0, 3)
+        with self._lock:
+            self.decisions.append(dec)
+        return dec
+
+    def _execute(self, dec: Dict[str, Any]) -> None:
+        if self.safety is None:
+            return
+        reason = f"reject storm: {dec['key']} n={dec['n']} >= {dec['limit']} in {int(self.cfg.window_sec)}s"
+        # compact details only (safety_state is rewritten on every request)
+        details = {"key": dec["key"], "n": dec["n"], "limit": dec["limit"], "window_sec": self.cfg.window_sec}
+        try:
+            if dec["action"] == "KILL":
+                self.safety.request_kill(code=STORM_KILL_CODE, reason=reason, details=details)
+            else:
+                self.safety.request_cooldown(seconds=int(self.cfg.cooldown_sec), code=STORM_COOLDOWN_CODE, reason=reason, details=details)
+        except Exception as e:
+            dec["error"] = f"{type(e).__name__}: {e}"
+
+    def on_reject(self, ev: Dict[str, Any]) -> None:
+        """Bus listener (see publish_reject)."""
+        if self.db_path and ev.get("db_path") and os.path.abspath(str(ev["db_path"])) != os.path.abspath(self.db_path):
+            return
+        self.observe(ev.get("code"), ev.get("domain"), t=ev.get("t"))
+
+    def snapshot(self, t: Optional[float] = None) -> Dict[str, Any]:
+        now = clock_monotonic() if t is None else float(t)
+        with self._lock:
+            by_code = {k: c.count(now) for k, c in self._codes.items()}
+            by_domain = {k: c.count(now) for k, c in self._domains.items()}
+            return {
+                "window_sec": self.cfg.window_sec,
+                "total": self._total.count(now),
+                "by_code": {k: n for k, n in by_code.items() if n},
+                "by_domain": {k: n for k, n in by_domain.items() if n},
+                "cooldown_active": now < self._cooldown_until,
+                "killed": self._killed,
+                "stats": dict(self.stats),
+                "decisions": list(self.decisions)[-8:],
+            }
+
+    def reset(self) -> None:
+        """Operator reset after a KILL (does not clear the safety kill-switch itself)."""
+        with self._lock:
+            self._killed = False
+            self._cooldown_until = 0.0
+
+
+# --- in-process reject bus ---
+_LISTENERS: List[Callable[[Dict[str, Any]], None]] = []
+_DETECTORS: Dict[str, RejectStormDetectorV1] = {}
+_BUS_LOCK = threading.Lock()
+
+
+def subscribe_rejects(fn: Callable[[Dict[str, Any]], None]) -> None:
+    with _BUS_LOCK:
+        if fn not in _LISTENERS:
+            _LISTENERS.append(fn)
+
+
+def unsubscribe_rejects(fn: Callable[[Dict[str, Any]], None]) -> None:
+    with _BUS_LOCK:
+        if fn in _LISTENERS:
+            _LISTENERS.remove(fn)
+
+
+def publish_reject(ev: Dict[str, Any]) -> None:
+    for fn in tuple(_LISTENERS):
+        try:
+            fn(ev)
+        except Exception:
+            pass
+
+
+def get_storm_detector(safety: Any) -> Optional[RejectStormDetectorV1]:
+    """Process-wide detector per safety DB, subscribed to the reject bus (None when disabled)."""
+    if not reject_storm_enabled():
+        return None
+    k = os.path.abspath(str(getattr(safety, "db_path", "") or ""))
+    with _BUS_LOCK:
+        det = _DETECTORS.get(k)
+        if det is None:
+            det = _DETECTORS[k] = RejectStormDetectorV1(cfg=RejectStormConfigV1.from_env(), safety=safety)
+            _LISTENERS.append(det.on_reject)
+        return det
+
+
+def storm_snapshots() -> Dict[str, Dict[str, Any]]:
+    with _BUS_LOCK:
+        dets = dict(_DETECTORS)
+    return {k: d.snapshot() for k, d in dets.items()}
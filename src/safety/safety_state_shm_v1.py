@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+import fcntl
+import json
+import mmap
+import os
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+# Shared-memory mirror of the kill / cooldown safety state (SystemSafetyEngineV1 hot path).
+# - one mmap'ed 4 KiB file per DB (<db>.safety_state.mmap, next to the DB like SQLite's -wal/-shm),
+#   mapped by every process that trades on that DB
+# - seqlock header: seq is odd while a writer is inside (writers serialize on flock), readers retry on
+#   a torn read; version counts state changes (one bump per publish)
+# - header: kill flag + cooldown until_epoch (the hot check reads only these), plus the JSON of each
+#   state for verdict details (decoded only when the check blocks)
+# - safety_state (SQLite) stays the durable truth: SystemSafetyEngineV1._set_state commits the row first,
+#   then publishes here. Writers that bypass the engine (direct SQL in ops scripts, other processes whose
+#   publish failed) are picked up through PRAGMA data_version: every guard read first asks a long-lived
+#   per-thread probe connection for it and re-reads safety_state whenever it moved, i.e. after any COMMIT
+#   to the DB by any other connection. Bound: an external kill / cooldown write is seen by the first check
+#   that starts after its COMMIT (cost per check: one PRAGMA, a few us; a 2-row SELECT only after some commit)
+# Off with TMF_SAFETY_STATE_SHM=0 (DB reads per check, as before); any mirror error falls back the same way.
+# NOTE: Python 3.9.6 compatible
+
+MAGIC = b"TMFSST1\x00"
+SIZE = 4096
+# magic, seq, version, kill, cooldown_until, kill_len, cd_len, kill_crc, cd_crc, synced_at (last resync that changed it)
+HEADER = struct.Struct("<8sQQ?7xdIIIId")
+_SLOTS = {"kill": (64, 2048), "cooldown": (2112, 1984)}   # key -> (offset, capacity)
+_SEQ = struct.Struct("<Q")
+_HOT = struct.Struct("<Q?7xd")                              # version, kill, cooldown_until (offset 16)
+_F64 = struct.Struct("<d")                                  # synced_at (offset 56)
+_MAX_SPIN = 100000
+STATE_KEYS = ("kill", "cooldown")
+
+
+def _env(name: str, default: str) -> str:
+    return (os.environ.get(name, default) or default).strip()
+
+
+def shm_enabled() -> bool:
+    return _env("TMF_SAFETY_STATE_SHM", "1").lower() in ("1", "true", "yes", "y", "on")
+
+
+def mirror_path(db_path: str) -> str:
+    return os.path.abspath(str(db_path)) + ".safety_state.mmap"
+
+
+def _loads(s: str) -> Dict[str, Any]:
+    try:
+        v = json.loads(s)
+        return v if isinstance(v, dict) else {}
+    except Exception:
+        return {}
+
+
+def _fit(value_json: str, cap: int) -> bytes:
+    b = value_json.encode("utf-8")
+    if len(b) <= cap:
+        return b
+    # keep the flag fields, drop the (bulky) details
+    v = {k: x for k, x in _loads(value_json).items() if k != "details"}
+    v["details_truncated"] = True
+    b = json.dumps(v, ensure_ascii=False).encode("utf-8")
+    return b if len(b) <= cap else b"{}"
+
+
+class SafetyStateShmV1:
+    """Process-local handle on the shared mirror (get_safety_state_shm keeps one per DB)."""
+
+    def __init__(self, db_path: str):
+        self.db_path = os.path.abspath(str(db_path))
+        self.path = mirror_path(db_path)
+        self._tlock = threading.Lock()
+        self._probe = threading.local()    # per-thread probe connection + data_version of the last resync
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(fd).st_size < SIZE:
+                    os.ftruncate(fd, SIZE)
+                self._mm = mmap.mmap(fd, SIZE, mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
+                if self._mm[:8] != MAGIC:
+                    self._mm[:SIZE] = b"\x00" * SIZE
+                    self._mm[:8] = MAGIC   # empty slots -> the first resync fills them from safety_state
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        except Exception:
+            os.close(fd)
+            raise
+        self._fd = fd
+        self.stats = {"reads": 0, "retries": 0, "publishes": 0, "resyncs": 0, "resync_changes": 0}
+
+    # ---- readers ----
+    def read_hot(self) -> Optional[Tuple[int, bool, float, float]]:
+        """(version, kill, cooldown_until, synced_at) under the seqlock; lock-free. None if a writer never finishes."""
+        mm = self._mm
+        for _ in range(_MAX_SPIN):
+            s1 = _SEQ.unpack_from(mm, 8)[0]
+            if not s1 & 1:
+                ver, kill, until = _HOT.unpack_from(mm, 16)
+                synced = _F64.unpack_from(mm, 56)[0]
+                if _SEQ.unpack_from(mm, 8)[0] == s1:
+                    self.stats["reads"] += 1
+                    return ver, kill, until, synced
+            self.stats["retries"] += 1
+        return None
+
+    def state(self, key: str) -> Optional[Dict[str, Any]]:
+        """Decoded JSON of kill / cooldown (verdict details); None if a writer never finishes."""
+        off = _SLOTS[key][0]
+        mm = self._mm
+        for _ in range(_MAX_SPIN):
+            s1 = _SEQ.unpack_from(mm, 8)[0]
+            if s1 & 1:
+                continue
+            h = HEADER.unpack_from(mm, 0)
+            raw = bytes(mm[off:off + (h[5] if key == "kill" else h[6])])
+            if _SEQ.unpack_from(mm, 8)[0] == s1:
+                try:
+                    v = json.loads(raw.decode("utf-8")) if raw else {}
+                    return v if isinstance(v, dict) else {}
+                except Exception:
+                    return {}
+        return None
+
+    def snapshot(self) -> Dict[str, Any]:
+        ver, kill, until, synced = self.read_hot() or (-1, False, 0.0, 0.0)
+        return {"path": self.path, "version": ver, "kill": bool(kill), "cooldown_until_epoch": until, "synced_at": synced,
+                "state": {k: self.state(k) for k in STATE_KEYS}, "stats": dict(self.stats)}
+
+    # ---- writers (thread lock inside the process, flock across processes) ----
+    @contextmanager
+    def _locked(self) -> Iterator[Any]:
+        with self._tlock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield self._mm
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _seq_write(self, mm: Any, fn: Callable[[Any], None]) -> None:
+        seq = _SEQ.unpack_from(mm, 8)[0]
+        seq += 2 if seq & 1 else 1            # odd while inside (a crashed writer may have left it odd)
+        _SEQ.pack_into(mm, 8, seq)
+        try:
+            fn(mm)
+        finally:
+            _SEQ.pack_into(mm, 8, seq + 1)
+
+    def _put(self, mm: Any, key: str, value_json: str) -> None:
+        off, cap = _SLOTS[key]
+        b = _fit(value_json, cap)
+        mm[off:off + len(b)] = b
+        h = list(HEADER.unpack_from(mm, 0))
+        v = _loads(value_json)
+        if key == "kill":
+            h[3] = bool(v.get("enabled"))
+            h[5], h[7] = len(b), zlib.crc32(value_json.encode("utf-8"))
+        else:
+            try:
+                h[4] = float(v.get("until_epoch", 0) or 0)
+            except Exception:
+                h[4] = 0.0
+            h[6], h[8] = len(b), zlib.crc32(value_json.encode("utf-8"))
+        h[2] += 1
+        HEADER.pack_into(mm, 0, *h)
+
+    def publish(self, key: str, value_json: str) -> None:
+        """Mirror one state row that was just committed to safety_state."""
+        if key not in _SLOTS:
+            return
+        with self._locked() as mm:
+            self._seq_write(mm, lambda m: self._put(m, key, value_json))
+        self.stats["publishes"] += 1
+
+    def data_version(self) -> int:
+        """PRAGMA data_version of this thread's probe connection (moves on every COMMIT by another connection)."""
+        p = self._probe
+        con = getattr(p, "con", None)
+        if con is None:
+            con = p.con = sqlite3.connect(self.db_path, isolation_level=None)
+            p.seen = None
+        return int(con.execute("PRAGMA data_version").fetchone()[0])
+
+    def maybe_resync(self, loader: Callable[[], Dict[str, Optional[str]]]) -> bool:
+        """
+        Re-read safety_state (loader -> {key: value_json or None}) on first use in this thread and whenever the
+        DB's data_version moved since the last resync here. Returns True if the mirror changed.
+        """
+        dv = self.data_version()
+        if self._probe.seen == dv:
+            return False
+        changed = self.resync(loader)
+        self._probe.seen = dv              # read before the load: a commit racing it moves the version again
+        return changed
+
+    def resync(self, loader: Callable[[], Dict[str, Optional[str]]], *, now: Optional[float] = None) -> bool:
+        t = time.time() if now is None else float(now)
+        # the DB read happens under the flock (a publish cannot interleave and be overwritten by an older row)
+        # but outside the seqlock section (readers never spin on SQLite); unchanged rows skip the seqlock
+        with self._locked() as mm:
+            rows = loader()
+            h = HEADER.unpack_from(mm, 0)
+            todo = []
+            for key, n, crc in (("kill", h[5], h[7]), ("cooldown", h[6], h[8])):
+                vj = rows.get(key) or "{}"
+                if n == 0 or zlib.crc32(vj.encode("utf-8")) != crc:
+                    todo.append((key, vj))
+
+            def _apply(m: Any) -> None:
+                for key, vj in todo:
+                    self._put(m, key, vj)
+                _F64.pack_into(m, 56, t)
+
+            if todo:
+                self._seq_write(mm, _apply)
+        self.stats["resyncs"] += 1
+        if todo:
+            self.stats["resync_changes"] += 1
+        return bool(todo)
+
+    def close(self) -> None:
+        con = getattr(self._probe, "con", None)
+        if con is not None:
+            self._probe.con = None
+            con.close()
+        try:
+            self._mm.close()
+        finally:
+            os.close(self._fd)
+
+
+_MIRRORS: Dict[str, SafetyStateShmV1] = {}
+_MIRRORS_LOCK = threading.Lock()
+
+
+def get_safety_state_shm(db_path: str) -> Optional[SafetyStateShmV1]:
+    """Process-wide mirror handle per DB (None when disabled or the mirror file cannot be mapped)."""
+    if not shm_enabled():
+        return None
+    k = os.path.abspath(str(db_path))
+    with _MIRRORS_LOCK:
+        m = _MIRRORS.get(k)
+        if m is None:
+            try:
+                m = _MIRRORS[k] = SafetyStateShmV1(k)
+            except Exception:
+                return None
+        return m
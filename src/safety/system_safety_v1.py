@@ -6,6 +6,10 @@ from dataclasses import dataclass, asdict
 from datetime import datetime, time, timezone
 from typing import Any, Dict, Optional, Tuple
 
+from src.data.sqlite_conn_v1 import connect_shared
+from src.ops.clock_v1 import clock_now
+from src.safety.safety_state_shm_v1 import STATE_KEYS, get_safety_state_shm
+
 
 @dataclass(frozen=True)
 class SafetyConfigV1:
@@ -50,13 +54,13 @@ def _parse_hhmm(s: str) -> time:
 
 def _today_ymd(now: Optional[datetime] = None) -> str:
     # Use local timezone to avoid TZ ambiguity during selftests / LaunchAgent runs.
-    now = now or datetime.now().astimezone()
+    now = now or clock_now().astimezone()
     return now.strftime("%Y-%m-%d")
 
 
 def _in_session(cfg: SafetyConfigV1, now: Optional[datetime] = None) -> bool:
     # Use local timezone to avoid TZ ambiguity during selftests / LaunchAgent runs.
-    now = now or datetime.now().astimezone()
+    now = now or clock_now().astimezone()
     o = _parse_hhmm(cfg.session_open_hhmm)
     c = _parse_hhmm(cfg.session_close_hhmm)
     tnow = now.time()
@@ -71,8 +75,21 @@ def _is_halt_day(cfg: SafetyConfigV1, now: Optional[datetime] = None) -> bool:
     return day in set(items)
 
 
+# check_pre_trade reads ~20 TMF_* knobs per call; os.getenv costs ~1-2us each (Mapping.get -> encodekey ->
+# decodevalue in Python), a lookup in os.environ's backing dict ~0.1us. Same values: os.environ writes go
+# through to it (POSIX only; elsewhere, or if the layout differs, plain os.getenv).
+_ENV_DATA = getattr(os.environ, "_data", None) if os.name == "posix" else None
+
+
+def _getenv(name: str, default: str = "") -> str:
+    if _ENV_DATA is None:
+        return os.getenv(name, default)
+    v = _ENV_DATA.get(name.encode("utf-8", "surrogateescape"))
+    return default if v is None else v.decode("utf-8", "surrogateescape")
+
+
 def _env_truthy(name: str, default: str = "0") -> bool:
-    v = str(os.getenv(name, default) or "").strip().lower()
+    v = str(_getenv(name, default) or "").strip().lower()
     return v in {"1","true","t","yes","y","on"}
 
 def _loads(s: Any) -> Dict[str, Any]:
@@ -101,11 +118,19 @@ class SystemSafetyEngineV1:
     - Optional session open/close guard.
     - Optional manual halt/expiry days list (patchable via config later).
     """
-    def __init__(self, *, db_path: str, cfg: Optional[SafetyConfigV1] = None):
+    def __init__(self, *, db_path: str, cfg: Optional[SafetyConfigV1] = None, quote_cache: Any = None):
         self.db_path = str(db_path)
         self.cfg = cfg or SafetyConfigV1()
+        # optional shared LatestQuoteCacheV1 (src.market.quote_cache_v1); DB lookups remain the fallback
+        self.quote_cache = quote_cache
+        self._state_table_ok = False
+        self._state_shm: Any = None   # SafetyStateShmV1 mirror of kill/cooldown (resolved on first use; False = off)
+        self._cfg_dict: Optional[Dict[str, Any]] = None
 
     def _ensure_safety_state_table(self, con: sqlite3.Connection) -> None:
+        # once per engine (the table is never dropped); was a CREATE per state read
+        if self._state_table_ok:
+            return
         con.execute(
             "CREATE TABLE IF NOT EXISTS safety_state("
             "key TEXT PRIMARY KEY,"
@@ -113,8 +138,47 @@ class SystemSafetyEngineV1:
             "ts TEXT"
             ")"
         )
+        self._state_table_ok = True
+
+    def _shm(self) -> Any:
+        m = self._state_shm
+        if m is None:
+            m = False
+            if self.db_path and self.db_path != ":memory:" and not self.db_path.startswith("file:"):
+                m = get_safety_state_shm(self.db_path) or False
+            self._state_shm = m
+        return m
+
+    def _load_state_rows(self) -> Dict[str, Optional[str]]:
+        con = self._con()
+        try:
+            self._ensure_safety_state_table(con)
+            rows = con.execute(
+                "SELECT key, value_json FROM safety_state WHERE key IN (%s)" % ",".join("?" * len(STATE_KEYS)),
+                STATE_KEYS,
+            ).fetchall()
+            return {str(r[0]): r[1] for r in rows}
+        finally:
+            con.close()
+
+    def _guard_state(self) -> Optional[Tuple[int, bool, float]]:
+        """(version, kill_enabled, cooldown_until_epoch) from the shared mirror; None -> read safety_state."""
+        m = self._shm()
+        if not m:
+            return None
+        try:
+            m.maybe_resync(self._load_state_rows)    # re-reads safety_state only after a commit (PRAGMA data_version)
+            h = m.read_hot()
+            return (int(h[0]), bool(h[1]), float(h[2])) if h else None
+        except Exception:
+            return None
 
     def _get_state(self, key: str) -> Optional[Dict[str, Any]]:
+        m = self._shm()
+        if m and key in STATE_KEYS and self._guard_state() is not None:
+            v = m.state(key)
+            if v is not None:
+                return v or None
         try:
             con = self._con()
             try:
@@ -132,17 +196,25 @@ class SystemSafetyEngineV1:
             return None
 
     def _set_state(self, key: str, value: Dict[str, Any]) -> None:
+        # safety_state is the durable truth: commit first, then publish to the shared mirror
+        value_json = json.dumps(value, ensure_ascii=False)
         con = self._con()
         try:
             self._ensure_safety_state_table(con)
             con.execute(
                 "INSERT INTO safety_state(key, value_json, ts) VALUES(?,?,?) "
                 "ON CONFLICT(key) DO UPDATE SET value_json=excluded.value_json, ts=excluded.ts",
-                (str(key), json.dumps(value, ensure_ascii=False), datetime.now().isoformat(timespec="seconds")),
+                (str(key), value_json, clock_now().isoformat(timespec="seconds")),
             )
             con.commit()
         finally:
             con.close()
+        m = self._shm()
+        if m:
+            try:
+                m.publish(str(key), value_json)
+            except Exception:
+                pass   # the commit moved data_version: readers resync from safety_state on their next check
 
     def request_cooldown(self, *, seconds: int, code: str, reason: str, details: Optional[Dict[str, Any]] = None) -> None:
         details = details or {}
@@ -151,7 +223,7 @@ class SystemSafetyEngineV1:
         if int(seconds) <= 0:
             self._set_state("cooldown", {"until_epoch": 0, "code": str(code), "reason": str(reason), "details": details})
             return
-        until = datetime.now().timestamp() + float(int(seconds))
+        until = clock_now().timestamp() + float(int(seconds))
         self._set_state("cooldown", {"until_epoch": until, "code": str(code), "reason": str(reason), "details": details})
 
     def request_kill(self, *, code: str, reason: str, details: Optional[Dict[str, Any]] = None) -> None:
@@ -166,9 +238,8 @@ class SystemSafetyEngineV1:
         self._set_state("kill", {"enabled": False})
 
     def _con(self) -> sqlite3.Connection:
-        con = sqlite3.connect(self.db_path)
-        con.row_factory = sqlite3.Row
-        return con
+        # long-lived per-thread connection (src.data.sqlite_conn_v1); close() on it is a no-op
+        return connect_shared(self.db_path, row_factory=sqlite3.Row)
 
     def _events_src(self, con: sqlite3.Connection) -> str:
         """Prefer sane timestamp view if present; fallback to raw events."""
@@ -188,6 +259,33 @@ class SystemSafetyEngineV1:
                 return 'events'
 
     def _latest_event_by_code(self, con: sqlite3.Connection, *, kind: str, code: str, scan_limit: int = 2000, reject_synthetic: bool = True) -> Optional[Tuple[int, str, Dict[str, Any]]]:
+        # Fast path: typed quotes_l5 (one indexed lookup, no payload_json decoding).
+        # Falls back to the events scan when disabled, when events_sane is present, or on any error.
+        if _env_truthy("TMF_QUOTES_L5", "1") and self._events_src(con) == "events":
+            allow_ops_seed = _env_truthy("TMF_DEV_ALLOW_OPS_SEED_BIDASK", "0")
+            if allow_ops_seed and _in_session(self.cfg):
+                allow_ops_seed = False
+            # Fastest path: shared in-memory latest-quote cache (incrementally refreshed from quotes_l5).
+            qc = self.quote_cache
+            if qc is not None and str(getattr(qc, "kind", "")) == str(kind) and _env_truthy("TMF_QUOTE_CACHE", "1"):
+                try:
+                    snap = qc.get(str(code), reject_synthetic=bool(reject_synthetic),
+                                  exclude_ops_seed=bool(reject_synthetic and not allow_ops_seed))
+                    return (int(snap.event_id or 0), str(snap.ts), snap.to_payload()) if snap else None
+                except Exception:
+                    pass
+            try:
+                from src.data.quotes_l5_v1 import latest_quote
+                q = latest_quote(
+                    con,
+                    code=str(code),
+                    kind=str(kind),
+                    reject_synthetic=bool(reject_synthetic),
+                    exclude_source_prefix=("ops_seed_" if (reject_synthetic and not allow_ops_seed) else None),
+                )
+                return (int(q["event_id"]), str(q["ts"]), q) if q else None
+            except Exception:
+                pass
         rows = con.execute(
             "SELECT id, ts, payload_json, source_file FROM %s WHERE kind=? ORDER BY id DESC LIMIT ?" % (self._events_src(con),),
             (str(kind), int(scan_limit)),
@@ -222,7 +320,7 @@ class SystemSafetyEngineV1:
 
             if now is None:
                 # If dt is timezone-aware, use timezone-aware now in same tz; else naive now
-                now = datetime.now(dt.tzinfo) if dt.tzinfo is not None else datetime.now()
+                now = clock_now(dt.tzinfo) if dt.tzinfo is not None else clock_now()
             else:
                 # Align tz awareness between now and dt
                 if dt.tzinfo is not None and now.tzinfo is None:
@@ -239,28 +337,32 @@ class SystemSafetyEngineV1:
         cfg = self.cfg
 
         # 0) global safety-state guards (cooldown / kill-switch)
-        st_kill = self._get_state("kill") or {}
-        if bool(st_kill.get("enabled")):
-            return SafetyVerdictV1(
-                False,
-                "SAFETY_KILL_SWITCH",
-                "kill-switch enabled; trading blocked",
-                {"kill": st_kill},
-            )
+        # hot path: kill flag + cooldown until from the shared mirror; state JSON is decoded only to block
+        hot = self._guard_state()
+        if hot is None or hot[1]:
+            st_kill = self._get_state("kill") or {}
+            if bool(st_kill.get("enabled")):
+                return SafetyVerdictV1(
+                    False,
+                    "SAFETY_KILL_SWITCH",
+                    "kill-switch enabled; trading blocked",
+                    {"kill": st_kill},
+                )
 
-        st_cd = self._get_state("cooldown") or {}
-        try:
-            until = float(st_cd.get("until_epoch", 0) or 0)
-        except Exception:
-            until = 0.0
-        now_ep = datetime.now().timestamp()
-        if until > now_ep:
-            return SafetyVerdictV1(
-                False,
-                "SAFETY_COOLDOWN_ACTIVE",
-                "cooldown active; trading blocked temporarily",
-                {"cooldown": st_cd, "now_epoch": now_ep},
-            )
+        now_ep = clock_now().timestamp()
+        if hot is None or hot[2] > now_ep:
+            st_cd = self._get_state("cooldown") or {}
+            try:
+                until = float(st_cd.get("until_epoch", 0) or 0)
+            except Exception:
+                until = 0.0
+            if until > now_ep:
+                return SafetyVerdictV1(
+                    False,
+                    "SAFETY_COOLDOWN_ACTIVE",
+                    "cooldown active; trading blocked temporarily",
+                    {"cooldown": st_cd, "now_epoch": now_ep},
+                )
 
         # A) Manual halt day (expiry/maintenance)
         if _is_halt_day(cfg):
@@ -281,6 +383,8 @@ class SystemSafetyEngineV1:
             )
 
         # C) Feed staleness guard from DB events (truth source)
+        # single quote lookup per check: its age also feeds the latency budget (feed_age_ms) below
+        feed_age_ms = 0
         if cfg.require_recent_bidask == 1:
             con = self._con()
             try:
@@ -316,13 +420,14 @@ class SystemSafetyEngineV1:
                     "cannot parse bidask event ts",
                     {"bidask_event_id": event_id, "ts": ts, "ts_used": str(ts_used)},
                 )
+            feed_age_ms = int(float(age) * 1000.0)
 
             # Allow dev override for regression/smoke: env > meta > cfg
             try:
                 meta_max = None
                 if isinstance(meta, dict):
                     meta_max = meta.get("max_bidask_age_seconds")
-                env_max = os.getenv("TMF_DEV_MAX_BIDASK_AGE_SECONDS", "").strip()
+                env_max = _getenv("TMF_DEV_MAX_BIDASK_AGE_SECONDS", "").strip()
                 if env_max != "":
                     max_age = float(env_max)
                 elif meta_max is not None:
@@ -373,7 +478,6 @@ class SystemSafetyEngineV1:
         # OS guard: latency + backpressure (queue/lag) -> COOLDOWN/KILL
         # Deterministic: any internal error -> COOLDOWN (fail-safe)
         try:
-            import os as _os
             from src.ops.latency.latency_budget import LatencyBudgetV1
             from src.ops.latency.backpressure_governor import BackpressureConfigV1, decide as bp_decide
 
@@ -383,7 +487,7 @@ class SystemSafetyEngineV1:
                         return int(float(meta[meta_key]))
                 except Exception:
                     pass
-                v = _os.getenv(env_key, "").strip()
+                v = _getenv(env_key, "").strip()
                 if v != "":
                     try:
                         return int(float(v))
@@ -391,53 +495,62 @@ class SystemSafetyEngineV1:
                         return default
                 return default
 
-            # feed_age_ms: derive from latest bidask's recv_ts/ingest_ts (when available)
-            feed_age_ms = 0
-            if cfg.require_recent_bidask == 1:
-                con2 = self._con()
-                try:
-                    ev2 = self._latest_event_by_code(
-                        con2,
-                        kind=cfg.bidask_kind,
-                        code=cfg.fop_code,
-                        reject_synthetic=bool(getattr(cfg, "reject_synthetic_bidask", 1)),
-                    )
-                finally:
-                    con2.close()
-                if ev2:
-                    _event_id2, _ts2, _payload2 = ev2
-                    if isinstance(_payload2, dict):
-                        ts_used2 = _payload2.get("recv_ts") or _payload2.get("ingest_ts") or _ts2
-                    else:
-                        ts_used2 = _ts2
-                    age2 = self._age_seconds(str(ts_used2))
-                    if age2 is not None:
-                        feed_age_ms = int(float(age2) * 1000.0)
-
+            # feed_age_ms: latest bidask's recv_ts/ingest_ts age, from the staleness guard above (C)
             broker_rtt_ms = 0
             oms_queue_depth = 0
+            gate_latency_ms = 0
             if isinstance(meta, dict):
                 try: broker_rtt_ms = int(meta.get("broker_rtt_ms", 0) or 0)
                 except Exception: broker_rtt_ms = 0
                 try: oms_queue_depth = int(meta.get("oms_queue_depth", 0) or 0)
                 except Exception: oms_queue_depth = 0
+                try: gate_latency_ms = int(meta.get("gate_latency_ms", 0) or 0)
+                except Exception: gate_latency_ms = 0
+
+            # measured gate-chain timing (rolling p95, fresh only) where meta does not supply the value
+            if (_getenv("TMF_LATBP_USE_GATE_LATENCY", "1") or "1").strip() == "1":
+                try:
+                    from src.ops.latency.gate_timing import load_gate_latency
+                    gl = load_gate_latency(max_age_sec=float(_meta_env_int(meta, "tmf_gate_latency_max_age_sec", "TMF_GATE_LATENCY_MAX_AGE_SEC", 5)),
+                                           db_path=self.db_path)
+                    if gl:
+                        if not (isinstance(meta, dict) and "broker_rtt_ms" in meta):
+                            broker_rtt_ms = int(gl.get("broker_rtt_ms", 0) or 0)
+                        if not (isinstance(meta, dict) and "gate_latency_ms" in meta):
+                            gate_latency_ms = int(gl.get("gate_latency_ms", 0) or 0)
+                except Exception:
+                    pass
+
+            # recorder async writer counters (fresh file only): pending records delay DB truth
+            if (_getenv("TMF_LATBP_USE_RECORDER_METRICS", "1") or "1").strip() == "1":
+                try:
+                    from src.broker.async_event_writer_v1 import load_writer_metrics
+                    wm = load_writer_metrics(max_age_sec=float(_meta_env_int(meta, "tmf_recorder_metrics_max_age_sec", "TMF_RECORDER_METRICS_MAX_AGE_SEC", 5)))
+                    if wm:
+                        oms_queue_depth = max(int(oms_queue_depth), int(wm.get("oms_queue_depth", 0) or 0))
+                        feed_age_ms = max(int(feed_age_ms), int(wm.get("feed_age_ms", 0) or 0))
+                except Exception:
+                    pass
 
             metrics = {
                 "feed_age_ms": int(feed_age_ms),
                 "broker_rtt_ms": int(broker_rtt_ms),
                 "oms_queue_depth": int(oms_queue_depth),
+                "gate_latency_ms": int(gate_latency_ms),
             }
 
             lat = LatencyBudgetV1(
                 max_feed_age_ms=_meta_env_int(meta, "tmf_max_feed_age_ms", "TMF_MAX_FEED_AGE_MS", 1500),
                 max_broker_rtt_ms=_meta_env_int(meta, "tmf_max_broker_rtt_ms", "TMF_MAX_BROKER_RTT_MS", 1200),
                 max_oms_queue_depth=_meta_env_int(meta, "tmf_max_oms_queue_depth", "TMF_MAX_OMS_QUEUE_DEPTH", 50),
+                max_gate_latency_ms=_meta_env_int(meta, "tmf_max_gate_latency_ms", "TMF_MAX_GATE_LATENCY_MS", 1000),
             )
             lv = lat.check(metrics)
 
             bp_cfg = BackpressureConfigV1(
                 cooldown_seconds=_meta_env_int(meta, "tmf_backpressure_cooldown_seconds", "TMF_BACKPRESSURE_COOLDOWN_SECONDS", 30),
                 kill_on_extreme=_meta_env_int(meta, "tmf_backpressure_kill_on_extreme", "TMF_BACKPRESSURE_KILL_ON_EXTREME", 1),
+                max_gate_latency_ms=_meta_env_int(meta, "tmf_max_gate_latency_ms", "TMF_MAX_GATE_LATENCY_MS", 1000),
             )
             bp = bp_decide(metrics, bp_cfg)
 
@@ -461,7 +574,9 @@ class SystemSafetyEngineV1:
                 pass
             return SafetyVerdictV1(False, "SAFETY_COOLDOWN_ACTIVE", "latency/backpressure module error -> cooldown", {"err": str(_e)})
 
-        return SafetyVerdictV1(True, "OK", "system safety pre-trade pass", {"cfg": asdict(cfg)})
+        if self._cfg_dict is None:
+            self._cfg_dict = asdict(cfg)
+        return SafetyVerdictV1(True, "OK", "system safety pre-trade pass", {"cfg": dict(self._cfg_dict)})
 
 # Backward-compatible alias (do not remove)
 SystemSafetyV1 = SystemSafetyEngineV1
@@ -0,0 +1,597 @@
+"""
+TMF AutoTrader - Offline backtest over bars_1m (v1)
+
+Why:
+- run_strategies_paper_v1 / run_strategies_paper_loop_v1 place at most one order per run/bar,
+  write every order through SQLite and poll; unusable for evaluating a strategy over months.
+
+What:
+- load a symbol's bars_1m history ONCE into column arrays (numpy if installed, else array('d'))
+- drive the existing strategies bar by bar (on_bar), or through indicator kernels that reproduce
+  their on_bar signals exactly (TrendStrategyV1 / MeanReversionStrategyV1; use_kernels=True)
+- MARKET fills at bar close +/- slippage_model_v1; fee/tax per side from cost_model_v1
+  (calibrated_slippage=True: implicit_cost_v1 table vs the close as mid, session of the bar, regime from its h - l)
+- position/trade book mirrors PaperOMS (single position per symbol, avg-in, close/flip)
+- trades, fills and the per-bar equity curve stay in memory (BacktestResultV1)
+
+Semantics (kept aligned with the paper runners):
+- decision at bar close; every strategy sees every bar, the FIRST signal of a bar is executed
+  (one_order_per_bar, like TMF_ONE_ORDER_PER_BAR=1)
+- StrategyContextV1.state is fresh per bar, as in the runners
+- stops are informational in PaperOMS; honor_stops=True adds an intrabar stop exit
+
+NOTE: Python 3.9.6 compatible
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from array import array
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+try:  # optional accelerator; every kernel has a stdlib path
+    import numpy as np  # type: ignore
+except Exception:  # pragma: no cover
+    np = None  # type: ignore
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.cost.cost_model_v1 import DEFAULT_FEE_BY_SYMBOL, DEFAULT_MULTIPLIER_BY_SYMBOL, TAX_RATE_EQUITY_FUTURES, FeeSpec
+from src.cost.implicit_cost_v1 import get_implicit_cost_model, session_of, vol_regime
+from src.oms.models_v1 import Position, Trade
+from src.sim.slippage_model_v1 import SlippageSpec, calc_slippage_points
+from src.strat.strategy_base_v1 import StrategyContextV1, StrategySignalV1
+
+
+def _base_symbol(sym: str) -> str:
+    # rolling codes like TMFB6 map to TMF (same rule as PaperOMS)
+    s = str(sym or "")
+    for b in ("TMF", "TXF", "MXF"):
+        if s.startswith(b):
+            return b
+    return s
+
+
+def _farray(xs: Sequence[float]) -> Any:
+    return np.asarray(xs, dtype=np.float64) if np is not None else array("d", xs)
+
+
+# ---------------------------------------------------------------------------
+# data
+# ---------------------------------------------------------------------------
+
+@dataclass
+class BarArraysV1:
+    symbol: str
+    ts: List[str]
+    o: Any
+    h: Any
+    l: Any
+    c: Any
+    v: Any
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def bar(self, i: int) -> Dict[str, Any]:
+        """Runner-shaped bar dict (what on_bar receives from _fetch_recent_bars_1m)."""
+        return {"ts_min": self.ts[i], "o": float(self.o[i]), "h": float(self.h[i]), "l": float(self.l[i]),
+                "c": float(self.c[i]), "v": float(self.v[i])}
+
+    @classmethod
+    def from_rows(cls, symbol: str, rows: Sequence[Sequence[Any]]) -> "BarArraysV1":
+        """rows: (ts_min, o, h, l, c, v) ascending."""
+        return cls(
+            symbol=str(symbol),
+            ts=[str(r[0]) for r in rows],
+            o=_farray([float(r[1]) for r in rows]),
+            h=_farray([float(r[2]) for r in rows]),
+            l=_farray([float(r[3]) for r in rows]),
+            c=_farray([float(r[4]) for r in rows]),
+            v=_farray([float(r[5] or 0.0) for r in rows]),
+        )
+
+
+def load_bars_1m(
+    db_path: str,
+    symbol: str,
+    *,
+    asset_class: str = "FOP",
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+) -> BarArraysV1:
+    """One indexed scan of bars_1m for symbol (ts_min ascending) into column arrays."""
+    q = "SELECT ts_min, o, h, l, c, v FROM bars_1m WHERE symbol=? AND asset_class=?"
+    params: List[Any] = [str(symbol), str(asset_class)]
+    if since:
+        q += " AND ts_min >= ?"
+        params.append(str(since))
+    if until:
+        q += " AND ts_min <= ?"
+        params.append(str(until))
+    q += " ORDER BY ts_min ASC"
+    con = sqlite3.connect(str(db_path))
+    try:
+        rows = con.execute(q, params).fetchall()
+    finally:
+        con.close()
+    return BarArraysV1.from_rows(str(symbol), rows)
+
+
+def load_bars_1m_from_archive(
+    root: str,
+    symbol: str,
+    *,
+    kind: str = "tick_fop_v1",
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+) -> BarArraysV1:
+    """bars_1m built from the tick archive (src.data.tick_archive_v1) days in [since, until]; no DB, no JSON."""
+    from src.data.tick_archive_v1 import TickArchiveV1, find_archives
+    rows: List[Any] = []
+    for p in find_archives(str(root), str(symbol), str(kind), since=since, until=until):
+        with TickArchiveV1(p) as a:
+            rows.extend(r for r in a.bars_1m_rows() if (not since or r[0] >= since) and (not until or r[0] <= until))
+    return BarArraysV1.from_rows(str(symbol), rows)
+
+
+# shared read-only bars for worker processes: o/h/l/c/v as one float64 file (column-major), mmap'ed
+_SHARED_COLS = ("o", "h", "l", "c", "v")
+
+
+def save_bars_shared(bars: BarArraysV1, out_dir: Path) -> Dict[str, Any]:
+    """Write bars as cols.f64 + ts.txt + meta.json (meta carries sha256 of both files)."""
+    import hashlib
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    buf = array("d")
+    for k in _SHARED_COLS:
+        buf.extend(float(x) for x in getattr(bars, k))
+    raw = buf.tobytes()
+    (out_dir / "cols.f64").write_bytes(raw)
+    ts_txt = "\n".join(bars.ts)
+    (out_dir / "ts.txt").write_text(ts_txt, encoding="utf-8")
+    h = hashlib.sha256()
+    h.update(raw)
+    h.update(ts_txt.encode("utf-8"))
+    meta = {"symbol": bars.symbol, "n": len(bars), "cols": list(_SHARED_COLS), "sha256": h.hexdigest()}
+    (out_dir / "meta.json").write_text(json.dumps(meta, ensure_ascii=False) + "\n", encoding="utf-8")
+    return meta
+
+
+def open_bars_shared(in_dir: Path) -> BarArraysV1:
+    """Zero-copy view over save_bars_shared output (np.memmap, else mmap + memoryview.cast('d'))."""
+    import mmap
+    in_dir = Path(in_dir)
+    meta = json.loads((in_dir / "meta.json").read_text(encoding="utf-8"))
+    n = int(meta["n"])
+    ts = (in_dir / "ts.txt").read_text(encoding="utf-8").split("\n") if n else []
+    if n == 0:
+        return BarArraysV1(symbol=str(meta["symbol"]), ts=[], o=_farray([]), h=_farray([]), l=_farray([]), c=_farray([]), v=_farray([]))
+    if np is not None:
+        m = np.memmap(str(in_dir / "cols.f64"), dtype=np.float64, mode="r", shape=(len(_SHARED_COLS), n))
+        cols = [m[j] for j in range(len(_SHARED_COLS))]
+    else:
+        with (in_dir / "cols.f64").open("rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        mv = memoryview(mm).cast("d")
+        cols = [mv[j * n:(j + 1) * n] for j in range(len(_SHARED_COLS))]
+    return BarArraysV1(str(meta["symbol"]), ts, *cols)
+
+
+# ---------------------------------------------------------------------------
+# indicator kernels: per-bar (side, stop_price, reason) identical to strategy.on_bar
+# ---------------------------------------------------------------------------
+
+KernelOut = List[Optional[Tuple[str, float, str]]]
+
+
+def _rolling_extreme(xs: Any, w: int, *, use_max: bool) -> List[float]:
+    """max/min over the trailing window of size <= w (includes current bar)."""
+    n = len(xs)
+    if np is not None:
+        a = np.asarray(xs, dtype=np.float64)
+        if n == 0:
+            return []
+        pad = np.full(w - 1, -np.inf if use_max else np.inf)
+        win = np.lib.stride_tricks.sliding_window_view(np.concatenate([pad, a]), w)
+        return (win.max(axis=1) if use_max else win.min(axis=1)).tolist()
+    out: List[float] = []
+    dq: deque = deque()  # monotonic deque of indices
+    for i in range(n):
+        x = xs[i]
+        if use_max:
+            while dq and xs[dq[-1]] <= x:
+                dq.pop()
+        else:
+            while dq and xs[dq[-1]] >= x:
+                dq.pop()
+        dq.append(i)
+        if dq[0] <= i - w:
+            dq.popleft()
+        out.append(xs[dq[0]])
+    return out
+
+
+def trend_kernel_v1(strat: Any, bars: BarArraysV1) -> KernelOut:
+    """TrendStrategyV1.on_bar over a fresh instance: Donchian breakout on the strategy's rolling window + Wilder ATR."""
+    w = int(getattr(getattr(strat, "_highs", None), "maxlen", None) or 512)
+    lookback = int(strat.lookback)
+    atr_n = max(1, int(strat.atr_n))
+    atr_mult = float(strat.atr_mult)
+    hh = _rolling_extreme(bars.h, w, use_max=True)
+    ll = _rolling_extreme(bars.l, w, use_max=False)
+    out: KernelOut = [None] * len(bars)
+    atr: Optional[float] = None
+    prev_c: Optional[float] = None
+    h_, l_, c_ = bars.h, bars.l, bars.c
+    for i in range(len(bars)):
+        h = float(h_[i]); l = float(l_[i]); c = float(c_[i])
+        tr = (h - l) if prev_c is None else max(h - l, abs(h - prev_c), abs(l - prev_c))
+        atr = tr if atr is None else (atr * (atr_n - 1) + tr) / atr_n
+        prev_c = c
+        if i + 1 < lookback:
+            continue
+        hi = hh[i]; lo = ll[i]
+        if c >= hi and (hi - lo) > 0:
+            side, reason = "BUY", "trend_v1:donchian_breakout_up"
+        elif c <= lo and (hi - lo) > 0:
+            side, reason = "SELL", "trend_v1:donchian_breakout_down"
+        else:
+            continue
+        stop_dist = max(1e-9, atr_mult * float(max(0.0, atr)))
+        out[i] = (side, (c - stop_dist) if side == "BUY" else (c + stop_dist), reason)
+    return out
+
+
+def mean_reversion_kernel_v1(strat: Any, bars: BarArraysV1) -> KernelOut:
+    """MeanReversionStrategyV1.on_bar with per-bar ctx.state (runner semantics): z-score of the last lookback_n closes."""
+    cfg = strat.cfg
+    n = int(cfg.lookback_n)
+    need = int(getattr(strat, "lookback", n)) + 2
+    entry_z = abs(float(cfg.entry_z))
+    stop_pts = float(cfg.stop_pts)
+    c_ = bars.c
+    N = len(bars)
+    out: KernelOut = [None] * N
+    if N == 0 or n <= 0:
+        return out
+    if np is not None and N >= n:
+        win = np.lib.stride_tricks.sliding_window_view(np.asarray(c_, dtype=np.float64), n)
+        mus = win.mean(axis=1)
+        sds = win.std(axis=1)
+    else:
+        mus = sds = None
+    for i in range(max(need - 1, n - 1), N):
+        c = float(c_[i])
+        if mus is not None:
+            mu = float(mus[i - n + 1]); sd = float(sds[i - n + 1])
+        else:
+            xs = [float(x) for x in c_[i - n + 1:i + 1]]
+            mu = sum(xs) / n
+            sd = (sum((x - mu) ** 2 for x in xs) / n) ** 0.5 if n > 1 else 0.0
+        if sd <= 0:
+            continue
+        z = (c - mu) / sd
+        if z <= -entry_z:
+            out[i] = ("BUY", c - stop_pts, f"meanrev_v1:z_le(-{cfg.entry_z})")
+        elif z >= entry_z:
+            out[i] = ("SELL", c + stop_pts, f"meanrev_v1:z_ge(+{cfg.entry_z})")
+    return out
+
+
+def _env_on(name: str) -> bool:
+    return str(os.environ.get(name, "0")).strip().lower() in ("1", "true", "yes", "y", "on")
+
+
+def _kernel_for(strat: Any) -> Optional[Callable[[Any, BarArraysV1], KernelOut]]:
+    """Kernels only replace a FRESH instance without dev force-first hooks; anything else runs on_bar."""
+    cls = strat.__class__.__name__
+    if cls == "TrendStrategyV1" and not _env_on("TMF_TREND_FORCE_FIRST_SIGNAL") and not getattr(strat, "_closes", None):
+        return trend_kernel_v1
+    if cls == "MeanReversionStrategyV1" and not bool(getattr(strat.cfg, "force_first", False)) and not getattr(strat, "_bars", None):
+        return mean_reversion_kernel_v1
+    return None
+
+
+# ---------------------------------------------------------------------------
+# engine
+# ---------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class BacktestConfigV1:
+    symbol: str = "TMFB6"
+    use_kernels: bool = True
+    one_order_per_bar: bool = True
+    honor_stops: bool = False
+    slippage: Optional[SlippageSpec] = None      # None -> slippage_model_v1 default for the base symbol
+    calibrated_slippage: bool = False            # calibrated table (fallback / cap: the slippage spec)
+    fee: Optional[FeeSpec] = None                # None -> cost_model_v1 default for the base symbol
+    tax_rate: float = TAX_RATE_EQUITY_FUTURES
+    multiplier: Optional[float] = None           # None -> cost_model_v1 multiplier
+    qty_override: Optional[float] = None
+
+
+@dataclass
+class BacktestResultV1:
+    symbol: str
+    n_bars: int
+    fills: List[Dict[str, Any]] = field(default_factory=list)
+    trades: List[Dict[str, Any]] = field(default_factory=list)
+    equity_ts: List[str] = field(default_factory=list)
+    equity: Any = None
+    summary: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self, *, with_equity: bool = False) -> Dict[str, Any]:
+        d = {"symbol": self.symbol, "n_bars": self.n_bars, "summary": dict(self.summary),
+             "fills": list(self.fills), "trades": list(self.trades)}
+        if with_equity:
+            d["equity_ts"] = list(self.equity_ts)
+            d["equity"] = [float(x) for x in (self.equity if self.equity is not None else [])]
+        return d
+
+
+class _BookV1:
+    """PaperOMS._apply_fill_to_position_and_trade, in memory (+ exact realized pnl for the equity curve)."""
+
+    def __init__(self, symbol: str, mult: float):
+        self.symbol = symbol
+        self.mult = float(mult)
+        self.pos = Position(symbol=symbol)
+        self.trades: List[Trade] = []
+        self.realized = 0.0
+
+    def signed_qty(self) -> float:
+        return self.pos.qty if self.pos.side == "LONG" else (-self.pos.qty if self.pos.side == "SHORT" else 0.0)
+
+    def unrealized(self, px: float) -> float:
+        if not self.pos.qty:
+            return 0.0
+        sign = 1.0 if self.pos.side == "LONG" else -1.0
+        return (float(px) - self.pos.avg_price) * sign * self.pos.qty * self.mult
+
+    def _open(self, *, ts: str, side: str, qty: float, px: float, reason_open: str) -> None:
+        pos = self.pos
+        pos.qty = qty
+        pos.side = side  # type: ignore[assignment]
+        pos.avg_price = px
+        pos.open_ts = ts
+        self.trades.append(Trade(trade_id=str(len(self.trades) + 1), open_ts=ts, close_ts=None, symbol=self.symbol,
+                                 side=side, qty=qty, entry=px, reason_open=reason_open,  # type: ignore[arg-type]
+                                 meta={"multiplier": self.mult}))
+
+    def apply_fill(self, *, ts: str, side: str, qty: float, px: float, reason: str) -> None:
+        pos = self.pos
+        signed = qty if side == "BUY" else -qty
+        if pos.qty == 0.0:
+            self._open(ts=ts, side=("LONG" if signed > 0 else "SHORT"), qty=abs(signed), px=px, reason_open="fill_open")
+            return
+        sign = 1.0 if pos.side == "LONG" else -1.0
+        if (pos.side == "LONG" and signed > 0) or (pos.side == "SHORT" and signed < 0):
+            new_qty = pos.qty + abs(signed)
+            pos.avg_price = (pos.avg_price * pos.qty + px * abs(signed)) / new_qty
+            pos.qty = new_qty
+            return
+        reduce_qty = abs(signed)
+        if reduce_qty < pos.qty - 1e-9:
+            # v1 book: trade row stays open until flat; equity still books the realized part
+            self.realized += (px - pos.avg_price) * sign * reduce_qty * self.mult
+            pos.qty = pos.qty - reduce_qty
+            return
+        closed_qty = pos.qty
+        entry = pos.avg_price
+        pnl = (px - entry) * sign * closed_qty * self.mult
+        self.realized += pnl
+        t = self.trades[-1]
+        t.close_ts = ts
+        t.exit = px
+        t.pnl_ntd = pnl
+        t.pnl_pct = 0.0 if entry <= 0 else (pnl / (entry * closed_qty * self.mult))
+        t.reason_close = reason
+        leftover = reduce_qty - closed_qty
+        pos.qty = 0.0
+        pos.side = None
+        pos.avg_price = 0.0
+        pos.open_ts = None
+        if leftover > 1e-9:
+            self._open(ts=ts, side=("LONG" if signed > 0 else "SHORT"), qty=leftover, px=px, reason_open="fill_flip_open")
+
+
+class BacktestEngineV1:
+    def __init__(self, strategies: Sequence[Any], cfg: Optional[BacktestConfigV1] = None):
+        self.strategies = list(strategies)
+        self.cfg = cfg or BacktestConfigV1()
+        self._impl: List[str] = []
+
+    def _cost_params(self) -> Tuple[float, float, SlippageSpec]:
+        base = _base_symbol(self.cfg.symbol)
+        mult = float(self.cfg.multiplier if self.cfg.multiplier is not None else DEFAULT_MULTIPLIER_BY_SYMBOL.get(base, 1.0))
+        fee = self.cfg.fee if self.cfg.fee is not None else DEFAULT_FEE_BY_SYMBOL.get(base, FeeSpec())
+        slp = self.cfg.slippage if self.cfg.slippage is not None else SlippageSpec()
+        return mult, float(fee.per_side_total), slp
+
+    def _signals(self, bars: BarArraysV1) -> List[Optional[Tuple[int, str, float, float, str]]]:
+        """Per bar: (strategy_idx, side, qty, stop_price, reason) of the first signalling strategy."""
+        N = len(bars)
+        per_strat: List[Optional[KernelOut]] = []
+        live: List[int] = []
+        self._impl = []
+        for k, s in enumerate(self.strategies):
+            kern = _kernel_for(s) if self.cfg.use_kernels else None
+            per_strat.append(kern(s, bars) if kern is not None else None)
+            self._impl.append(kern.__name__ if kern is not None else "on_bar")
+            if kern is None:
+                live.append(k)
+        out: List[Optional[Tuple[int, str, float, float, str]]] = [None] * N
+        for i in range(N):
+            bar = bars.bar(i) if live else None
+            first: Optional[Tuple[int, str, float, float, str]] = None
+            for k, s in enumerate(self.strategies):
+                ks = per_strat[k]
+                if ks is not None:
+                    hit = ks[i]
+                    if hit is not None and first is None:
+                        first = (k, hit[0], self._qty(s, None), float(hit[1]), hit[2])
+                    continue
+                ctx = StrategyContextV1(now_ts=bars.ts[i], symbol=bars.symbol, state={})
+                fn = getattr(s, "on_bar", None) or getattr(s, "on_bar_1m", None)
+                sig = fn(ctx, bar) if fn else None
+                if sig is not None and first is None:
+                    stop = sig.stop_price if sig.stop_price is not None else float("nan")
+                    first = (k, str(sig.side), self._qty(s, sig), float(stop), str(sig.reason or ""))
+            out[i] = first
+        return out
+
+    def _qty(self, strat: Any, sig: Optional[StrategySignalV1]) -> float:
+        if self.cfg.qty_override is not None:
+            return float(self.cfg.qty_override)
+        if sig is not None:
+            return float(sig.qty)
+        cfg = getattr(strat, "cfg", None)
+        return float(getattr(cfg, "qty", None) or getattr(strat, "qty", 1.0))
+
+    def run(self, bars: BarArraysV1) -> BacktestResultV1:
+        t0 = time.perf_counter()
+        cfg = self.cfg
+        mult, fee_per_side, slp_spec = self._cost_params()
+        vol_edges = get_implicit_cost_model().cfg.vol_edges if cfg.calibrated_slippage else (0.0, 0.0)
+        book = _BookV1(cfg.symbol, mult)
+        res = BacktestResultV1(symbol=cfg.symbol, n_bars=len(bars))
+        sigs = self._signals(bars)
+        t_sig = time.perf_counter() - t0
+
+        costs = 0.0
+        eq: List[float] = []
+        stop_px: Optional[float] = None
+
+        def _fill(i: int, side: str, qty: float, ref_px: float, reason: str, strat_name: str) -> None:
+            nonlocal costs
+            if cfg.calibrated_slippage:
+                # decision at the close of bar i: its range is the last completed minute (implicit_cost_v1 regime)
+                slp = calc_slippage_points(price=ref_px, symbol=_base_symbol(cfg.symbol), side=side, qty=qty,
+                                           spec_override=slp_spec, session=session_of(bars.ts[i]),
+                                           regime=vol_regime(float(bars.h[i]) - float(bars.l[i]), vol_edges),
+                                           calibrated=True, reference="mid")
+            else:
+                slp = calc_slippage_points(price=ref_px, symbol=_base_symbol(cfg.symbol), side=side, qty=qty,
+                                           spec_override=slp_spec, calibrated=False)
+            px = float(ref_px + slp) if side == "BUY" else float(ref_px - slp)
+            fee = fee_per_side * float(qty)
+            tax = px * mult * float(qty) * float(cfg.tax_rate)
+            costs += fee + tax
+            res.fills.append({"ts": bars.ts[i], "bar_idx": i, "side": side, "qty": float(qty), "price": px,
+                              "ref_price": float(ref_px), "slippage_points": float(slp), "fee": fee, "tax": tax,
+                              "reason": reason, "strat": strat_name})
+            book.apply_fill(ts=bars.ts[i], side=side, qty=float(qty), px=px, reason=reason)
+
+        for i in range(len(bars)):
+            c = float(bars.c[i])
+            # intrabar stop (optional; PaperOMS does not manage stops)
+            if cfg.honor_stops and stop_px is not None and book.pos.qty > 0:
+                if book.pos.side == "LONG" and float(bars.l[i]) <= stop_px:
+                    _fill(i, "SELL", book.pos.qty, min(stop_px, float(bars.o[i])), "stop", "engine")
+                    stop_px = None
+                elif book.pos.side == "SHORT" and float(bars.h[i]) >= stop_px:
+                    _fill(i, "BUY", book.pos.qty, max(stop_px, float(bars.o[i])), "stop", "engine")
+                    stop_px = None
+            sg = sigs[i]
+            if sg is not None:
+                k, side, qty, stop, reason = sg
+                _fill(i, side, qty, c, reason, getattr(self.strategies[k], "name", "?"))
+                if stop == stop:  # not NaN
+                    stop_px = stop
+            eq.append(book.realized + book.unrealized(c) - costs)
+
+        res.trades = [
+            {"open_ts": t.open_ts, "close_ts": t.close_ts, "symbol": t.symbol, "side": t.side, "qty": float(t.qty),
+             "entry": float(t.entry), "exit": (None if t.exit is None else float(t.exit)),
+             "pnl": (None if t.pnl_ntd is None else float(t.pnl_ntd)),
+             "pnl_pct": (None if t.pnl_pct is None else float(t.pnl_pct)),
+             "reason_open": t.reason_open, "reason_close": t.reason_close}
+            for t in book.trades
+        ]
+        res.equity_ts = list(bars.ts)
+        res.equity = _farray(eq)
+        peak = float("-inf")
+        mdd = 0.0
+        for x in eq:
+            peak = max(peak, x)
+            mdd = max(mdd, peak - x)
+        closed = [t for t in res.trades if t["pnl"] is not None]
+        res.summary = {
+            "n_bars": len(bars),
+            "n_fills": len(res.fills),
+            "n_trades_closed": len(closed),
+            "win_rate": (sum(1 for t in closed if t["pnl"] > 0) / len(closed)) if closed else None,
+            "gross_pnl_ntd": float(book.realized + (book.unrealized(float(bars.c[-1])) if len(bars) else 0.0)),
+            "costs_ntd": float(costs),
+            "net_pnl_ntd": float(eq[-1]) if eq else 0.0,
+            "max_drawdown_ntd": float(mdd),
+            "open_position": {"side": book.pos.side, "qty": float(book.pos.qty), "avg_price": float(book.pos.avg_price)},
+            "impl": list(self._impl),
+            "numpy": bool(np is not None),
+            "secs_signals": round(t_sig, 4),
+            "secs_total": round(time.perf_counter() - t0, 4),
+        }
+        return res
+
+
+def load_strategies_from_env() -> List[Any]:
+    """Same TMF_STRATEGIES / TMF_QTY / TMF_MR_* knobs as run_strategies_paper_v1."""
+    from src.strat.mean_reversion_v1 import MeanReversionStrategyV1
+    from src.strat.trend_v1 import TrendStrategyV1
+    spec = (os.environ.get("TMF_STRATEGIES", "trend,mean_reversion") or "trend,mean_reversion").strip()
+    out: List[Any] = []
+    for k in [s.strip().lower() for s in spec.split(",") if s.strip()]:
+        if k in ("trend", "trend_v1"):
+            out.append(TrendStrategyV1.from_env(qty=float(os.environ.get("TMF_QTY", "2.0"))))
+        elif k in ("mr", "mean_reversion", "mean_reversion_v1"):
+            out.append(MeanReversionStrategyV1.from_env())
+        else:
+            print(f"[WARN] unknown strategy key: {k} (skip)")
+    return out
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="TMF AutoTrader offline backtest over bars_1m (v1)")
+    ap.add_argument("--db", default=os.environ.get("TMF_DB_PATH", "runtime/data/tmf_autotrader_v1.sqlite3"))
+    ap.add_argument("--symbol", default=(os.environ.get("TMF_FOP_CODE", "TMFB6") or "TMFB6").strip())
+    ap.add_argument("--since", default=None)
+    ap.add_argument("--archive-dir", default="", help="build bars from the tick archive (src/data/tick_archive_v1.py) instead of bars_1m")
+    ap.add_argument("--until", default=None)
+    ap.add_argument("--no-kernels", action="store_true", help="drive every strategy through on_bar")
+    ap.add_argument("--honor-stops", action="store_true")
+    ap.add_argument("--calibrated-slippage", action="store_true", help="slippage from the implicit cost table (src/cost/implicit_cost_v1.py)")
+    ap.add_argument("--out", default="", help="write result JSON (with equity curve) here")
+    args = ap.parse_args(argv)
+
+    t0 = time.perf_counter()
+    if args.archive_dir:
+        bars = load_bars_1m_from_archive(str(args.archive_dir), str(args.symbol), since=args.since, until=args.until)
+    else:
+        bars = load_bars_1m(str(args.db), str(args.symbol), since=args.since, until=args.until)
+    t_load = time.perf_counter() - t0
+    eng = BacktestEngineV1(load_strategies_from_env(),
+                           BacktestConfigV1(symbol=str(args.symbol), use_kernels=not args.no_kernels, honor_stops=bool(args.honor_stops),
+                                            calibrated_slippage=bool(args.calibrated_slippage)))
+    res = eng.run(bars)
+    res.summary["secs_load"] = round(t_load, 4)
+    print(json.dumps(res.summary, ensure_ascii=False, indent=2))
+    if args.out:
+        outp = Path(args.out)
+        outp.parent.mkdir(parents=True, exist_ok=True)
+        outp.write_text(json.dumps(res.to_dict(with_equity=True), ensure_ascii=False) + "\n", encoding="utf-8")
+        print(f"[OK] wrote {outp}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
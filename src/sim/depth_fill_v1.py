@@ -0,0 +1,290 @@
+"""
+TMF AutoTrader — order-book-aware paper fills v1 (bidask_fop_v1 L1..L5 depth instead of one market price)
+
+Why:
+- PaperOMS.match fills a MARKET order entirely at one market_price, capped by a flat liquidity_qty
+  (TMF_PAPER_MATCH_LIQ_QTY): large TMF orders get top-of-book prices for size that was never displayed.
+
+What:
+- DepthFillEngineV1 keeps the latest five-level book of one FOP code in flat arrays (array('d'): prices,
+  volumes, volume already taken by our own fills in this snapshot); on_quote() rewrites them in place
+- match(): taker fill walks the opposite side from the touch (up to the limit price for LIMIT orders),
+  ONE PaperOMS fill per call at the VWAP of the levels taken (levels in the fill meta). Size beyond the
+  displayed depth stays working: MARKET remainders keep walking each new quote, LIMIT remainders rest
+- resting LIMIT orders, queue-position approximation:
+    ahead = displayed volume at our price on our side when the order starts resting (0 if we improve the
+    touch; unknown beyond L5 -> filled only once the level becomes visible);
+    quote updates: ahead = min(ahead, displayed volume at our price) (cancels / trades shrink the queue,
+    new orders join behind us); our price level gone and better than the touch -> ahead = 0
+    tick_fop_v1 trade at our price: volume consumes ahead first, the rest fills us (TMF_PAPER_DEPTH_QUEUE=1)
+    trade through our price, or the opposite side crossing it -> fill at our limit price
+- optional slippage_model_v1 overlay on taker fills (TMF_PAPER_DEPTH_SLIPPAGE=1; capped at the limit); measured
+  from the VWAP, so a calibrated table adds only realized slippage beyond the book (spread + impact are in the VWAP)
+- a quote with prices but no volumes (scalar bid/ask schema) gets TMF_PAPER_MATCH_LIQ_QTY per level
+
+Cost: on_quote with no working order is one payload scan into preallocated arrays; fills never allocate
+per-level objects until the fill meta is written.
+
+NOTE: Python 3.9.6 compatible
+"""
+from __future__ import annotations
+
+import os
+from array import array
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.sim.slippage_model_v1 import calc_slippage_points
+
+LEVELS = 5
+_EPS = 1e-9
+
+
+def _env(name: str, default: str) -> str:
+    return (os.environ.get(name, default) or default).strip()
+
+
+def _base_symbol(sym: str) -> str:
+    s = str(sym or "")
+    for b in ("TMF", "TXF", "MXF"):
+        if s.startswith(b):
+            return b
+    return s
+
+
+@dataclass(frozen=True)
+class DepthFillConfigV1:
+    queue_fill: int = 1              # trades at a resting order's price fill it once the queue ahead is gone
+    slippage_overlay: int = 0        # slippage_model_v1 points added to taker fills
+    unknown_level_qty: float = 10.0  # level size when the quote has no volumes
+
+    @classmethod
+    def from_env(cls) -> "DepthFillConfigV1":
+        return cls(
+            queue_fill=1 if _env("TMF_PAPER_DEPTH_QUEUE", "1") == "1" else 0,
+            slippage_overlay=1 if _env("TMF_PAPER_DEPTH_SLIPPAGE", "0") == "1" else 0,
+            unknown_level_qty=max(0.0, float(_env("TMF_PAPER_MATCH_LIQ_QTY", "10.0"))),
+        )
+
+
+def _load_side(prices: Any, volumes: Any, px: array, qty: array, default_qty: float) -> int:
+    """payload level lists -> px/qty arrays (levels with a positive price, in book order); returns level count."""
+    n = 0
+    if not isinstance(prices, (list, tuple)):
+        return 0
+    vols = volumes if isinstance(volumes, (list, tuple)) else ()
+    nv = len(vols)
+    for i in range(min(len(prices), LEVELS)):
+        try:
+            p = float(prices[i])
+            v = float(vols[i]) if i < nv else default_qty
+        except (TypeError, ValueError):
+            continue
+        if p <= 0.0 or v <= 0.0:
+            continue
+        px[n] = p
+        qty[n] = v
+        n += 1
+    return n
+
+
+class DepthFillEngineV1:
+    """Depth-walking fills for one FOP code (the book) on PaperOMS orders of any symbol trading it."""
+
+    def __init__(self, code: str, *, cfg: Optional[DepthFillConfigV1] = None):
+        self.code = str(code)
+        self.cfg = cfg or DepthFillConfigV1.from_env()
+        z = [0.0] * LEVELS
+        # side 0 = bids, side 1 = asks
+        self.px = (array("d", z), array("d", z))
+        self.qty = (array("d", z), array("d", z))
+        self.used = (array("d", z), array("d", z))
+        self.n = [0, 0]
+        self.seq = 0
+        self.ts = ""
+        self._working: Dict[str, List[Any]] = {}   # order_id -> [order, ahead, resting]; dict order = our priority
+        self.stats = {"quotes": 0, "trades": 0, "taker_fills": 0, "queue_fills": 0, "levels_walked": 0}
+
+    # ---- book ----
+    def on_quote(self, oms: Any, payload: Dict[str, Any], *, ts: str = "", reason: str = "depth_fill") -> list:
+        """Load a bidask payload (other codes ignored); returns fills of working orders it triggers."""
+        if str(payload.get("code") or "") != self.code:
+            return []
+        d = self.cfg.unknown_level_qty
+        p = payload.get("bid_price")
+        if not isinstance(p, (list, tuple)) and payload.get("bid") is not None:
+            p = [payload.get("bid")]
+        self.n[0] = _load_side(p, payload.get("bid_volume"), self.px[0], self.qty[0], d)
+        p = payload.get("ask_price")
+        if not isinstance(p, (list, tuple)) and payload.get("ask") is not None:
+            p = [payload.get("ask")]
+        self.n[1] = _load_side(p, payload.get("ask_volume"), self.px[1], self.qty[1], d)
+        for u in self.used:
+            for i in range(LEVELS):
+                u[i] = 0.0
+        self.seq += 1
+        self.ts = str(ts or payload.get("ts") or "")
+        self.stats["quotes"] += 1
+        if not self._working:
+            return []
+        fills: list = []
+        for oid, w in list(self._working.items()):
+            order = w[0]
+            if not w[2]:
+                fills += self._take(oms, order, reason)
+            else:
+                fills += self._rest_on_quote(oms, w, reason)
+            self._retire(oid, order)
+        return fills
+
+    def on_trade(self, oms: Any, payload: Dict[str, Any], *, reason: str = "depth_fill") -> list:
+        """tick_fop_v1 trade: advances the queue of resting LIMIT orders at / through its price."""
+        if str(payload.get("code") or "") != self.code or not self._working:
+            return []
+        try:
+            px = float(payload.get("close"))
+            vol = float(payload.get("volume") or 0.0)
+        except (TypeError, ValueError):
+            return []
+        self.stats["trades"] += 1
+        fills: list = []
+        for oid, w in list(self._working.items()):
+            if vol <= 0.0:
+                break
+            order = w[0]
+            if not w[2]:
+                continue
+            lim = float(order.price)
+            buy = str(order.side).upper() == "BUY"
+            rem = float(order.qty - order.filled_qty)
+            if (buy and px < lim - _EPS) or ((not buy) and px > lim + _EPS):
+                q = min(rem, vol)                                 # traded through our price
+            elif abs(px - lim) <= _EPS and self.cfg.queue_fill:
+                q = min(rem, max(0.0, vol - w[1]))
+                w[1] = max(0.0, w[1] - vol)
+            else:
+                continue
+            if q > 0.0:
+                vol -= q
+                fills += self._fill(oms, order, lim, q, reason, {"mode": "trade", "trade_px": px, "ahead": w[1]})
+                self._retire(oid, order)
+        return fills
+
+    def best(self, side: int) -> Optional[float]:
+        return self.px[side][0] if self.n[side] else None
+
+    def depth(self, side: int) -> List[Tuple[float, float]]:
+        """[(price, volume still available), ...] for bids (0) / asks (1)."""
+        px, q, u = self.px[side], self.qty[side], self.used[side]
+        return [(px[i], q[i] - u[i]) for i in range(self.n[side])]
+
+    # ---- orders ----
+    def match(self, oms: Any, order: Any, *, reason: str = "depth_fill") -> list:
+        """Take what the book offers now (VWAP across levels); the remainder keeps working."""
+        if str(order.order_type).upper() == "LIMIT" and order.price is None:
+            return oms.match(order, market_price=0.0, reason=reason)      # PaperOMS rejects it
+        fills = self._take(oms, order, reason)
+        if str(order.status) not in ("FILLED", "REJECTED", "CANCELLED") and order.order_id not in self._working:
+            resting = str(order.order_type).upper() == "LIMIT"
+            self._working[order.order_id] = [order, self._queue_ahead(order) if resting else 0.0, resting]
+        return fills
+
+    def cancel(self, order_id: str) -> bool:
+        return self._working.pop(order_id, None) is not None
+
+    def working(self) -> int:
+        return len(self._working)
+
+    # ---- internals ----
+    def _retire(self, oid: str, order: Any) -> None:
+        if str(order.status) in ("FILLED", "REJECTED", "CANCELLED") or float(order.qty - order.filled_qty) <= _EPS:
+            self._working.pop(oid, None)
+
+    def _queue_ahead(self, order: Any) -> float:
+        side = 0 if str(order.side).upper() == "BUY" else 1
+        lim = float(order.price)
+        px, q, n = self.px[side], self.qty[side], self.n[side]
+        for i in range(n):
+            if abs(px[i] - lim) <= _EPS:
+                return q[i]
+        if n == 0 or (side == 0 and lim > px[0]) or (side == 1 and lim < px[0]):
+            return 0.0                                            # improves the touch: first in the new level
+        if (side == 0 and lim < px[n - 1]) or (side == 1 and lim > px[n - 1]):
+            return float("inf")                                   # beyond L5: unknown until it is displayed
+        return 0.0                                                # inside a gap of the displayed levels
+
+    def _rest_on_quote(self, oms: Any, w: List[Any], reason: str) -> list:
+        order = w[0]
+        buy = str(order.side).upper() == "BUY"
+        lim = float(order.price)
+        opp = 1 if buy else 0
+        px, q, u = self.px[opp], self.qty[opp], self.used[opp]
+        rem = float(order.qty - order.filled_qty)
+        got = 0.0
+        for i in range(self.n[opp]):
+            if (buy and px[i] > lim + _EPS) or ((not buy) and px[i] < lim - _EPS):
+                break
+            a = min(q[i] - u[i], rem - got)
+            if a > 0.0:
+                u[i] += a
+                got += a
+            if got >= rem - _EPS:
+                break
+        if got > 0.0:
+            w[1] = 0.0
+            return self._fill(oms, order, lim, got, reason, {"mode": "cross", "ahead": 0.0})
+        own = 0 if buy else 1
+        px, q, n = self.px[own], self.qty[own], self.n[own]
+        for i in range(n):
+            if abs(px[i] - lim) <= _EPS:
+                if q[i] < w[1]:
+                    w[1] = q[i]
+                return []
+        if n == 0 or (buy and lim > px[0]) or ((not buy) and lim < px[0]):
+            w[1] = 0.0
+        return []
+
+    def _take(self, oms: Any, order: Any, reason: str) -> list:
+        buy = str(order.side).upper() == "BUY"
+        side = 1 if buy else 0
+        lim = None if str(order.order_type).upper() != "LIMIT" else float(order.price)
+        rem = float(order.qty - order.filled_qty)
+        px, q, u = self.px[side], self.qty[side], self.used[side]
+        got = 0.0
+        notional = 0.0
+        levels: List[List[float]] = []
+        for i in range(self.n[side]):
+            p = px[i]
+            if lim is not None and ((buy and p > lim + _EPS) or ((not buy) and p < lim - _EPS)):
+                break
+            a = min(q[i] - u[i], rem - got)
+            if a <= 0.0:
+                continue
+            u[i] += a
+            got += a
+            notional += a * p
+            levels.append([p, a])
+            if got >= rem - _EPS:
+                break
+        if got <= 0.0:
+            return []
+        vwap = notional / got
+        exec_px = vwap
+        meta: Dict[str, Any] = {"mode": "taker", "levels": levels, "vwap": vwap}
+        if self.cfg.slippage_overlay:
+            slp = calc_slippage_points(price=vwap, symbol=_base_symbol(order.symbol), side=("BUY" if buy else "SELL"), qty=got,
+                                       reference="vwap")
+            exec_px = vwap + slp if buy else vwap - slp
+            if lim is not None:
+                exec_px = min(exec_px, lim) if buy else max(exec_px, lim)
+            meta["slippage_points"] = abs(exec_px - vwap)
+        self.stats["taker_fills"] += 1
+        self.stats["levels_walked"] += len(levels)
+        return self._fill(oms, order, exec_px, got, reason, meta)
+
+    def _fill(self, oms: Any, order: Any, price: float, qty: float, reason: str, meta: Dict[str, Any]) -> list:
+        meta["book_seq"] = self.seq
+        meta["book_ts"] = self.ts
+        if meta.get("mode") != "taker":
+            self.stats["queue_fills"] += 1
+        return oms.match(order, market_price=price, liquidity_qty=qty, reason=reason, fill_meta={"depth": meta})
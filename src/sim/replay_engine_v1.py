@@ -0,0 +1,479 @@
+"""
+TMF AutoTrader — deterministic replay engine v1 (recorded raw_events -> full trading stack, in one thread)
+
+Why:
+- ops/replay/replay_runner.replay_jsonl parses one log into memory and hands events to a single handler;
+  run_async_supervisor_v1 drives the real stack but on the wall clock (queues, timers, worker threads),
+  so two runs over the same log do not take the same decisions.
+
+What:
+- input: one or many runtime/raw_events/shioaji_recorder.*.jsonl ({"ts","kind","payload"} per line)
+  and/or tick archives (.tav1, src/data/tick_archive_v1.py; replayed on exchange event time, while JSONL
+  replays on the record ts = receive time; archives carry no recv_ts / ingest_ts),
+  streamed and k-way merged on record ts (heapq.merge; ties -> file order, then line order). Each file is
+  expected in write order; records going back in time are replayed in file position (counted in stats)
+- SimClockV1 (src.ops.clock_v1) follows the merged record ts, so every clock_now() in safety, risk,
+  preflight, market calendar, in-trade controls, OMS timestamps and the reject-storm windows is replay time
+- stack (same wiring as the supervisor): bidask -> LatestQuoteCacheV1.feed_payload (in memory, never
+  refreshed from the DB); ticks -> StreamBarAggregatorV1 (flush_due on the sim clock); closed 1m bars ->
+  strategies -> PaperOMSRiskSafetyWrapperV1.place_order + paper autofill; run_intrade_once on the latest mid
+  every controls_every_sec of replay time while a position is open (stops and time stops)
+- TMF_PAPER_DEPTH_FILL=1: fills walk the recorded L1..L5 depth (src/sim/depth_fill_v1.py) instead of one
+  price capped by TMF_PAPER_MATCH_LIQ_QTY; remainders keep working and fill on later quotes / ticks
+- scratch SQLite DB for the OMS / risk / safety tables (a fresh DB per run for identical decisions)
+- no sleeps: as fast as the stack runs; report carries events/sec
+
+Determinism:
+- decision log (JSONL, sorted keys): one line per order attempt / autofill / in-trade control action,
+  with replay time, bar, strategy, side, qty, stop, outcome, reject code, fills. No uuids, no wall time,
+  no latencies -> byte-identical across runs over the same input + env (decision_log_sha256 in the report)
+- wall-clock inputs are switched off while replaying (restored afterwards): gate timing (TMF_GATE_TIMING),
+  LATBP gate-latency / recorder-metrics files, the risk-state snapshot file (TMF_RISK_STATE_PATH)
+
+NOTE: Python 3.9.6 compatible
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import heapq
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.data.build_bars_1m_v1 import STREAM_SOURCE
+from src.data.store_sqlite_v1 import init_db
+from src.data.stream_bars_v1 import StreamBarAggregatorV1, bar_public
+from src.execution.order_result_types import get_reject_codes
+from src.market.market_metrics_from_db_v1 import _compute_liquidity_score
+from src.market.quote_cache_v1 import LatestQuoteCacheV1
+from src.ops.clock_v1 import SimClockV1, use_clock
+from src.ops.latency.gate_timing import outcome_of
+from src.sim.signal_meta_v1 import _apply_vol_confidence, _atr_from_bars, _ensure_stop
+from src.strat.strategy_base_v1 import StrategyContextV1
+
+# (epoch, file index, line no, ts, kind, payload)
+ReplayRecord = Tuple[float, int, int, str, str, Dict[str, Any]]
+
+REPLAY_ENV = {
+    "TMF_GATE_TIMING": "0",
+    "TMF_LATBP_USE_GATE_LATENCY": "0",
+    "TMF_LATBP_USE_RECORDER_METRICS": "0",
+    "TMF_RISK_STATE_PATH": "",
+    "TMF_QUOTE_CACHE": "1",
+    "TMF_QUOTES_L5": "1",
+}
+
+
+def _env(name: str, default: str) -> str:
+    return (os.environ.get(name, default) or default).strip()
+
+
+def _epoch(ts: Any) -> Optional[float]:
+    try:
+        return datetime.fromisoformat(str(ts).strip().replace("Z", "+00:00")).timestamp()
+    except Exception:
+        return None
+
+
+@dataclass(frozen=True)
+class ReplayConfigV1:
+    symbol: str = "TMF"
+    fop_code: str = "TMFB6"
+    atr_n: int = 20
+    quote_kinds: Tuple[str, ...] = ("bidask_fop_v1",)
+    tick_kinds: Tuple[str, ...] = ("tick_fop_v1",)
+    bar_grace_sec: float = 2.0
+    flush_every_sec: float = 0.2
+    controls_every_sec: float = 0.25
+    time_stop_seconds: float = 300.0
+    one_order_per_bar: int = 1
+    auto_match: int = 1
+    match_liq_qty: float = 10.0
+    depth_fill: int = 0
+    max_bidask_age_seconds: int = 15
+
+    @classmethod
+    def from_env(cls) -> "ReplayConfigV1":
+        return cls(
+            symbol=_env("TMF_SYMBOL", "TMF"),
+            fop_code=_env("TMF_FOP_CODE", "TMFB6"),
+            atr_n=int(_env("TMF_ATR_N", "20")),
+            bar_grace_sec=float(_env("TMF_RECORDER_STREAM_BAR_GRACE_SEC", "2.0")),
+            controls_every_sec=max(0.01, float(_env("TMF_SUPERVISOR_CONTROLS_SEC", "0.25"))),
+            time_stop_seconds=float(_env("TMF_INTRADE_TIME_STOP_SECONDS", "300")),
+            one_order_per_bar=1 if _env("TMF_ONE_ORDER_PER_BAR", "1") == "1" else 0,
+            auto_match=1 if _env("TMF_PAPER_AUTOMATCH", "1") == "1" else 0,
+            match_liq_qty=float(_env("TMF_PAPER_MATCH_LIQ_QTY", "10.0")),
+            depth_fill=1 if _env("TMF_PAPER_DEPTH_FILL", "0") == "1" else 0,
+            max_bidask_age_seconds=int(_env("TMF_MAX_BIDASK_AGE_SECONDS", "15")),
+        )
+
+
+def iter_recorder_jsonl(path: str, idx: int, stats: Dict[str, int]) -> Iterator[ReplayRecord]:
+    """One recorder file in write order; records without a parsable ts inherit the previous one."""
+    last = 0.0
+    with open(path, "r", encoding="utf-8") as f:
+        for ln, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                rec = json.loads(line)
+            except Exception:
+                stats["bad"] += 1
+                continue
+            if not isinstance(rec, dict):
+                stats["bad"] += 1
+                continue
+            kind, payload = rec.get("kind"), rec.get("payload")
+            if not isinstance(kind, str) or not isinstance(payload, dict):
+                stats["bad"] += 1
+                continue
+            ts = str(rec.get("ts") or payload.get("ingest_ts") or "")
+            ep = _epoch(ts)
+            if ep is None:
+                stats["ts_missing"] += 1
+                ep = last
+            elif ep < last:
+                stats["out_of_order"] += 1
+                ep = last  # keep file position; the sim clock never runs backwards
+            last = ep
+            yield ep, idx, ln, ts, kind, payload
+
+
+def iter_tick_archive(path: str, idx: int) -> Iterator[ReplayRecord]:
+    """One .tav1 archive (sorted by ts_ns) as recorder-shaped records; line no = record index."""
+    from src.data.tick_archive_v1 import TickArchiveV1
+    with TickArchiveV1(path) as a:
+        for ln, (ns, kind, payload) in enumerate(a.iter_records()):
+            ep = ns / 1e9
+            ts = datetime.fromtimestamp(ep, timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+            yield ep, idx, ln, ts, kind, payload
+
+
+def merge_recorder_jsonl(paths: Sequence[str], stats: Dict[str, int]) -> Iterator[ReplayRecord]:
+    """k-way merge of several recorder files / tick archives on (ts, file index, line no); O(files) memory."""
+    its = [iter_tick_archive(str(p), i) if str(p).endswith(".tav1") else iter_recorder_jsonl(str(p), i, stats)
+           for i, p in enumerate(paths)]
+    return heapq.merge(*its, key=lambda r: r[:3])
+
+
+@contextmanager
+def _env_overrides(env: Dict[str, str]) -> Iterator[None]:
+    old = {k: os.environ.get(k) for k in env}
+    os.environ.update(env)
+    try:
+        yield
+    finally:
+        for k, v in old.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+
+class ReplayEngineV1:
+    def __init__(self, *, db_path: str, cfg: Optional[ReplayConfigV1] = None, strategies: Optional[List[Any]] = None,
+                 decision_log: str = ""):
+        self.db_path = str(db_path)
+        self.cfg = cfg or ReplayConfigV1.from_env()
+        self._strategies = strategies
+        self.decision_log = str(decision_log or "")
+        self.clock = SimClockV1()
+        self.counters: Dict[str, int] = {
+            "events": 0, "quotes": 0, "ticks": 0, "other": 0, "bars": 0, "bars_revised": 0,
+            "signals": 0, "signals_no_metrics": 0, "signals_suppressed": 0, "strategy_errors": 0,
+            "orders_sent": 0, "orders_accepted": 0, "orders_rejected": 0, "fills": 0, "depth_fills": 0,
+            "oms_errors": 0, "controls_runs": 0, "controls_closes": 0, "controls_errors": 0, "decisions": 0,
+        }
+        self.merge_stats: Dict[str, int] = {"bad": 0, "ts_missing": 0, "out_of_order": 0}
+        self.last_errors: Dict[str, str] = {}
+        self._bars: Deque[Dict[str, Any]] = deque(maxlen=max(2, self.cfg.atr_n + 1))
+        self._closed: List[Dict[str, Any]] = []
+        self._sha = hashlib.sha256()
+        self._log_fp: Any = None
+        self._last_px: Optional[float] = None
+
+    # ---- stack (built inside the replay clock / env scope) ----
+    def _build(self) -> None:
+        from src.oms.paper_oms_v1 import PaperOMS
+        from src.oms.paper_oms_risk_safety_wrapper_v1 import PaperOMSRiskSafetyWrapperV1
+        from src.risk.in_trade_controls_v1 import InTradeConfigV1
+        from src.risk.risk_engine_v1 import RiskConfigV1, RiskEngineV1
+        from src.safety.system_safety_v1 import SafetyConfigV1, SystemSafetyEngineV1
+        from src.sim.backtest_bars_v1 import load_strategies_from_env
+        from src.sim.depth_fill_v1 import DepthFillEngineV1
+
+        cfg = self.cfg
+        init_db(Path(self.db_path))
+        # fed only: the scratch DB has no quotes_l5 rows, so never pay for a refresh probe
+        self.quote_cache = LatestQuoteCacheV1(self.db_path, min_refresh_sec=float("inf"))
+        self.oms = PaperOMS(Path(self.db_path))
+        risk = RiskEngineV1(db_path=self.db_path, cfg=RiskConfigV1(strict_require_market_metrics=1))
+        self.safety = SystemSafetyEngineV1(
+            db_path=self.db_path,
+            cfg=SafetyConfigV1(fop_code=cfg.fop_code, max_bidask_age_seconds=cfg.max_bidask_age_seconds, require_recent_bidask=1),
+            quote_cache=self.quote_cache,
+        )
+        self.wrap = PaperOMSRiskSafetyWrapperV1(paper_oms=self.oms, risk=risk, safety=self.safety, db_path=self.db_path)
+        self.depth = DepthFillEngineV1(cfg.fop_code) if cfg.depth_fill else None
+        self.strategies = list(self._strategies) if self._strategies is not None else load_strategies_from_env()
+        self.intrade_cfg = InTradeConfigV1(time_stop_seconds=cfg.time_stop_seconds)
+        self.agg = StreamBarAggregatorV1(intervals_sec=[60], close_grace_sec=cfg.bar_grace_sec)
+        self.agg.add_sink(self._on_bar_closed)
+
+    # ---- decision log ----
+    def _log(self, row: Dict[str, Any]) -> None:
+        row = dict(row, t=self.clock.now().isoformat(timespec="milliseconds"), seq=self.counters["decisions"])
+        b = (json.dumps(row, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str) + "\n").encode("utf-8")
+        self._sha.update(b)
+        self.counters["decisions"] += 1
+        if self._log_fp is not None:
+            self._log_fp.write(b)
+
+    def _error(self, where: str, e: BaseException) -> None:
+        self.counters[f"{where}_errors"] += 1
+        self.last_errors[where] = f"{type(e).__name__}: {e}"
+
+    # ---- stages (synchronous) ----
+    def _on_bar_closed(self, bar: Dict[str, Any]) -> None:
+        if int(bar.get("interval_sec") or 0) != 60 or str(bar.get("symbol")) != self.cfg.fop_code:
+            return
+        if int(bar.get("revision") or 0) > 0:
+            self.counters["bars_revised"] += 1
+            return
+        self._closed.append(bar_public(bar))
+
+    def _market_metrics(self) -> Dict[str, Any]:
+        snap = self.quote_cache.get(self.cfg.fop_code, reject_synthetic=True, refresh=False)
+        if snap is None or snap.bid is None or snap.ask is None:
+            return {}
+        bid, ask = float(snap.bid), float(snap.ask)
+        return {
+            "bid": bid,
+            "ask": ask,
+            "spread_points": float(ask - bid),
+            "atr_points": _atr_from_bars(self._bars, self.cfg.atr_n),
+            "liquidity_score": float(_compute_liquidity_score(snap.to_payload())),
+            "source": {"bidask_event_id": int(snap.event_id or 0), "bidask_ts": snap.ts, "source_file": snap.source_file,
+                       "ingest_ts": snap.ingest_ts, "fop_code": self.cfg.fop_code, "atr_symbol": self.cfg.fop_code,
+                       "atr_n": int(self.cfg.atr_n), "via": "replay_memory"},
+        }
+
+    def _on_bar(self, b: Dict[str, Any]) -> None:
+        cfg = self.cfg
+        self.counters["bars"] += 1
+        bar = {"ts_min": str(b["ts_start"]), "o": float(b["o"]), "h": float(b["h"]), "l": float(b["l"]),
+               "c": float(b["c"]), "v": float(b.get("v") or 0.0), "n_trades": int(b.get("n_trades") or 0),
+               "source": STREAM_SOURCE}
+        self._bars.append(bar)
+        ctx = StrategyContextV1(now_ts=bar["ts_min"], symbol=cfg.symbol, state={})
+        mm = self._market_metrics()
+        placed = False
+        for s in self.strategies:
+            fn = getattr(s, "on_bar", None) or getattr(s, "on_bar_1m", None)
+            try:
+                sig = fn(ctx, bar) if fn else None
+            except Exception as e:
+                self._error("strategy", e)
+                continue
+            if sig is None:
+                continue
+            self.counters["signals"] += 1
+            name = getattr(s, "name", s.__class__.__name__)
+            if placed:
+                self.counters["signals_suppressed"] += 1
+                continue
+            if not mm:
+                self.counters["signals_no_metrics"] += 1
+                self._log({"kind": "skip", "bar": bar["ts_min"], "strat": name, "side": sig.side, "why": "no_market_metrics"})
+                continue
+            sig = _ensure_stop(sig, ref_price=bar["c"])
+            meta = sig.to_order_meta(strat_name=name, strat_version=getattr(s, "version", "v?"), ref_price=bar["c"],
+                                     now_ts=bar["ts_min"], symbol=cfg.symbol)
+            meta["market_metrics"] = mm
+            meta = _apply_vol_confidence(meta, mm)
+            meta["replay"] = {"bar_ts": bar["ts_min"]}
+            self._place(name, sig, meta, bar)
+            placed = bool(cfg.one_order_per_bar)
+
+    def _place(self, name: str, sig: Any, meta: Dict[str, Any], bar: Dict[str, Any]) -> None:
+        self.counters["orders_sent"] += 1
+        row: Dict[str, Any] = {"kind": "order", "bar": bar["ts_min"], "c": bar["c"], "strat": name, "side": sig.side,
+                               "qty": float(sig.qty), "stop": sig.stop_price}
+        try:
+            r = self.wrap.place_order(symbol=self.cfg.symbol, side=sig.side, qty=float(sig.qty), order_type=str(sig.order_type),
+                                      price=(None if sig.price is None else float(sig.price)), meta=meta)
+        except Exception as e:
+            self._error("oms", e)
+            self._log(dict(row, outcome="ERROR", code=type(e).__name__))
+            return
+        row["outcome"] = outcome_of(r)
+        if isinstance(r, dict):
+            s_code, r_code, e_code = get_reject_codes(r)
+            if row["outcome"] == "REJECTED":
+                self.counters["orders_rejected"] += 1
+                row["code"] = e_code or r_code or s_code
+            else:
+                row["code"] = str((r.get("exec") or {}).get("code") or "")
+            self._log(row)
+            return
+        self.counters["orders_accepted"] += 1
+        fills: List[Tuple[float, float]] = []
+        if self.cfg.auto_match and hasattr(r, "order_id") and hasattr(r, "side"):
+            mm = meta.get("market_metrics") or {}
+            px = float(mm.get("ask") or 0.0) if str(r.side).upper() == "BUY" else float(mm.get("bid") or 0.0)
+            if self.depth is not None:
+                fs = self.depth.match(self.oms, r, reason="replay_autofill")
+                fills = [(float(f.qty), float(f.price)) for f in fs]
+                self.counters["fills"] += len(fills)
+            elif px > 0:
+                fs = self.oms.match(r, market_price=px, liquidity_qty=self.cfg.match_liq_qty, reason="replay_autofill")
+                fills = [(float(f.qty), float(f.price)) for f in fs]
+                self.counters["fills"] += len(fills)
+        row["fills"] = fills
+        self._log(row)
+
+    def _depth_fills(self, src: str, fs: list) -> None:
+        # resting / remaining orders filled by a later quote or trade (TMF_PAPER_DEPTH_FILL=1)
+        if not fs:
+            return
+        self.counters["fills"] += len(fs)
+        self.counters["depth_fills"] += len(fs)
+        self._log({"kind": "fill", "src": src, "fills": [(float(f.qty), float(f.price)) for f in fs]})
+
+    def _controls(self) -> None:
+        from src.risk.in_trade_controls_v1 import run_intrade_once
+        pos = self.oms.pos.get(self.cfg.symbol)
+        if not pos or float(pos.qty) <= 0 or self._last_px is None:
+            return
+        px = float(self._last_px)
+        try:
+            res = run_intrade_once(oms=self.oms, symbol=self.cfg.symbol, market_price=px, cfg=self.intrade_cfg)
+        except Exception as e:
+            self._error("controls", e)
+            return
+        self.counters["controls_runs"] += 1
+        action = str(res.get("action", ""))
+        if action.startswith("CLOSE") or not bool(res.get("ok", True)):
+            if action.startswith("CLOSE"):
+                self.counters["controls_closes"] += 1
+            self._log({"kind": "control", "action": action, "px": px, "fills": int(res.get("fills") or 0)})
+
+    # ---- run ----
+    def run(self, paths: Sequence[str], *, max_events: int = 0) -> Dict[str, Any]:
+        cfg = self.cfg
+        t0 = time.perf_counter()
+        first_ts: Optional[str] = None
+        last_ts: Optional[str] = None
+        if self.decision_log:
+            Path(self.decision_log).parent.mkdir(parents=True, exist_ok=True)
+            self._log_fp = open(self.decision_log, "wb")
+        try:
+            with _env_overrides(REPLAY_ENV), use_clock(self.clock):
+                self._build()
+                next_flush = next_ctl = None
+                for ep, _i, _ln, ts, kind, payload in merge_recorder_jsonl(paths, self.merge_stats):
+                    self.clock.set(ep)
+                    n = self.counters["events"] = self.counters["events"] + 1
+                    first_ts = first_ts or ts
+                    last_ts = ts
+                    if kind in cfg.quote_kinds:
+                        self.counters["quotes"] += 1
+                        snap = self.quote_cache.feed_payload(payload, ts=ts, event_id=n)
+                        if snap is not None and snap.code == cfg.fop_code and snap.bid and snap.ask:
+                            self._last_px = 0.5 * (float(snap.bid) + float(snap.ask))
+                        if self.depth is not None:
+                            self._depth_fills("quote", self.depth.on_quote(self.oms, payload, ts=ts, reason="replay_depth"))
+                    elif kind in cfg.tick_kinds:
+                        self.counters["ticks"] += 1
+                        self.agg.on_tick_payload(payload)
+                        if self.depth is not None:
+                            self._depth_fills("trade", self.depth.on_trade(self.oms, payload, reason="replay_depth"))
+                    else:
+                        self.counters["other"] += 1
+                    if next_flush is None or ep >= next_flush:
+                        self.agg.flush_due()
+                        next_flush = ep + cfg.flush_every_sec
+                    while self._closed:
+                        self._on_bar(self._closed.pop(0))
+                    if next_ctl is None or ep >= next_ctl:
+                        next_ctl = ep + cfg.controls_every_sec
+                        self._controls()
+                    if max_events and n >= max_events:
+                        break
+                self.agg.flush_all()
+                while self._closed:
+                    self._on_bar(self._closed.pop(0))
+                sim_end = self.clock.now().isoformat(timespec="milliseconds")
+                self.quote_cache.close()
+        finally:
+            if self._log_fp is not None:
+                self._log_fp.close()
+                self._log_fp = None
+        secs = time.perf_counter() - t0
+        return {
+            "inputs": [str(p) for p in paths],
+            "db": self.db_path,
+            "sim_first_ts": first_ts,
+            "sim_last_ts": last_ts,
+            "sim_end_local": sim_end,
+            "counters": dict(self.counters),
+            "merge": dict(self.merge_stats),
+            "bar_stream": dict(self.agg.stats),
+            "depth_fill": dict(self.depth.stats, working=self.depth.working()) if self.depth is not None else None,
+            "last_errors": dict(self.last_errors),
+            "decision_log": self.decision_log or None,
+            "decision_log_sha256": self._sha.hexdigest(),
+            "secs": round(secs, 3),
+            "events_per_sec": round(self.counters["events"] / secs, 1) if secs > 0 else None,
+        }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="TMF AutoTrader deterministic replay of recorder JSONL through the full stack (v1)")
+    ap.add_argument("inputs", nargs="+", help="recorder JSONL files / .tav1 tick archives (k-way merged on ts)")
+    ap.add_argument("--db", default="", help="scratch DB (default: fresh temp file, removed afterwards)")
+    ap.add_argument("--decision-log", default="", help="write the deterministic decision log (JSONL) here")
+    ap.add_argument("--max-events", type=int, default=0)
+    ap.add_argument("--out", default="", help="write the replay report JSON here")
+    args = ap.parse_args(argv)
+
+    td = None
+    db = args.db
+    if not db:
+        td = tempfile.mkdtemp(prefix="tmf_replay_")
+        db = str(Path(td) / "replay.sqlite3")
+    try:
+        eng = ReplayEngineV1(db_path=db, decision_log=args.decision_log)
+        rep = eng.run(args.inputs, max_events=args.max_events)
+    finally:
+        if td is not None:
+            shutil.rmtree(td, ignore_errors=True)
+    if td is not None:
+        rep["db"] = None
+    print(json.dumps(rep, ensure_ascii=False, indent=2))
+    if args.out:
+        p = Path(args.out)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        tmp = p.with_name(p.name + f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(rep, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        os.replace(tmp, p)
+        print(f"[OK] wrote {p}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
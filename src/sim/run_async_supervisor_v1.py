@@ -0,0 +1,614 @@
+"""
+TMF AutoTrader — async runtime supervisor v1 (one process instead of a chain of DB-polling scripts)
+
+Stages (cooperating asyncio tasks, bounded in-memory queues between them):
+  ingest   : recorder events (JSONL replay, or submit_threadsafe() from an in-process recorder callback)
+             bidask -> shared LatestQuoteCacheV1 (in memory); ticks -> bars stage
+  bars     : StreamBarAggregatorV1 (incremental 1m bars; flush_due() on a timer closes quiet minutes)
+  strategy : every strategy sees every closed bar (on_bar / on_bar_1m); market_metrics from the quote
+             cache + ATR over in-memory bars; at most one order intent per bar (TMF_ONE_ORDER_PER_BAR)
+  oms      : PaperOMSRiskSafetyWrapperV1.place_order + paper autofill, on ONE dedicated worker thread
+  controls : run_intrade_once on the latest mid whenever it changed and a position is open
+             (same worker thread as the OMS, so OMS state is never touched concurrently)
+Persistence is off the critical path: events go through AsyncEventWriterV1 (JSONL + events/quotes_l5),
+closed bars (and late ticks of minutes no longer in memory) through BarsDbSinkV1 on a persist thread.
+
+Per stage: queue wait and service time histograms (LatencyHistogramV1), depth, processed/dropped.
+End to end: bar close -> order decision, bar close -> order result, quote -> in-trade check.
+Degraded mode (TMF_SUPERVISOR_DEGRADED_MODE) starts when any stage's queue wait exceeds
+TMF_SUPERVISOR_LAG_BUDGET_MS (or its backlog exceeds TMF_SUPERVISOR_MAX_BACKLOG) and ends after
+TMF_SUPERVISOR_RECOVER_SEC without a lagging stage:
+  off      : measure only
+  conflate : (default) signals on a bar that already has a newer bar queued are dropped, and queued order
+             intents older than TMF_SUPERVISOR_STALE_ORDER_MS are dropped (never trade on stale data)
+  no_entry : no new order intents at all while degraded; in-trade controls keep running
+Metrics JSON: runtime/state/supervisor_metrics_latest.json (TMF_SUPERVISOR_METRICS_PATH).
+NOTE: Python 3.9.6 compatible
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from datetime import datetime
+from pathlib import Path
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from src.broker.async_event_writer_v1 import AsyncEventWriterV1, AsyncWriterConfigV1
+from src.data.build_bars_1m_v1 import STREAM_SOURCE
+from src.data.store_sqlite_v1 import init_db
+from src.data.stream_bars_v1 import BarsDbSinkV1, StreamBarAggregatorV1, bar_public
+from src.market.market_metrics_from_db_v1 import _compute_liquidity_score
+from src.market.quote_cache_v1 import LatestQuoteCacheV1
+from src.oms.paper_oms_v1 import PaperOMS
+from src.oms.paper_oms_risk_safety_wrapper_v1 import PaperOMSRiskSafetyWrapperV1
+from src.ops.latency.latency_histogram import LatencyHistogramV1
+from src.risk.in_trade_controls_v1 import InTradeConfigV1, run_intrade_once
+from src.risk.risk_engine_v1 import RiskConfigV1, RiskEngineV1
+from src.safety.system_safety_v1 import SafetyConfigV1, SystemSafetyEngineV1
+from src.sim.backtest_bars_v1 import load_strategies_from_env
+from src.sim.signal_meta_v1 import _apply_vol_confidence, _atr_from_bars, _ensure_stop
+from src.strat.strategy_base_v1 import StrategyContextV1
+
+DEGRADED_MODES = ("off", "conflate", "no_entry")
+STAGES = ("ingest", "bars", "strategy", "oms")
+
+
+def _env(name: str, default: str) -> str:
+    return (os.environ.get(name, default) or default).strip()
+
+
+@dataclass(frozen=True)
+class SupervisorConfigV1:
+    symbol: str = "TMF"
+    fop_code: str = "TMFB6"
+    atr_n: int = 20
+    quote_kinds: Tuple[str, ...] = ("bidask_fop_v1",)
+    tick_kinds: Tuple[str, ...] = ("tick_fop_v1",)
+    queue_max: int = 10000
+    bar_grace_sec: float = 2.0
+    flush_every_sec: float = 0.2
+    quote_refresh_sec: float = 1.0
+    controls_every_sec: float = 0.25
+    time_stop_seconds: float = 300.0
+    lag_budget_ms: float = 250.0
+    max_backlog: int = 1000
+    degraded_mode: str = "conflate"
+    recover_sec: float = 5.0
+    stale_order_ms: float = 2000.0
+    one_order_per_bar: int = 1
+    auto_match: int = 1
+    match_liq_qty: float = 10.0
+    max_bidask_age_seconds: int = 15
+    persist_events: int = 1
+    raw_events_dir: str = "runtime/raw_events"
+    source_tag: str = "supervisor_v1"
+    metrics_path: str = "runtime/state/supervisor_metrics_latest.json"
+    metrics_every_sec: float = 1.0
+
+    @classmethod
+    def from_env(cls) -> "SupervisorConfigV1":
+        mode = _env("TMF_SUPERVISOR_DEGRADED_MODE", "conflate").lower()
+        return cls(
+            symbol=_env("TMF_SYMBOL", "TMF"),
+            fop_code=_env("TMF_FOP_CODE", "TMFB6"),
+            atr_n=int(_env("TMF_ATR_N", "20")),
+            queue_max=max(1, int(_env("TMF_SUPERVISOR_QUEUE_MAX", "10000"))),
+            bar_grace_sec=float(_env("TMF_RECORDER_STREAM_BAR_GRACE_SEC", "2.0")),
+            quote_refresh_sec=float(_env("TMF_SUPERVISOR_QUOTE_REFRESH_SEC", "1.0")),
+            controls_every_sec=max(0.01, float(_env("TMF_SUPERVISOR_CONTROLS_SEC", "0.25"))),
+            time_stop_seconds=float(_env("TMF_INTRADE_TIME_STOP_SECONDS", "300")),
+            lag_budget_ms=float(_env("TMF_SUPERVISOR_LAG_BUDGET_MS", "250")),
+            max_backlog=max(1, int(_env("TMF_SUPERVISOR_MAX_BACKLOG", "1000"))),
+            degraded_mode=(mode if mode in DEGRADED_MODES else "conflate"),
+            recover_sec=float(_env("TMF_SUPERVISOR_RECOVER_SEC", "5")),
+            stale_order_ms=float(_env("TMF_SUPERVISOR_STALE_ORDER_MS", "2000")),
+            one_order_per_bar=1 if _env("TMF_ONE_ORDER_PER_BAR", "1") == "1" else 0,
+            auto_match=1 if _env("TMF_PAPER_AUTOMATCH", "1") == "1" else 0,
+            match_liq_qty=float(_env("TMF_PAPER_MATCH_LIQ_QTY", "10.0")),
+            max_bidask_age_seconds=int(_env("TMF_MAX_BIDASK_AGE_SECONDS", "15")),
+            persist_events=1 if _env("TMF_SUPERVISOR_PERSIST_EVENTS", "1") == "1" else 0,
+            raw_events_dir=_env("TMF_SUPERVISOR_RAW_EVENTS_DIR", "runtime/raw_events"),
+            metrics_path=_env("TMF_SUPERVISOR_METRICS_PATH", "runtime/state/supervisor_metrics_latest.json"),
+        )
+
+
+class StageV1:
+    """Bounded queue + queue-wait / service-time histograms. Create inside the running loop (py3.9 Queue binds it)."""
+
+    def __init__(self, name: str, maxsize: int):
+        self.name = name
+        self.q: "asyncio.Queue[Tuple[float, Any]]" = asyncio.Queue(maxsize=max(1, int(maxsize)))
+        self.wait_ms = LatencyHistogramV1()
+        self.service_ms = LatencyHistogramV1()
+        self.last_wait_ms = 0.0
+        self.processed = 0
+        self.dropped = 0
+
+    async def put(self, item: Any, *, t_enq: Optional[float] = None) -> None:
+        await self.q.put((time.monotonic() if t_enq is None else t_enq, item))
+
+    def put_nowait(self, item: Any, *, t_enq: Optional[float] = None) -> bool:
+        try:
+            self.q.put_nowait((time.monotonic() if t_enq is None else t_enq, item))
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+
+    async def get(self) -> Tuple[float, Any, float]:
+        t_enq, item = await self.q.get()
+        t0 = time.monotonic()
+        self.last_wait_ms = (t0 - t_enq) * 1000.0
+        self.wait_ms.observe(self.last_wait_ms)
+        return t_enq, item, t0
+
+    def done(self, t0: float) -> None:
+        self.service_ms.observe((time.monotonic() - t0) * 1000.0)
+        self.processed += 1
+        self.q.task_done()
+
+    def behind(self, cfg: SupervisorConfigV1) -> bool:
+        depth = self.q.qsize()
+        return depth > cfg.max_backlog or (depth > 0 and self.last_wait_ms > cfg.lag_budget_ms)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"depth": self.q.qsize(), "processed": self.processed, "dropped": self.dropped,
+                "last_wait_ms": round(self.last_wait_ms, 3),
+                "queue_wait_ms": self.wait_ms.to_dict(), "service_ms": self.service_ms.to_dict()}
+
+
+def _now_iso() -> str:
+    return datetime.now().isoformat(timespec="milliseconds")
+
+
+class AsyncSupervisorV1:
+    def __init__(self, *, db_path: str, cfg: Optional[SupervisorConfigV1] = None, strategies: Optional[List[Any]] = None):
+        self.db_path = str(db_path)
+        self.cfg = cfg or SupervisorConfigV1.from_env()
+        init_db(Path(self.db_path))
+        cfg = self.cfg
+        self.quote_cache = LatestQuoteCacheV1(self.db_path, min_refresh_sec=cfg.quote_refresh_sec)
+        self.oms = PaperOMS(Path(self.db_path))
+        risk = RiskEngineV1(db_path=self.db_path, cfg=RiskConfigV1(strict_require_market_metrics=1))
+        safety = SystemSafetyEngineV1(
+            db_path=self.db_path,
+            cfg=SafetyConfigV1(fop_code=cfg.fop_code, max_bidask_age_seconds=cfg.max_bidask_age_seconds, require_recent_bidask=1),
+            quote_cache=self.quote_cache,
+        )
+        self.wrap = PaperOMSRiskSafetyWrapperV1(paper_oms=self.oms, risk=risk, safety=safety, db_path=self.db_path)
+        self.strategies = list(strategies) if strategies is not None else load_strategies_from_env()
+        self.intrade_cfg = InTradeConfigV1(time_stop_seconds=cfg.time_stop_seconds)
+        self.agg = StreamBarAggregatorV1(intervals_sec=[60], close_grace_sec=cfg.bar_grace_sec)
+        self.agg.add_sink(self._on_bar_closed)
+        self.agg.add_late_tick_sink(self._on_late_tick)
+        self._bars: Deque[Dict[str, Any]] = deque(maxlen=max(2, cfg.atr_n + 1))
+        self.latency = {
+            "bar_close_to_decision_ms": LatencyHistogramV1(),
+            "bar_close_to_order_ms": LatencyHistogramV1(),
+            "quote_to_controls_ms": LatencyHistogramV1(),
+        }
+        self.controls_ms = LatencyHistogramV1()
+        self.counters: Dict[str, int] = {
+            "events": 0, "quotes": 0, "ticks": 0, "bars": 0, "bars_revised": 0, "bars_persisted": 0, "persist_errors": 0,
+            "signals": 0, "signals_no_metrics": 0, "signals_shed": 0, "signals_suppressed": 0, "strategy_errors": 0,
+            "orders_sent": 0, "orders_accepted": 0, "orders_rejected": 0, "orders_shed_stale": 0, "fills": 0, "oms_errors": 0,
+            "controls_runs": 0, "controls_closes": 0, "controls_errors": 0, "external_dropped": 0,
+        }
+        self.degraded = False
+        self.degraded_transitions = 0
+        self.degraded_stages: List[str] = []
+        self.last_errors: Dict[str, str] = {}
+        self._healthy_since: Optional[float] = None
+        self._last_px: Optional[float] = None
+        self._px_mono = 0.0
+        self._px_seq = 0
+        self._ctl_seq = 0
+        self.stages: Dict[str, StageV1] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stop_evt: Optional[asyncio.Event] = None
+        self._writer: Optional[AsyncEventWriterV1] = None
+        self._bars_sink = BarsDbSinkV1(self.db_path, background=False)   # already on the persist thread
+        self._oms_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tmf-sup-oms")
+        self._persist_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tmf-sup-persist")
+
+    # ---- external feed (in-process recorder callbacks run on other threads) ----
+    def submit_threadsafe(self, ts: str, kind: str, payload: Dict[str, Any]) -> None:
+        loop = self._loop
+        if loop is None:
+            raise RuntimeError("supervisor is not running")
+        t_enq = time.monotonic()
+        loop.call_soon_threadsafe(self._put_external, (ts, kind, payload), t_enq)
+
+    def _put_external(self, rec: Tuple[str, str, Dict[str, Any]], t_enq: float) -> None:
+        if not self.stages["ingest"].put_nowait(rec, t_enq=t_enq):
+            self.counters["external_dropped"] += 1
+
+    def stop_threadsafe(self) -> None:
+        if self._loop is not None and self._stop_evt is not None:
+            self._loop.call_soon_threadsafe(self._stop_evt.set)
+
+    # ---- stages ----
+    async def _pump(self, source: AsyncIterator[Tuple[str, str, Dict[str, Any]]]) -> None:
+        async for rec in source:
+            await self.stages["ingest"].put(rec)
+
+    async def _ingest_task(self) -> None:
+        st = self.stages["ingest"]
+        cfg = self.cfg
+        while True:
+            _t, (ts, kind, payload), t0 = await st.get()
+            try:
+                self.counters["events"] += 1
+                if "source_file" not in payload:
+                    payload = dict(payload, source_file=self.cfg.source_tag)  # events.source_file is NOT NULL
+                if self._writer is not None:
+                    self._writer.submit(ts, kind, payload)
+                if kind in cfg.quote_kinds:
+                    self.counters["quotes"] += 1
+                    snap = self.quote_cache.feed_payload(payload, ts=ts)
+                    if snap is not None and snap.code == cfg.fop_code and snap.bid and snap.ask:
+                        self._last_px = 0.5 * (float(snap.bid) + float(snap.ask))
+                        self._px_mono = t0
+                        self._px_seq += 1
+                elif kind in cfg.tick_kinds:
+                    self.counters["ticks"] += 1
+                    await self.stages["bars"].put(payload)
+            finally:
+                st.done(t0)
+
+    async def _bars_task(self) -> None:
+        st = self.stages["bars"]
+        while True:
+            _t, payload, t0 = await st.get()
+            try:
+                self.agg.on_tick_payload(payload)
+            finally:
+                st.done(t0)
+
+    async def _flush_task(self) -> None:
+        while True:
+            await asyncio.sleep(self.cfg.flush_every_sec)
+            self.agg.flush_due()
+
+    def _on_bar_closed(self, bar: Dict[str, Any]) -> None:
+        # aggregator sink: runs inside the bars stage (or a flush), must not block
+        if int(bar.get("interval_sec") or 0) != 60:
+            return
+        self._persist_pool.submit(self._persist_bar, dict(bar))
+        if str(bar.get("symbol")) != self.cfg.fop_code:
+            return
+        if int(bar.get("revision") or 0) > 0:
+            self.counters["bars_revised"] += 1
+            return
+        self.stages["strategy"].put_nowait(bar_public(bar))
+
+    def _on_late_tick(self, t: Dict[str, Any]) -> None:
+        self._persist_pool.submit(self._persist_late_tick, t)
+
+    def _persist_late_tick(self, t: Dict[str, Any]) -> None:
+        try:
+            self._bars_sink.on_late_tick(t)
+        except Exception as e:
+            self._error("persist", e)
+
+    def _persist_bar(self, bar: Dict[str, Any]) -> None:
+        try:
+            self._bars_sink(bar)
+            self.counters["bars_persisted"] += 1
+        except Exception as e:
+            self._error("persist", e)
+
+    def _market_metrics(self) -> Dict[str, Any]:
+        snap = self.quote_cache.get(self.cfg.fop_code, reject_synthetic=True, refresh=False)
+        if snap is None or snap.bid is None or snap.ask is None:
+            return {}
+        bid, ask = float(snap.bid), float(snap.ask)
+        return {
+            "bid": bid,
+            "ask": ask,
+            "spread_points": float(ask - bid),
+            "atr_points": _atr_from_bars(self._bars, self.cfg.atr_n),
+            "liquidity_score": float(_compute_liquidity_score(snap.to_payload())),
+            "source": {"bidask_event_id": int(snap.event_id or 0), "bidask_ts": snap.ts, "source_file": snap.source_file,
+                       "ingest_ts": snap.ingest_ts, "fop_code": self.cfg.fop_code, "atr_symbol": self.cfg.fop_code,
+                       "atr_n": int(self.cfg.atr_n), "via": "supervisor_memory"},
+        }
+
+    async def _strategy_task(self) -> None:
+        st = self.stages["strategy"]
+        cfg = self.cfg
+        while True:
+            t_close, b, t0 = await st.get()
+            try:
+                self.counters["bars"] += 1
+                bar = {"ts_min": str(b["ts_start"]), "o": float(b["o"]), "h": float(b["h"]), "l": float(b["l"]),
+                       "c": float(b["c"]), "v": float(b.get("v") or 0.0), "n_trades": int(b.get("n_trades") or 0),
+                       "source": STREAM_SOURCE}
+                self._bars.append(bar)
+                ctx = StrategyContextV1(now_ts=bar["ts_min"], symbol=cfg.symbol, state={})
+                mm = self._market_metrics()
+                stale = st.q.qsize() > 0  # a newer bar is already waiting
+                intent = False
+                for s in self.strategies:
+                    fn = getattr(s, "on_bar", None) or getattr(s, "on_bar_1m", None)
+                    try:
+                        sig = fn(ctx, bar) if fn else None
+                    except Exception as e:
+                        self._error("strategy", e)
+                        continue
+                    if sig is None:
+                        continue
+                    self.counters["signals"] += 1
+                    if intent:
+                        self.counters["signals_suppressed"] += 1
+                        continue
+                    if not mm:
+                        self.counters["signals_no_metrics"] += 1
+                        continue
+                    if self.degraded and (cfg.degraded_mode == "no_entry" or (cfg.degraded_mode == "conflate" and stale)):
+                        self.counters["signals_shed"] += 1
+                        continue
+                    sig = _ensure_stop(sig, ref_price=bar["c"])
+                    meta = sig.to_order_meta(strat_name=getattr(s, "name", s.__class__.__name__),
+                                             strat_version=getattr(s, "version", "v?"), ref_price=bar["c"],
+                                             now_ts=bar["ts_min"], symbol=cfg.symbol)
+                    meta["market_metrics"] = mm
+                    meta = _apply_vol_confidence(meta, mm)
+                    meta["supervisor"] = {"bar_ts": bar["ts_min"], "degraded": bool(self.degraded)}
+                    self.latency["bar_close_to_decision_ms"].observe((time.monotonic() - t_close) * 1000.0)
+                    self.stages["oms"].put_nowait({"sig": sig, "meta": meta, "t_close": t_close})
+                    intent = bool(cfg.one_order_per_bar)
+            finally:
+                st.done(t0)
+
+    def _place(self, it: Dict[str, Any]) -> Any:
+        # OMS worker thread
+        sig, meta = it["sig"], it["meta"]
+        r = self.wrap.place_order(symbol=self.cfg.symbol, side=sig.side, qty=float(sig.qty), order_type=str(sig.order_type),
+                                  price=(None if sig.price is None else float(sig.price)), meta=meta)
+        if isinstance(r, dict):
+            self.counters["orders_rejected"] += 1
+            return r
+        self.counters["orders_accepted"] += 1
+        if self.cfg.auto_match and hasattr(r, "order_id") and hasattr(r, "side"):
+            mm = meta.get("market_metrics") or {}
+            px = float(mm.get("ask") or 0.0) if str(r.side).upper() == "BUY" else float(mm.get("bid") or 0.0)
+            if px > 0:
+                self.counters["fills"] += len(self.oms.match(r, market_price=px, liquidity_qty=self.cfg.match_liq_qty,
+                                                             reason="supervisor_autofill"))
+        return r
+
+    async def _oms_task(self) -> None:
+        st = self.stages["oms"]
+        loop = asyncio.get_running_loop()
+        while True:
+            _t, it, t0 = await st.get()
+            try:
+                if self.degraded and self.cfg.degraded_mode != "off" and (t0 - it["t_close"]) * 1000.0 > self.cfg.stale_order_ms:
+                    self.counters["orders_shed_stale"] += 1
+                    continue
+                self.counters["orders_sent"] += 1
+                await loop.run_in_executor(self._oms_pool, self._place, it)
+                self.latency["bar_close_to_order_ms"].observe((time.monotonic() - it["t_close"]) * 1000.0)
+            except Exception as e:
+                self._error("oms", e)
+            finally:
+                st.done(t0)
+
+    async def _controls_task(self) -> None:
+        loop = asyncio.get_running_loop()
+        cfg = self.cfg
+        while True:
+            await asyncio.sleep(cfg.controls_every_sec)
+            seq, px, t_px = self._px_seq, self._last_px, self._px_mono
+            if px is None or seq == self._ctl_seq:
+                continue
+            self._ctl_seq = seq
+            pos = self.oms.pos.get(cfg.symbol)
+            if not pos or float(pos.qty) <= 0:
+                continue
+            t0 = time.monotonic()
+            try:
+                res = await loop.run_in_executor(
+                    self._oms_pool, lambda: run_intrade_once(oms=self.oms, symbol=cfg.symbol, market_price=float(px), cfg=self.intrade_cfg))
+                self.counters["controls_runs"] += 1
+                if str(res.get("action", "")).startswith("CLOSE"):
+                    self.counters["controls_closes"] += 1
+            except Exception as e:
+                self._error("controls", e)
+            now = time.monotonic()
+            self.controls_ms.observe((now - t0) * 1000.0)
+            self.latency["quote_to_controls_ms"].observe((now - t_px) * 1000.0)
+
+    async def _health_task(self) -> None:
+        cfg = self.cfg
+        while True:
+            await asyncio.sleep(0.1)
+            behind = [n for n, st in self.stages.items() if st.behind(cfg)]
+            now = time.monotonic()
+            if behind:
+                self._healthy_since = None
+                self.degraded_stages = behind
+                if not self.degraded:
+                    self.degraded = True
+                    self.degraded_transitions += 1
+                    print(f"[DEGRADED] stages={','.join(behind)} mode={cfg.degraded_mode}")
+            elif self.degraded:
+                if self._healthy_since is None:
+                    self._healthy_since = now
+                elif now - self._healthy_since >= cfg.recover_sec:
+                    self.degraded = False
+                    self.degraded_stages = []
+                    print("[RECOVERED] all stages within budget")
+
+    async def _metrics_task(self) -> None:
+        while True:
+            await asyncio.sleep(self.cfg.metrics_every_sec)
+            self.publish_metrics()
+
+    def _error(self, where: str, e: BaseException) -> None:
+        self.counters[f"{where}_errors"] += 1
+        self.last_errors[where] = f"{type(e).__name__}: {e}"
+
+    # ---- lifecycle ----
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "ts": _now_iso(),
+            "degraded": bool(self.degraded),
+            "degraded_mode": self.cfg.degraded_mode,
+            "degraded_stages": list(self.degraded_stages),
+            "degraded_transitions": int(self.degraded_transitions),
+            "stages": {n: st.to_dict() for n, st in self.stages.items()},
+            "controls": {"service_ms": self.controls_ms.to_dict()},
+            "latency": {k: h.to_dict() for k, h in self.latency.items()},
+            "counters": dict(self.counters),
+            "last_errors": dict(self.last_errors),
+            "bar_stream": dict(self.agg.stats),
+            "writer": (self._writer.snapshot() if self._writer is not None else None),
+        }
+
+    def publish_metrics(self) -> None:
+        if not self.cfg.metrics_path:
+            return
+        try:
+            p = Path(self.cfg.metrics_path)
+            p.parent.mkdir(parents=True, exist_ok=True)
+            tmp = p.with_name(p.name + ".tmp")
+            tmp.write_text(json.dumps(self.snapshot(), ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+            os.replace(tmp, p)
+        except Exception:
+            pass
+
+    async def run(self, source: Optional[AsyncIterator[Tuple[str, str, Dict[str, Any]]]] = None, *,
+                  max_seconds: float = 0.0) -> Dict[str, Any]:
+        """
+        Run until the source is exhausted (then drain every stage), max_seconds, or stop_threadsafe().
+        source=None: events only arrive through submit_threadsafe().
+        """
+        cfg = self.cfg
+        self._loop = asyncio.get_running_loop()
+        self._stop_evt = asyncio.Event()
+        self.stages = {n: StageV1(n, cfg.queue_max) for n in STAGES}
+        fp = None
+        if cfg.persist_events:
+            d = Path(cfg.raw_events_dir)
+            d.mkdir(parents=True, exist_ok=True)
+            out = d / f"supervisor.{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+            fp = out.open("a", encoding="utf-8")
+            wcfg = replace(AsyncWriterConfigV1.from_env(), db_path=self.db_path, metrics_path="")
+            self._writer = AsyncEventWriterV1(fp, cfg=wcfg, spill_path=out.with_name(out.stem + ".spill.jsonl")).start()
+        tasks = [asyncio.ensure_future(c) for c in (self._ingest_task(), self._bars_task(), self._strategy_task(),
+                                                    self._oms_task(), self._controls_task(), self._flush_task(),
+                                                    self._health_task(), self._metrics_task())]
+        t_start = time.monotonic()
+        try:
+            waiters = [asyncio.ensure_future(self._stop_evt.wait())]
+            if source is not None:
+                waiters.append(asyncio.ensure_future(self._pump(source)))
+            done, pending = await asyncio.wait(waiters, timeout=(max_seconds if max_seconds > 0 else None),
+                                               return_when=asyncio.FIRST_COMPLETED)
+            for w in pending:
+                w.cancel()
+            for w in done:
+                w.result()  # surface source errors
+            # drain in pipeline order; flush_all closes the last open minute
+            for n in ("ingest", "bars"):
+                await self.stages[n].q.join()
+            self.agg.flush_all()
+            for n in ("strategy", "oms"):
+                await self.stages[n].q.join()
+        finally:
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self._oms_pool.shutdown(wait=True)
+            if self._writer is not None:
+                self._writer.close()
+            self._persist_pool.shutdown(wait=True)
+            self._bars_sink.close()
+            self.quote_cache.close()
+            if fp is not None:
+                fp.close()
+            out = self.snapshot()
+            out["secs"] = round(time.monotonic() - t_start, 3)
+            self.publish_metrics()
+            self._loop = None
+        return out
+
+
+def _epoch(ts: Any) -> Optional[float]:
+    try:
+        return datetime.fromisoformat(str(ts).replace("Z", "+00:00")).timestamp()
+    except Exception:
+        return None
+
+
+async def jsonl_source(path: str, *, speed: float = 0.0, restamp: bool = False) -> AsyncIterator[Tuple[str, str, Dict[str, Any]]]:
+    """
+    Recorder JSONL ({"ts","kind","payload"} per line) as an event source.
+    speed>0 replays with the recorded inter-event gaps divided by speed (0 = as fast as possible);
+    restamp=True rewrites ts / ingest_ts / recv_ts to now (paper replay against the freshness gates).
+    """
+    base: Optional[Tuple[float, float]] = None
+    with open(path, "r", encoding="utf-8") as f:
+        for i, line in enumerate(f):
+            if speed <= 0 and i % 256 == 255:
+                await asyncio.sleep(0)  # unpaced replay: let the downstream stages interleave
+            try:
+                rec = json.loads(line)
+            except Exception:
+                continue
+            kind, payload, ts = rec.get("kind"), rec.get("payload"), str(rec.get("ts") or "")
+            if not kind or not isinstance(payload, dict):
+                continue
+            if speed > 0:
+                ep = _epoch(ts)
+                if ep is not None:
+                    if base is None:
+                        base = (ep, time.monotonic())
+                    delay = (ep - base[0]) / float(speed) - (time.monotonic() - base[1])
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+            if restamp:
+                now = _now_iso()
+                payload = dict(payload)
+                payload["ingest_ts"] = now
+                if "recv_ts" in payload:
+                    payload["recv_ts"] = now
+                ts = now
+            yield ts, str(kind), payload
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="TMF AutoTrader async runtime supervisor (paper) v1")
+    ap.add_argument("--db", default=os.environ.get("TMF_DB_PATH", "runtime/data/tmf_autotrader_v1.sqlite3"))
+    ap.add_argument("--events-jsonl", required=True, help="recorder JSONL to feed through the pipeline")
+    ap.add_argument("--speed", type=float, default=0.0, help="replay speed (0 = as fast as possible)")
+    ap.add_argument("--restamp", action="store_true", help="stamp events with the current time on ingest")
+    ap.add_argument("--max-seconds", type=float, default=float(_env("TMF_MAX_SECONDS", "0")))
+    args = ap.parse_args(argv)
+
+    Path(args.db).parent.mkdir(parents=True, exist_ok=True)
+    sup = AsyncSupervisorV1(db_path=args.db)
+    print(f"[BOOT] supervisor db={args.db} fop_code={sup.cfg.fop_code} degraded_mode={sup.cfg.degraded_mode} "
+          f"strategies={','.join(getattr(s, 'name', '?') for s in sup.strategies)}")
+    out = asyncio.run(sup.run(jsonl_source(args.events_jsonl, speed=args.speed, restamp=args.restamp), max_seconds=args.max_seconds))
+    lat = out["latency"]["bar_close_to_decision_ms"]
+    print(f"[OK] events={out['counters']['events']} bars={out['counters']['bars']} orders={out['counters']['orders_sent']} "
+          f"fills={out['counters']['fills']} degraded_transitions={out['degraded_transitions']} "
+          f"bar_close_to_decision p50={lat['p50_ms']} p99={lat['p99_ms']} secs={out['secs']}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -49,6 +49,9 @@ from src.oms.paper_oms_risk_safety_wrapper_v1 import PaperOMSRiskSafetyWrapperV1
 from src.risk.risk_engine_v1 import RiskEngineV1, RiskConfigV1
 from src.safety.system_safety_v1 import SystemSafetyEngineV1, SafetyConfigV1
 from src.market.market_metrics_from_db_v1 import get_market_metrics_from_db
+from src.market.quote_cache_v1 import shared_quote_cache_or_none
+from src.data.bar_events_v1 import make_bar_event_source
+from src.ops.latency.latency_histogram import LatencyHistogramV1
 
 from src.strat.trend_v1 import TrendStrategyV1
 from src.strat.mean_reversion_v1 import MeanReversionStrategyV1
@@ -149,13 +152,14 @@ def _fetch_last_bar_1m(db_path: Path, symbol: str) -> Optional[Dict[str, Any]]:
         con.close()
 
 
-def _build_market_metrics(*, db_path: Path, fop_code: str, bars_symbol_for_atr: str, atr_n: int, asof_ts: str) -> Dict[str, Any]:
+def _build_market_metrics(*, db_path: Path, fop_code: str, bars_symbol_for_atr: str, atr_n: int, asof_ts: str, quote_cache: Any = None) -> Dict[str, Any]:
     mm = get_market_metrics_from_db(
         db_path=str(db_path),
         fop_code=fop_code,
         bars_symbol_for_atr=bars_symbol_for_atr,
         atr_n=atr_n,
         asof_ts=asof_ts,
+        quote_cache=quote_cache,
     ) or {}
     # STRICT: do NOT fabricate market_metrics; only include when bid/ask truly present.
     if mm.get("bid") is None or mm.get("ask") is None:
@@ -188,6 +192,19 @@ def _ensure_stop(signal: StrategySignalV1, *, ref_price: float) -> StrategySigna
     return signal
 
 
+def _write_latency_summary(path: str, summary: Dict[str, Any]) -> None:
+    # best-effort artifact (runtime/state); never breaks the loop
+    try:
+        import json
+        p = Path(path)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        tmp = p.with_name(p.name + ".tmp")
+        tmp.write_text(json.dumps(summary, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+        tmp.replace(p)
+    except Exception:
+        pass
+
+
 def _load_strategies() -> List[Any]:
     spec = (os.environ.get("TMF_STRATEGIES", "trend,mean_reversion") or "trend,mean_reversion").strip()
     keys = [s.strip().lower() for s in spec.split(",") if s.strip()]
@@ -234,15 +251,28 @@ def main() -> int:
         session_close_hhmm=(os.environ.get("TMF_SESSION_CLOSE_HHMM", "1345") or "1345").strip(),
         halt_dates_csv=(os.environ.get("TMF_HALT_DATES_CSV", "") or "").strip(),
     )
-    safety = SystemSafetyEngineV1(db_path=str(db), cfg=safety_cfg)
+    quote_cache = shared_quote_cache_or_none(str(db))
+    safety = SystemSafetyEngineV1(db_path=str(db), cfg=safety_cfg, quote_cache=quote_cache)
     wrap = PaperOMSRiskSafetyWrapperV1(paper_oms=oms, risk=risk, safety=safety, db_path=str(db))
 
     # Loop settings
+    # TMF_PAPER_LOOP_MODE=poll  : re-read the last bars_1m row every TMF_POLL_SECONDS (default)
+    # TMF_PAPER_LOOP_MODE=event : wake on bar-close notifications (src.data.bar_events_v1:
+    #                             TMF_BAR_EVENTS_UDP=host:port from the recorder, else SQLite change detection)
     poll_sec = float((os.environ.get("TMF_POLL_SECONDS", "0.5") or "0.5").strip())
     one_order_per_bar = int((os.environ.get("TMF_ONE_ORDER_PER_BAR", "1") or "1").strip()) == 1
+    loop_mode = (os.environ.get("TMF_PAPER_LOOP_MODE", "poll") or "poll").strip().lower()
+    events = make_bar_event_source(str(db), symbol=fop_code, quote_cache=quote_cache) if loop_mode == "event" else None
+    idle_sec = 0.0 if events is not None else max(0.2, poll_sec)
+
+    # bar close (producer publish time in event mode, detection time in poll mode) -> order decision
+    lat_decision = LatencyHistogramV1()
+    lat_detect = LatencyHistogramV1()
+    lat_path = (os.environ.get("TMF_PAPER_LOOP_LATENCY_PATH", "runtime/state/paper_loop_latency_latest.json")
+                or "runtime/state/paper_loop_latency_latest.json").strip()
 
     strats = _load_strategies()
-    print(f"[BOOT] symbol={args.symbol} fop_code={fop_code} max_age={max_age}s poll={poll_sec}s "
+    print(f"[BOOT] symbol={args.symbol} fop_code={fop_code} max_age={max_age}s poll={poll_sec}s mode={loop_mode} "
           f"one_order_per_bar={int(one_order_per_bar)} strategies={','.join([getattr(s,'name','?') for s in strats])}")
 
     last_bar_ts = None
@@ -253,93 +283,122 @@ def main() -> int:
     t_start = time.time()
     bars_seen = 0
 
-    while True:
-        if float(getattr(args,'max_seconds',0) or 0) > 0 and (time.time() - t0) >= float(args.max_seconds):
-            print(f"[EXIT] reached max_seconds={args.max_seconds}")
-            return 0
-
-        bar = _fetch_last_bar_1m(db, fop_code)
-        if not bar:
-            time.sleep(max(0.2, poll_sec))
-            continue
-
-        ts_min = str(bar["ts_min"])
-        if last_bar_ts == ts_min:
-            time.sleep(max(0.2, poll_sec))
-            continue
-
-        last_bar_ts = ts_min
-
-        bars_seen += 1
-        if max_loop_seconds > 0 and (time.time() - t_start) >= max_loop_seconds:
-            print(f"[EXIT] max_loop_seconds reached: {max_loop_seconds}")
-            break
-        if max_loop_bars > 0 and bars_seen > max_loop_bars:
-            print(f"[EXIT] max_loop_bars reached: {max_loop_bars}")
-            break
-        ref_price = float(bar["c"])
-
-        # Pull market_metrics fresh every new bar (must reflect latest NON-synthetic bidask)
-        mm = _build_market_metrics(db_path=db, fop_code=fop_code, bars_symbol_for_atr=bars_symbol, atr_n=atr_n, asof_ts=ts_min)
-        if not mm:
-            print(f"[SKIP] bar_ts={ts_min} no market_metrics(bid/ask) in DB yet")
-            time.sleep(max(0.2, poll_sec))
-            continue
-
-        ctx = StrategyContextV1(now_ts=ts_min, symbol=args.symbol, state={})
-        print(f"[BAR] ts={ts_min} c={ref_price} spread={mm.get('spread_points')} liq={mm.get('liquidity_score')} bidask_ts={(mm.get('source') or {}).get('bidask_ts')} bidask_id={(mm.get('source') or {}).get('bidask_event_id')}")
-
-        placed = False
-        for s in strats:
-            sig = s.on_bar_1m(ctx, bar)
-            if sig is None:
+    try:
+        while True:
+            if float(getattr(args,'max_seconds',0) or 0) > 0 and (time.time() - t0) >= float(args.max_seconds):
+                print(f"[EXIT] reached max_seconds={args.max_seconds}")
+                return 0
+
+            ev = None
+            if events is not None:
+                ev = events.wait_bar(timeout=1.0)
+                bar = None if ev is None else ev.bar
+            else:
+                bar = _fetch_last_bar_1m(db, fop_code)
+            t_close = ev.close_wall if ev is not None else time.time()
+            if not bar:
+                time.sleep(idle_sec)
                 continue
 
-            sig = _ensure_stop(sig, ref_price=ref_price)
-            meta = sig.to_order_meta(
-                strat_name=getattr(s, "name", "unknown"),
-                strat_version=getattr(s, "version", "v?"),
-                ref_price=ref_price,
-            )
-            meta["market_metrics"] = mm
-
-
-            meta = _apply_vol_confidence(meta, mm)
-            print(f"[SIGNAL] strat={getattr(s,'name','?')} side={sig.side} qty={sig.qty} stop={sig.stop_price} reason={sig.reason}")
-            r = wrap.place_order(
-                symbol=args.symbol,
-                side=sig.side,
-                qty=float(sig.qty),
-                order_type=str(sig.order_type),
-                price=(None if sig.price is None else float(sig.price)),
-                meta=meta,
-            )
-            print("[ORDER]", r)
-
-            # --- PAPER AUTOFILL (v1) ---
-            # In paper mode, accepted orders must be matched to generate fills/trades.
-            # Default: auto-match MARKET orders immediately using conservative bid/ask.
-            try:
-                auto_match = (os.environ.get("TMF_PAPER_AUTOMATCH", "1").strip() == "1")
-                liq_qty = float(os.environ.get("TMF_PAPER_MATCH_LIQ_QTY", "10.0") or "10.0")
-                is_order_obj = hasattr(r, "order_id") and hasattr(r, "order_type") and hasattr(r, "side")
-                if auto_match and is_order_obj:
-                    bid = float((mm.get("bid") or 0.0))
-                    ask = float((mm.get("ask") or 0.0))
-                    px = ask if str(getattr(r, "side", "")).upper() == "BUY" else bid
-                    if px > 0:
-                        fills = wrap.paper_oms.match(r, market_price=float(px), liquidity_qty=liq_qty, reason="paper_loop_autofill")
-                        print(f"[MATCH] order_id={getattr(r,'order_id',None)} side={getattr(r,'side',None)} market_price={px} fills={len(fills)}")
-            except Exception as _e:
-                print(f"[WARN] paper_autofill failed: {_e}")
-            placed = True
-            if one_order_per_bar:
+            ts_min = str(bar["ts_min"])
+            if last_bar_ts == ts_min:
+                time.sleep(idle_sec)
+                continue
+
+            last_bar_ts = ts_min
+            if ev is not None and ev.via == "udp":
+                # producer publish -> receipt (db events carry no producer time)
+                lat_detect.observe((ev.detect_wall - ev.close_wall) * 1000.0)
+
+            bars_seen += 1
+            if max_loop_seconds > 0 and (time.time() - t_start) >= max_loop_seconds:
+                print(f"[EXIT] max_loop_seconds reached: {max_loop_seconds}")
+                break
+            if max_loop_bars > 0 and bars_seen > max_loop_bars:
+                print(f"[EXIT] max_loop_bars reached: {max_loop_bars}")
                 break
+            ref_price = float(bar["c"])
 
-        if not placed:
-            print("[INFO] no signal")
+            # Pull market_metrics fresh every new bar (must reflect latest NON-synthetic bidask)
+            mm = _build_market_metrics(db_path=db, fop_code=fop_code, bars_symbol_for_atr=bars_symbol, atr_n=atr_n, asof_ts=ts_min, quote_cache=quote_cache)
+            if not mm:
+                print(f"[SKIP] bar_ts={ts_min} no market_metrics(bid/ask) in DB yet")
+                time.sleep(idle_sec)
+                continue
 
-        time.sleep(max(0.2, poll_sec))
+            ctx = StrategyContextV1(now_ts=ts_min, symbol=args.symbol, state={})
+            print(f"[BAR] ts={ts_min} c={ref_price} spread={mm.get('spread_points')} liq={mm.get('liquidity_score')} bidask_ts={(mm.get('source') or {}).get('bidask_ts')} bidask_id={(mm.get('source') or {}).get('bidask_event_id')}")
+
+            placed = False
+            for s in strats:
+                sig = s.on_bar_1m(ctx, bar)
+                if sig is None:
+                    continue
+
+                sig = _ensure_stop(sig, ref_price=ref_price)
+                meta = sig.to_order_meta(
+                    strat_name=getattr(s, "name", "unknown"),
+                    strat_version=getattr(s, "version", "v?"),
+                    ref_price=ref_price,
+                )
+                meta["market_metrics"] = mm
+
+
+                meta = _apply_vol_confidence(meta, mm)
+                if not placed:
+                    lat_decision.observe((time.time() - t_close) * 1000.0)
+                print(f"[SIGNAL] strat={getattr(s,'name','?')} side={sig.side} qty={sig.qty} stop={sig.stop_price} reason={sig.reason}")
+                r = wrap.place_order(
+                    symbol=args.symbol,
+                    side=sig.side,
+                    qty=float(sig.qty),
+                    order_type=str(sig.order_type),
+                    price=(None if sig.price is None else float(sig.price)),
+                    meta=meta,
+                )
+                print("[ORDER]", r)
+
+                # --- PAPER AUTOFILL (v1) ---
+                # In paper mode, accepted orders must be matched to generate fills/trades.
+                # Default: auto-match MARKET orders immediately using conservative bid/ask.
+                try:
+                    auto_match = (os.environ.get("TMF_PAPER_AUTOMATCH", "1").strip() == "1")
+                    liq_qty = float(os.environ.get("TMF_PAPER_MATCH_LIQ_QTY", "10.0") or "10.0")
+                    is_order_obj = hasattr(r, "order_id") and hasattr(r, "order_type") and hasattr(r, "side")
+                    if auto_match and is_order_obj:
+                        bid = float((mm.get("bid") or 0.0))
+                        ask = float((mm.get("ask") or 0.0))
+                        px = ask if str(getattr(r, "side", "")).upper() == "BUY" else bid
+                        if px > 0:
+                            fills = wrap.paper_oms.match(r, market_price=float(px), liquidity_qty=liq_qty, reason="paper_loop_autofill")
+                            print(f"[MATCH] order_id={getattr(r,'order_id',None)} side={getattr(r,'side',None)} market_price={px} fills={len(fills)}")
+                except Exception as _e:
+                    print(f"[WARN] paper_autofill failed: {_e}")
+                placed = True
+                if one_order_per_bar:
+                    break
+
+            if not placed:
+                lat_decision.observe((time.time() - t_close) * 1000.0)
+                print("[INFO] no signal")
+
+            time.sleep(idle_sec)
+    finally:
+        summary = {
+            "mode": loop_mode,
+            "via": (None if events is None else type(events).__name__),
+            "bars_seen": bars_seen,
+            "close_to_decision_ms": lat_decision.to_dict(),
+            "close_to_detect_ms": lat_detect.to_dict(),
+            "source_stats": (None if events is None else dict(events.stats)),
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        if lat_decision.n:
+            d = summary["close_to_decision_ms"]
+            print(f"[LAT] close_to_decision_ms n={d['n']} p50={d['p50_ms']} p95={d['p95_ms']} p99={d['p99_ms']} max={d['max_ms']}")
+        _write_latency_summary(lat_path, summary)
+        if events is not None:
+            events.close()
 
     # unreachable
     # return 0
@@ -48,80 +48,12 @@ from src.oms.paper_oms_risk_safety_wrapper_v1 import PaperOMSRiskSafetyWrapperV1
 from src.risk.risk_engine_v1 import RiskEngineV1, RiskConfigV1
 from src.safety.system_safety_v1 import SystemSafetyEngineV1, SafetyConfigV1
 from src.market.market_metrics_from_db_v1 import get_market_metrics_from_db
+from src.market.quote_cache_v1 import shared_quote_cache_or_none
 
 from src.strat.trend_v1 import TrendStrategyV1
 from src.strat.mean_reversion_v1 import MeanReversionStrategyV1
 from src.strat.strategy_base_v1 import StrategyContextV1, StrategySignalV1
-
-def _vol_regime_from_atr(atr_points: float) -> str:
-    """
-    Minimal volatility regime classifier (v1).
-    ATR is in "points" of the instrument price scale (same unit as bid/ask).
-    Thresholds are env-tunable to support rapid ops calibration.
-    """
-    import os
-    low_max = float((os.environ.get("TMF_VOL_REGIME_LOW_MAX_ATR", "30") or "30").strip())
-    mid_max = float((os.environ.get("TMF_VOL_REGIME_MID_MAX_ATR", "60") or "60").strip())
-    high_max = float((os.environ.get("TMF_VOL_REGIME_HIGH_MAX_ATR", "90") or "90").strip())
-    x = float(atr_points)
-    if x <= low_max:
-        return "LOW"
-    if x <= mid_max:
-        return "MID"
-    if x <= high_max:
-        return "HIGH"
-    return "EXTREME"
-
-
-def _apply_vol_confidence(meta: dict, mm: dict) -> dict:
-    """
-    v18 task: signal_confidence must be modulated by vol_regime.
-    We keep raw confidence for audit, and write adjusted confidence used by the engine.
-    """
-    import os
-    atr = mm.get("atr_points")
-    if atr is None:
-        return meta
-    try:
-        regime = _vol_regime_from_atr(float(atr))
-    except Exception:
-        return meta
-
-    # factors: conservative by default (high vol -> lower confidence)
-    f_low  = float((os.environ.get("TMF_CONF_FACTOR_LOW", "1.05") or "1.05").strip())
-    f_mid  = float((os.environ.get("TMF_CONF_FACTOR_MID", "1.00") or "1.00").strip())
-    f_high = float((os.environ.get("TMF_CONF_FACTOR_HIGH", "0.80") or "0.80").strip())
-    f_ext  = float((os.environ.get("TMF_CONF_FACTOR_EXTREME", "0.60") or "0.60").strip())
-    factor = {"LOW": f_low, "MID": f_mid, "HIGH": f_high, "EXTREME": f_ext}.get(regime, f_mid)
-
-    meta = dict(meta or {})
-    meta["vol_regime"] = regime
-    meta["regime_dpb_risk"] = (regime == "EXTREME")  # B3 DPB/DPBM risk regime (fail-fast via taifex_preflight)
-
-    strat = meta.get("strat") if isinstance(meta.get("strat"), dict) else {}
-    raw = strat.get("confidence")
-    if raw is None:
-        raw = meta.get("signal_confidence")
-    if raw is None:
-        return meta
-
-    try:
-        raw_f = float(raw)
-    except Exception:
-        return meta
-
-    adj = max(0.0, min(1.0, raw_f * factor))
-    meta["signal_confidence_raw"] = raw_f
-    meta["signal_confidence"] = adj
-
-    strat = dict(strat)
-    strat.setdefault("confidence_raw", raw_f)
-    strat["confidence"] = adj
-    meta["strat"] = strat
-    return meta
-
-
-
+from src.sim.signal_meta_v1 import _apply_vol_confidence, _ensure_stop, _vol_regime_from_atr  # noqa: F401 (re-export)
 
 def _fetch_last_bar_1m(db_path: Path, symbol: str) -> Optional[Dict[str, Any]]:
     con = sqlite3.connect(str(db_path))
@@ -147,8 +79,8 @@ def _fetch_last_bar_1m(db_path: Path, symbol: str) -> Optional[Dict[str, Any]]:
         con.close()
 
 
-def _build_market_metrics(*, db_path: Path, fop_code: str, bars_symbol_for_atr: str, atr_n: int) -> Dict[str, Any]:
-    mm = get_market_metrics_from_db(db_path=str(db_path), fop_code=fop_code, bars_symbol_for_atr=bars_symbol_for_atr, atr_n=atr_n) or {}
+def _build_market_metrics(*, db_path: Path, fop_code: str, bars_symbol_for_atr: str, atr_n: int, quote_cache: Any = None) -> Dict[str, Any]:
+    mm = get_market_metrics_from_db(db_path=str(db_path), fop_code=fop_code, bars_symbol_for_atr=bars_symbol_for_atr, atr_n=atr_n, quote_cache=quote_cache) or {}
     # IMPORTANT: do NOT fabricate market_metrics; only include when bid/ask truly present.
     if mm.get("bid") is None or mm.get("ask") is None:
         return {}
@@ -164,23 +96,6 @@ def _build_market_metrics(*, db_path: Path, fop_code: str, bars_symbol_for_atr:
     }
 
 
-def _ensure_stop(signal: StrategySignalV1, *, ref_price: float) -> StrategySignalV1:
-    # Keep RiskEngine strict; strategy should provide stop when it can.
-    # Engine fallback is allowed for skeleton stage to keep flow testable, but is clearly tagged.
-    if signal.stop_price is not None:
-        return signal
-    default_stop_pts = float((os.environ.get("TMF_ENGINE_DEFAULT_STOP_POINTS", "50") or "50").strip())
-    # BUY: stop below; SELL: stop above
-    if signal.side == "BUY":
-        signal.stop_price = ref_price - default_stop_pts
-    else:
-        signal.stop_price = ref_price + default_stop_pts
-    signal.tags = dict(signal.tags or {})
-    signal.tags["engine_stop_fallback"] = True
-    signal.tags["engine_default_stop_points"] = default_stop_pts
-    return signal
-
-
 def _load_strategies() -> List[Any]:
     # Env-driven list; default run both skeletons.
     spec = (os.environ.get("TMF_STRATEGIES", "trend,mean_reversion") or "trend,mean_reversion").strip()
@@ -229,7 +144,8 @@ def main():
         session_close_hhmm=(os.environ.get("TMF_SESSION_CLOSE_HHMM", "1345") or "1345").strip(),
         halt_dates_csv=(os.environ.get("TMF_HALT_DATES_CSV", "") or "").strip(),
     )
-    safety = SystemSafetyEngineV1(db_path=str(db), cfg=safety_cfg)
+    quote_cache = shared_quote_cache_or_none(str(db))
+    safety = SystemSafetyEngineV1(db_path=str(db), cfg=safety_cfg, quote_cache=quote_cache)
     wrap = PaperOMSRiskSafetyWrapperV1(paper_oms=oms, risk=risk, safety=safety, db_path=str(db))
 
     # Data: warmup recent bars so stateful strategies (Donchian/ATR) can produce signals
@@ -255,7 +171,7 @@ def main():
 
     ref_price = float(last_bar["c"])
 
-    mm = _build_market_metrics(db_path=db, fop_code=fop_code, bars_symbol_for_atr=bars_symbol, atr_n=atr_n)
+    mm = _build_market_metrics(db_path=db, fop_code=fop_code, bars_symbol_for_atr=bars_symbol, atr_n=atr_n, quote_cache=quote_cache)
     if not mm:
         print("[REJECT] market_metrics missing bid/ask from DB (strict_require_market_metrics=1).")
         return 0
@@ -0,0 +1,119 @@
+"""
+TMF AutoTrader — signal -> order meta helpers v1 (shared by the paper runner, async supervisor, replay engine)
+
+Why:
+- run_async_supervisor_v1 and replay_engine_v1 used to import these from run_strategies_paper_v1, whose import
+  runs the drift detector against the production DB (may freeze learning governance state and writes the
+  drift report). Replays and tests must not touch either.
+
+What:
+- _vol_regime_from_atr / _apply_vol_confidence: vol-regime tag + confidence modulation (v18)
+- _ensure_stop: engine default stop fallback (tagged)
+- _atr_from_bars: market_metrics_from_db_v1._atr_from_bars_1m over in-memory bars (oldest first)
+- imports nothing with side effects; no DB, no files
+
+NOTE: Python 3.9.6 compatible
+"""
+from __future__ import annotations
+
+import os
+from typing import Any, List, Optional
+
+from src.strat.strategy_base_v1 import StrategySignalV1
+
+
+def _vol_regime_from_atr(atr_points: float) -> str:
+    """
+    Minimal volatility regime classifier (v1).
+    ATR is in "points" of the instrument price scale (same unit as bid/ask).
+    Thresholds are env-tunable to support rapid ops calibration.
+    """
+    low_max = float((os.environ.get("TMF_VOL_REGIME_LOW_MAX_ATR", "30") or "30").strip())
+    mid_max = float((os.environ.get("TMF_VOL_REGIME_MID_MAX_ATR", "60") or "60").strip())
+    high_max = float((os.environ.get("TMF_VOL_REGIME_HIGH_MAX_ATR", "90") or "90").strip())
+    x = float(atr_points)
+    if x <= low_max:
+        return "LOW"
+    if x <= mid_max:
+        return "MID"
+    if x <= high_max:
+        return "HIGH"
+    return "EXTREME"
+
+
+def _apply_vol_confidence(meta: dict, mm: dict) -> dict:
+    """
+    v18 task: signal_confidence must be modulated by vol_regime.
+    We keep raw confidence for audit, and write adjusted confidence used by the engine.
+    """
+    atr = mm.get("atr_points")
+    if atr is None:
+        return meta
+    try:
+        regime = _vol_regime_from_atr(float(atr))
+    except Exception:
+        return meta
+
+    # factors: conservative by default (high vol -> lower confidence)
+    f_low  = float((os.environ.get("TMF_CONF_FACTOR_LOW", "1.05") or "1.05").strip())
+    f_mid  = float((os.environ.get("TMF_CONF_FACTOR_MID", "1.00") or "1.00").strip())
+    f_high = float((os.environ.get("TMF_CONF_FACTOR_HIGH", "0.80") or "0.80").strip())
+    f_ext  = float((os.environ.get("TMF_CONF_FACTOR_EXTREME", "0.60") or "0.60").strip())
+    factor = {"LOW": f_low, "MID": f_mid, "HIGH": f_high, "EXTREME": f_ext}.get(regime, f_mid)
+
+    meta = dict(meta or {})
+    meta["vol_regime"] = regime
+    meta["regime_dpb_risk"] = (regime == "EXTREME")  # B3 DPB/DPBM risk regime (fail-fast via taifex_preflight)
+
+    strat = meta.get("strat") if isinstance(meta.get("strat"), dict) else {}
+    raw = strat.get("confidence")
+    if raw is None:
+        raw = meta.get("signal_confidence")
+    if raw is None:
+        return meta
+
+    try:
+        raw_f = float(raw)
+    except Exception:
+        return meta
+
+    adj = max(0.0, min(1.0, raw_f * factor))
+    meta["signal_confidence_raw"] = raw_f
+    meta["signal_confidence"] = adj
+
+    strat = dict(strat)
+    strat.setdefault("confidence_raw", raw_f)
+    strat["confidence"] = adj
+    meta["strat"] = strat
+    return meta
+
+
+def _ensure_stop(signal: StrategySignalV1, *, ref_price: float) -> StrategySignalV1:
+    # Keep RiskEngine strict; strategy should provide stop when it can.
+    # Engine fallback is allowed for skeleton stage to keep flow testable, but is clearly tagged.
+    if signal.stop_price is not None:
+        return signal
+    default_stop_pts = float((os.environ.get("TMF_ENGINE_DEFAULT_STOP_POINTS", "50") or "50").strip())
+    # BUY: stop below; SELL: stop above
+    if signal.side == "BUY":
+        signal.stop_price = ref_price - default_stop_pts
+    else:
+        signal.stop_price = ref_price + default_stop_pts
+    signal.tags = dict(signal.tags or {})
+    signal.tags["engine_stop_fallback"] = True
+    signal.tags["engine_default_stop_points"] = default_stop_pts
+    return signal
+
+
+def _atr_from_bars(bars: Any, n: int) -> Optional[float]:
+    """Same ATR as market_metrics_from_db_v1._atr_from_bars_1m, over in-memory bars (oldest first)."""
+    rows = list(bars)[-(int(n) + 1):]
+    trs: List[float] = []
+    prev_c = None
+    for b in rows:
+        h, l, c = float(b["h"]), float(b["l"]), float(b["c"])
+        if prev_c is not None:
+            trs.append(max(h - l, abs(h - prev_c), abs(l - prev_c)))
+        prev_c = c
+    take = trs[-int(n):]
+    return float(sum(take) / float(len(take))) if take else None
@@ -9,6 +9,11 @@ Design:
 - Slippage is expressed in "points" (price ticks / index points).
 - Default is a fixed slippage per side by symbol.
 - Optional: proportional slippage via bps of price (disabled by default).
+- Optional: calibrated per (symbol, session, vol regime, qty) from src/cost/implicit_cost_v1 tables
+  (calibrated=True, or TMF_SLIPPAGE_CALIBRATED=1 when the caller does not say), measured from the caller's
+  reference price: "mid" (bar close: half spread + depth impact + realized slippage), "touch", or "vwap"
+  (depth-walking fills: realized slippage beyond the book only). Capped by the spec's max_points; falls back
+  to the fixed spec (spec_override or the symbol default) when no calibrated cell has enough samples.
 
 Use:
 - slp = calc_slippage(price, symbol, side, qty)
@@ -17,9 +22,13 @@ Use:
   - SELL: exec_price = price - slp
 """
 from __future__ import annotations
+import os
 from dataclasses import dataclass
 from typing import Dict, Optional
 
+from src.cost.implicit_cost_v1 import get_implicit_cost_model, session_of
+from src.ops.clock_v1 import clock_now
+
 
 @dataclass(frozen=True)
 class SlippageSpec:
@@ -46,12 +55,18 @@ def calc_slippage_points(
     side: str,
     qty: float = 1.0,
     spec_override: Optional[SlippageSpec] = None,
+    session: Optional[str] = None,
+    regime: Optional[str] = None,
+    calibrated: Optional[bool] = None,
+    reference: str = "mid",
 ) -> float:
     """
     Return slippage in points per side for this fill.
     Conservative rule:
       slippage = max(fixed_points, price * bps/10000), capped by max_points.
-    qty currently not used (keep deterministic v1); reserved for later depth modeling.
+    calibrated (None -> TMF_SLIPPAGE_CALIBRATED=1): calibrated table lookup for (symbol, session, regime, qty)
+    relative to `reference` ("mid" / "touch" / "vwap") instead (session None -> from the current clock;
+    regime None -> all regimes of the session).
     """
     if price <= 0:
         raise ValueError("price must be positive")
@@ -60,6 +75,14 @@ def calc_slippage_points(
         raise ValueError("side must be BUY or SELL")
 
     spec = spec_override if spec_override is not None else DEFAULT_SLIPPAGE_BY_SYMBOL.get(symbol, SlippageSpec())
+    if calibrated is None:
+        calibrated = (os.environ.get("TMF_SLIPPAGE_CALIBRATED") or "0").strip() == "1"
+    if calibrated:
+        if session is None:
+            session = session_of(clock_now())
+        c = get_implicit_cost_model().lookup(symbol, qty=float(qty), session=session, regime=(regime or "*"))
+        if c is not None:
+            return float(min(max(0.0, c.points_from(reference)), float(spec.max_points)))
     prop = (price * (float(spec.bps) / 10000.0)) if spec.bps and spec.bps > 0 else 0.0
     slp = max(float(spec.fixed_points), float(prop))
     slp = min(slp, float(spec.max_points))